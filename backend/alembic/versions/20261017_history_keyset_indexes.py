@@ -0,0 +1,48 @@
+"""Add (date, id) indexes for keyset-paginated sales history.
+
+Revision ID: 20261017_history_keyset_indexes
+Revises: 20261017_sales_facts
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_history_keyset_indexes"
+down_revision = "20261017_sales_facts"
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ("ix_sales_date_id", "sales", ["date", "id"]),
+    ("ix_pos_sales_date_id", "pos_sales", ["date", "id"]),
+]
+
+
+def _index_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {ix["name"] for ix in inspector.get_indexes(table_name)}
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    for name, table, columns in INDEXES:
+        existing = _index_names(bind, table)
+        if existing is None or name in existing:
+            continue
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for name, table, _columns in reversed(INDEXES):
+        existing = _index_names(bind, table)
+        if existing and name in existing:
+            op.drop_index(name, table_name=table)
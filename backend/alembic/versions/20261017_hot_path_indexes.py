@@ -0,0 +1,69 @@
+"""Add composite indexes for FEFO, POS reporting and stock journal access paths.
+
+Revision ID: 20261017_hot_path_indexes
+Revises: 20260515_pos_lot_pricing
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_hot_path_indexes"
+down_revision = "20260515_pos_lot_pricing"
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns, partial WHERE clause or None)
+INDEXES = [
+    ("ix_batches_medicine_active_expiry", "batches", ["medicine_id", "is_active", "expiration_date"], None),
+    ("ix_batches_live_fefo", "batches", ["medicine_id", "expiration_date"], "live"),
+    ("ix_pos_sales_status_date", "pos_sales", ["status", "date"], None),
+    ("ix_pos_sale_items_sale_id", "pos_sale_items", ["sale_id"], None),
+    ("ix_pos_sale_items_medicine_id", "pos_sale_items", ["medicine_id"], None),
+    ("ix_stock_movements_medicine_date", "stock_movements", ["medicine_id", "date_mouvement"], None),
+    ("ix_medicine_pricing_medicine_created", "medicine_pricing", ["medicine_id", "created_at"], None),
+]
+
+
+def _index_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {ix["name"] for ix in inspector.get_indexes(table_name)}
+
+
+def _live_batches_clause(dialect_name):
+    # Partial indexes are supported by SQLite and PostgreSQL only
+    if dialect_name == "sqlite":
+        return {"sqlite_where": sa.text("is_active = 1 AND quantity > 0")}
+    if dialect_name == "postgresql":
+        return {"postgresql_where": sa.text("is_active AND quantity > 0")}
+    return None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    for name, table, columns, partial in INDEXES:
+        existing = _index_names(bind, table)
+        if existing is None or name in existing:
+            continue
+
+        kwargs = {}
+        if partial == "live":
+            kwargs = _live_batches_clause(bind.dialect.name)
+            if kwargs is None:
+                # Backend without partial indexes: the composite index covers it
+                continue
+        op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for name, table, _columns, _partial in reversed(INDEXES):
+        existing = _index_names(bind, table)
+        if existing and name in existing:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,41 @@
+"""Add per-year invoice number counters.
+
+Revision ID: 20261017_invoice_sequences
+Revises: 20261017_hot_path_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_invoice_sequences"
+down_revision = "20261017_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "invoice_sequences" in sa.inspect(bind).get_table_names():
+        return
+
+    # Counters are created on first use, starting after the highest
+    # existing code of the year, so no data migration is needed.
+    op.create_table(
+        "invoice_sequences",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("prefix", sa.String(length=10), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("last_number", sa.Integer(), nullable=False, server_default="0"),
+        sa.UniqueConstraint("prefix", "year", name="uq_invoice_sequences_prefix_year"),
+    )
+    op.create_index("ix_invoice_sequences_id", "invoice_sequences", ["id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "invoice_sequences" in sa.inspect(bind).get_table_names():
+        op.drop_table("invoice_sequences")
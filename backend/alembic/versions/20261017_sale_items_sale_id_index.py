@@ -0,0 +1,37 @@
+"""Index sale_items.sale_id (history eager loads, financial statement join).
+
+Revision ID: 20261017_sale_items_sale_id_index
+Revises: 20261017_history_keyset_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_sale_items_sale_id_index"
+down_revision = "20261017_history_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+
+INDEX_NAME = "ix_sale_items_sale_id"
+
+
+def _index_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {ix["name"] for ix in inspector.get_indexes(table_name)}
+
+
+def upgrade():
+    existing = _index_names(op.get_bind(), "sale_items")
+    if existing is not None and INDEX_NAME not in existing:
+        op.create_index(INDEX_NAME, "sale_items", ["sale_id"])
+
+
+def downgrade():
+    existing = _index_names(op.get_bind(), "sale_items")
+    if existing and INDEX_NAME in existing:
+        op.drop_index(INDEX_NAME, table_name="sale_items")
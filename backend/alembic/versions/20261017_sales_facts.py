@@ -0,0 +1,71 @@
+"""Add the dashboard sales fact tables.
+
+Revision ID: 20261017_sales_facts
+Revises: 20261017_stock_holds
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_sales_facts"
+down_revision = "20261017_stock_holds"
+branch_labels = None
+depends_on = None
+
+
+def _measures():
+    return [
+        sa.Column("revenue", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("sales_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cancelled_amount", sa.Float(), nullable=False, server_default="0"),
+    ]
+
+
+def _timestamps():
+    return [
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    # Filled on first startup (or with backfill_sales_facts.py)
+    if "sales_daily_facts" not in tables:
+        op.create_table(
+            "sales_daily_facts",
+            *_timestamps(),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("source", sa.String(length=10), nullable=False),
+            sa.Column("payment_method", sa.String(length=20), nullable=False, server_default=""),
+            sa.Column("user_id", sa.Integer(), nullable=False, server_default="0"),
+            *_measures(),
+            sa.UniqueConstraint("day", "source", "payment_method", "user_id", name="uq_sales_daily_facts_bucket"),
+        )
+        op.create_index("ix_sales_daily_facts_id", "sales_daily_facts", ["id"])
+
+    if "sales_hourly_facts" not in tables:
+        op.create_table(
+            "sales_hourly_facts",
+            *_timestamps(),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("hour", sa.Integer(), nullable=False),
+            sa.Column("source", sa.String(length=10), nullable=False),
+            *_measures(),
+            sa.UniqueConstraint("day", "hour", "source", name="uq_sales_hourly_facts_bucket"),
+        )
+        op.create_index("ix_sales_hourly_facts_id", "sales_hourly_facts", ["id"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+    for table in ("sales_hourly_facts", "sales_daily_facts"):
+        if table in tables:
+            op.drop_table(table)
@@ -0,0 +1,43 @@
+"""Add the POS stock hold snapshot table.
+
+Revision ID: 20261017_stock_holds
+Revises: 20261017_invoice_sequences
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_stock_holds"
+down_revision = "20261017_invoice_sequences"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if "stock_holds" in sa.inspect(bind).get_table_names():
+        return
+
+    # Snapshot of the in-memory cart holds, rewritten by the sweeper
+    op.create_table(
+        "stock_holds",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column("hold_key", sa.String(length=120), nullable=False),
+        sa.Column("owner", sa.String(length=64), nullable=False),
+        sa.Column("medicine_id", sa.Integer(), sa.ForeignKey("medicines.id"), nullable=False),
+        sa.Column("batch_id", sa.Integer(), sa.ForeignKey("batches.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_stock_holds_id", "stock_holds", ["id"])
+    op.create_index("ix_stock_holds_hold_key", "stock_holds", ["hold_key"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    if "stock_holds" in sa.inspect(bind).get_table_names():
+        op.drop_table("stock_holds")
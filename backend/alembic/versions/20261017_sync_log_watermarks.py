@@ -0,0 +1,52 @@
+"""Per-table sync_down high-water marks in sync_logs.
+
+Revision ID: 20261017_sync_log_watermarks
+Revises: 20261017_sale_items_sale_id_index
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_sync_log_watermarks"
+down_revision = "20261017_sale_items_sale_id_index"
+branch_labels = None
+depends_on = None
+
+
+INDEX_NAME = "ix_sync_logs_table_name"
+
+
+def _column_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {col["name"] for col in inspector.get_columns(table_name)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = _column_names(bind, "sync_logs")
+    if columns is None:
+        return
+    if "table_name" not in columns:
+        op.add_column("sync_logs", sa.Column("table_name", sa.String(length=50), nullable=True))
+    if "high_water_mark" not in columns:
+        op.add_column("sync_logs", sa.Column("high_water_mark", sa.DateTime(timezone=True), nullable=True))
+    if INDEX_NAME not in {ix["name"] for ix in sa.inspect(bind).get_indexes("sync_logs")}:
+        op.create_index(INDEX_NAME, "sync_logs", ["table_name"])
+
+
+def downgrade():
+    bind = op.get_bind()
+    columns = _column_names(bind, "sync_logs")
+    if not columns:
+        return
+    if INDEX_NAME in {ix["name"] for ix in sa.inspect(bind).get_indexes("sync_logs")}:
+        op.drop_index(INDEX_NAME, table_name="sync_logs")
+    with op.batch_alter_table("sync_logs") as batch_op:
+        if "high_water_mark" in columns:
+            batch_op.drop_column("high_water_mark")
+        if "table_name" in columns:
+            batch_op.drop_column("table_name")
@@ -0,0 +1,64 @@
+"""Outbox columns on sync_queue (row key, idempotency key, version).
+
+Revision ID: 20261017_sync_queue_outbox
+Revises: 20261017_sync_log_watermarks
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_sync_queue_outbox"
+down_revision = "20261017_sync_log_watermarks"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    "ix_sync_queue_status_id": (["status", "id"], False),
+    "ix_sync_queue_idempotency_key": (["idempotency_key"], True),
+}
+
+
+def _column_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {col["name"] for col in inspector.get_columns(table_name)}
+
+
+def _index_names(bind, table_name):
+    return {ix["name"] for ix in sa.inspect(bind).get_indexes(table_name)}
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = _column_names(bind, "sync_queue")
+    if columns is None:
+        return
+    if "row_key" not in columns:
+        op.add_column("sync_queue", sa.Column("row_key", sa.String(length=64), nullable=True))
+    if "idempotency_key" not in columns:
+        op.add_column("sync_queue", sa.Column("idempotency_key", sa.String(length=120), nullable=True))
+    if "version" not in columns:
+        op.add_column("sync_queue", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    existing = _index_names(bind, "sync_queue")
+    for name, (index_columns, unique) in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "sync_queue", index_columns, unique=unique)
+
+
+def downgrade():
+    bind = op.get_bind()
+    columns = _column_names(bind, "sync_queue")
+    if not columns:
+        return
+    existing = _index_names(bind, "sync_queue")
+    for name in INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="sync_queue")
+    with op.batch_alter_table("sync_queue") as batch_op:
+        for column in ("version", "idempotency_key", "row_key"):
+            if column in columns:
+                batch_op.drop_column(column)
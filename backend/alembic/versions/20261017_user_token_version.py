@@ -0,0 +1,35 @@
+"""Token version on users (invalidates tokens issued before a password change).
+
+Revision ID: 20261017_user_token_version
+Revises: 20261017_sync_queue_outbox
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20261017_user_token_version"
+down_revision = "20261017_sync_queue_outbox"
+branch_labels = None
+depends_on = None
+
+
+def _column_names(bind, table_name):
+    inspector = sa.inspect(bind)
+    if table_name not in inspector.get_table_names():
+        return None
+    return {col["name"] for col in inspector.get_columns(table_name)}
+
+
+def upgrade():
+    columns = _column_names(op.get_bind(), "users")
+    if columns is not None and "token_version" not in columns:
+        op.add_column("users", sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    columns = _column_names(op.get_bind(), "users")
+    if columns and "token_version" in columns:
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.drop_column("token_version")
@@ -4,14 +4,18 @@ Handles token extraction, verification, and role-based access control.
 """
 
 from fastapi import Depends, HTTPException, status
+import logging
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.database import get_local_db
 from app.models.user import User, UserRole
-from app.utils.security import decode_token
+from app.utils.security import verify_token
 from app.schemas.auth import TokenData
+from app.auth.user_cache import UserPrincipal, user_cache
+
+logger = logging.getLogger(__name__)
 
 # OAuth2 scheme for token extraction
 # tokenUrl is the endpoint where clients get tokens
@@ -33,10 +37,37 @@ credentials_exception = HTTPException(
 # AUTHENTICATION DEPENDENCIES
 # ============================================================================
 
+def _load_principal(token: str, db: Session) -> UserPrincipal:
+    """
+    Resolve a JWT to its user, from user_cache when possible.
+
+    Tokens carry the user's token_version ("ver", 0 for tokens issued
+    before versions existed): a token older than the last password
+    change is rejected.
+    """
+    payload = verify_token(token)
+    if payload is None or payload.get("sub") is None:
+        raise credentials_exception
+    username = payload["sub"]
+    version = payload.get("ver", 0)
+
+    principal = user_cache.get(username, version)
+    if principal is not None:
+        return principal
+
+    generation = user_cache.generation()
+    user = db.query(User).filter(User.username == username).first()
+    if user is None or (user.token_version or 0) != version:
+        raise credentials_exception
+    principal = UserPrincipal.from_user(user)
+    user_cache.put(principal, generation)
+    return principal
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_local_db)
-) -> User:
+) -> UserPrincipal:
     """
     Get current authenticated user from JWT token.
     
@@ -45,24 +76,13 @@ async def get_current_user(
         db: Database session
         
     Returns:
-        User: Current authenticated user
+        UserPrincipal: Current authenticated user (cached, read-only;
+        load the User row to modify it)
         
     Raises:
         HTTPException: 401 if token is invalid or user not found
     """
-    # Decode token to get username
-    username = decode_token(token)
-    
-    if username is None:
-        raise credentials_exception
-    
-    # Get user from database
-    user = db.query(User).filter(User.username == username).first()
-    
-    if user is None:
-        raise credentials_exception
-    
-    return user
+    return _load_principal(token, db)
 
 
 from app.core.license import license_service
@@ -85,7 +105,6 @@ async def get_current_active_user(
         HTTPException: 400 if user is inactive
         HTTPException: 403 if license is expired (and not Super Admin)
     """
-    print(f"[DEBUG] get_current_active_user: Verifying user {current_user.username}")
     if not current_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,16 +114,14 @@ async def get_current_active_user(
     # Check license status
     # Super Admin can bypass expired license to fix it
     if current_user.role != UserRole.SUPER_ADMIN:
-        print("[DEBUG] get_current_active_user: Checking license...")
         license_status = license_service.get_license_status(db)
-        print(f"[DEBUG] get_current_active_user: License status: {license_status.get('status')}")
+        logger.debug("License status for %s: %s", current_user.username, license_status.get("status"))
         if license_status["status"] == "expired":
              raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=license_status["message"]
             )
             
-    print("[DEBUG] get_current_active_user: Verification complete.")
     return current_user
 
 
@@ -185,7 +202,7 @@ async def get_super_admin_user(
 async def get_super_admin_user_bypass_license(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_local_db)
-) -> User:
+) -> UserPrincipal:
     """
     Get Super Admin user WITHOUT checking license status.
     This allows Super Admin to access license management even when license is expired.
@@ -195,23 +212,13 @@ async def get_super_admin_user_bypass_license(
         db: Database session
         
     Returns:
-        User: Current super admin user
+        UserPrincipal: Current super admin user
         
     Raises:
         HTTPException: 401 if token is invalid or user not found
         HTTPException: 403 if user is not super admin
     """
-    # Decode token to get username
-    username = decode_token(token)
-    
-    if username is None:
-        raise credentials_exception
-    
-    # Get user from database
-    user = db.query(User).filter(User.username == username).first()
-    
-    if user is None:
-        raise credentials_exception
+    user = _load_principal(token, db)
     
     # Check if user is active
     if not user.is_active:
@@ -0,0 +1,110 @@
+"""
+Authenticated-user cache.
+
+get_current_user runs on every protected request (POS search and cart
+calls included). Instead of loading the User row each time, the fields
+the routes read are kept as a UserPrincipal in a small LRU:
+
+- keyed by (JWT subject, token version): a token issued before a password
+  change carries an older version and never matches;
+- entries expire after AUTH_USER_CACHE_TTL_SECONDS, which bounds how long
+  a change made outside the routes (another process, a script) can go
+  unseen;
+- the routes updating, deactivating or deleting a user call
+  invalidate(user_id) after committing.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+import os
+import threading
+import time
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Authenticated user as seen by the routes (no password hash)."""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    must_change_password: bool
+    token_version: int
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            role=user.role,
+            is_active=user.is_active,
+            must_change_password=user.must_change_password,
+            token_version=user.token_version or 0,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+class UserCache:
+    """Bounded LRU of UserPrincipal with a short TTL."""
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, UserPrincipal]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str, token_version: int) -> Optional[UserPrincipal]:
+        key = (subject, token_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self) -> int:
+        """Token to pass to put(): a load overlapping an invalidation is not kept."""
+        with self._lock:
+            return self._generation
+
+    def put(self, principal: UserPrincipal, generation: Optional[int] = None) -> None:
+        key = (principal.username, principal.token_version)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), principal)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop the entries of one user (all users when user_id is None)."""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k, (_, p) in self._entries.items() if p.id == user_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+user_cache = UserCache()
@@ -1,49 +1,83 @@
-from datetime import datetime
+from datetime import date, datetime
+import threading
 from .config import LICENSE_EXPIRATION_DATE, WARNING_DAYS_THRESHOLD
 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.settings import Settings
 
+DEFAULT_WARNING_MESSAGE = "Votre licence expire bientôt. Veuillez contacter le concepteur pour une mise à jour."
+
+# Settings rows read by the license check
+LICENSE_SETTING_KEYS = ("license_expiry_date", "license_warning_bdays", "license_warning_message")
+
+
 class LicenseService:
+    """
+    License status, computed from the license settings.
+
+    get_current_active_user checks the license on every authenticated
+    request, so the settings are read once and kept in memory:
+
+    - the three license settings are loaded in one query and kept until
+      invalidate() is called by the routes writing them (/license/update,
+      /admin/license, /settings) and by sync_down;
+    - the status is kept for the current day and recomputed when the date
+      changes (days_remaining, valid -> warning -> expired).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._config = None        # (expiration_date_str, warning_days, warning_msg)
+        self._status = None
+        self._status_day = None
+        self._generation = 0       # bumped by invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self) -> None:
+        """Forget the cached settings (call after committing a license setting)."""
+        with self._lock:
+            self._generation += 1
+            self._config = None
+            self._status = None
+            self._status_day = None
+
     @staticmethod
-    def get_license_status(db: Session = None):
+    def _load_config(db: Session = None):
         expiration_date_str = LICENSE_EXPIRATION_DATE
-        
         warning_days = WARNING_DAYS_THRESHOLD
-        warning_msg = "Votre licence expire bientôt. Veuillez contacter le concepteur pour une mise à jour."
-        
+        warning_msg = DEFAULT_WARNING_MESSAGE
+
         # Try to get from DB if session is provided
         if db:
-            try:
-                # 1. Expiration Date
-                setting = db.query(Settings).filter(Settings.key == "license_expiry_date").first()
-                if setting and setting.value:
-                    expiration_date_str = setting.value
-                
-                # 2. Warning Days Threshold
-                setting = db.query(Settings).filter(Settings.key == "license_warning_bdays").first()
-                if setting and setting.value:
-                    try:
-                        warning_days = int(setting.value)
-                    except:
-                        pass
-                
-                # 3. Warning Message
-                setting = db.query(Settings).filter(Settings.key == "license_warning_message").first()
-                if setting and setting.value:
-                    warning_msg = setting.value
-                    
-            except Exception:
-                pass # Fallback to config
+            rows = dict(db.execute(
+                select(Settings.key, Settings.value).where(Settings.key.in_(LICENSE_SETTING_KEYS))
+            ).all())
+            # 1. Expiration Date
+            if rows.get("license_expiry_date"):
+                expiration_date_str = rows["license_expiry_date"]
+            # 2. Warning Days Threshold
+            if rows.get("license_warning_bdays"):
+                try:
+                    warning_days = int(rows["license_warning_bdays"])
+                except ValueError:
+                    pass
+            # 3. Warning Message
+            if rows.get("license_warning_message"):
+                warning_msg = rows["license_warning_message"]
+
+        return expiration_date_str, warning_days, warning_msg
 
+    @staticmethod
+    def _compute_status(config, today: date):
+        expiration_date_str, warning_days, warning_msg = config
         try:
-            expiration_date = datetime.strptime(expiration_date_str, "%Y-%m-%d")
-            today = datetime.now()
-            
+            expiration_date = datetime.strptime(expiration_date_str, "%Y-%m-%d").date()
+
             # Calculate days remaining
-            delta = expiration_date - today
-            days_remaining = delta.days + 1 # Include today
-            
+            days_remaining = (expiration_date - today).days
+
             if days_remaining < 0:
                 return {
                     "status": "expired",
@@ -51,7 +85,7 @@ class LicenseService:
                     "expiration_date": expiration_date_str,
                     "message": warning_msg
                 }
-            
+
             if days_remaining <= warning_days:
                 return {
                     "status": "warning",
@@ -59,7 +93,7 @@ class LicenseService:
                     "expiration_date": expiration_date_str,
                     "message": warning_msg
                 }
-                
+
             return {
                 "status": "valid",
                 "days_remaining": days_remaining,
@@ -72,10 +106,41 @@ class LicenseService:
                 "message": f"Erreur de vérification de licence: {str(e)}"
             }
 
-    @staticmethod
-    def check_license_validity(db: Session = None) -> bool:
+    def get_license_status(self, db: Session = None):
+        today = date.today()
+        if db is None:
+            return self._compute_status(self._load_config(), today)
+
+        with self._lock:
+            if self._status is not None and self._status_day == today:
+                self.hits += 1
+                return dict(self._status)
+            self.misses += 1
+            config, generation = self._config, self._generation
+
+        if config is None:
+            try:
+                config = self._load_config(db)
+            except Exception:
+                # Fallback to config, not cached
+                return self._compute_status(self._load_config(), today)
+
+        status = self._compute_status(config, today)
+        with self._lock:
+            # Settings written while we were reading: don't keep stale values
+            if self._generation == generation:
+                self._config = config
+                self._status = status
+                self._status_day = today
+        return dict(status)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def check_license_validity(self, db: Session = None) -> bool:
         """Returns True if license is valid, False otherwise."""
-        status = LicenseService.get_license_status(db)
+        status = self.get_license_status(db)
         return status["status"] != "expired"
 
 license_service = LicenseService()
@@ -0,0 +1,152 @@
+"""
+Logging setup.
+
+Diagnostics go through the standard `logging` module instead of print():
+in the executable stdout is a file, so every print was a synchronous
+write on the request path.
+
+- every logger feeds a QueueHandler: the calling thread only formats the
+  record onto a queue, a QueueListener thread writes it out;
+- a disabled level costs one level check (use logger.debug("... %s", x),
+  the message is not built);
+- LOG_LEVEL sets the root level, LOG_LEVELS per-module levels
+  ("app.sync=DEBUG,sqlalchemy.engine=INFO");
+- records go to a size-rotated file in LOG_DIR (APPDATA/PharmaGestion/logs
+  in the executable) and to stderr outside of it;
+- LOG_FORMAT=json writes one JSON object per line (fields passed with
+  `extra=` included).
+"""
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv("LOG_FILE_BACKUPS", "5"))
+LOG_FILE_NAME = "backend.log"
+
+# Noisy third-party loggers, unless overridden by LOG_LEVELS
+DEFAULT_LEVELS = {
+    "sqlalchemy.engine": "WARNING",
+    "multipart": "WARNING",
+    "PIL": "WARNING",
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s [%(threadName)s] %(name)s: %(message)s"
+
+# LogRecord attributes, everything else comes from `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def default_log_dir() -> Optional[str]:
+    """LOG_DIR, or APPDATA/PharmaGestion/logs in the executable."""
+    if os.getenv("LOG_DIR"):
+        return os.getenv("LOG_DIR")
+    if getattr(sys, "frozen", False):
+        return os.path.join(os.environ.get("APPDATA", "."), "PharmaGestion", "logs")
+    return None
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse LOG_LEVELS: "app.sync=DEBUG,sqlalchemy.engine=INFO"."""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    levels: Optional[Dict[str, str]] = None,
+    log_dir: Optional[str] = None,
+    console: Optional[bool] = None,
+) -> Optional[QueueListener]:
+    """
+    Route every logger through a queue to the file/console handlers.
+
+    Idempotent: a second call only re-applies the levels.
+    """
+    global _listener, _queue_handler
+
+    logging.getLogger().setLevel(level)
+    for name, module_level in {**DEFAULT_LEVELS, **parse_levels(LOG_LEVELS), **(levels or {})}.items():
+        logging.getLogger(name).setLevel(module_level)
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    log_dir = log_dir or default_log_dir()
+    if log_dir:
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            handlers.append(RotatingFileHandler(
+                os.path.join(log_dir, LOG_FILE_NAME), maxBytes=LOG_FILE_MAX_BYTES,
+                backupCount=LOG_FILE_BACKUPS, encoding="utf-8",
+            ))
+        except OSError as e:
+            sys.stderr.write(f"Log file disabled: {e}\n")
+    if console is None:
+        # The executable has no console (stdout is redirected to a file)
+        console = not getattr(sys, "frozen", False)
+    if console:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush the queue and stop the writer thread."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
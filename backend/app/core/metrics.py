@@ -0,0 +1,361 @@
+"""
+Metrics.
+
+In-process counters, gauges and histograms, exposed by /metrics in the
+Prometheus text format and by /metrics/json:
+
+- MetricsMiddleware (pure ASGI) records, per route template and method,
+  a latency histogram, the status codes and the requests in flight;
+- install_db_hooks() counts the SQL statements and the time spent in the
+  database, attributed to the request that ran them (a context variable,
+  copied to the threadpool running `def` endpoints);
+- services bump their own counters (metrics.inc("pharma_checkouts_total"))
+  and collectors registered with register_collector() report values read
+  at scrape time (sync backlog, cache hit rates).
+
+Histograms use fixed buckets: observe() is a few comparisons under a lock.
+METRICS=off disables the middleware and the database hooks.
+"""
+
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS", "on").lower() not in ("off", "false", "0")
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+Labels = Tuple[Tuple[str, str], ...]
+# (name, kind, help, labels, value) reported by a collector
+Sample = Tuple[str, str, str, Dict[str, Any], float]
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram (Prometheus-style buckets, in ms)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value_ms: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value_ms <= bound:
+                self._counts[i] += 1
+                break
+        else:
+            self._counts[-1] += 1
+        self._sum += value_ms
+        self._count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self._count:
+            return None
+        rank, seen = q * self._count, 0
+        for bound, count in zip((*self.buckets, float("inf")), self._counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, seen = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self._counts):
+            seen += count
+            cumulative.append([bound, seen])
+        return {
+            "count": self._count,
+            "sum_ms": round(self._sum, 3),
+            "buckets": cumulative,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+        }
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """Thread-safe store of the application metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}     # name -> (kind, help)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, LatencyHistogram]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Optional[Tuple[float, ...]] = None) -> None:
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            if buckets is not None:
+                self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def add_gauge(self, name: str, delta: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + delta
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = LatencyHistogram(self._buckets.get(name, LATENCY_BUCKETS_MS))
+            histogram.observe(value)
+
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Add a function returning samples read at scrape time."""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def reset(self) -> None:
+        """Forget the recorded values (tests); descriptions and collectors stay."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def _collect(self) -> Tuple[Dict[str, Dict[Labels, float]], Dict[str, Dict[Labels, float]], Dict[str, Any]]:
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            histograms = {
+                name: {key: h.snapshot() for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            collectors = list(self._collectors)
+            meta = dict(self._meta)
+
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                meta.setdefault(name, (kind, help_text))
+                target = counters if kind == "counter" else gauges
+                target.setdefault(name, {})[_labels(labels)] = value
+        return counters, gauges, {"histograms": histograms, "meta": meta}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every metric as JSON: {name: {"type", "help", "series": [{"labels", "value" or histogram fields}]}}."""
+        counters, gauges, rest = self._collect()
+        result: Dict[str, Any] = {}
+        for kind, store in (("counter", counters), ("gauge", gauges)):
+            for name, series in sorted(store.items()):
+                result[name] = {
+                    "type": kind,
+                    "help": rest["meta"].get(name, (kind, ""))[1],
+                    "series": [{"labels": dict(key), "value": value} for key, value in sorted(series.items())],
+                }
+        for name, series in sorted(rest["histograms"].items()):
+            result[name] = {
+                "type": "histogram",
+                "help": rest["meta"].get(name, ("histogram", ""))[1],
+                "series": [{"labels": dict(key), **snap} for key, snap in sorted(series.items())],
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters, gauges, rest = self._collect()
+        meta = rest["meta"]
+        lines: List[str] = []
+
+        def header(name, kind):
+            help_text = meta.get(name, (kind, ""))[1]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for kind, store in (("counter", counters), ("gauge", gauges)):
+            for name, series in sorted(store.items()):
+                header(name, kind)
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name, series in sorted(rest["histograms"].items()):
+            header(name, "histogram")
+            for key, snap in sorted(series.items()):
+                for bound, count in snap["buckets"]:
+                    le = bound if bound == "+Inf" else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', le))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(snap['sum_ms'])}")
+                lines.append(f"{name}_count{_format_labels(key)} {snap['count']}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+metrics.describe("pharma_http_requests_total", "counter", "HTTP requests by route, method and status code.")
+metrics.describe("pharma_http_requests_in_flight", "gauge", "HTTP requests being served.")
+metrics.describe("pharma_http_request_duration_ms", "histogram", "HTTP request latency in milliseconds, by route.")
+metrics.describe("pharma_http_request_db_queries", "histogram", "SQL statements per HTTP request, by route.",
+                 buckets=QUERY_COUNT_BUCKETS)
+metrics.describe("pharma_http_request_db_time_ms", "histogram", "Database time per HTTP request in milliseconds, by route.")
+metrics.describe("pharma_db_queries_total", "counter", "SQL statements executed (requests and background work).")
+metrics.describe("pharma_db_time_ms_total", "counter", "Time spent executing SQL statements, in milliseconds.")
+metrics.describe("pharma_checkouts_total", "counter", "POS sales checked out.")
+metrics.describe("pharma_checkout_lines_total", "counter", "Sale lines (batch allocations) checked out.")
+metrics.describe("pharma_checkout_cancellations_total", "counter", "POS sales cancelled.")
+metrics.describe("pharma_sync_runs_total", "counter", "Sync worker passes, by result.")
+metrics.describe("pharma_sync_sales_pushed_total", "counter", "Sales sent to the remote database by the sync worker.")
+
+
+# ----------------------------------------------------------------------
+# Per-request database statistics
+# ----------------------------------------------------------------------
+
+class RequestStats:
+    __slots__ = ("queries", "db_time_ms")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time_ms = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+_hooks_installed = False
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Statistics of the request being served, None outside of a request."""
+    return _request_stats.get()
+
+
+# The start time lives on the execution context, not on the connection:
+# a statement that raises never reaches after_cursor_execute, and its
+# context is simply dropped.
+_START_ATTR = "_metrics_query_start"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        setattr(context, _START_ATTR, time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, _START_ATTR, None)
+    if started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    metrics.inc("pharma_db_queries_total")
+    metrics.inc("pharma_db_time_ms_total", elapsed_ms)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time_ms += elapsed_ms
+
+
+def install_db_hooks() -> None:
+    """Time every statement on every engine (idempotent)."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    _hooks_installed = True
+
+
+def uninstall_db_hooks() -> None:
+    global _hooks_installed
+    if not _hooks_installed:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+    _hooks_installed = False
+
+
+# ----------------------------------------------------------------------
+# ASGI middleware
+# ----------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """Per-route latency, status codes, in-flight requests and DB usage."""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        method = scope.get("method", "GET")
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        registry.add_gauge("pharma_http_requests_in_flight", 1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            _request_stats.reset(token)
+            registry.add_gauge("pharma_http_requests_in_flight", -1)
+            # Route template, not the raw path: /stock/{id}, not /stock/42
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            registry.inc("pharma_http_requests_total", route=route, method=method, status=status["code"])
+            registry.observe("pharma_http_request_duration_ms", elapsed_ms, route=route, method=method)
+            registry.observe("pharma_http_request_db_queries", stats.queries, route=route, method=method)
+            registry.observe("pharma_http_request_db_time_ms", stats.db_time_ms, route=route, method=method)
@@ -9,6 +9,8 @@ from .core import (
     init_local_db,
     init_remote_db,
     check_database_connection,
+    configure_sqlite_engine,
+    get_sqlite_pragmas,
     engine_local,
     engine_remote
 )
@@ -22,6 +24,8 @@ __all__ = [
     "init_local_db",
     "init_remote_db",
     "check_database_connection",
+    "configure_sqlite_engine",
+    "get_sqlite_pragmas",
     "engine_local",
     "engine_remote"
 ]
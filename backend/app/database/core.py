@@ -3,13 +3,16 @@ Database configuration module.
 Manages dual database connections: SQLite (local/offline) and PostgreSQL Supabase (remote/cloud).
 """
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from typing import Generator
+import logging
 import os
 import sys
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 load_dotenv()
 
@@ -22,7 +25,7 @@ def get_database_path():
         appdata_dir = os.path.join(os.getenv('APPDATA'), 'PharmaGestion')
         os.makedirs(appdata_dir, exist_ok=True)
         db_path = os.path.join(appdata_dir, 'pharmacy_local.db')
-        print(f"[DEBUG] Using APPDATA database: {db_path}")
+        logger.debug(f"Using APPDATA database: {db_path}")
         return f"sqlite:///{db_path}"
     else:
         # Running in development - use local directory
@@ -32,9 +35,8 @@ def get_database_path():
 DATABASE_URL_LOCAL = os.getenv("DB_URL_LOCAL", get_database_path())
 DATABASE_URL_REMOTE = os.getenv("DB_URL_REMOTE", "")
 if not DATABASE_URL_REMOTE:
-    import logging as _logging
-    _logging.getLogger("database").warning(
-        "[WARNING] DB_URL_REMOTE non configurée — mode local SQLite uniquement. "
+    logger.warning(
+        "DB_URL_REMOTE non configurée — mode local SQLite uniquement. "
         "Configurez DB_URL_REMOTE dans les variables d'environnement."
     )
 
@@ -46,6 +48,69 @@ engine_local = create_engine(
     echo=False
 )
 
+# =============================
+# SQLITE TUNING PROFILE
+# =============================
+# Applied on every new DBAPI connection (engine "connect" event).
+# WAL lets dashboard reads run while a checkout writes, and
+# synchronous=NORMAL only fsyncs at checkpoints instead of every commit
+# (still durable against application crashes; a power cut can lose the
+# last transactions, never corrupt the file).
+# Set SQLITE_TUNING=off to keep SQLite defaults (rollback journal).
+SQLITE_TUNING_ENABLED = os.getenv("SQLITE_TUNING", "on").lower() not in ("off", "false", "0")
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),      # négatif = KiB (64 Mo)
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", "268435456")),     # 256 Mo
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+_PRAGMA_LABELS = {
+    "synchronous": {0: "OFF", 1: "NORMAL", 2: "FULL", 3: "EXTRA"},
+    "temp_store": {0: "DEFAULT", 1: "FILE", 2: "MEMORY"},
+}
+
+
+def configure_sqlite_engine(engine, pragmas: dict = None) -> None:
+    """
+    Register the connect-time PRAGMA profile on a SQLite engine.
+    No-op for other backends.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    profile = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # busy_timeout first: journal_mode=WAL needs a lock on the file
+            for name in sorted(profile, key=lambda n: n != "busy_timeout"):
+                cursor.execute(f"PRAGMA {name}={profile[name]}")
+        finally:
+            cursor.close()
+
+
+def get_sqlite_pragmas(engine=None) -> dict:
+    """
+    Read back the PRAGMAs active on a live connection (startup self-check).
+    Returns an empty dict for non-SQLite engines.
+    """
+    engine = engine or engine_local
+    if engine.dialect.name != "sqlite":
+        return {}
+    with engine.connect() as conn:
+        active = {}
+        for name in SQLITE_PRAGMAS:
+            value = conn.execute(text(f"PRAGMA {name}")).scalar()
+            active[name] = _PRAGMA_LABELS.get(name, {}).get(value, value)
+        return active
+
+
+if SQLITE_TUNING_ENABLED:
+    configure_sqlite_engine(engine_local)
+
 # PostgreSQL engine (remote/cloud) — fallback sur SQLite local si non configuré
 if not DATABASE_URL_REMOTE:
     # Pas de DB remote configurée — on réutilise l'engine local
@@ -56,6 +121,8 @@ elif "sqlite" in DATABASE_URL_REMOTE:
         connect_args={"check_same_thread": False},
         echo=False
     )
+    if SQLITE_TUNING_ENABLED:
+        configure_sqlite_engine(engine_remote)
 else:
     engine_remote = create_engine(
         DATABASE_URL_REMOTE,
@@ -127,11 +194,24 @@ def init_local_db():
     from app.models.medicine_pricing import MedicinePricing  # Pricing module
     try:
         Base.metadata.create_all(bind=engine_local)
-        print("[OK] Local database (SQLite) initialized successfully!")
+        logger.info("Local database (SQLite) initialized successfully!")
     except Exception as e:
-        print(f"[ERROR] SQLite init failed: {e}")
+        logger.error(f"SQLite init failed: {e}")
         raise
 
+    # Self-check: report the PRAGMAs actually in effect
+    try:
+        pragmas = get_sqlite_pragmas(engine_local)
+        if pragmas:
+            logger.info("SQLite pragmas: " + ", ".join(f"{k}={v}" for k, v in pragmas.items()))
+            if SQLITE_TUNING_ENABLED and str(pragmas.get("journal_mode", "")).lower() != SQLITE_PRAGMAS["journal_mode"].lower():
+                logger.warning(
+                    f"SQLite journal_mode={pragmas.get('journal_mode')} "
+                    f"(attendu: {SQLITE_PRAGMAS['journal_mode']})"
+                )
+    except Exception as e:
+        logger.warning(f"SQLite pragma check skipped: {e}")
+
     # Check if super admin user exists, if not create one
     from sqlalchemy.orm import Session
     from app.models.user import User, UserRole
@@ -153,9 +233,9 @@ def init_local_db():
             )
             session.add(admin_user)
             session.commit()
-            print("[OK] Super admin créé (username: arnaud)")
-            print(f"[IMPORTANT] Mot de passe initial : {initial_password}")
-            print("[IMPORTANT] Ce mot de passe ne sera affiché qu'UNE SEULE FOIS. Changez-le immédiatement.")
+            logger.info("Super admin créé (username: arnaud)")
+            logger.warning(f"Mot de passe initial : {initial_password}")
+            logger.warning("Ce mot de passe ne sera affiché qu'UNE SEULE FOIS. Changez-le immédiatement.")
 
         # Check if is_first_setup setting exists, if not create it
         first_setup_setting = session.query(Settings).filter(Settings.key == "is_first_setup").first()
@@ -164,7 +244,7 @@ def init_local_db():
             session.add(setting)
             session.commit()
     except Exception as e:
-        print(f"[WARNING] Could not create default admin: {e}")
+        logger.warning(f"Could not create default admin: {e}")
     finally:
         session.close()
     
@@ -186,7 +266,7 @@ def init_local_db():
         ).all()
         
         if medicines_without_batches:
-            print(f"[*] Migrating {len(medicines_without_batches)} medicines to batch system...")
+            logger.info(f"Migrating {len(medicines_without_batches)} medicines to batch system...")
             for med in medicines_without_batches:
                 # Create a default batch with existing stock
                 default_expiry = med.expiry_date if med.expiry_date else (date.today() + timedelta(days=365))
@@ -200,9 +280,9 @@ def init_local_db():
                 )
                 session.add(batch)
             session.commit()
-            print(f"[OK] {len(medicines_without_batches)} default batches created")
+            logger.info(f"{len(medicines_without_batches)} default batches created")
     except Exception as e:
-        print(f"[WARNING] Batch migration skipped: {e}")
+        logger.warning(f"Batch migration skipped: {e}")
         session.rollback()
     finally:
         session.close()
@@ -219,9 +299,9 @@ def init_local_db():
             if 'customer_name' not in columns:
                 session.execute(text("ALTER TABLE pos_sales ADD COLUMN customer_name VARCHAR(200)"))
                 session.commit()
-                print("[OK] Added customer_name column to pos_sales")
+                logger.info("Added customer_name column to pos_sales")
     except Exception as e:
-        print(f"[WARNING] pos_sales migration skipped: {e}")
+        logger.warning(f"pos_sales migration skipped: {e}")
         session.rollback()
     finally:
         session.close()
@@ -245,7 +325,7 @@ def init_local_db():
             for col, col_def in new_cols.items():
                 if col not in existing_cols:
                     session.execute(text(f"ALTER TABLE pos_sales ADD COLUMN {col} {col_def}"))
-                    print(f"[OK] Added column '{col}' to pos_sales")
+                    logger.info(f"Added column '{col}' to pos_sales")
             session.commit()
 
         if 'pos_sale_items' in inspector.get_table_names():
@@ -257,15 +337,103 @@ def init_local_db():
             for col, col_def in new_cols.items():
                 if col not in existing_cols:
                     session.execute(text(f"ALTER TABLE pos_sale_items ADD COLUMN {col} {col_def}"))
-                    print(f"[OK] Added column '{col}' to pos_sale_items")
+                    logger.info(f"Added column '{col}' to pos_sale_items")
+            session.commit()
+
+    except Exception as e:
+        logger.warning(f"Sync columns migration skipped: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+    # =============================
+    # AUTO-MIGRATE: Add sync_down watermark columns to sync_logs if missing
+    # =============================
+    session = Session(bind=engine_local)
+    try:
+        from sqlalchemy import text, inspect
+        inspector = inspect(engine_local)
+        if 'sync_logs' in inspector.get_table_names():
+            existing_cols = [c['name'] for c in inspector.get_columns('sync_logs')]
+            new_cols = {
+                'table_name':      "VARCHAR(50)",
+                'high_water_mark': "DATETIME",
+            }
+            for col, col_def in new_cols.items():
+                if col not in existing_cols:
+                    session.execute(text(f"ALTER TABLE sync_logs ADD COLUMN {col} {col_def}"))
+                    logger.info(f"Added column '{col}' to sync_logs")
             session.commit()
+    except Exception as e:
+        logger.warning(f"sync_logs migration skipped: {e}")
+        session.rollback()
+    finally:
+        session.close()
 
+    # =============================
+    # AUTO-MIGRATE: Add outbox columns to sync_queue if missing
+    # (its indexes are created by the index migration below)
+    # =============================
+    session = Session(bind=engine_local)
+    try:
+        from sqlalchemy import text, inspect
+        inspector = inspect(engine_local)
+        if 'sync_queue' in inspector.get_table_names():
+            existing_cols = [c['name'] for c in inspector.get_columns('sync_queue')]
+            new_cols = {
+                'row_key':         "VARCHAR(64)",
+                'idempotency_key': "VARCHAR(120)",
+                'version':         "INTEGER NOT NULL DEFAULT 1",
+            }
+            for col, col_def in new_cols.items():
+                if col not in existing_cols:
+                    session.execute(text(f"ALTER TABLE sync_queue ADD COLUMN {col} {col_def}"))
+                    logger.info(f"Added column '{col}' to sync_queue")
+            session.commit()
     except Exception as e:
-        print(f"[WARNING] Sync columns migration skipped: {e}")
+        logger.warning(f"sync_queue migration skipped: {e}")
         session.rollback()
     finally:
         session.close()
 
+    # =============================
+    # AUTO-MIGRATE: Add token_version column to users if missing
+    # =============================
+    session = Session(bind=engine_local)
+    try:
+        from sqlalchemy import text, inspect
+        inspector = inspect(engine_local)
+        if 'users' in inspector.get_table_names():
+            columns = [c['name'] for c in inspector.get_columns('users')]
+            if 'token_version' not in columns:
+                session.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+                session.commit()
+                logger.info("Added token_version column to users")
+    except Exception as e:
+        logger.warning(f"users migration skipped: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+    # =============================
+    # AUTO-MIGRATE: Create model indexes missing on existing tables
+    # =============================
+    # create_all() only creates indexes together with their table.
+    try:
+        from sqlalchemy import inspect
+        inspector = inspect(engine_local)
+        existing_tables = set(inspector.get_table_names())
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=engine_local)
+                    logger.info(f"Created index '{index.name}' on {table.name}")
+    except Exception as e:
+        logger.warning(f"Index migration skipped: {e}")
+
     # =============================
     # SAFETY CHECK: Report expired batches without mutating expiry dates
     # =============================
@@ -282,12 +450,12 @@ def init_local_db():
         
         if expired_batches:
             for batch in expired_batches:
-                print(
-                    f"[WARNING] Batch {batch.batch_number} is expired "
+                logger.warning(
+                    f"Batch {batch.batch_number} is expired "
                     f"({batch.expiration_date}) and will be blocked from POS sales"
                 )
     except Exception as e:
-        print(f"[WARNING] Batch expiry check skipped: {e}")
+        logger.warning(f"Batch expiry check skipped: {e}")
         session.rollback()
     finally:
         session.close()
@@ -308,9 +476,9 @@ def init_remote_db():
 
     try:
         Base.metadata.create_all(bind=engine_remote)
-        print("[OK] Remote database (Render PostgreSQL) tables created!")
+        logger.info("Remote database (Render PostgreSQL) tables created!")
     except Exception as e:
-        print(f"[ERROR] Error initializing remote database: {e}")
+        logger.error(f"Error initializing remote database: {e}")
         return
 
     # ── Créer le super admin si la DB est vide ─────────────────────────────
@@ -334,13 +502,13 @@ def init_remote_db():
             )
             remote_session.add(admin_user)
             remote_session.commit()
-            print("[OK] Super admin créé sur la DB remote (username: arnaud)")
-            print(f"[IMPORTANT] Mot de passe initial : {initial_password}")
-            print("[IMPORTANT] Ce mot de passe ne sera affiché qu'UNE SEULE FOIS. Changez-le immédiatement.")
+            logger.info("Super admin créé sur la DB remote (username: arnaud)")
+            logger.warning(f"Mot de passe initial : {initial_password}")
+            logger.warning("Ce mot de passe ne sera affiché qu'UNE SEULE FOIS. Changez-le immédiatement.")
         else:
-            print("[OK] Super admin already exists on remote DB.")
+            logger.info("Super admin already exists on remote DB.")
     except Exception as e:
-        print(f"[WARNING] Could not seed remote admin user: {e}")
+        logger.warning(f"Could not seed remote admin user: {e}")
         remote_session.rollback()
     finally:
         remote_session.close()
@@ -362,5 +530,5 @@ def check_database_connection(use_remote: bool = False) -> bool:
             conn.execute(text("SELECT 1"))
         return True
     except Exception as e:
-        print(f"Database connection failed: {e}")
+        logger.warning(f"Database connection failed: {e}")
         return False
@@ -17,6 +17,9 @@ from app.models.batch import Batch
 from app.models.pos_sale import POSSale, POSSaleItem
 from app.models.stock_movement import StockMovement
 from app.models.medicine_pricing import MedicinePricing
+from app.models.invoice_sequence import InvoiceSequence
+from app.models.stock_hold import StockHold
+from app.models.sales_fact import SalesDailyFact, SalesHourlyFact
 
 __all__ = [
     # Base
@@ -67,5 +70,15 @@ __all__ = [
     
     # Medicine Pricing
     "MedicinePricing",
+    
+    # Invoice numbering
+    "InvoiceSequence",
+    
+    # POS cart holds
+    "StockHold",
+    
+    # Dashboard sales facts
+    "SalesDailyFact",
+    "SalesHourlyFact",
 ]
 
@@ -4,7 +4,7 @@ Each medicine can have multiple batches with different expiration dates.
 Used for FEFO (First Expired First Out) stock management.
 """
 
-from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey, Boolean
+from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModelMixin
@@ -25,6 +25,16 @@ class Batch(Base, BaseModelMixin):
         (earliest expiring batch is sold first).
     """
     __tablename__ = "batches"
+    __table_args__ = (
+        # FEFO access path: medicine -> active -> earliest expiry
+        Index("ix_batches_medicine_active_expiry", "medicine_id", "is_active", "expiration_date"),
+        # Partial index on live batches only (SQLite / PostgreSQL)
+        Index(
+            "ix_batches_live_fefo", "medicine_id", "expiration_date",
+            sqlite_where=text("is_active = 1 AND quantity > 0"),
+            postgresql_where=text("is_active AND quantity > 0"),
+        ),
+    )
     
     batch_number = Column(String(100), nullable=False, index=True)
     medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
@@ -0,0 +1,33 @@
+"""
+Invoice sequence model — Per-year, per-prefix invoice number counters.
+
+One row per (prefix, year), e.g. ('POS', 2026) -> last_number = 42 means
+POS-2026-0042 was the last code handed out. The counter is incremented
+atomically inside the sale transaction (see services/invoice_sequence_service).
+"""
+
+from sqlalchemy import Column, String, Integer, UniqueConstraint
+from app.database import Base
+from app.models.base import BaseModelMixin
+
+
+class InvoiceSequence(Base, BaseModelMixin):
+    """
+    Invoice number counter.
+
+    Attributes:
+        prefix      : Code prefix ('POS', 'INV')
+        year        : Calendar year of the sequence
+        last_number : Last number allocated (0 = none yet)
+    """
+    __tablename__ = "invoice_sequences"
+    __table_args__ = (
+        UniqueConstraint("prefix", "year", name="uq_invoice_sequences_prefix_year"),
+    )
+
+    prefix = Column(String(10), nullable=False)
+    year = Column(Integer, nullable=False)
+    last_number = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<InvoiceSequence(prefix='{self.prefix}', year={self.year}, last={self.last_number})>"
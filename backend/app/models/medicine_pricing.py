@@ -3,7 +3,7 @@ Medicine Pricing model — Isolated module for medication pricing management.
 Stores complete reception and pricing data for medications.
 """
 
-from sqlalchemy import Column, String, Integer, Float, Date, Boolean, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Date, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModelMixin
@@ -19,6 +19,10 @@ class MedicinePricing(Base, BaseModelMixin):
     - carton_fixe: Fixed carton price with automatic subdivision
     """
     __tablename__ = "medicine_pricing"
+    __table_args__ = (
+        # Latest pricing per medicine (POS search)
+        Index("ix_medicine_pricing_medicine_created", "medicine_id", "created_at"),
+    )
 
     # --- Lien vers Medicine (auto-rempli à la création) ---
     medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=True, index=True)
@@ -4,7 +4,7 @@ Dedicated POS transaction models with batch-level tracking.
 Separated from legacy Sale/SaleItem to avoid breaking existing functionality.
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey
+from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModelMixin
@@ -24,6 +24,12 @@ class POSSale(Base, BaseModelMixin):
         synced_at   : Timestamp de la dernière sync réussie
     """
     __tablename__ = "pos_sales"
+    __table_args__ = (
+        # Dashboard / reports: completed or cancelled sales over a period
+        Index("ix_pos_sales_status_date", "status", "date"),
+        # History: keyset pagination on (date DESC, id DESC)
+        Index("ix_pos_sales_date_id", "date", "id"),
+    )
 
     sale_uuid = Column(
         String(36),
@@ -82,8 +88,8 @@ class POSSaleItem(Base, BaseModelMixin):
     """
     __tablename__ = "pos_sale_items"
 
-    sale_id = Column(Integer, ForeignKey("pos_sales.id", ondelete="CASCADE"), nullable=False)
-    medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("pos_sales.id", ondelete="CASCADE"), nullable=False, index=True)
+    medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False, index=True)
     batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True)  # nullable pour compat legacy
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
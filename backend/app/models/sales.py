@@ -2,7 +2,7 @@
 Sales models: Sale and SaleItem.
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, DateTime, Integer, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModelMixin
@@ -54,6 +54,10 @@ class Sale(Base, BaseModelMixin):
         sync_status: Synchronization status for offline mode
     """
     __tablename__ = "sales"
+    __table_args__ = (
+        # History: keyset pagination on (date DESC, id DESC)
+        Index("ix_sales_date_id", "date", "id"),
+    )
     
     code = Column(String(50), unique=True, nullable=False, index=True)
     total_amount = Column(Float, nullable=False)
@@ -98,7 +102,7 @@ class SaleItem(Base, BaseModelMixin):
     """
     __tablename__ = "sale_items"
     
-    sale_id = Column(Integer, ForeignKey("sales.id", ondelete="CASCADE"), nullable=False)
+    sale_id = Column(Integer, ForeignKey("sales.id", ondelete="CASCADE"), nullable=False, index=True)
     medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Float, nullable=False)
@@ -0,0 +1,77 @@
+"""
+Sales fact models — Pre-aggregated sales for the dashboard.
+
+Two grains, both keyed on the UTC day of the sale (same convention as
+`func.date(Sale.date)` in the reports):
+    - SalesDailyFact : per day, source, payment method and seller
+    - SalesHourlyFact: per day, hour and source
+
+Rows are updated incrementally when a sale is created or cancelled
+(see services/sales_facts_service.py) and can be rebuilt from the raw
+sales with `python backfill_sales_facts.py`.
+"""
+
+from sqlalchemy import Column, String, Integer, Float, Date, UniqueConstraint
+from app.database import Base
+from app.models.base import BaseModelMixin
+
+
+class _SalesMeasures:
+    """Measures shared by both grains."""
+    revenue = Column(Float, nullable=False, default=0.0)            # Completed sales (FBu)
+    sales_count = Column(Integer, nullable=False, default=0)        # Completed sales
+    cancelled_count = Column(Integer, nullable=False, default=0)    # Cancelled sales
+    cancelled_amount = Column(Float, nullable=False, default=0.0)   # Cancelled sales (FBu)
+
+
+class SalesDailyFact(Base, BaseModelMixin, _SalesMeasures):
+    """
+    Daily sales totals.
+
+    Attributes:
+        day           : Sale day (UTC)
+        source        : 'pos' (POSSale) | 'legacy' (Sale)
+        payment_method: Payment method of the sales
+        user_id       : Seller
+    """
+    __tablename__ = "sales_daily_facts"
+    __table_args__ = (
+        UniqueConstraint("day", "source", "payment_method", "user_id", name="uq_sales_daily_facts_bucket"),
+    )
+
+    day = Column(Date, nullable=False)
+    source = Column(String(10), nullable=False)
+    payment_method = Column(String(20), nullable=False, default="")
+    user_id = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<SalesDailyFact(day={self.day}, source='{self.source}', "
+            f"payment='{self.payment_method}', user_id={self.user_id}, "
+            f"revenue={self.revenue}, count={self.sales_count})>"
+        )
+
+
+class SalesHourlyFact(Base, BaseModelMixin, _SalesMeasures):
+    """
+    Hourly sales totals.
+
+    Attributes:
+        day   : Sale day (UTC)
+        hour  : Hour of the sale (0-23, UTC)
+        source: 'pos' (POSSale) | 'legacy' (Sale)
+    """
+    __tablename__ = "sales_hourly_facts"
+    __table_args__ = (
+        UniqueConstraint("day", "hour", "source", name="uq_sales_hourly_facts_bucket"),
+    )
+
+    day = Column(Date, nullable=False)
+    hour = Column(Integer, nullable=False)
+    source = Column(String(10), nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<SalesHourlyFact(day={self.day}, hour={self.hour}, source='{self.source}', "
+            f"revenue={self.revenue}, count={self.sales_count})>"
+        )
@@ -0,0 +1,39 @@
+"""
+Stock hold model — Persisted snapshot of the POS cart reservations.
+
+Holds live in memory (services/stock_holds.py); this table only receives a
+periodic snapshot so live holds survive a restart. It is never written on
+the cart path itself.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from app.database import Base
+from app.models.base import BaseModelMixin
+
+
+class StockHold(Base, BaseModelMixin):
+    """
+    Quantity of a batch reserved by a cart line until `expires_at`.
+
+    Attributes:
+        hold_key   : Cart line identifier ('<owner>:<medicine_id>:<level>')
+        owner      : Cart owner (till / cashier), e.g. 'user:3'
+        medicine_id: Medicine of the cart line
+        batch_id   : Reserved batch
+        quantity   : Reserved base units
+        expires_at : End of the reservation (UTC)
+    """
+    __tablename__ = "stock_holds"
+
+    hold_key = Column(String(120), nullable=False, index=True)
+    owner = Column(String(64), nullable=False)
+    medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False)
+    batch_id = Column(Integer, ForeignKey("batches.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<StockHold(key='{self.hold_key}', batch_id={self.batch_id}, "
+            f"qty={self.quantity}, expires={self.expires_at})>"
+        )
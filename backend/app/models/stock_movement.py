@@ -9,7 +9,7 @@ Types de mouvements:
     - 'perte'         : Déclaration de perte / casse / périmé
 """
 
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import BaseModelMixin
@@ -28,6 +28,10 @@ class StockMovement(Base, BaseModelMixin):
     - Le motif et la référence (ex: N° de facture)
     """
     __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Per-medicine journal ordered by date
+        Index("ix_stock_movements_medicine_date", "medicine_id", "date_mouvement"),
+    )
     
     medicine_id = Column(Integer, ForeignKey("medicines.id"), nullable=False, index=True)
     batch_id = Column(Integer, ForeignKey("batches.id"), nullable=True)
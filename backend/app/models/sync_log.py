@@ -26,12 +26,16 @@ class SyncLog(Base, BaseModelMixin):
         timestamp: When the sync attempt occurred
         status: Sync result (success/failure/pending)
         message: Detailed message or error description
+        table_name: Table pulled by sync_down (None for other events)
+        high_water_mark: Latest remote updated_at copied for that table
     """
     __tablename__ = "sync_logs"
     
     timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     status = Column(SQLEnum(SyncLogStatus), nullable=False)
     message = Column(Text, nullable=True)
+    table_name = Column(String(50), nullable=True, index=True)
+    high_water_mark = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
         return f"<SyncLog(id={self.id}, timestamp={self.timestamp}, status='{self.status}')>"
@@ -1,9 +1,13 @@
 """
 Sync Queue Model.
 Stores actions performed offline for later synchronization.
+
+Used as the transactional outbox of app/sync/outbox.py: one live entry
+per changed row (idempotency_key = '<table>:<row key>'), written in the
+same transaction as the change and deleted once the cloud acknowledged it.
 """
 
-from sqlalchemy import Column, Integer, String, JSON, DateTime, Enum
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Enum, Index
 from sqlalchemy.sql import func
 import enum
 
@@ -21,11 +25,20 @@ class SyncStatus(str, enum.Enum):
 
 class SyncQueue(Base):
     __tablename__ = "sync_queue"
+    __table_args__ = (
+        # Drainer: pending entries in arrival order
+        Index("ix_sync_queue_status_id", "status", "id"),
+        # One live entry per changed row (coalescing)
+        Index("ix_sync_queue_idempotency_key", "idempotency_key", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     action = Column(Enum(SyncAction), nullable=False)
     table_name = Column(String(50), nullable=False)
     data = Column(JSON, nullable=False) # Stores the payload (e.g., Sale data)
+    row_key = Column(String(64), nullable=True)  # id (or sale_uuid) of the changed row
+    idempotency_key = Column(String(120), nullable=True)
+    version = Column(Integer, default=1, nullable=False)  # bumped when a change is coalesced
     
     status = Column(Enum(SyncStatus), default=SyncStatus.PENDING)
     error_message = Column(String(255), nullable=True)
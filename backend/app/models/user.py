@@ -2,7 +2,7 @@
 User model for authentication and authorization.
 """
 
-from sqlalchemy import Column, String, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Boolean, Integer, Enum as SQLEnum
 from app.database import Base
 from app.models.base import BaseModelMixin
 import enum
@@ -24,6 +24,8 @@ class User(Base, BaseModelMixin):
         password_hash: Hashed password (bcrypt)
         role: User role (admin or pharmacist)
         is_active: Whether the user account is active
+        token_version: Bumped on password change; tokens carrying an
+            older version ("ver" claim) are rejected
     """
     __tablename__ = "users"
     
@@ -32,6 +34,7 @@ class User(Base, BaseModelMixin):
     role = Column(String(20), nullable=False, default="pharmacist")
     is_active = Column(Boolean, default=True, nullable=False)
     must_change_password = Column(Boolean, default=False, nullable=False)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', role='{self.role}')>"
@@ -3,13 +3,19 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import date
 from typing import Optional
+import logging
 
 from app.database import get_local_db
 from app.models.user import User
 from app.models.settings import Settings
 from app.auth.dependencies import get_super_admin_user, get_current_active_user
+from app.core.license import license_service
+from app.auth.user_cache import user_cache
+from app.services import sales_facts_service
+from app.services.search_index import product_index
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 class LicenseUpdate(BaseModel):
     expiry_date: date
@@ -62,6 +68,7 @@ async def update_license(
         db.add(setting)
         
     db.commit()
+    license_service.invalidate()
     
     # Re-fetch logic (could be shared function)
     expiry_date = license_data.expiry_date
@@ -105,6 +112,8 @@ async def reset_data(
             # (unless we implemented soft delete, but here we do hard delete)
             sale_items_count = db.query(SaleItem).delete()
             sales_count = db.query(Sale).delete()
+            # The dashboard reads the facts: drop the deleted sales' revenue with them
+            sales_facts_service.clear_source(db, sales_facts_service.SOURCE_LEGACY)
             deleted_counts['sales'] = sales_count
             deleted_counts['sale_items'] = sale_items_count
             
@@ -127,12 +136,17 @@ async def reset_data(
             deleted_counts['users'] = count
             
         db.commit()
+        if reset_data.users:
+            user_cache.invalidate()
+        if reset_data.products:
+            # Deleted medicines must not stay searchable (ids are reused)
+            product_index.rebuild(db)
         
         return {"message": "Data reset successful", "deleted": deleted_counts}
         
     except Exception as e:
         db.rollback()
-        print(f"Error resetting data: {str(e)}")
+        logger.exception(f"Error resetting data: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Error resetting data: {str(e)}"
@@ -7,6 +7,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.requests import Request
 from sqlalchemy.orm import Session
 from datetime import timedelta
+import logging
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -21,9 +22,11 @@ from app.utils.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.auth.dependencies import get_current_active_user, get_admin_user
+from app.auth.user_cache import user_cache
 
 # Create router
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Rate limiter — protège les endpoints sensibles
 _limiter = Limiter(key_func=get_remote_address)
@@ -99,7 +102,7 @@ async def login(
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": user.username, "ver": user.token_version},
         expires_delta=access_token_expires
     )
     
@@ -191,7 +194,7 @@ async def get_me(
     Raises:
         HTTPException 401: If not authenticated
     """
-    print(f"[DEBUG] /auth/me endpoint reached for {current_user.username}")
+    logger.debug("/auth/me for %s", current_user.username)
     return current_user
 
 
@@ -241,7 +244,10 @@ async def change_user_password(
         )
         
     user.password_hash = hash_password(password_data.password)
+    # Tokens issued with the old password stop working
+    user.token_version = (user.token_version or 0) + 1
     db.commit()
+    user_cache.invalidate(user_id)
     return {"message": "Password updated successfully"}
 
 
@@ -283,8 +289,10 @@ async def delete_user(
         # Fallback to soft delete if FK constraint fails
         user.is_active = False
         db.commit()
+        user_cache.invalidate(user_id)
         return {"message": "User deactivated (could not delete due to existing records)"}
         
+    user_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -319,6 +327,7 @@ async def toggle_user_status(
     # Toggle status
     user.is_active = not user.is_active
     db.commit()
+    user_cache.invalidate(user_id)
     db.refresh(user)
     
     return user
@@ -553,15 +562,18 @@ async def change_initial_password(
             detail="Passwords do not match"
         )
     
-    # Update password and clear the flag
-    current_user.password_hash = hash_password(password_data.new_password)
-    current_user.must_change_password = False
+    # Update password and clear the flag (current_user is the cached principal)
+    user = db.query(User).filter(User.id == current_user.id).first()
+    user.password_hash = hash_password(password_data.new_password)
+    user.must_change_password = False
+    user.token_version = (user.token_version or 0) + 1
     db.commit()
+    user_cache.invalidate(user.id)
     
     # Generate new token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": current_user.username},
+        data={"sub": user.username, "ver": user.token_version},
         expires_delta=access_token_expires
     )
     
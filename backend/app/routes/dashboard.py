@@ -2,6 +2,8 @@
 Dashboard routes - Endpoints for system statistics and analytics.
 """
 
+import time
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
@@ -24,6 +26,7 @@ async def get_dashboard_stats(
     days: int = 7,
     start_date: str = None,
     end_date: str = None,
+    debug: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
@@ -36,18 +39,29 @@ async def get_dashboard_stats(
         - Expired medicines count
         - Low stock medicines count
         - Revenue chart data (last 7 days)
+        - Duration of each query group in `timings` when `debug=true`
     
     **Accessible to**: All authenticated users
     """
+    timings = {}
+
+    def timed(name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        if debug:
+            timings[name] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+
     # Get basic stats
-    stats = dashboard_service.get_stats(db, start_date=start_date, end_date=end_date)
+    stats = timed("stats", dashboard_service.get_stats, db, start_date=start_date, end_date=end_date, debug=debug)
     
     # Get revenue chart data
-    chart_data = dashboard_service.get_revenue_chart_data(db, days=days, start_date=start_date, end_date=end_date)
+    chart_data = timed("revenue_chart", dashboard_service.get_revenue_chart_data, db, days=days, start_date=start_date, end_date=end_date)
     
     # Get top selling products
-    # Get top selling products
-    top_products = dashboard_service.get_top_selling_products(
+    top_products = timed(
+        "top_selling_products",
+        dashboard_service.get_top_selling_products,
         db, 
         limit=15, 
         start_date=start_date, 
@@ -55,10 +69,14 @@ async def get_dashboard_stats(
     )
     
     # Get sales by day of week
-    sales_by_day = dashboard_service.get_sales_by_day_of_week(db, days=days)
+    sales_by_day = timed("sales_by_day", dashboard_service.get_sales_by_day_of_week, db, days=days)
     
     # Get sales by hour
-    sales_by_hour = dashboard_service.get_sales_by_hour(db, days=days)
+    sales_by_hour = timed("sales_by_hour", dashboard_service.get_sales_by_hour, db, days=days)
+
+    if debug:
+        # get_stats groups first, then the chart queries
+        stats["timings"] = {**stats.get("timings", {}), **timings}
     
     return {
         **stats,
@@ -90,6 +90,7 @@ async def update_license(
             db.add(Settings(key="license_warning_message", value=warning_message))
     
     db.commit()
+    license_service.invalidate()
     
     # Get updated status
     status = license_service.get_license_status(db)
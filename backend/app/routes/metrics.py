@@ -1,43 +1,99 @@
 """
-Protected test route to verify authentication.
+Metrics Routes - Prometheus text and JSON exposition of app.core.metrics.
+
+Request metrics are recorded by MetricsMiddleware; the collectors below
+read the sync backlog and the cache hit rates at scrape time.
 """
 
 from fastapi import APIRouter, Depends
-from datetime import datetime
+from fastapi.responses import Response
+from typing import Any, Dict, Iterable
 
+from app.auth.dependencies import get_admin_user
+from app.auth.user_cache import user_cache
+from app.core.license import license_service
+from app.core.metrics import Sample, metrics
+from app.database import SessionLocal
 from app.models.user import User
-from app.auth.dependencies import get_current_active_user
+from app.services.search_index import product_index
+from app.sync.sync_manager import SyncManager
+from app.sync.sync_worker import sync_worker
+from app.utils.network import connectivity
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
-# Create router
 router = APIRouter()
 
 
+def collect_sync() -> Iterable[Sample]:
+    """Sync backlog (one local query, no connectivity probe) and worker state."""
+    with SessionLocal() as db:
+        status = SyncManager.get_status(db)
+    if "error" in status:
+        raise RuntimeError(status["error"])
+    link = connectivity.state()
+    worker = sync_worker.status()
+    return [
+        ("pharma_sync_backlog", "gauge", "Local changes waiting to be sent to the remote database.",
+         {"queue": "sales"}, status["pending_count"]),
+        ("pharma_sync_backlog", "gauge", "", {"queue": "outbox"}, status["outbox_pending"]),
+        ("pharma_sync_errors", "gauge", "Local changes the remote database rejected.",
+         {"queue": "sales"}, status["error_count"]),
+        ("pharma_sync_errors", "gauge", "", {"queue": "outbox"}, status["outbox_errors"]),
+        ("pharma_sync_lag_seconds", "gauge", "Age of the oldest sale not yet sent.", {}, status["lag_seconds"]),
+        ("pharma_sync_worker_consecutive_failures", "gauge", "Failed sync passes since the last success.",
+         {}, worker["consecutive_failures"]),
+        ("pharma_remote_online", "gauge", "1 when the remote database was reachable at the last probe.",
+         {}, 1 if link["online"] else 0),
+        ("pharma_remote_probe_failures", "gauge", "Consecutive failed connectivity probes.",
+         {}, link["consecutive_failures"]),
+    ]
+
+
+def collect_caches() -> Iterable[Sample]:
+    """Hit/miss counters of the in-memory caches."""
+    users, license_stats = user_cache.stats(), license_service.stats()
+    return [
+        ("pharma_cache_hits_total", "counter", "Cache lookups answered from memory.", {"cache": "user"}, users["hits"]),
+        ("pharma_cache_hits_total", "counter", "", {"cache": "license"}, license_stats["hits"]),
+        ("pharma_cache_misses_total", "counter", "Cache lookups that went to the database.",
+         {"cache": "user"}, users["misses"]),
+        ("pharma_cache_misses_total", "counter", "", {"cache": "license"}, license_stats["misses"]),
+        ("pharma_cache_entries", "gauge", "Entries held by a cache.", {"cache": "user"}, users["size"]),
+        ("pharma_cache_entries", "gauge", "", {"cache": "product_index"}, len(product_index)),
+    ]
+
+
+metrics.register_collector(collect_sync)
+metrics.register_collector(collect_caches)
+
+
 @router.get(
     "/metrics",
-    summary="Protected test endpoint",
-    description="Test endpoint to verify authentication is working correctly"
+    summary="Metrics (Prometheus)",
+    description="Request latency, database usage, checkouts, sync backlog and cache hit rates, in the Prometheus text format",
+    response_class=Response,
 )
-async def get_metrics(
-    current_user: User = Depends(get_current_active_user)
-):
+def get_metrics(current_user: User = Depends(get_admin_user)):
     """
-    Protected metrics endpoint - requires authentication.
-    
-    Returns basic information about the authenticated user and system status.
-    
-    Returns:
-        dict: Metrics and user information
-        
+    Prometheus text exposition (version 0.0.4).
+
+    Raises:
+        HTTPException 401/403: If not authenticated as admin
+    """
+    return Response(content=metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get(
+    "/metrics/json",
+    summary="Metrics (JSON)",
+    description="Same metrics as /metrics, as JSON (histograms with p50/p95)",
+)
+def get_metrics_json(current_user: User = Depends(get_admin_user)) -> Dict[str, Any]:
+    """
+    Every metric with its type, help and series.
+
     Raises:
-        HTTPException 401: If not authenticated
+        HTTPException 401/403: If not authenticated as admin
     """
-    return {
-        "message": "Access granted to protected route",
-        "user": {
-            "username": current_user.username,
-            "role": current_user.role.value,
-            "is_active": current_user.is_active
-        },
-        "timestamp": datetime.utcnow().isoformat(),
-        "status": "authenticated"
-    }
+    return metrics.snapshot()
@@ -3,7 +3,9 @@ POS Routes — API endpoints for Point of Sale operations.
 
 Endpoints:
     GET  /pos/products/search   — Search products with batch info
-    POST /pos/cart/add          — Calculate FEFO allocation for cart
+    GET  /pos/products/scan     — Exact barcode scan + FEFO line for 1 unit
+    POST /pos/cart/add          — FEFO allocation for a cart line (held until checkout)
+    POST /pos/cart/remove       — Release the stock held by a cart line
     POST /pos/checkout          — Finalize sale, deduct stock per batch
     GET  /pos/sale/{sale_id}    — Get POS sale details
     GET  /pos/history           — POS sales history
@@ -21,10 +23,11 @@ from app.database import get_local_db
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user, get_admin_user
 from app.services import pos_service
+from app.services.stock_holds import stock_holds, hold_key
 from app.schemas.pos import (
     CartAddRequest, CartAddResponse,
     POSCheckoutRequest, POSSaleResponse,
-    ProductSearchResult,
+    ProductSearchResult, ScanResult,
     BatchCreate, BatchResponse,
 )
 
@@ -104,6 +107,39 @@ async def get_top_products(
         )
 
 
+@router.get(
+    "/products/scan",
+    response_model=ScanResult,
+    summary="Exact barcode/code scan with FEFO allocation for 1 unit"
+)
+async def scan_product(
+    code: str = Query(..., min_length=1, max_length=50, description="Scanned EAN/barcode or product code"),
+    cart_id: Optional[str] = Query(None, max_length=50, description="Till/cart identifier owning the stock hold"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_local_db)
+):
+    """
+    Barcode scanner fast path: exact match on `code_barres` / `code`
+    (hash lookup, no fuzzy search), returned together with the FEFO
+    allocation for 1 unit so the cart line can be added without a
+    second `/cart/add` call. The unit is held for the cart line
+    (current user, or `cart_id`) exactly as `/cart/add` would hold it.
+    
+    **Accessible to**: All authenticated users
+    
+    **Errors**:
+    - 404: No active product with this code
+    """
+    try:
+        owner = pos_service.cart_owner(current_user.id, cart_id)
+        return pos_service.scan_product(db, code, owner=owner)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+
 # ============================================================================
 # CART OPERATIONS
 # ============================================================================
@@ -125,8 +161,11 @@ async def cart_add(
     the earliest expiration date first. If one batch doesn't have enough,
     it moves to the next batch.
     
-    This is a **read-only** operation — no stock is deducted.
-    The frontend stores the allocations and sends them at checkout.
+    No stock is deducted: the allocation is **held** for this cart line
+    (current user, or `cart_id`) for a few minutes, so other tills are not
+    allocated the same units. Calling it again for the same product and
+    level replaces the hold. The frontend stores the allocations and sends
+    them at checkout, which converts the holds into stock deductions.
     
     **Accessible to**: All authenticated users
     
@@ -135,7 +174,8 @@ async def cart_add(
     - 404: Medicine not found
     """
     try:
-        result = pos_service.cart_add(db, request)
+        owner = pos_service.cart_owner(current_user.id, request.cart_id)
+        result = pos_service.cart_add(db, request, owner=owner)
         return result
     except ValueError as e:
         raise HTTPException(
@@ -146,19 +186,28 @@ async def cart_add(
 
 @router.post(
     "/cart/remove",
-    summary="Remove item from cart (frontend-managed)"
+    summary="Remove item from cart and release its stock hold"
 )
 async def cart_remove(
     medicine_id: int,
+    level: Optional[str] = Query(None, description="Line level (default: every level)"),
+    cart_id: Optional[str] = Query(None, max_length=50, description="Till/cart identifier"),
     current_user: User = Depends(get_current_active_user),
 ):
     """
-    Cart removal is handled entirely on the frontend.
-    
-    This endpoint exists for API completeness but simply returns success.
-    The frontend manages the cart state and removes items locally.
+    The cart itself is managed on the frontend; this releases the stock
+    held by the removed line so other tills can sell it immediately
+    (holds also expire on their own).
+
+    Returns the number of cart lines whose hold was released (0 when the
+    line held nothing, e.g. already expired).
     """
-    return {"status": "ok", "message": "Cart is managed on frontend"}
+    owner = pos_service.cart_owner(current_user.id, cart_id)
+    if level:
+        released = stock_holds.release(hold_key(owner, medicine_id, level))
+    else:
+        released = stock_holds.release_owner(owner, [medicine_id])
+    return {"status": "ok", "medicine_id": medicine_id, "level": level, "released": released}
 
 
 # ============================================================================
@@ -291,21 +340,33 @@ async def get_pos_history(
     page_size: int = Query(50, ge=1, le=100),
     start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    include_total: bool = Query(True, description="Count the whole filtered history"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Get POS sales history with pagination and date filters.
     
+    Pass the returned `next_cursor` to get the next page (keyset pagination).
+    
     **Accessible to**: All authenticated users
     """
-    sales, total = pos_service.get_pos_sales_history(
-        db=db,
-        page=page,
-        page_size=page_size,
-        start_date=start_date,
-        end_date=end_date
-    )
+    try:
+        sales, total, next_cursor = pos_service.get_pos_sales_history(
+            db=db,
+            page=page,
+            page_size=page_size,
+            start_date=start_date,
+            end_date=end_date,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     enriched = [pos_service.enrich_pos_sale_response(s) for s in sales]
     
@@ -313,7 +374,8 @@ async def get_pos_history(
         "total": total,
         "page": page,
         "page_size": page_size,
-        "total_pages": (total + page_size - 1) // page_size,
+        "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+        "next_cursor": next_cursor,
         "items": enriched
     }
 
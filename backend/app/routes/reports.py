@@ -1,21 +1,57 @@
 """
 Report Routes - Endpoints for file exports (Excel/PDF).
-Includes both download (attachment) and inline preview endpoints.
+Includes both download (attachment) and inline preview endpoints,
+background report jobs (submit, poll, download) and multi-report
+export bundles (one ZIP).
+
+Every report goes through the report_jobs artifact cache: an identical
+report is served from the cache until the sales or stock data change.
 """
 
+import asyncio
+import time
 from datetime import date
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_local_db
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user
-from app.services import report_service
+from app.schemas.report import ReportBundleCreate, ReportJobCreate, ReportJobResponse, FinancialStatement
+from app.services import excel_export, financial_statement, report_bundle, report_jobs
+from app.services.report_jobs import report_queue
 
 router = APIRouter()
 
 
+def _report_response(db: Session, report_type: str, params: dict = None, disposition: str = "attachment"):
+    """
+    Serve a report from the artifact cache (built synchronously on a miss).
+
+    Callers are plain `def` handlers: a miss builds the report in the
+    threadpool, never on the event loop.
+    """
+    report = report_jobs.get_report_type(report_type)
+    try:
+        filename = report.filename(report.parse(params))
+        artifact, _ = report_jobs.render(db, report_type, params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {
+        'Content-Disposition': f'{disposition}; filename="{filename}"'
+    }
+    
+    return StreamingResponse(
+        excel_export.iter_file(artifact),
+        media_type=report.media_type,
+        headers=headers
+    )
+
+
 # ══════════════════════════════════════════════════════════════════
 # STOCK REPORTS
 # ══════════════════════════════════════════════════════════════════
@@ -24,119 +60,63 @@ router = APIRouter()
     "/stock/pdf",
     summary="Download stock report (PDF)"
 )
-async def download_stock_pdf(
+def download_stock_pdf(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Generate and download current stock status as PDF.
     """
-    try:
-        pdf_file = report_service.generate_stock_pdf(db)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="stock_report_{date.today()}.pdf"'
-    }
-    
-    return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
-        headers=headers
-    )
+    return _report_response(db, "stock_pdf")
 
 
 @router.get(
     "/stock/pdf/preview",
     summary="Preview stock report (PDF inline)"
 )
-async def preview_stock_pdf(
+def preview_stock_pdf(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Generate and display stock PDF inline in the browser.
     """
-    try:
-        pdf_file = report_service.generate_stock_pdf(db)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    headers = {
-        'Content-Disposition': f'inline; filename="stock_report_{date.today()}.pdf"'
-    }
-    
-    return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
-        headers=headers
-    )
+    return _report_response(db, "stock_pdf", disposition="inline")
 
 
 @router.get(
     "/stock/excel",
     summary="Download stock report (Excel)"
 )
-async def download_stock_excel(
+def download_stock_excel(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Generate and download current stock status as Excel.
     """
-    try:
-        excel_file = report_service.generate_stock_excel(db)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    headers = {
-        'Content-Disposition': f'attachment; filename="stock_report_{date.today()}.xlsx"'
-    }
-    
-    return StreamingResponse(
-        excel_file,
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers=headers
-    )
+    return _report_response(db, "stock_excel")
 
 
 @router.get(
     "/stock/word",
     summary="Download stock report (Word)"
 )
-async def download_stock_word(
+def download_stock_word(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Generate and download current stock status as Word (doc).
     """
-    try:
-        word_file = report_service.generate_stock_word(db)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return _report_response(db, "stock_word")
 
-    headers = {
-        'Content-Disposition': f'attachment; filename="stock_report_{date.today()}.doc"'
-    }
-    
-    return StreamingResponse(
-        word_file,
-        media_type='application/msword',
-        headers=headers
-    )
-
-
-# ══════════════════════════════════════════════════════════════════
-# SALES REPORTS
-# ══════════════════════════════════════════════════════════════════
 
 @router.get(
     "/sales/pdf",
     summary="Download sales report (PDF)"
 )
-async def download_sales_pdf(
+def download_sales_pdf(
     start_date: date,
     end_date: date,
     current_user: User = Depends(get_current_active_user),
@@ -146,24 +126,14 @@ async def download_sales_pdf(
     Generate and download sales history as PDF.
     Requires start_date and end_date.
     """
-    pdf_file = report_service.generate_sales_pdf(db, start_date, end_date)
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="sales_report_{start_date}_{end_date}.pdf"'
-    }
-    
-    return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
-        headers=headers
-    )
+    return _report_response(db, "sales_pdf", {"start_date": start_date, "end_date": end_date})
 
 
 @router.get(
     "/sales/pdf/preview",
     summary="Preview sales report (PDF inline)"
 )
-async def preview_sales_pdf(
+def preview_sales_pdf(
     start_date: date,
     end_date: date,
     current_user: User = Depends(get_current_active_user),
@@ -172,24 +142,14 @@ async def preview_sales_pdf(
     """
     Generate and display sales PDF inline in the browser.
     """
-    pdf_file = report_service.generate_sales_pdf(db, start_date, end_date)
-    
-    headers = {
-        'Content-Disposition': f'inline; filename="sales_report_{start_date}_{end_date}.pdf"'
-    }
-    
-    return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
-        headers=headers
-    )
+    return _report_response(db, "sales_pdf", {"start_date": start_date, "end_date": end_date}, disposition="inline")
 
 
 @router.get(
     "/sales/excel",
     summary="Download sales report (Excel)"
 )
-async def download_sales_excel(
+def download_sales_excel(
     start_date: date,
     end_date: date,
     current_user: User = Depends(get_current_active_user),
@@ -198,24 +158,14 @@ async def download_sales_excel(
     """
     Generate and download sales history as Excel.
     """
-    excel_file = report_service.generate_sales_excel(db, start_date, end_date)
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="sales_report_{start_date}_{end_date}.xlsx"'
-    }
-    
-    return StreamingResponse(
-        excel_file,
-        media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers=headers
-    )
+    return _report_response(db, "sales_excel", {"start_date": start_date, "end_date": end_date})
 
 
 @router.get(
     "/sales/word",
     summary="Download sales report (Word)"
 )
-async def download_sales_word(
+def download_sales_word(
     start_date: date,
     end_date: date,
     current_user: User = Depends(get_current_active_user),
@@ -224,28 +174,55 @@ async def download_sales_word(
     """
     Generate and download sales history as Word.
     """
-    word_file = report_service.generate_sales_word(db, start_date, end_date)
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="sales_report_{start_date}_{end_date}.doc"'
-    }
-    
-    return StreamingResponse(
-        word_file,
-        media_type='application/msword',
-        headers=headers
-    )
+    return _report_response(db, "sales_word", {"start_date": start_date, "end_date": end_date})
 
 
-# ══════════════════════════════════════════════════════════════════
-# FINANCIAL REPORTS
-# ══════════════════════════════════════════════════════════════════
+@router.get(
+    "/financial",
+    response_model=FinancialStatement,
+    summary="Get financial summary (JSON)"
+)
+def get_financial_statement(
+    start_date: date = Query(None, description="Start date for period filter"),
+    end_date: date = Query(None, description="End date for period filter"),
+    period: str = "month",
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_local_db)
+):
+    """
+    Financial statement grouped by family, as rendered in the PDF / Excel.
+    Sales of the period (legacy + POS) when both dates are given,
+    otherwise the closing balance of the stock.
+    """
+    return financial_statement.build_statement(db, start_date, end_date, period)
+
+
+@router.get(
+    "/financial/excel",
+    summary="Download financial summary (Excel)"
+)
+def download_financial_excel(
+    start_date: date = Query(None, description="Start date for period filter"),
+    end_date: date = Query(None, description="End date for period filter"),
+    period: str = "month",
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_local_db)
+):
+    """
+    Generate and download the financial statement as Excel.
+    """
+    return _report_response(db, "financial_excel", {
+        "start_date": start_date,
+        "end_date": end_date,
+        "period_label": period
+    })
+
 
 @router.get(
     "/financial/pdf",
     summary="Download financial summary (PDF)"
 )
-async def download_financial_pdf(
+def download_financial_pdf(
     start_date: date = Query(None, description="Start date for period filter"),
     end_date: date = Query(None, description="End date for period filter"),
     period: str = "month",
@@ -256,29 +233,18 @@ async def download_financial_pdf(
     Generate and download a professional financial PDF report.
     Optionally filter by date range.
     """
-    pdf_file = report_service.generate_financial_pdf(
-        db, 
-        start_date=start_date,
-        end_date=end_date,
-        period_label=period
-    )
-    
-    headers = {
-        'Content-Disposition': f'attachment; filename="financial_report_{date.today()}.pdf"'
-    }
-    
-    return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
-        headers=headers
-    )
+    return _report_response(db, "financial_pdf", {
+        "start_date": start_date,
+        "end_date": end_date,
+        "period_label": period
+    })
 
 
 @router.get(
     "/financial/pdf/preview",
     summary="Preview financial summary (PDF inline)"
 )
-async def preview_financial_pdf(
+def preview_financial_pdf(
     start_date: date = Query(None, description="Start date for period filter"),
     end_date: date = Query(None, description="End date for period filter"),
     period: str = "month",
@@ -288,19 +254,144 @@ async def preview_financial_pdf(
     """
     Generate and display financial PDF inline in the browser.
     """
-    pdf_file = report_service.generate_financial_pdf(
-        db, 
-        start_date=start_date,
-        end_date=end_date,
-        period_label=period
-    )
+    return _report_response(db, "financial_pdf", {
+        "start_date": start_date,
+        "end_date": end_date,
+        "period_label": period
+    }, disposition="inline")
+
+
+# ══════════════════════════════════════════════════════════════════
+# BACKGROUND REPORT JOBS
+# ══════════════════════════════════════════════════════════════════
+
+def _get_job(job_id: str):
+    job = report_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche de rapport introuvable")
+    return job
+
+
+@router.post(
+    "/jobs",
+    response_model=ReportJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Submit a background report job"
+)
+def submit_report_job(
+    job_data: ReportJobCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_local_db)
+):
+    """
+    Queue a report build and return its job at once.
+    If the same report was already built on the current data, the job is
+    already `done` (`cached=true`).
+
+    Plain `def`: the cache key reads the data watermarks with the
+    synchronous session, in the threadpool.
+    """
+    try:
+        job = report_queue.submit(db, job_data.report_type, job_data.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=ReportJobResponse,
+    summary="Get report job status"
+)
+async def get_report_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Long-poll: wait up to N seconds for the job to finish"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Status of a report job (queued, running, done, failed).
+    """
+    job = _get_job(job_id)
+    deadline = time.monotonic() + wait
+    while not job.done.is_set() and time.monotonic() < deadline:
+        await asyncio.sleep(0.2)
+    return job.to_dict()
+
+
+@router.get(
+    "/jobs/{job_id}/download",
+    summary="Download the artifact of a finished report job"
+)
+async def download_report_job(
+    job_id: str,
+    inline: bool = False,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download the report built by a job.
     
+    **Errors**:
+    - 404: Unknown job
+    - 409: Job not finished or failed
+    - 410: Artifact evicted from the cache (submit the job again)
+    """
+    job = _get_job(job_id)
+    if job.status != report_jobs.STATUS_DONE:
+        raise HTTPException(
+            status_code=409,
+            detail=job.error or "Le rapport n'est pas encore prêt"
+        )
+    try:
+        artifact = open(job.path, "rb")
+    except FileNotFoundError:
+        raise HTTPException(status_code=410, detail="Rapport expiré, veuillez relancer la génération")
+
+    disposition = "inline" if inline else "attachment"
     headers = {
-        'Content-Disposition': f'inline; filename="financial_report_{date.today()}.pdf"'
+        'Content-Disposition': f'{disposition}; filename="{job.filename}"'
     }
     
     return StreamingResponse(
-        pdf_file,
-        media_type='application/pdf',
+        excel_export.iter_file(artifact),
+        media_type=job.report.media_type,
         headers=headers
     )
+
+
+# ══════════════════════════════════════════════════════════════════
+# EXPORT BUNDLES
+# ══════════════════════════════════════════════════════════════════
+
+@router.post(
+    "/bundle",
+    summary="Download several reports of a period as one ZIP"
+)
+def download_report_bundle(
+    bundle_data: ReportBundleCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_local_db)
+):
+    """
+    Build the requested reports from one consistent read of the data
+    (shared datasets, rendered in parallel) and stream them as a ZIP.
+    Reports already in the artifact cache are reused.
+    
+    **Errors**:
+    - 400: Unknown report type or invalid period
+    - 500: A report failed to build
+    """
+    try:
+        artifacts = report_bundle.build_bundle(
+            bundle_data.start_date, bundle_data.end_date, bundle_data.formats, engine=db.get_bind()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    filename = report_bundle.bundle_filename(bundle_data.start_date, bundle_data.end_date)
+    return StreamingResponse(
+        report_bundle.iter_zip(artifacts),
+        media_type=report_bundle.ZIP_MEDIA_TYPE,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
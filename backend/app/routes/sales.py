@@ -2,7 +2,7 @@
 Sales routes - POS endpoints for creating sales and generating invoices.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 import logging
@@ -13,7 +13,7 @@ from app.models.user import User
 from app.auth.dependencies import get_current_active_user
 from app.schemas.sales import SaleCreate, SaleResponse, SaleItemResponse
 from app.schemas.customer import CustomerResponse
-from app.services import sales_service, pdf_service
+from app.services import sales_service, pdf_service, pdf_render, excel_export, sales_facts_service
 
 # Create router
 router = APIRouter()
@@ -184,12 +184,19 @@ async def get_sales_history(
     max_amount: float = None,
     user_id: int = None,
     status_filter: str = None,
+    cursor: str = None,
+    include_total: bool = True,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
     """
     Get paginated sales history with optional filters.
     
+    pagination:
+    - page / page_size
+    - cursor: `next_cursor` of the previous page (same cost for any depth)
+    - include_total=false skips counting the whole history
+    
     filters:
     - start_date (YYYY-MM-DD)
     - end_date (YYYY-MM-DD)
@@ -227,12 +234,16 @@ async def get_sales_history(
     
     # Get history
     try:
-        sales, total = sales_service.get_sales_history(
+        sales, total, next_cursor = sales_service.get_sales_history(
             db=db,
             page=page,
             page_size=page_size,
-            filters=filters
+            filters=filters,
+            cursor=cursor,
+            include_total=include_total
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         logger.error(f"get_sales_history failed: {type(e).__name__}: {e}")
         logger.error(traceback.format_exc())
@@ -271,7 +282,8 @@ async def get_sales_history(
         total=total,
         page=page,
         page_size=page_size,
-        total_pages=(total + page_size - 1) // page_size,
+        total_pages=(total + page_size - 1) // page_size if total is not None else None,
+        next_cursor=next_cursor,
         items=enriched_sales
     )
 
@@ -338,7 +350,8 @@ async def cancel_sale(
                 expiry_date=medicine.expiry_date,
             )
             
-    # Update sale status
+    # Update sale status (and move it to the cancelled dashboard facts)
+    sales_facts_service.record_cancellation(db, sales_facts_service.SOURCE_LEGACY, sale)
     sale.status = "cancelled"
     sale.cancelled_at = datetime.utcnow()
     sale.cancelled_by = current_user.id
@@ -461,6 +474,7 @@ async def get_sale(
 )
 async def download_invoice(
     sale_id: int,
+    format: str = Query("a4", description="a4 ou receipt (ticket thermique 80 mm)"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db)
 ):
@@ -502,16 +516,23 @@ async def download_invoice(
         }
         
         # Generate PDF
-        pdf_buffer = pdf_service.generate_invoice_pdf(invoice_data)
+        pdf_file = pdf_service.generate_invoice_pdf(invoice_data, format=format)
         
         # Return as streaming response
         return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
+            excel_export.iter_file(pdf_file),
+            media_type=pdf_render.PDF_MEDIA_TYPE,
             headers={
                 "Content-Disposition": f"attachment; filename=invoice_{invoice_data['invoice_code']}.pdf"
             }
         )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
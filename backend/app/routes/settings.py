@@ -10,6 +10,7 @@ from app.database import get_local_db
 from app.models.settings import Settings
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user
+from app.core.license import license_service
 from app.schemas.settings import SettingsUpdate, SettingsResponse
 
 router = APIRouter()
@@ -95,6 +96,7 @@ async def update_settings(
             db.add(new_setting)
             
     db.commit()
+    license_service.invalidate()
     
     # Return updated state
     return await get_settings(current_user, db)
@@ -4,10 +4,11 @@ Routes de synchronisation cloud — Local SQLite ↔ Supabase PostgreSQL.
 Endpoints :
   POST /sync/push    → Pousse les ventes locales vers Supabase
   GET  /sync/pull    → Récupère les mises à jour depuis Supabase
-  GET  /sync/status  → État de la synchronisation (nb en attente)
+  GET  /sync/status  → État de la synchronisation (file d'attente, retard, worker)
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
 from sqlalchemy.orm import Session
 import logging
 
@@ -15,27 +16,33 @@ from app.database import get_local_db
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user
 from app.sync.sync_manager import SyncManager
+from app.sync.sync_worker import sync_worker
 
 router = APIRouter()
 logger = logging.getLogger("sync_routes")
 
 
 @router.post("/push", summary="Pousser les ventes locales vers Supabase")
-async def sync_push(
+def sync_push(
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000, description="Ventes par lot (défaut: SYNC_CHUNK_SIZE)"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db),
 ):
     """
     Synchronise les ventes POS locales non-envoyées vers Supabase.
     
-    - Lit les POSSale avec sync_status = 'pending' ou 'local_only'
-    - Les insère dans Supabase (upsert par UUID)
+    - Lit les POSSale avec sync_status = 'pending' ou 'local_only', par lots
+    - Les insère dans Supabase (ON CONFLICT sale_uuid DO NOTHING)
     - Met à jour sync_status = 'synced' si succès
+    - Continue jusqu'à vider la file d'attente
+    - Envoie ensuite le outbox (clients, lots, mouvements, annulations)
     
-    Retourne un rapport : { synced, errors, online }
+    Retourne un rapport : { synced, skipped, errors, chunks, sales_per_second, online, outbox }
     """
     try:
-        report = SyncManager.sync_up(local_db=db)
+        report = SyncManager.sync_up(local_db=db, chunk_size=chunk_size)
+        if report["online"]:
+            report["outbox"] = SyncManager.push_changes(local_db=db)
         return {
             "success": True,
             "message": f"{report['synced']} vente(s) synchronisée(s)",
@@ -47,21 +54,27 @@ async def sync_push(
 
 
 @router.get("/pull", summary="Récupérer les mises à jour depuis Supabase")
-async def sync_pull(
+def sync_pull(
+    page_size: Optional[int] = Query(None, ge=1, le=10000, description="Lignes par page (défaut: SYNC_DOWN_PAGE_SIZE)"),
+    full: bool = Query(False, description="Tout recopier, sans tenir compte du dernier pull"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db),
 ):
     """
-    Récupère les paramètres et médicaments depuis Supabase vers la base locale.
+    Récupère les paramètres et le catalogue (médicaments, lots, prix)
+    modifiés dans Supabase depuis le dernier pull.
     
-    Utile après une installation fraîche ou pour synchroniser les
-    paramètres de la pharmacie modifiés depuis un autre poste.
+    Utile après une installation fraîche (full=true) ou pour partager le
+    catalogue entre plusieurs postes / succursales.
     """
     try:
-        report = SyncManager.sync_down(local_db=db)
+        report = SyncManager.sync_down(local_db=db, page_size=page_size, full=full)
         return {
             "success": True,
-            "message": f"{report.get('settings_updated', 0)} paramètre(s) mis à jour",
+            "message": (
+                f"{report.get('medicines_updated', 0)} médicament(s), "
+                f"{report.get('settings_updated', 0)} paramètre(s) mis à jour"
+            ),
             **report,
         }
     except Exception as e:
@@ -70,19 +83,22 @@ async def sync_pull(
 
 
 @router.get("/status", summary="État de la synchronisation")
-async def sync_status(
+def sync_status(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_local_db),
 ):
     """
-    Retourne l'état actuel de la synchronisation :
-    - online : Supabase accessible ?
-    - pending_count : ventes en attente d'envoi
+    Retourne l'état actuel de la synchronisation, sans tester la connexion :
+    - online : dernier état connu de Supabase
+    - pending_count / queue_depth : ventes en attente d'envoi
+    - lag_seconds : âge de la plus ancienne vente non envoyée
     - error_count : ventes en erreur
     - synced_count : ventes déjà synchronisées
+    - outbox_pending / outbox_errors : autres modifications non envoyées
+    - worker : synchronisation en tâche de fond (dernier succès, backoff)
     """
     try:
-        return SyncManager.get_status(local_db=db)
+        return {**SyncManager.get_status(local_db=db), "worker": sync_worker.status()}
     except Exception as e:
         logger.error(f"[/sync/status] Erreur: {e}")
         return {"online": False, "error": str(e)}
@@ -9,6 +9,7 @@ from typing import Optional
 from app.database import get_local_db
 from app.models.user import User
 from app.auth.dependencies import get_current_active_user
+from app.auth.user_cache import user_cache
 from app.services import sales_service
 
 # For now, we focus on stats.
@@ -80,8 +81,11 @@ async def update_user_password(
     # Hash new password
     hashed_password = security.hash_password(password_data.password)
     user.password_hash = hashed_password
+    # Tokens issued with the old password stop working
+    user.token_version = (user.token_version or 0) + 1
     
     db.commit()
+    user_cache.invalidate(user_id)
     
     return {"message": "Password updated successfully"}
 
@@ -145,6 +149,7 @@ async def update_user(
     # Update Password
     if user_data.password:
         user.password_hash = security.hash_password(user_data.password)
+        user.token_version = (user.token_version or 0) + 1
 
     # Update Role
     if user_data.role:
@@ -161,6 +166,7 @@ async def update_user(
         user.is_active = user_data.is_active
 
     db.commit()
+    user_cache.invalidate(user_id)
     db.refresh(user)
 
     return {
@@ -191,6 +197,7 @@ async def toggle_user_status(
         
     user.is_active = not user.is_active
     db.commit()
+    user_cache.invalidate(user_id)
     
     return {"message": "Status updated", "is_active": user.is_active}
 
@@ -214,5 +221,6 @@ async def delete_user(
         
     db.delete(user)
     db.commit()
+    user_cache.invalidate(user_id)
     
     return {"message": "User deleted"}
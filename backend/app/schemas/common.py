@@ -3,7 +3,7 @@ Common schemas for pagination and reusable components.
 """
 
 from pydantic import BaseModel, Field
-from typing import List, TypeVar, Generic
+from typing import List, Optional, TypeVar, Generic
 from math import ceil
 
 # Generic type for paginated responses
@@ -34,10 +34,11 @@ class PaginatedResponse(BaseModel, Generic[T]):
     Generic paginated response wrapper.
     """
     items: List[T] = Field(..., description="List of items for current page")
-    total: int = Field(..., description="Total number of items")
+    total: Optional[int] = Field(..., description="Total number of items (None when not counted)")
     page: int = Field(..., description="Current page number")
     page_size: int = Field(..., description="Number of items per page")
-    total_pages: int = Field(..., description="Total number of pages")
+    total_pages: Optional[int] = Field(..., description="Total number of pages (None when not counted)")
+    next_cursor: Optional[str] = Field(default=None, description="Cursor of the next page (keyset pagination)")
     
     @classmethod
     def create(cls, items: List[T], total: int, page: int, page_size: int):
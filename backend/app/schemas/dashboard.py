@@ -3,7 +3,7 @@ Dashboard schemas - Data structures for dashboard statistics and charts.
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 
@@ -44,6 +44,7 @@ class DashboardStatsResponse(BaseModel):
     expired_medicines: int = Field(..., description="Count of expired medicines")
     low_stock_medicines: int = Field(..., description="Count of medicines with low stock")
     low_stock_list: List[dict] = Field(default=[], description="Detailed list of low stock medicines")
+    timings: Optional[Dict[str, float]] = Field(default=None, description="Duration per query group in ms (debug=true only)")
 
 
 class SalesHistoryFilter(BaseModel):
@@ -78,6 +78,10 @@ class CartAddRequest(BaseModel):
     medicine_id: int = Field(..., gt=0, description="Medicine ID")
     quantity: int = Field(..., gt=0, description="Desired quantity at the chosen level")
     level: str = Field(default="unite", description="Level: unite, plaquette, boite, carton")
+    cart_id: Optional[str] = Field(
+        default=None, max_length=50,
+        description="Till/cart identifier owning the stock hold (default: current user)"
+    )
     
     model_config = {
         "json_schema_extra": {
@@ -103,6 +107,21 @@ class CartAddResponse(BaseModel):
     )
 
 
+# ============================================================================
+# BARCODE SCAN
+# ============================================================================
+
+class ScanResult(BaseModel):
+    """
+    Exact barcode/code scan: product plus a ready-to-use cart line
+    (FEFO allocation for 1 unit). `allocation` is None when the product
+    has no sellable stock; `allocation_error` then explains why.
+    """
+    product: ProductSearchResult
+    allocation: Optional[CartAddResponse] = None
+    allocation_error: Optional[str] = None
+
+
 # ============================================================================
 # CHECKOUT
 # ============================================================================
@@ -134,6 +153,10 @@ class POSCheckoutRequest(BaseModel):
     payment_method: str = Field(default="cash", description="Payment: 'cash' or 'insurance'")
     customer_id: Optional[int] = Field(None, description="Optional customer ID")
     customer_name: Optional[str] = Field(None, description="Optional customer name for invoice")
+    cart_id: Optional[str] = Field(
+        None, max_length=50,
+        description="Till/cart identifier used in /cart/add (its stock holds are converted)"
+    )
     
     # Insurance fields
     insurance_provider: Optional[str] = None
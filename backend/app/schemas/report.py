@@ -0,0 +1,94 @@
+"""
+Report schemas - Background report jobs, export bundles and financial statement.
+"""
+
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+
+class ReportJobCreate(BaseModel):
+    """Schema for submitting a report job."""
+    report_type: str = Field(..., description="stock_pdf, stock_excel, stock_word, sales_pdf, sales_excel, sales_word, financial_pdf, financial_excel")
+    params: Dict[str, Any] = Field(default={}, description="Report parameters, e.g. start_date / end_date (YYYY-MM-DD)")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "report_type": "sales_pdf",
+                    "params": {"start_date": "2026-01-01", "end_date": "2026-12-31"}
+                }
+            ]
+        }
+    }
+
+
+class ReportBundleCreate(BaseModel):
+    """Schema for a multi-report export bundle (one ZIP)."""
+    start_date: date
+    end_date: date
+    formats: List[str] = Field(
+        default=["stock_excel", "sales_excel", "financial_pdf", "sales_word"],
+        description="Report types to include (see ReportJobCreate.report_type)"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "start_date": "2026-09-01",
+                    "end_date": "2026-09-30",
+                    "formats": ["stock_excel", "sales_excel", "financial_pdf", "sales_word"]
+                }
+            ]
+        }
+    }
+
+
+class ReportJobResponse(BaseModel):
+    """Schema for a report job status."""
+    job_id: str
+    report_type: str
+    params: Dict[str, Optional[str]] = {}
+    status: str = Field(..., description="queued, running, done or failed")
+    cached: bool = Field(False, description="Served from the artifact cache")
+    error: Optional[str] = None
+    size: Optional[int] = Field(None, description="Artifact size in bytes")
+    filename: str
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+class FinancialLine(BaseModel):
+    """One product of the financial statement."""
+    medicine_id: int
+    name: str
+    quantity: float = Field(..., description="Units sold over the period, or units in stock")
+    rate: float = Field(..., description="Average selling price (sales) or current selling price (stock)")
+    value: float = Field(..., description="Sales amount, or stock value at selling price")
+
+
+class FinancialFamily(BaseModel):
+    """Products of one medicine family, with subtotals."""
+    family_id: Optional[int] = None
+    name: str
+    quantity: float = 0
+    value: float = 0
+    lines: List[FinancialLine] = []
+
+
+class FinancialStatement(BaseModel):
+    """
+    Financial statement grouped by family.
+
+    `mode` is "sales" (legacy + POS sales over [start_date, end_date]) or
+    "stock" (closing balance of the active stock, no period).
+    """
+    mode: str
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    period_label: str = "Aperçu"
+    families: List[FinancialFamily] = []
+    grand_total: float = 0
+    generated_at: datetime
@@ -4,19 +4,35 @@ from . import medicine_service
 from . import supplier_service
 from . import customer_service
 from . import sales_service
+from . import pdf_render
 from . import pdf_service
 from . import dashboard_service
+from . import excel_export
+from . import financial_statement
 from . import report_service
+from . import report_jobs
+from . import report_bundle
 from . import medicine_pricing_service
 from . import pos_service
+from . import invoice_sequence_service
+from . import sales_facts_service
+from . import sales_history
 
 __all__ = [
     "medicine_service",
     "supplier_service",
     "customer_service",
     "sales_service",
+    "pdf_render",
     "pdf_service",
     "dashboard_service",
+    "excel_export",
+    "financial_statement",
+    "report_jobs",
+    "report_bundle",
     "medicine_pricing_service",
     "pos_service",
+    "invoice_sequence_service",
+    "sales_facts_service",
+    "sales_history",
 ]
@@ -3,18 +3,175 @@ Dashboard service layer - Analytics and aggregation logic.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, cast, Date
+from sqlalchemy import func, and_, case, select, union_all, text, cast, Date
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
+import logging
+import time
 
 from app.models.medicine import Medicine
 from app.models.sales import Sale
 from app.models.pos_sale import POSSale, POSSaleItem
+from app.models.sales_fact import SalesDailyFact
+from app.models.supplier import Supplier
+from app.services import sales_facts_service
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# STATS ENGINE
+# ============================================================================
+# get_stats() is computed by a few independent query groups. Each group is
+# one round trip (conditional aggregates instead of one query per KPI).
+# On PostgreSQL the groups run concurrently, each on its own connection.
+
+def _count_if(condition):
+    """COUNT of rows matching `condition` (SUM(CASE ...), portable)."""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _medicine_kpis(db: Session, today: date, **_) -> Dict[str, Any]:
+    """Active, expired and low-stock medicines plus suppliers: one query."""
+    suppliers = db.query(func.count(Supplier.id)).scalar_subquery()
+    total, expired, low_stock, total_suppliers = db.query(
+        func.count(Medicine.id),
+        _count_if(and_(Medicine.expiry_date.isnot(None), Medicine.expiry_date <= today)),
+        _count_if(Medicine.quantity <= Medicine.min_stock_alert),
+        suppliers,
+    ).filter(Medicine.is_active == True).one()
+    return {
+        "total_medicines": total or 0,
+        "expired_medicines": int(expired or 0),
+        "low_stock_medicines": int(low_stock or 0),
+        "total_suppliers": total_suppliers or 0,
+    }
+
+
+def _sales_kpis(db: Session, today: date, period: Optional[Tuple[date, date]] = None, **_) -> Dict[str, Any]:
+    """Weekly / total revenue, sales count and cancelled sales from the facts: one query."""
+    week_ago = today - timedelta(days=7)
+    if period:
+        cancelled = func.sum(case(
+            (SalesDailyFact.day.between(*period), SalesDailyFact.cancelled_count), else_=0
+        ))
+    else:
+        cancelled = func.sum(SalesDailyFact.cancelled_count)
+
+    weekly, revenue, count, cancelled_count = db.query(
+        func.coalesce(func.sum(case((SalesDailyFact.day >= week_ago, SalesDailyFact.revenue), else_=0)), 0),
+        func.coalesce(func.sum(SalesDailyFact.revenue), 0),
+        func.coalesce(func.sum(SalesDailyFact.sales_count), 0),
+        func.coalesce(cancelled, 0),
+    ).one()
+    return {
+        "weekly_sales": float(weekly),
+        "total_revenue": float(revenue),
+        "total_sales_count": int(count),
+        "cancelled_sales": int(cancelled_count),
+    }
 
 
-from typing import Optional
+def _recent_sales(db: Session, **_) -> Dict[str, Any]:
+    """Last 5 completed sales, legacy and POS merged in one UNION ALL query."""
+    branches = [
+        select(model.id, model.code, model.total_amount, model.date)
+        .where(model.status == 'completed')
+        .order_by(model.date.desc())
+        .limit(5)
+        .subquery()
+        for model in (Sale, POSSale)
+    ]
+    merged = union_all(*(select(branch) for branch in branches)).subquery()
+    rows = db.execute(select(merged).order_by(merged.c.date.desc()).limit(5)).all()
+    return {"recent_sales": [
+        {
+            "id": row.id,
+            "code": row.code,
+            "total_amount": float(row.total_amount),
+            "date": row.date.isoformat() if row.date else None
+        } for row in rows
+    ]}
+
+
+def _expiring_soon(db: Session, today: date, **_) -> Dict[str, Any]:
+    """Medicines expiring within their own alert threshold (10 first)."""
+    if db.get_bind().dialect.name == "sqlite":
+        within_threshold = text(f"expiry_date <= date('{today}', '+' || expiry_alert_threshold || ' days')")
+    else:
+        # date - date is a number of days on PostgreSQL
+        within_threshold = (Medicine.expiry_date - today) <= Medicine.expiry_alert_threshold
+
+    expiring_soon_data = db.query(Medicine).filter(
+        Medicine.expiry_date > today,
+        Medicine.is_active == True,
+        within_threshold
+    ).order_by(Medicine.expiry_date).limit(10).all()
+    expiring_soon = [
+        {
+            "name": m.name,
+            "code": m.code,
+            "expiry_date": m.expiry_date,
+            "quantity": m.quantity
+        } for m in expiring_soon_data
+    ]
+    return {"expiring_soon": expiring_soon, "expiring_soon_count": len(expiring_soon)}
+
+
+def _low_stock_list(db: Session, **_) -> Dict[str, Any]:
+    low_stock_data = db.query(Medicine).filter(
+        Medicine.quantity <= Medicine.min_stock_alert,
+        Medicine.is_active == True
+    ).order_by(Medicine.quantity.asc()).limit(10).all()
+    return {"low_stock_list": [
+        {
+            "name": m.name,
+            "code": m.code,
+            "quantity": m.quantity,
+            "min_stock": m.min_stock_alert
+        } for m in low_stock_data
+    ]}
+
+
+# name -> (query group, values used if it fails)
+_STATS_GROUPS: Dict[str, Tuple[Callable[..., Dict[str, Any]], Dict[str, Any]]] = {
+    "medicines": (_medicine_kpis, {
+        "total_medicines": 0, "expired_medicines": 0,
+        "low_stock_medicines": 0, "total_suppliers": 0,
+    }),
+    "sales": (_sales_kpis, {
+        "weekly_sales": 0.0, "total_revenue": 0.0,
+        "total_sales_count": 0, "cancelled_sales": 0,
+    }),
+    "recent_sales": (_recent_sales, {"recent_sales": []}),
+    "expiring_soon": (_expiring_soon, {"expiring_soon": [], "expiring_soon_count": 0}),
+    "low_stock_list": (_low_stock_list, {"low_stock_list": []}),
+}
+
+
+def _run_group(db: Session, name: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    fn, fallback = _STATS_GROUPS[name]
+    start = time.perf_counter()
+    try:
+        values = fn(db, **params)
+    except Exception:
+        logger.exception(f"Error getting dashboard {name}")
+        values = dict(fallback)
+    return values, (time.perf_counter() - start) * 1000
+
 
-def get_stats(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, Any]:
+def _run_group_in_session(bind, name: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], float]:
+    with Session(bind=bind) as session:
+        return _run_group(session, name, params)
+
+
+def get_stats(
+    db: Session,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    debug: bool = False
+) -> Dict[str, Any]:
     """
     Get key metrics for the dashboard.
     
@@ -24,216 +181,38 @@ def get_stats(db: Session, start_date: Optional[str] = None, end_date: Optional[
         - sales_this_week: Sum of sales amounts for current week
         - medicines_expired: Count of expired medicines
         - medicines_low_stock: Count of low stock medicines
+        - timings: per query group duration in ms (only when `debug`)
     """
-    import traceback
-
     # Define today at the start
     today = date.today()
-
-    # 1. Total medicines
-    try:
-        total_medicines = db.query(Medicine).filter(Medicine.is_active == True).count()
-    except Exception:
-        print("Error getting total medicines:")
-        traceback.print_exc()
-        total_medicines = 0
-    
-    # 2. Weekly sales (only completed sales)
-    try:
-        week_ago = today - timedelta(days=7)
-        weekly_sales_legacy = db.query(func.sum(Sale.total_amount)).filter(
-            func.date(Sale.date) >= week_ago,
-            Sale.status == 'completed'
-        ).scalar() or 0
-        weekly_sales_pos = db.query(func.sum(POSSale.total_amount)).filter(
-            func.date(POSSale.date) >= week_ago,
-            POSSale.status == 'completed'
-        ).scalar() or 0
-        weekly_sales = weekly_sales_legacy + weekly_sales_pos
-    except Exception:
-        print("Error getting weekly sales:")
-        traceback.print_exc()
-        weekly_sales = 0
-
-    # 2b. Total sales count (completed only)
-    try:
-        legacy_sales_count = db.query(Sale).filter(
-            Sale.status == 'completed'
-        ).count()
-        pos_sales_count = db.query(POSSale).filter(
-            POSSale.status == 'completed'
-        ).count()
-        total_sales_count = legacy_sales_count + pos_sales_count
-    except Exception:
-        print("Error getting total sales count:")
-        traceback.print_exc()
-        total_sales_count = 0
-
-    # 3. Total suppliers
-    try:
-        from app.models.supplier import Supplier
-        total_suppliers = db.query(Supplier).count()
-    except Exception:
-        print("Error getting total suppliers:")
-        traceback.print_exc()
-        total_suppliers = 0
-
-    # 4. Total revenue (only completed sales)
-    try:
-        legacy_revenue = db.query(func.sum(Sale.total_amount)).filter(
-            Sale.status == 'completed'
-        ).scalar() or 0
-        pos_revenue = db.query(func.sum(POSSale.total_amount)).filter(
-            POSSale.status == 'completed'
-        ).scalar() or 0
-        total_revenue = legacy_revenue + pos_revenue
-    except Exception:
-        print("Error getting total revenue:")
-        traceback.print_exc()
-        total_revenue = 0
-    
-    # 5. Expired medicines (expired_medicines)
-    try:
-        expired_medicines = db.query(Medicine).filter(
-            and_(
-                Medicine.expiry_date.isnot(None),
-                Medicine.expiry_date <= today,
-                Medicine.is_active == True
-            )
-        ).count()
-    except Exception:
-        print("Error getting expired medicines:")
-        traceback.print_exc()
-        expired_medicines = 0
-    
-    # 6. Low stock medicines (low_stock_medicines)
-    try:
-        low_stock_medicines = db.query(Medicine).filter(
-            Medicine.quantity <= Medicine.min_stock_alert,
-            Medicine.is_active == True
-        ).count()
-    except Exception:
-        print("Error getting low stock medicines:")
-        traceback.print_exc()
-        low_stock_medicines = 0
-
-    # 7. Cancelled sales
-    try:
-        from app.models.sales import SaleStatus
-        
-        query = db.query(Sale).filter(Sale.status == SaleStatus.CANCELLED)
-        
-        if start_date and end_date:
-            dt_start_obj = datetime.strptime(start_date, "%Y-%m-%d").date()
-            dt_end_obj = datetime.strptime(end_date, "%Y-%m-%d").date()
-            query = query.filter(
-                func.date(Sale.date) >= dt_start_obj,
-                func.date(Sale.date) <= dt_end_obj
-            )
-            
-        pos_cancelled_query = db.query(POSSale).filter(
-            POSSale.status == "cancelled"
+    params: Dict[str, Any] = {"today": today, "period": None}
+    if start_date and end_date:
+        params["period"] = (
+            datetime.strptime(start_date, "%Y-%m-%d").date(),
+            datetime.strptime(end_date, "%Y-%m-%d").date(),
         )
-        if start_date and end_date:
-            pos_cancelled_query = pos_cancelled_query.filter(
-                func.date(POSSale.date) >= dt_start_obj,
-                func.date(POSSale.date) <= dt_end_obj
-            )
 
-        cancelled_sales = query.count() + pos_cancelled_query.count()
-    except Exception:
-        print("Error getting cancelled sales:")
-        traceback.print_exc()
-        cancelled_sales = 0
+    start = time.perf_counter()
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Independent round trips to the remote server: run them concurrently
+        with ThreadPoolExecutor(max_workers=len(_STATS_GROUPS)) as pool:
+            futures = {
+                name: pool.submit(_run_group_in_session, bind, name, params)
+                for name in _STATS_GROUPS
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: _run_group(db, name, params) for name in _STATS_GROUPS}
 
-    # 8. Recent sales (only completed sales)
-    try:
-        recent_sales = []
-        recent_sales_data = db.query(Sale).filter(
-            Sale.status == 'completed'
-        ).order_by(Sale.date.desc()).limit(5).all()
-        for sale in recent_sales_data:
-            recent_sales.append({
-                "id": sale.id,
-                "code": sale.code,
-                "total_amount": float(sale.total_amount),
-                "date": sale.date.isoformat() if sale.date else None
-            })
-        recent_pos_sales = db.query(POSSale).filter(
-            POSSale.status == 'completed'
-        ).order_by(POSSale.date.desc()).limit(5).all()
-        for sale in recent_pos_sales:
-            recent_sales.append({
-                "id": sale.id,
-                "code": sale.code,
-                "total_amount": float(sale.total_amount),
-                "date": sale.date.isoformat() if sale.date else None
-            })
-        recent_sales.sort(key=lambda item: item.get("date") or "", reverse=True)
-        recent_sales = recent_sales[:5]
-    except Exception:
-        print("Error getting recent sales:")
-        traceback.print_exc()
-        recent_sales = []
+    stats: Dict[str, Any] = {}
+    for values, _ in results.values():
+        stats.update(values)
 
-    # Expiring soon logic update:
-    try:
-        # Check if expiry_date is between today and today + expiry_alert_threshold days
-        from sqlalchemy import text
-        
-        expiring_soon_data = db.query(Medicine).filter(
-            Medicine.expiry_date > today,
-            Medicine.is_active == True,
-            text(f"expiry_date <= date('{today}', '+' || expiry_alert_threshold || ' days')")
-        ).order_by(Medicine.expiry_date).limit(10).all()
-        
-        expiring_soon = [
-            {
-                "name": m.name,
-                "code": m.code,
-                "expiry_date": m.expiry_date,
-                "quantity": m.quantity
-            } for m in expiring_soon_data
-        ]
-    except Exception:
-        print("Error getting expiring soon:")
-        traceback.print_exc()
-        expiring_soon = []
-        
-    # Low stock details
-    try:
-        low_stock_data = db.query(Medicine).filter(
-            Medicine.quantity <= Medicine.min_stock_alert,
-            Medicine.is_active == True
-        ).order_by(Medicine.quantity.asc()).limit(10).all()
-        
-        low_stock_list = [
-            {
-                "name": m.name,
-                "code": m.code,
-                "quantity": m.quantity,
-                "min_stock": m.min_stock_alert
-            } for m in low_stock_data
-        ]
-    except Exception:
-        print("Error getting low stock list:")
-        traceback.print_exc()
-        low_stock_list = []
-    
-    return {
-        "total_medicines": total_medicines,
-        "total_sales_count": total_sales_count,
-        "weekly_sales": float(weekly_sales),
-        "total_suppliers": total_suppliers,
-        "expired_medicines": expired_medicines,
-        "expiring_soon_count": len(expiring_soon),
-        "low_stock_medicines": low_stock_medicines,
-        "total_revenue": float(total_revenue),
-        "cancelled_sales": cancelled_sales,
-        "recent_sales": recent_sales,
-        "expiring_soon": expiring_soon,
-        "low_stock_list": low_stock_list
-    }
+    if debug:
+        stats["timings"] = {name: round(ms, 2) for name, (_, ms) in results.items()}
+        stats["timings"]["total"] = round((time.perf_counter() - start) * 1000, 2)
+    return stats
 
 
 def get_cancelled_sales_details(db: Session, limit: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -333,9 +312,7 @@ def get_cancelled_sales_details(db: Session, limit: int = 50, start_date: Option
             
         return detailed_sales[:limit]
     except Exception:
-        import traceback
-        print("Error getting cancelled sales details:")
-        traceback.print_exc()
+        logger.exception("Error getting cancelled sales details")
         return []
 
 
@@ -362,49 +339,22 @@ def get_revenue_chart_data(db: Session, days: int = 7, start_date: Optional[str]
             end_date_val = date.today()
             start_date_val = end_date_val - timedelta(days=days - 1)
         
-        daily_sales = db.query(
-            func.date(Sale.date).label('sale_date'),
-            func.sum(Sale.total_amount).label('total')
-        ).filter(
-            func.date(Sale.date) >= start_date_val,
-            func.date(Sale.date) <= end_date_val,
-            Sale.status == 'completed'
-        ).group_by(
-            func.date(Sale.date)
-        ).all()
-        daily_pos_sales = db.query(
-            func.date(POSSale.date).label('sale_date'),
-            func.sum(POSSale.total_amount).label('total')
-        ).filter(
-            func.date(POSSale.date) >= start_date_val,
-            func.date(POSSale.date) <= end_date_val,
-            POSSale.status == 'completed'
-        ).group_by(
-            func.date(POSSale.date)
-        ).all()
-        
-        # Convert result to dict
-        sales_map = {str(d[0]): float(d[1] or 0) for d in daily_sales}
-        for sale_date, total in daily_pos_sales:
-            key = str(sale_date)
-            sales_map[key] = sales_map.get(key, 0.0) + float(total or 0)
+        # Completed revenue per day (legacy + POS) from the sales facts
+        sales_map = sales_facts_service.daily_revenue(db, start_date_val, end_date_val)
         
         # Generate full list
         chart_data = []
         current_date = start_date_val
         while current_date <= end_date_val:
-            date_str = current_date.isoformat()
             chart_data.append({
-                "date": date_str,
-                "amount": sales_map.get(date_str, 0.0)
+                "date": current_date.isoformat(),
+                "amount": sales_map.get(current_date, 0.0)
             })
             current_date += timedelta(days=1)
             
         return chart_data
     except Exception:
-        import traceback
-        print("Error getting revenue chart data:")
-        traceback.print_exc()
+        logger.exception("Error getting revenue chart data")
         return []
 
 
@@ -495,9 +445,7 @@ def get_top_selling_products(db: Session, limit: int = 15, start_date: Optional[
             reverse=True,
         )[:limit]
     except Exception:
-        import traceback
-        print("Error getting top selling products:")
-        traceback.print_exc()
+        logger.exception("Error getting top selling products")
         return []
 
 
@@ -507,26 +455,11 @@ def get_sales_by_day_of_week(db: Session, days: int = 7) -> List[Dict[str, Any]]
     Returns list of {day: "Monday", amount: 123.0}
     """
     try:
-        from app.models.sales import Sale
-        from sqlalchemy import text
-        
         start_date = date.today() - timedelta(days=days - 1)
         
-        # SQLite strftime('%w', date) returns 0 (Sunday) - 6 (Saturday)
-        results = db.query(
-            func.strftime('%w', Sale.date).label('dow'),
-            func.sum(Sale.total_amount).label('total')
-        ).filter(
-            func.date(Sale.date) >= start_date,
-            Sale.status == 'completed'
-        ).group_by(text('dow')).all()
-        pos_results = db.query(
-            func.strftime('%w', POSSale.date).label('dow'),
-            func.sum(POSSale.total_amount).label('total')
-        ).filter(
-            func.date(POSSale.date) >= start_date,
-            POSSale.status == 'completed'
-        ).group_by(text('dow')).all()
+        # Daily revenue from the sales facts, folded by day of week
+        # (0 = Sunday ... 6 = Saturday, like SQLite strftime('%w'))
+        daily = sales_facts_service.daily_revenue(db, start_date, date.today())
         
         # Map 0-6 to day names
         days_map = {
@@ -534,10 +467,10 @@ def get_sales_by_day_of_week(db: Session, days: int = 7) -> List[Dict[str, Any]]
             '4': 'Thursday', '5': 'Friday', '6': 'Saturday'
         }
         
-        results_dict = {str(r[0]): float(r[1] or 0) for r in results}
-        for dow, total in pos_results:
-            key = str(dow)
-            results_dict[key] = results_dict.get(key, 0.0) + float(total or 0)
+        results_dict = {}
+        for day, total in daily.items():
+            key = str((day.weekday() + 1) % 7)
+            results_dict[key] = results_dict.get(key, 0.0) + total
         
         data = []
         for i in range(7):
@@ -549,9 +482,7 @@ def get_sales_by_day_of_week(db: Session, days: int = 7) -> List[Dict[str, Any]]
             
         return data
     except Exception:
-        import traceback
-        print("Error getting sales by day of week:")
-        traceback.print_exc()
+        logger.exception("Error getting sales by day of week")
         return []
 
 
@@ -561,30 +492,9 @@ def get_sales_by_hour(db: Session, days: int = 7) -> List[Dict[str, Any]]:
     Returns list of {hour: 0-23, amount: 123.0}
     """
     try:
-        from app.models.sales import Sale
-        from sqlalchemy import text
-        
         start_date = date.today() - timedelta(days=days - 1)
         
-        results = db.query(
-            func.strftime('%H', Sale.date).label('hour'),
-            func.sum(Sale.total_amount).label('total')
-        ).filter(
-            func.date(Sale.date) >= start_date,
-            Sale.status == 'completed'
-        ).group_by(text('hour')).order_by(text('hour')).all()
-        pos_results = db.query(
-            func.strftime('%H', POSSale.date).label('hour'),
-            func.sum(POSSale.total_amount).label('total')
-        ).filter(
-            func.date(POSSale.date) >= start_date,
-            POSSale.status == 'completed'
-        ).group_by(text('hour')).order_by(text('hour')).all()
-        
-        results_dict = {int(r[0]): float(r[1] or 0) for r in results}
-        for hour, total in pos_results:
-            key = int(hour)
-            results_dict[key] = results_dict.get(key, 0.0) + float(total or 0)
+        results_dict = sales_facts_service.hourly_revenue(db, start_date)
         
         data = []
         # Fill all 24 hours
@@ -596,8 +506,6 @@ def get_sales_by_hour(db: Session, days: int = 7) -> List[Dict[str, Any]]:
             
         return data
     except Exception:
-        import traceback
-        print("Error getting sales by hour:")
-        traceback.print_exc()
+        logger.exception("Error getting sales by hour")
         return []
 
@@ -0,0 +1,135 @@
+"""
+Financial statement — Per-family quantities, rates and values.
+
+One aggregate query builds the whole statement (no lookup per family or
+per medicine), and the PDF, Excel and JSON outputs all render the same
+FinancialStatement model:
+
+- sales mode (start_date and end_date given): lines of completed legacy
+  sales (SaleItem) and POS sales (POSSaleItem) over the period, UNION ALL
+  then grouped per medicine and joined to its family. Value is the
+  amount actually sold, rate the average selling price.
+- stock mode (no period): closing balance of the active stock, valued
+  at the current selling price.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.medicine import Medicine, MedicineFamily
+from app.models.pos_sale import POSSale, POSSaleItem
+from app.models.sales import Sale, SaleItem
+from app.schemas.report import FinancialFamily, FinancialLine, FinancialStatement
+
+NO_FAMILY = "Sans Catégorie"
+
+
+def _sold_lines(start_dt: datetime, end_dt: datetime):
+    """Completed sale lines of both sale tables: (medicine_id, quantity, amount)."""
+    branches = [
+        select(
+            item.medicine_id.label("medicine_id"),
+            item.quantity.label("quantity"),
+            item.total_price.label("amount"),
+        )
+        .join(sale, sale.id == item.sale_id)
+        .where(sale.date >= start_dt, sale.date <= end_dt, sale.status != "cancelled")
+        for sale, item in ((Sale, SaleItem), (POSSale, POSSaleItem))
+    ]
+    return union_all(*branches).subquery("sold_lines")
+
+
+def _sales_rows(db: Session, start_date: date, end_date: date):
+    lines = _sold_lines(
+        datetime.combine(start_date, datetime.min.time()),
+        datetime.combine(end_date, datetime.max.time()),
+    )
+    quantity = func.sum(lines.c.quantity)
+    amount = func.sum(lines.c.amount)
+    return db.execute(
+        select(
+            MedicineFamily.id, MedicineFamily.name, Medicine.id, Medicine.name, quantity, amount,
+        )
+        .select_from(lines)
+        .join(Medicine, Medicine.id == lines.c.medicine_id)
+        .outerjoin(MedicineFamily, MedicineFamily.id == Medicine.family_id)
+        .group_by(MedicineFamily.id, MedicineFamily.name, Medicine.id, Medicine.name)
+        .order_by(MedicineFamily.name, Medicine.name)
+    ).all()
+
+
+def _stock_rows(db: Session):
+    return db.execute(
+        select(
+            MedicineFamily.id, MedicineFamily.name, Medicine.id, Medicine.name,
+            Medicine.quantity, Medicine.price_sell,
+        )
+        .select_from(Medicine)
+        .outerjoin(MedicineFamily, MedicineFamily.id == Medicine.family_id)
+        .where(Medicine.is_active == True)
+        .order_by(MedicineFamily.name, Medicine.name)
+    ).all()
+
+
+def build_statement(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    period_label: str = "Aperçu",
+) -> FinancialStatement:
+    """
+    Build the financial statement (one SQL query).
+
+    Args:
+        db: Database session
+        start_date / end_date: Sales period; stock closing balance if missing
+        period_label: Label printed on the documents
+    """
+    sales_mode = bool(start_date and end_date)
+    rows = _sales_rows(db, start_date, end_date) if sales_mode else _stock_rows(db)
+
+    families = {}
+    for family_id, family_name, medicine_id, name, quantity, measure in rows:
+        quantity = float(quantity or 0)
+        if sales_mode:
+            # measure = amount sold
+            value = float(measure or 0)
+            rate = value / quantity if quantity else 0.0
+        else:
+            # measure = current selling price
+            rate = float(measure or 0)
+            value = quantity * rate
+        family = families.get(family_id)
+        if family is None:
+            family = families[family_id] = FinancialFamily(
+                family_id=family_id, name=family_name or NO_FAMILY
+            )
+        family.lines.append(FinancialLine(
+            medicine_id=medicine_id, name=name, quantity=quantity, rate=rate, value=value
+        ))
+        family.quantity += quantity
+        family.value += value
+
+    # Products without family last
+    ordered = sorted(families.values(), key=lambda f: (f.family_id is None, f.name))
+    return FinancialStatement(
+        mode="sales" if sales_mode else "stock",
+        start_date=start_date if sales_mode else None,
+        end_date=end_date if sales_mode else None,
+        period_label=period_label,
+        families=ordered,
+        grand_total=sum(f.value for f in ordered),
+        generated_at=datetime.now(),
+    )
+
+
+def excel_rows(statement: FinancialStatement):
+    """Flat rows for the Excel export: one row per product, family subtotals, grand total."""
+    for family in statement.families:
+        for line in family.lines:
+            yield (family.name, line.name, line.quantity, round(line.rate, 2), round(line.value, 2))
+        yield (f"Total {family.name}", None, family.quantity, None, round(family.value, 2))
+    yield ("Grand Total", None, None, None, round(statement.grand_total, 2))
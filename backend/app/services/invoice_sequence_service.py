@@ -0,0 +1,219 @@
+"""
+Invoice sequence service — Race-free invoice numbering.
+
+Codes have the form PREFIX-YYYY-NNNN (POS-2026-0042, INV-2026-0007).
+Each (prefix, year) owns a counter row in `invoice_sequences`:
+
+- `next_invoice_code()` increments the counter with a single UPDATE inside
+  the caller's transaction. The row stays locked until the sale commits,
+  so concurrent checkouts get distinct numbers, and a rolled-back sale
+  gives its number back (no gaps).
+- The first code of a year creates the counter, starting after the
+  highest code already stored (databases created before the counter).
+- Optional block reservation (`enable_block_reservation`) reserves N
+  numbers at once in a separate short transaction; codes are then minted
+  in memory without touching the database, e.g. by an offline till that
+  reserved its block from the shared database while online. Numbers left
+  in a block when the process stops are skipped. The app lifespan turns
+  it on for POS codes when INVOICE_BLOCK_SIZE > 0.
+"""
+
+from typing import Dict, Optional
+from datetime import datetime
+import logging
+import os
+import threading
+
+from sqlalchemy import insert, update, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.invoice_sequence import InvoiceSequence
+
+logger = logging.getLogger("invoice_sequence")
+
+# Default block size for `enable_block_reservation` (0 = disabled)
+INVOICE_BLOCK_SIZE = int(os.getenv("INVOICE_BLOCK_SIZE", "0"))
+
+
+def format_invoice_code(prefix: str, year: int, number: int) -> str:
+    """Format: PREFIX-YYYY-NNNN."""
+    return f"{prefix}-{year}-{number:04d}"
+
+
+def _highest_existing_number(db: Session, prefix: str, year: int, code_column) -> int:
+    """Highest number already used in `code_column` for this prefix/year."""
+    highest = 0
+    codes = db.query(code_column).filter(code_column.like(f"{prefix}-{year}-%"))
+    for (code,) in codes:
+        try:
+            highest = max(highest, int(code.split('-')[-1]))
+        except (ValueError, IndexError):
+            continue
+    return highest
+
+
+def _create_sequence(db: Session, prefix: str, year: int, code_column) -> None:
+    """Create the counter row if missing (concurrent creators are tolerated)."""
+    values = {
+        "prefix": prefix,
+        "year": year,
+        "last_number": _highest_existing_number(db, prefix, year, code_column),
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        stmt = sqlite.insert(InvoiceSequence).values(**values).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(InvoiceSequence).values(**values).on_conflict_do_nothing()
+    else:
+        stmt = insert(InvoiceSequence).values(**values)
+    db.execute(stmt)
+
+
+def _increment(db: Session, prefix: str, year: int, count: int) -> Optional[int]:
+    """Add `count` to the counter; returns the new last number (None if no row)."""
+    stmt = (
+        update(InvoiceSequence)
+        .where(InvoiceSequence.prefix == prefix, InvoiceSequence.year == year)
+        .values(last_number=InvoiceSequence.last_number + count)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        return db.execute(stmt.returning(InvoiceSequence.last_number)).scalar()
+
+    # No RETURNING: the UPDATE already holds the row lock, read it back
+    if db.execute(stmt).rowcount == 0:
+        return None
+    return db.execute(
+        select(InvoiceSequence.last_number)
+        .where(InvoiceSequence.prefix == prefix, InvoiceSequence.year == year)
+    ).scalar()
+
+
+def allocate_numbers(
+    db: Session,
+    prefix: str,
+    code_column,
+    count: int = 1,
+    year: Optional[int] = None,
+) -> range:
+    """
+    Atomically allocate `count` consecutive numbers in the caller's transaction.
+
+    Args:
+        db: Database session (the sale transaction)
+        prefix: Code prefix ('POS', 'INV')
+        code_column: Column holding existing codes (seeds a new counter)
+        count: How many numbers to allocate
+        year: Sequence year (default: current year)
+
+    Returns:
+        range of the allocated numbers
+    """
+    year = year or datetime.now().year
+    last = _increment(db, prefix, year, count)
+    if last is None:
+        _create_sequence(db, prefix, year, code_column)
+        last = _increment(db, prefix, year, count)
+    return range(last - count + 1, last + 1)
+
+
+class InvoiceBlockAllocator:
+    """
+    Mints codes from blocks of numbers reserved in advance.
+
+    Each reservation runs in its own short transaction opened with
+    `session_factory` (e.g. the shared remote database for an offline
+    till), so it is committed independently of the sales using it.
+    """
+
+    def __init__(self, prefix: str, code_column, block_size: int, session_factory):
+        self.prefix = prefix
+        self.code_column = code_column
+        self.block_size = block_size
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._year: Optional[int] = None
+        self._numbers = iter(())
+        self._remaining = 0
+
+    @property
+    def remaining(self) -> int:
+        return self._remaining
+
+    def reserve(self, year: Optional[int] = None) -> range:
+        """Reserve a new block (replaces what is left of the current one)."""
+        year = year or datetime.now().year
+        db = self.session_factory()
+        try:
+            block = allocate_numbers(db, self.prefix, self.code_column, self.block_size, year)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        with self._lock:
+            self._year = year
+            self._numbers = iter(block)
+            self._remaining = len(block)
+        logger.info(f"Invoice block reserved: {self.prefix}-{year} {block.start}..{block.stop - 1}")
+        return block
+
+    def next_code(self) -> str:
+        year = datetime.now().year
+        with self._lock:
+            if self._year == year and self._remaining > 0:
+                self._remaining -= 1
+                return format_invoice_code(self.prefix, year, next(self._numbers))
+        self.reserve(year)
+        return self.next_code()
+
+
+_block_allocators: Dict[str, InvoiceBlockAllocator] = {}
+
+
+def enable_block_reservation(
+    prefix: str,
+    code_column,
+    block_size: int = 0,
+    session_factory=None,
+) -> InvoiceBlockAllocator:
+    """
+    Mint `prefix` codes from reserved blocks instead of the per-sale counter.
+
+    Args:
+        prefix: Code prefix ('POS', 'INV')
+        code_column: Column holding existing codes (seeds a new counter)
+        block_size: Numbers per block (default: INVOICE_BLOCK_SIZE env)
+        session_factory: Where blocks are reserved (default: local database)
+    """
+    if session_factory is None:
+        from app.database import SessionLocal
+        session_factory = SessionLocal
+    block_size = block_size or INVOICE_BLOCK_SIZE
+    if block_size <= 0:
+        raise ValueError("La taille de bloc de numérotation doit être positive")
+
+    allocator = InvoiceBlockAllocator(prefix, code_column, block_size, session_factory)
+    _block_allocators[prefix] = allocator
+    return allocator
+
+
+def disable_block_reservation(prefix: str) -> None:
+    _block_allocators.pop(prefix, None)
+
+
+def next_invoice_code(db: Session, prefix: str, code_column) -> str:
+    """
+    Next invoice code for `prefix`, allocated inside the caller's transaction
+    (or from the reserved block when block reservation is enabled).
+    """
+    allocator = _block_allocators.get(prefix)
+    if allocator is not None:
+        return allocator.next_code()
+
+    year = datetime.now().year
+    number = allocate_numbers(db, prefix, code_column, 1, year)[0]
+    return format_invoice_code(prefix, year, number)
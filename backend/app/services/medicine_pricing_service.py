@@ -18,6 +18,7 @@ from app.models.medicine import Medicine
 from app.models.batch import Batch
 from app.models.stock_movement import StockMovement
 from app.schemas.medicine_pricing import MedicinePricingCreate, MedicinePricingUpdate
+from app.services.search_index import product_index
 
 logger = logging.getLogger("medicine_pricing_service")
 
@@ -177,6 +178,7 @@ def create_pricing(db: Session, data: MedicinePricingCreate) -> MedicinePricing:
         existing.benefice_estime = round(valeur_vente - valeur_achat, 2)
         
         # Update the linked Medicine stock
+        medicine = None
         if existing.medicine_id:
             medicine = db.query(Medicine).filter(Medicine.id == existing.medicine_id).first()
             if medicine:
@@ -206,6 +208,8 @@ def create_pricing(db: Session, data: MedicinePricingCreate) -> MedicinePricing:
         
         db.commit()
         db.refresh(existing)
+        if medicine:
+            product_index.upsert(medicine)
         return existing
     
     # --- Step 2: Find or create Medicine ---
@@ -308,6 +312,7 @@ def create_pricing(db: Session, data: MedicinePricingCreate) -> MedicinePricing:
 
     db.commit()
     db.refresh(entry)
+    product_index.upsert(medicine)
     
     logger.info(
         f"Pricing #{entry.id} créé pour {data.nom} — "
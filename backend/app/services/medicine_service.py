@@ -19,6 +19,7 @@ from app.schemas.medicine import (
     MedicineFamilyCreate, MedicineFamilyUpdate,
     MedicineTypeCreate, MedicineTypeUpdate
 )
+from app.services.search_index import product_index, MAX_ID_FILTER
 
 
 # ============================================================================
@@ -343,13 +344,18 @@ def get_medicines(
     
     # Apply filters
     if search:
-        search_filter = or_(
-            Medicine.name.ilike(f"%{search}%"),
-            Medicine.code.ilike(f"%{search}%"),
-            Medicine.code_barres.ilike(f"%{search}%"),
-            Medicine.dci.ilike(f"%{search}%"),
-            Medicine.fournisseur.ilike(f"%{search}%"),
-        )
+        # In-memory index first; SQL ilike scan only as a fallback
+        matched_ids = product_index.match_ids(search, include_secondary=True)
+        if matched_ids is not None and len(matched_ids) <= MAX_ID_FILTER:
+            search_filter = Medicine.id.in_(matched_ids)
+        else:
+            search_filter = or_(
+                Medicine.name.ilike(f"%{search}%"),
+                Medicine.code.ilike(f"%{search}%"),
+                Medicine.code_barres.ilike(f"%{search}%"),
+                Medicine.dci.ilike(f"%{search}%"),
+                Medicine.fournisseur.ilike(f"%{search}%"),
+            )
         query = query.filter(search_filter)
     
     if family_id:
@@ -432,6 +438,7 @@ def create_medicine(db: Session, medicine_data: MedicineCreate) -> Medicine:
 
     db.commit()
     db.refresh(medicine)
+    product_index.upsert(medicine)
     return medicine
 
 
@@ -479,6 +486,7 @@ def update_medicine(db: Session, medicine_id: int, medicine_data: MedicineUpdate
 
         db.commit()
         db.refresh(medicine)
+        product_index.upsert(medicine)
         return medicine
     except Exception:
         db.rollback()
@@ -508,6 +516,8 @@ def delete_medicine(db: Session, medicine_id: int) -> bool:
         # Hard delete if no history (cleaner)
         db.delete(medicine)
         db.commit()
+
+    product_index.remove(medicine_id)
         
     return True
 
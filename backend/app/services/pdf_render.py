@@ -0,0 +1,454 @@
+"""
+PDF rendering — Shared page templates and auto-paginating tables.
+
+Reports and invoices used to hand-position every string on a canvas, each
+one with its own header code and `if y_position < 3 * cm: showPage()`
+checks. Here:
+
+- page templates (page size, margins, letterhead, page footer) are built
+  once at import and shared by every document of a kind;
+- the standard fonts are loaded once per process (first use parses the
+  AFM metrics) and text measured for truncation goes through a cached
+  stringWidth;
+- tables are RowTable flowables: fixed-height rows drawn straight on the
+  canvas and split between pages by slicing, with the header repeated on
+  each page (no cell object per value, no re-splitting of the remaining
+  rows on every page as with platypus.Table on long reports);
+- documents are written to the given file object (artifact, response,
+  socket makefile) or to a spooled temporary file, never to a BytesIO
+  holding the whole report.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm, mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.platypus import BaseDocTemplate, Flowable, Frame, PageTemplate
+
+PDF_MEDIA_TYPE = "application/pdf"
+SPOOL_MAX_BYTES = 4 * 1024 * 1024
+
+BODY_FONT = ("Helvetica", 8)
+HEADER_FONT = ("Helvetica-Bold", 9)
+FONT_FACES = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique")
+
+COMPANY_NAME = "PHARMA-SOURCE"
+COMPANY_NIF = "NIF: [À compléter]"
+COMPANY_TEL = "TEL: [À compléter]"
+
+RECEIPT_WIDTH = 80 * mm
+
+
+@lru_cache(maxsize=None)
+def load_fonts() -> Dict[str, Any]:
+    """Load the standard fonts once (metrics are parsed on first use)."""
+    return {face: pdfmetrics.getFont(face) for face in FONT_FACES}
+
+
+@lru_cache(maxsize=8192)
+def text_width(text: str, font: str, size: float) -> float:
+    return pdfmetrics.stringWidth(text, font, size)
+
+
+def fit(text: str, width: float, font: str, size: float) -> str:
+    """Truncate `text` so that it fits in `width` points."""
+    if text_width(text, font, size) <= width:
+        return text
+    while text and text_width(text, font, size) > width:
+        text = text[:-1]
+    return text
+
+
+# ============================================================================
+# FLOWABLES
+# ============================================================================
+
+class Column:
+    """
+    Table column.
+
+    Attributes:
+        title: Header text
+        x: Offset from the frame left (right edge when align="right")
+        align: "left" or "right"
+        max_chars: Truncate values to this many characters
+        width: Truncate values to this width (measured with the row font)
+    """
+
+    __slots__ = ("title", "x", "align", "max_chars", "width")
+
+    def __init__(self, title: str, x: float, align: str = "left",
+                 max_chars: Optional[int] = None, width: Optional[float] = None):
+        self.title = title
+        self.x = x
+        self.align = align
+        self.max_chars = max_chars
+        self.width = width
+
+
+class Row:
+    """Table row with its own font and/or background (plain tuples use the table defaults)."""
+
+    __slots__ = ("cells", "font", "fill")
+
+    def __init__(self, cells: Sequence[Any], font: Optional[Tuple[str, float]] = None, fill=None):
+        self.cells = cells
+        self.font = font
+        self.fill = fill
+
+
+class RowTable(Flowable):
+    """
+    Fixed-height rows drawn on the canvas, paginated by the frame.
+
+    Args:
+        columns: Column layout
+        rows: Row tuples (cell values, None = empty) or Row objects
+        font: Default row font (name, size)
+        header_font: Header font
+        row_height: Distance between two row baselines
+        header: Header rows (default: the column titles); [] for none
+        header_fill: Header background color
+        header_rule: Draw a line under the header
+    """
+
+    HEADER_LEADING = 0.5 * cm
+    HEADER_GAP = 0.25 * cm
+    BASELINE = 0.1 * cm
+
+    def __init__(self, columns: Sequence[Column], rows: Sequence[Any],
+                 font: Tuple[str, float] = BODY_FONT,
+                 header_font: Tuple[str, float] = HEADER_FONT,
+                 row_height: float = 0.35 * cm,
+                 header: Optional[Sequence[Row]] = None,
+                 header_fill=None, header_rule: bool = True):
+        super().__init__()
+        self.columns = columns
+        self.rows = rows
+        self.font = font
+        self.header_font = header_font
+        self.row_height = row_height
+        self.header = [Row([c.title for c in columns])] if header is None else header
+        self.header_fill = header_fill
+        self.header_rule = header_rule
+
+    def _copy(self, rows: Sequence[Any]) -> "RowTable":
+        return RowTable(
+            self.columns, rows, self.font, self.header_font, self.row_height,
+            self.header, self.header_fill, self.header_rule,
+        )
+
+    @property
+    def header_height(self) -> float:
+        if not self.header:
+            return 0
+        return len(self.header) * self.HEADER_LEADING + self.HEADER_GAP
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = self.header_height + len(self.rows) * self.row_height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fitting = int((availHeight - self.header_height) // self.row_height)
+        if fitting <= 0:
+            return []
+        if fitting >= len(self.rows):
+            return [self]
+        return [self._copy(self.rows[:fitting]), self._copy(self.rows[fitting:])]
+
+    def _draw_cells(self, canv, y: float, cells: Sequence[Any], font: Tuple[str, float]):
+        for column, value in zip(self.columns, cells):
+            if value is None or value == "":
+                continue
+            text = str(value)
+            if column.max_chars:
+                text = text[:column.max_chars]
+            if column.width:
+                text = fit(text, column.width, *font)
+            if column.align == "right":
+                canv.drawRightString(column.x, y, text)
+            else:
+                canv.drawString(column.x, y, text)
+
+    def draw(self):
+        canv = self.canv
+        y = self.height
+
+        if self.header:
+            if self.header_fill is not None:
+                canv.setFillColor(self.header_fill)
+                canv.rect(0, y - self.header_height + self.HEADER_GAP, self.width,
+                          len(self.header) * self.HEADER_LEADING, fill=1, stroke=0)
+                canv.setFillColor(colors.black)
+            canv.setFont(*self.header_font)
+            for row in self.header:
+                y -= self.HEADER_LEADING
+                self._draw_cells(canv, y + 0.2 * cm, row.cells, self.header_font)
+            if self.header_rule:
+                canv.line(0, y, self.width, y)
+            y -= self.HEADER_GAP
+
+        current = self.font
+        canv.setFont(*current)
+        for row in self.rows:
+            y -= self.row_height
+            if isinstance(row, Row):
+                cells, font, fill = row.cells, row.font or self.font, row.fill
+            else:
+                cells, font, fill = row, self.font, None
+            if fill is not None:
+                canv.setFillColor(fill)
+                canv.rect(-0.2 * cm, y, self.width + 0.4 * cm, self.row_height, fill=1, stroke=0)
+                canv.setFillColor(colors.black)
+            if font != current:
+                canv.setFont(*font)
+                current = font
+            self._draw_cells(canv, y + self.BASELINE, cells, font)
+
+
+class TextLine(Flowable):
+    """
+    One line of text.
+
+    Args:
+        segments: [(x, text, align)] with align "left", "right" or "center"
+            (x is ignored when centered)
+        font: Font (name, size)
+        leading: Line height
+    """
+
+    def __init__(self, segments: Sequence[Tuple[float, str, str]],
+                 font: Tuple[str, float] = ("Helvetica", 10), leading: float = 0.5 * cm):
+        super().__init__()
+        self.segments = segments
+        self.font = font
+        self.leading = leading
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = self.leading
+        return self.width, self.height
+
+    def draw(self):
+        canv = self.canv
+        canv.setFont(*self.font)
+        y = self.height - self.font[1]
+        for x, text, align in self.segments:
+            if align == "center":
+                canv.drawCentredString(self.width / 2, y, text)
+            elif align == "right":
+                canv.drawRightString(x, y, text)
+            else:
+                canv.drawString(x, y, text)
+
+
+def text(value: str, font: Tuple[str, float] = ("Helvetica", 10),
+         align: str = "left", leading: float = 0.5 * cm, x: float = 0) -> TextLine:
+    """Single-segment TextLine."""
+    return TextLine([(x, value, align)], font, leading)
+
+
+class Rule(Flowable):
+    """Horizontal line across the frame."""
+
+    def __init__(self, color=colors.black, thickness: float = 1, space: float = 0.2 * cm):
+        super().__init__()
+        self.color = color
+        self.thickness = thickness
+        self.space = space
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        self.height = 2 * self.space
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.setStrokeColor(self.color)
+        self.canv.setLineWidth(self.thickness)
+        self.canv.line(0, self.space, self.width, self.space)
+        self.canv.setStrokeColor(colors.black)
+        self.canv.setLineWidth(1)
+
+
+# ============================================================================
+# PAGE TEMPLATES
+# ============================================================================
+
+PageHook = Callable[[Any, "Document"], None]
+
+
+class DocumentTemplate:
+    """
+    Page layout shared by every document of a kind.
+
+    Attributes:
+        pagesize: (width, height); height None = sized to the content
+            (thermal receipts, one continuous page)
+        margin: Page margin on all sides
+        first_top: Extra space reserved at the top of the first page
+        on_first_page / on_page: Decorations drawn on the first / every page
+    """
+
+    def __init__(self, name: str, pagesize: Tuple[float, Optional[float]], margin: float,
+                 first_top: float = 0, on_first_page: Optional[PageHook] = None,
+                 on_page: Optional[PageHook] = None):
+        self.name = name
+        self.pagesize = pagesize
+        self.margin = margin
+        self.first_top = first_top
+        self.on_first_page = on_first_page
+        self.on_page = on_page
+
+    def frame_width(self) -> float:
+        return self.pagesize[0] - 2 * self.margin
+
+    def _decorate(self, first: bool) -> Callable:
+        hooks = [hook for hook in (self.on_first_page if first else None, self.on_page) if hook]
+
+        def on_page(canv, doc):
+            canv.saveState()
+            for hook in hooks:
+                hook(canv, doc)
+            canv.restoreState()
+        return on_page
+
+    def page_templates(self, pagesize: Tuple[float, float]) -> List[PageTemplate]:
+        width, height = pagesize
+        frame = lambda top: Frame(
+            self.margin, self.margin, width - 2 * self.margin, height - 2 * self.margin - top,
+            leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0,
+        )
+        return [
+            PageTemplate("first", [frame(self.first_top)], onPage=self._decorate(True),
+                         pagesize=pagesize, autoNextPageTemplate="later"),
+            PageTemplate("later", [frame(0)], onPage=self._decorate(False), pagesize=pagesize),
+        ]
+
+
+class Document(BaseDocTemplate):
+    """BaseDocTemplate carrying the per-document values read by page decorations."""
+
+    def __init__(self, output, template: DocumentTemplate, pagesize, page_vars: Dict[str, Any]):
+        super().__init__(
+            output, pagesize=pagesize,
+            leftMargin=template.margin, rightMargin=template.margin,
+            topMargin=template.margin, bottomMargin=template.margin,
+            title=page_vars.get("title", ""), author=COMPANY_NAME,
+        )
+        self.page_vars = page_vars
+        self.addPageTemplates(template.page_templates(pagesize))
+
+
+def _content_height(template: DocumentTemplate, story: Sequence[Flowable]) -> float:
+    width = template.frame_width()
+    height = 2 * template.margin + template.first_top
+    for flowable in story:
+        height += flowable.wrap(width, 1e9)[1] + flowable.getSpaceBefore() + flowable.getSpaceAfter()
+    return height
+
+
+def render(template: DocumentTemplate, story: List[Flowable], output: Optional[IO[bytes]] = None,
+           **page_vars) -> IO[bytes]:
+    """
+    Lay out `story` with `template` and write the PDF.
+
+    Args:
+        template: Page template
+        story: Flowables, in order
+        output: Writable file object (spooled temporary file if None)
+        **page_vars: Values for the page decorations (title, subtitle...)
+
+    Returns:
+        `output`, positioned at 0 when seekable
+    """
+    load_fonts()
+    if output is None:
+        output = SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+
+    width, height = template.pagesize
+    if height is None:
+        height = _content_height(template, story)
+
+    Document(output, template, (width, height), page_vars).build(story)
+    if output.seekable():
+        output.seek(0)
+    return output
+
+
+# ============================================================================
+# TEMPLATES
+# ============================================================================
+
+def _letterhead(canv, doc: Document):
+    """PHARMA-SOURCE block and report subtitle (first page of reports)."""
+    width, height = doc.pagesize
+    margin = doc.leftMargin
+    y = height - margin
+
+    canv.setFont("Helvetica-Bold", 14)
+    canv.drawString(margin, y, COMPANY_NAME)
+    y -= 0.5 * cm
+    canv.setFont("Helvetica", 10)
+    canv.drawString(margin, y, COMPANY_NIF)
+    y -= 0.4 * cm
+    canv.drawString(margin, y, COMPANY_TEL)
+    y -= 1 * cm
+
+    canv.setFont("Helvetica-Bold", 12)
+    canv.drawRightString(width - margin, y + 0.5 * cm, COMPANY_NAME)
+    canv.setFont("Helvetica", 10)
+    canv.drawRightString(width - margin, y, doc.page_vars.get("subtitle", ""))
+
+
+def _page_number(canv, doc: Document):
+    width, _ = doc.pagesize
+    canv.setFont("Helvetica", 7)
+    canv.drawRightString(width - doc.rightMargin, 1 * cm, f"Page {canv.getPageNumber()}")
+
+
+def _invoice_header(canv, doc: Document):
+    width, height = doc.pagesize
+    margin = doc.leftMargin
+    y = height - margin
+
+    canv.setFont("Helvetica-Bold", 20)
+    canv.drawCentredString(width / 2, y, "PHARMACIE")
+    y -= 0.5 * cm
+    canv.setFont("Helvetica", 10)
+    canv.drawCentredString(width / 2, y, "Système de Gestion")
+    y -= 1.5 * cm
+
+    canv.setStrokeColor(colors.grey)
+    canv.setLineWidth(2)
+    canv.line(margin, y, width - margin, y)
+
+
+def _invoice_footer(canv, doc: Document):
+    width, _ = doc.pagesize
+    canv.setStrokeColor(colors.grey)
+    canv.setLineWidth(1)
+    canv.line(doc.leftMargin, 2 * cm, width - doc.rightMargin, 2 * cm)
+
+
+REPORT_A4 = DocumentTemplate(
+    "report_a4", A4, margin=2 * cm, first_top=3.4 * cm,
+    on_first_page=_letterhead, on_page=_page_number,
+)
+
+INVOICE_A4 = DocumentTemplate(
+    "invoice_a4", A4, margin=2 * cm, first_top=3 * cm,
+    on_first_page=_invoice_header, on_page=_invoice_footer,
+)
+
+RECEIPT = DocumentTemplate("receipt", (RECEIPT_WIDTH, None), margin=4 * mm)
+
+
+def report_subtitle(title: str, generated_at: Optional[datetime] = None) -> str:
+    """Right-aligned report title line, e.g. "État du Stock - 17-Oct-2026"."""
+    return f"{title} - {(generated_at or datetime.now()).strftime('%d-%b-%Y')}"
@@ -2,16 +2,114 @@
 PDF service - Generate invoice PDFs using ReportLab.
 """
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.pdfgen import canvas
+from typing import IO, Any, Dict, Optional
+
 from reportlab.lib import colors
-from io import BytesIO
-from datetime import datetime
-from typing import Dict, Any
+from reportlab.lib.units import cm, mm
+from reportlab.platypus import Spacer
+
+from app.services import pdf_render
+from app.services.pdf_render import Column, RowTable, Rule, TextLine, text
+
+INVOICE_FORMATS = ("a4", "receipt")
+
+
+def _money(value: float) -> str:
+    return f"{value:,.0f} FBu"
+
+
+def _a4_story(invoice_data: Dict[str, Any]) -> list:
+    """A4 invoice: header and page footer come from the INVOICE_A4 template."""
+    col4 = 13 * cm
+    col5 = 16 * cm
+
+    story = [
+        text(f"FACTURE: {invoice_data['invoice_code']}", ("Helvetica-Bold", 14), leading=0.7 * cm),
+        text(f"Date: {invoice_data['date'].strftime('%d/%m/%Y %H:%M')}"),
+        text(f"Vendeur: {invoice_data['seller']}"),
+    ]
+    customer = invoice_data.get('customer')
+    if customer:
+        story.append(text(f"Client: {customer['name']}"))
+        story.append(text(f"Téléphone: {customer['phone']}"))
+
+    story.append(Spacer(0, 1 * cm))
+    story.append(text("ARTICLES", ("Helvetica-Bold", 12), leading=0.7 * cm))
+    story.append(RowTable(
+        [
+            Column("Médicament", 0.2 * cm, max_chars=40),  # Truncate long names
+            Column("Qté", 8 * cm),
+            Column("P.U.", 10 * cm),
+            Column("Total", col5),
+        ],
+        [
+            (item['medicine_name'], item['quantity'], _money(item['unit_price']), _money(item['total_price']))
+            for item in invoice_data['items']
+        ],
+        font=("Helvetica", 9),
+        row_height=0.5 * cm,
+        header_fill=colors.lightgrey,
+        header_rule=False,
+    ))
+    story.append(Rule(colors.grey, space=0.4 * cm))
+
+    story.append(TextLine(
+        [(col4, "TOTAL:", "left"), (col5, _money(invoice_data['total_amount']), "left")],
+        ("Helvetica-Bold", 14), leading=1 * cm,
+    ))
+    story.append(text(f"Mode de paiement: {invoice_data['payment_method'].upper()}"))
+    if customer:
+        story.append(text(f"Points bonus gagnés: {customer.get('points_earned', 0)}"))
 
+    story.append(Spacer(0, 1.5 * cm))
+    story.append(text("Merci pour votre visite!", ("Helvetica-Oblique", 9), align="center"))
+    return story
 
-def generate_invoice_pdf(invoice_data: Dict[str, Any]) -> BytesIO:
+
+def _receipt_story(invoice_data: Dict[str, Any]) -> list:
+    """80 mm thermal receipt: one continuous page sized to its content."""
+    width = pdf_render.RECEIPT.frame_width()
+    line = 0.4 * cm
+
+    story = [
+        text("PHARMACIE", ("Helvetica-Bold", 12), align="center", leading=0.6 * cm),
+        text("Système de Gestion", ("Helvetica", 8), align="center", leading=line),
+        Rule(colors.grey),
+        text(f"FACTURE: {invoice_data['invoice_code']}", ("Helvetica-Bold", 9), leading=line),
+        text(f"Date: {invoice_data['date'].strftime('%d/%m/%Y %H:%M')}", ("Helvetica", 8), leading=line),
+        text(f"Vendeur: {invoice_data['seller']}", ("Helvetica", 8), leading=line),
+    ]
+    customer = invoice_data.get('customer')
+    if customer:
+        story.append(text(f"Client: {customer['name']}", ("Helvetica", 8), leading=line))
+
+    story.append(RowTable(
+        [
+            Column("Article", 0, width=width - 30 * mm),
+            Column("Qté", width - 20 * mm, align="right"),
+            Column("Total", width, align="right"),
+        ],
+        [
+            (item['medicine_name'], item['quantity'], f"{item['total_price']:,.0f}")
+            for item in invoice_data['items']
+        ],
+        font=("Helvetica", 7),
+        header_font=("Helvetica-Bold", 7),
+    ))
+    story.append(Rule(colors.grey))
+    story.append(TextLine(
+        [(0, "TOTAL", "left"), (width, _money(invoice_data['total_amount']), "right")],
+        ("Helvetica-Bold", 10), leading=0.6 * cm,
+    ))
+    story.append(text(f"Paiement: {invoice_data['payment_method'].upper()}", ("Helvetica", 8), leading=line))
+    if customer:
+        story.append(text(f"Points bonus gagnés: {customer.get('points_earned', 0)}", ("Helvetica", 8), leading=line))
+    story.append(text("Merci pour votre visite!", ("Helvetica-Oblique", 8), align="center", leading=0.6 * cm))
+    return story
+
+
+def generate_invoice_pdf(invoice_data: Dict[str, Any], format: str = "a4",
+                         output: Optional[IO[bytes]] = None) -> IO[bytes]:
     """
     Generate a professional invoice PDF.
     
@@ -24,147 +122,21 @@ def generate_invoice_pdf(invoice_data: Dict[str, Any]) -> BytesIO:
             - items: list of dicts
             - customer: dict or None
             - seller: str
+        format: "a4" or "receipt" (80 mm thermal printer)
+        output: File object to write to (spooled temporary file if None)
     
     Returns:
-        BytesIO buffer containing the PDF
+        File object containing the PDF, positioned at 0
     """
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    
-    # Margins
-    left_margin = 2 * cm
-    right_margin = width - 2 * cm
-    
-    # Current Y position (start from top)
-    y = height - 2 * cm
-    
-    # ========================================================================
-    # HEADER
-    # ========================================================================
-    pdf.setFont("Helvetica-Bold", 20)
-    pdf.drawCentredString(width / 2, y, "PHARMACIE")
-    y -= 0.5 * cm
-    
-    pdf.setFont("Helvetica", 10)
-    pdf.drawCentredString(width / 2, y, "Système de Gestion")
-    y -= 1.5 * cm
-    
-    # Horizontal line
-    pdf.setStrokeColor(colors.grey)
-    pdf.setLineWidth(2)
-    pdf.line(left_margin, y, right_margin, y)
-    y -= 1 * cm
-    
-    # ========================================================================
-    # INVOICE INFO
-    # ========================================================================
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(left_margin, y, f"FACTURE: {invoice_data['invoice_code']}")
-    y -= 0.7 * cm
-    
-    pdf.setFont("Helvetica", 10)
-    date_str = invoice_data['date'].strftime("%d/%m/%Y %H:%M")
-    pdf.drawString(left_margin, y, f"Date: {date_str}")
-    y -= 0.5 * cm
-    
-    pdf.drawString(left_margin, y, f"Vendeur: {invoice_data['seller']}")
-    y -= 0.5 * cm
-    
-    # Customer info (if exists)
-    if invoice_data.get('customer'):
-        customer = invoice_data['customer']
-        pdf.drawString(left_margin, y, f"Client: {customer['name']}")
-        y -= 0.5 * cm
-        pdf.drawString(left_margin, y, f"Téléphone: {customer['phone']}")
-        y -= 0.5 * cm
-    
-    y -= 1 * cm
-    
-    # ========================================================================
-    # ITEMS TABLE
-    # ========================================================================
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.drawString(left_margin, y, "ARTICLES")
-    y -= 0.7 * cm
-    
-    # Table header
-    pdf.setFillColor(colors.lightgrey)
-    pdf.rect(left_margin, y - 0.5 * cm, right_margin - left_margin, 0.6 * cm, fill=True, stroke=False)
-    
-    pdf.setFillColor(colors.black)
-    pdf.setFont("Helvetica-Bold", 9)
-    
-    col1 = left_margin + 0.2 * cm
-    col2 = left_margin + 8 * cm
-    col3 = left_margin + 10 * cm
-    col4 = left_margin + 13 * cm
-    col5 = left_margin + 16 * cm
-    
-    pdf.drawString(col1, y - 0.3 * cm, "Médicament")
-    pdf.drawString(col2, y - 0.3 * cm, "Qté")
-    pdf.drawString(col3, y - 0.3 * cm, "P.U.")
-    pdf.drawString(col5, y - 0.3 * cm, "Total")
-    y -= 0.7 * cm
-    
-    # Table rows
-    pdf.setFont("Helvetica", 9)
-    for item in invoice_data['items']:
-        # Check if we need a new page
-        if y < 3 * cm:
-            pdf.showPage()
-            y = height - 2 * cm
-            pdf.setFont("Helvetica", 9)
-        
-        pdf.drawString(col1, y, item['medicine_name'][:40])  # Truncate long names
-        pdf.drawString(col2, y, str(item['quantity']))
-        pdf.drawString(col3, y, f"{item['unit_price']:,.0f} FBu")
-        pdf.drawString(col5, y, f"{item['total_price']:,.0f} FBu")
-        y -= 0.5 * cm
-    
-    # Separator line
-    y -= 0.3 * cm
-    pdf.setStrokeColor(colors.grey)
-    pdf.setLineWidth(1)
-    pdf.line(left_margin, y, right_margin, y)
-    y -= 0.7 * cm
-    
-    # ========================================================================
-    # TOTAL
-    # ========================================================================
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(col4, y, "TOTAL:")
-    pdf.drawString(col5, y, f"{invoice_data['total_amount']:,.0f} FBu")
-    y -= 1 * cm
-    
-    # ========================================================================
-    # PAYMENT INFO
-    # ========================================================================
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(left_margin, y, f"Mode de paiement: {invoice_data['payment_method'].upper()}")
-    y -= 0.5 * cm
-    
-    # Bonus points (if customer)
-    if invoice_data.get('customer'):
-        bonus = invoice_data['customer'].get('points_earned', 0)
-        pdf.drawString(left_margin, y, f"Points bonus gagnés: {bonus}")
-        y -= 0.5 * cm
-    
-    y -= 1.5 * cm
-    
-    # ========================================================================
-    # FOOTER
-    # ========================================================================
-    pdf.setFont("Helvetica-Oblique", 9)
-    pdf.drawCentredString(width / 2, y, "Merci pour votre visite!")
-    
-    # Bottom line
-    y = 2 * cm
-    pdf.setStrokeColor(colors.grey)
-    pdf.setLineWidth(1)
-    pdf.line(left_margin, y, right_margin, y)
-    
-    # Finalize PDF
-    pdf.save()
-    buffer.seek(0)
-    return buffer
+    if format not in INVOICE_FORMATS:
+        raise ValueError(f"Format de facture inconnu: {format}")
+
+    if format == "receipt":
+        return pdf_render.render(
+            pdf_render.RECEIPT, _receipt_story(invoice_data), output,
+            title=f"Ticket {invoice_data['invoice_code']}",
+        )
+    return pdf_render.render(
+        pdf_render.INVOICE_A4, _a4_story(invoice_data), output,
+        title=f"Facture {invoice_data['invoice_code']}",
+    )
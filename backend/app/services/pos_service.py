@@ -3,15 +3,16 @@ POS Service — Business logic for Point of Sale operations.
 
 Core features:
 - Product search (name/code) with batch info
-- FEFO (First Expired First Out) batch allocation
-- Atomic checkout with per-batch stock deduction
+- Exact barcode scan with ready-made FEFO cart line
+- FEFO (First Expired First Out) batch allocation with short-lived cart holds
+- Atomic set-based checkout with guarded per-batch stock deduction
 - Invoice code generation
 - Sale logging
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
-from typing import List, Optional, Tuple
+from sqlalchemy import func, or_, and_, bindparam, case, insert, update
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date
 import uuid as uuid_lib
 import logging
@@ -21,10 +22,17 @@ from app.models.batch import Batch
 from app.models.pos_sale import POSSale, POSSaleItem
 from app.models.medicine_pricing import MedicinePricing
 from app.models.stock_movement import StockMovement
+from app.core.metrics import metrics
+from app.services.search_index import fold, product_index
+from app.services import invoice_sequence_service, sales_facts_service, sales_history
+from app.services.stock_holds import stock_holds, hold_key
+from app.models.sync_queue import SyncAction
+from app.sync import outbox
+from app.sync.sync_worker import sync_worker
 from app.schemas.pos import (
     CartAddRequest, CartAddResponse,
     BatchAllocation, BatchInfo,
-    ProductSearchResult,
+    ProductSearchResult, ScanResult,
     POSCheckoutRequest, CheckoutItem,
     POSSaleItemResponse, POSSaleResponse,
     BatchCreate, BatchResponse,
@@ -123,19 +131,147 @@ def sync_legacy_stock(db: Session) -> int:
 # PRODUCT SEARCH
 # ============================================================================
 
+def _load_fefo_batches(
+    db: Session,
+    medicine_ids: List[int],
+    today: date
+) -> Dict[int, List[Batch]]:
+    """
+    Load the sellable batches of several medicines in a single query.
+
+    Returns:
+        Dict medicine_id -> batches sorted FEFO (earliest expiry first)
+    """
+    grouped: Dict[int, List[Batch]] = {mid: [] for mid in medicine_ids}
+    if not medicine_ids:
+        return grouped
+
+    batches = db.query(Batch).filter(
+        Batch.medicine_id.in_(medicine_ids),
+        Batch.is_active == True,
+        Batch.quantity > 0,
+        Batch.expiration_date >= today
+    ).order_by(Batch.medicine_id, Batch.expiration_date.asc(), Batch.id).all()
+
+    for batch in batches:
+        grouped[batch.medicine_id].append(batch)
+    return grouped
+
+
+def _load_latest_pricing(
+    db: Session,
+    medicine_ids: List[int]
+) -> Dict[int, MedicinePricing]:
+    """
+    Load the most recent MedicinePricing row of several medicines in a single
+    query (ROW_NUMBER() window per medicine, supported by SQLite ≥ 3.25 and
+    PostgreSQL).
+    """
+    if not medicine_ids:
+        return {}
+
+    ranked = db.query(
+        MedicinePricing.id.label("id"),
+        func.row_number().over(
+            partition_by=MedicinePricing.medicine_id,
+            order_by=(MedicinePricing.created_at.desc(), MedicinePricing.id.desc())
+        ).label("rn")
+    ).filter(
+        MedicinePricing.medicine_id.in_(medicine_ids)
+    ).subquery()
+
+    rows = db.query(MedicinePricing).join(
+        ranked, ranked.c.id == MedicinePricing.id
+    ).filter(ranked.c.rn == 1).all()
+
+    return {p.medicine_id: p for p in rows}
+
+
+def _to_search_result(
+    med: Medicine,
+    batches: List[Batch],
+    latest_pricing: Optional[MedicinePricing]
+) -> ProductSearchResult:
+    """Assemble a ProductSearchResult from preloaded rows (no query)."""
+    return ProductSearchResult(
+        id=med.id,
+        name=med.name,
+        code=med.code,
+        price_sell=med.price_sell,
+        available_quantity=sum(b.quantity for b in batches),
+        batches=[
+            BatchInfo(
+                id=b.id,
+                batch_number=b.batch_number,
+                expiration_date=b.expiration_date,
+                quantity=b.quantity
+            )
+            for b in batches
+        ],
+        units_per_packaging=med.units_per_packaging or 1,
+        units_per_blister=med.units_per_blister or 1,
+        blisters_per_box=med.blisters_per_box or 1,
+        boxes_per_carton=med.boxes_per_carton or 1,
+        # Multi-level pricing
+        prix_vente_unite=latest_pricing.vente_comprime if latest_pricing else (med.prix_vente_unite or 0),
+        prix_vente_plaquette=latest_pricing.vente_plaquette if latest_pricing else (med.prix_vente_plaquette or 0),
+        prix_vente_boite=latest_pricing.vente_boite if latest_pricing else (med.prix_vente_boite or 0),
+        prix_vente_carton=latest_pricing.vente_carton if latest_pricing else (med.prix_vente_carton or 0),
+        prix_achat_unite=latest_pricing.achat_comprime if latest_pricing else (med.prix_achat_unite or 0),
+        prix_achat_plaquette=latest_pricing.achat_plaquette if latest_pricing else (med.prix_achat_plaquette or 0),
+        prix_achat_boite=latest_pricing.achat_boite if latest_pricing else (med.prix_achat_boite or 0),
+        prix_achat_carton=latest_pricing.achat_carton if latest_pricing else (med.prix_achat_carton or 0),
+        comprimes_par_plaquette=med.units_per_blister or 1,
+        plaquettes_par_boite=med.blisters_per_box or 1,
+        # Medicine details
+        dosage_form=med.dosage_form,
+        dci=med.dci,
+        forme_galenique=med.forme_galenique,
+    )
+
+
+def build_product_results(
+    db: Session,
+    medicines: List[Medicine]
+) -> List[ProductSearchResult]:
+    """
+    Enrich a list of medicines with FEFO batches and latest pricing.
+
+    Set-based: two queries for the whole list (batches + latest pricing),
+    whatever the number of medicines. Order of `medicines` is preserved.
+    """
+    medicine_ids = [m.id for m in medicines]
+    batches_by_med = _load_fefo_batches(db, medicine_ids, date.today())
+    pricing_by_med = _load_latest_pricing(db, medicine_ids)
+
+    return [
+        _to_search_result(med, batches_by_med.get(med.id, []), pricing_by_med.get(med.id))
+        for med in medicines
+    ]
+
+
 def search_products(
     db: Session, 
     query: str, 
     limit: int = 20
 ) -> List[ProductSearchResult]:
     """Search products with multi-level pricing from latest MedicinePricing.
+
+    Typed queries are resolved by the in-memory product index (ranked:
+    exact code/barcode, prefixes, then substrings); the SQL `ilike` scan is
+    only used until the index has been built.
     
     Note: sync_legacy_stock() n'est plus appelé ici — uniquement au démarrage
     via l'endpoint /pos/sync-stock ou lors de l'init du serveur.
     """
-    today = date.today()
-    
-    if query and len(query.strip()) >= 1:
+    ranked_ids = product_index.search(query, limit) if query and query.strip() else None
+
+    if ranked_ids is not None:
+        # Index hit: fetch the ranked rows by primary key, keep index order
+        rows = db.query(Medicine).filter(Medicine.id.in_(ranked_ids)).all() if ranked_ids else []
+        by_id = {m.id: m for m in rows}
+        medicines = [by_id[mid] for mid in ranked_ids if mid in by_id]
+    elif query and len(query.strip()) >= 1:
         search_term = f"%{query.strip()}%"
         medicines = db.query(Medicine).filter(
             Medicine.is_active == True,
@@ -151,63 +287,7 @@ def search_products(
             Medicine.quantity > 0
         ).order_by(Medicine.name).limit(limit).all()
     
-    results = []
-    
-    for med in medicines:
-        batches = db.query(Batch).filter(
-            Batch.medicine_id == med.id,
-            Batch.is_active == True,
-            Batch.quantity > 0,
-            Batch.expiration_date >= today
-        ).order_by(Batch.expiration_date.asc()).all()
-        
-        available_qty = sum(b.quantity for b in batches)
-        
-        batch_infos = [
-            BatchInfo(
-                id=b.id,
-                batch_number=b.batch_number,
-                expiration_date=b.expiration_date,
-                quantity=b.quantity
-            )
-            for b in batches
-        ]
-        
-        # Get latest pricing for multi-level prices
-        latest_pricing = db.query(MedicinePricing).filter(
-            MedicinePricing.medicine_id == med.id
-        ).order_by(MedicinePricing.created_at.desc()).first()
-
-        results.append(ProductSearchResult(
-            id=med.id,
-            name=med.name,
-            code=med.code,
-            price_sell=med.price_sell,
-            available_quantity=available_qty,
-            batches=batch_infos,
-            units_per_packaging=med.units_per_packaging or 1,
-            units_per_blister=med.units_per_blister or 1,
-            blisters_per_box=med.blisters_per_box or 1,
-            boxes_per_carton=med.boxes_per_carton or 1,
-            # Multi-level pricing
-            prix_vente_unite=latest_pricing.vente_comprime if latest_pricing else (med.prix_vente_unite or 0),
-            prix_vente_plaquette=latest_pricing.vente_plaquette if latest_pricing else (med.prix_vente_plaquette or 0),
-            prix_vente_boite=latest_pricing.vente_boite if latest_pricing else (med.prix_vente_boite or 0),
-            prix_vente_carton=latest_pricing.vente_carton if latest_pricing else (med.prix_vente_carton or 0),
-            prix_achat_unite=latest_pricing.achat_comprime if latest_pricing else (med.prix_achat_unite or 0),
-            prix_achat_plaquette=latest_pricing.achat_plaquette if latest_pricing else (med.prix_achat_plaquette or 0),
-            prix_achat_boite=latest_pricing.achat_boite if latest_pricing else (med.prix_achat_boite or 0),
-            prix_achat_carton=latest_pricing.achat_carton if latest_pricing else (med.prix_achat_carton or 0),
-            comprimes_par_plaquette=med.units_per_blister or 1,
-            plaquettes_par_boite=med.blisters_per_box or 1,
-            # Medicine details
-            dosage_form=med.dosage_form,
-            dci=med.dci,
-            forme_galenique=med.forme_galenique,
-        ))
-    
-    return results
-
+    return build_product_results(db, medicines)
 
 
 def get_top_products(
@@ -218,8 +298,6 @@ def get_top_products(
     Get top/frequent products — based on POS sales volume.
     Falls back to products with highest stock if no sales exist.
     """
-    today = date.today()
-    
     try:
         # Try to get most sold products from POS history
         top_medicine_ids = db.query(
@@ -250,79 +328,39 @@ def get_top_products(
             Medicine.quantity > 0
         ).order_by(Medicine.quantity.desc()).limit(limit).all()
     
-    results = []
-    for med in medicines:
-        batches = db.query(Batch).filter(
-            Batch.medicine_id == med.id,
-            Batch.is_active == True,
-            Batch.quantity > 0,
-            Batch.expiration_date >= today
-        ).order_by(Batch.expiration_date.asc()).all()
-        
-        available_qty = sum(b.quantity for b in batches)
-        batch_infos = [
-            BatchInfo(
-                id=b.id,
-                batch_number=b.batch_number,
-                expiration_date=b.expiration_date,
-                quantity=b.quantity
-            )
-            for b in batches
-        ]
-
-        latest_pricing = db.query(MedicinePricing).filter(
-            MedicinePricing.medicine_id == med.id
-        ).order_by(MedicinePricing.created_at.desc()).first()
-        
-        results.append(ProductSearchResult(
-            id=med.id,
-            name=med.name,
-            code=med.code,
-            price_sell=med.price_sell,
-            available_quantity=available_qty,
-            batches=batch_infos,
-            units_per_packaging=med.units_per_packaging or 1,
-            units_per_blister=med.units_per_blister or 1,
-            blisters_per_box=med.blisters_per_box or 1,
-            boxes_per_carton=med.boxes_per_carton or 1,
-            prix_vente_unite=latest_pricing.vente_comprime if latest_pricing else (med.prix_vente_unite or 0),
-            prix_vente_plaquette=latest_pricing.vente_plaquette if latest_pricing else (med.prix_vente_plaquette or 0),
-            prix_vente_boite=latest_pricing.vente_boite if latest_pricing else (med.prix_vente_boite or 0),
-            prix_vente_carton=latest_pricing.vente_carton if latest_pricing else (med.prix_vente_carton or 0),
-            prix_achat_unite=latest_pricing.achat_comprime if latest_pricing else (med.prix_achat_unite or 0),
-            prix_achat_plaquette=latest_pricing.achat_plaquette if latest_pricing else (med.prix_achat_plaquette or 0),
-            prix_achat_boite=latest_pricing.achat_boite if latest_pricing else (med.prix_achat_boite or 0),
-            prix_achat_carton=latest_pricing.achat_carton if latest_pricing else (med.prix_achat_carton or 0),
-            comprimes_par_plaquette=med.units_per_blister or 1,
-            plaquettes_par_boite=med.blisters_per_box or 1,
-            # Medicine details
-            dosage_form=med.dosage_form,
-            dci=med.dci,
-            forme_galenique=med.forme_galenique,
-        ))
-    
-    return results
+    return build_product_results(db, medicines)
 
 
 # ============================================================================
 # FEFO ALLOCATION
 # ============================================================================
 
+def cart_owner(user_id: int, cart_id: Optional[str] = None) -> str:
+    """Owner of cart holds: the till's cart id, else the cashier."""
+    return f"cart:{cart_id}" if cart_id else f"user:{user_id}"
+
+
 def allocate_fefo(
     db: Session, 
     medicine_id: int, 
-    quantity: int
+    quantity: int,
+    owner: Optional[str] = None,
+    level: str = "unite",
 ) -> Tuple[Medicine, List[BatchAllocation]]:
     """
     Allocate stock using FEFO (First Expired First Out) strategy.
     
     Selects batches ordered by expiration_date ASC and allocates
-    the requested quantity across one or more batches.
+    the requested quantity across one or more batches. Quantities held
+    by other cart lines (stock_holds) are not available.
     
     Args:
         db: Database session
         medicine_id: Medicine to allocate from
         quantity: Total quantity needed
+        owner: Cart owner; when given, the allocation is held for the
+            (owner, medicine, level) cart line, replacing its previous hold
+        level: Cart line level (part of the hold key)
     
     Returns:
         Tuple of (Medicine object, list of BatchAllocation)
@@ -344,13 +382,39 @@ def allocate_fefo(
         Batch.quantity > 0,
         Batch.expiration_date >= today  # Vendable jusqu'à la date d'expiration incluse
     ).order_by(Batch.expiration_date.asc()).all()
+    batch_ids = [b.id for b in batches]
+    
+    if owner is None:
+        held = stock_holds.held_quantities(batch_ids)
+        return medicine, _allocate_from_batches(medicine, batches, quantity, held)
     
+    allocations = stock_holds.reserve(
+        hold_key(owner, medicine_id, level), owner, medicine_id, batch_ids,
+        lambda held: _allocate_from_batches(medicine, batches, quantity, held),
+    )
+    return medicine, allocations
+
+
+def _allocate_from_batches(
+    medicine: Medicine,
+    batches: List[Batch],
+    quantity: int,
+    held: Optional[Dict[int, int]] = None
+) -> List[BatchAllocation]:
+    """
+    FEFO allocation over batches already loaded and sorted by expiry,
+    minus the quantities `held` by other cart lines (batch id -> units).
+
+    Raises:
+        ValueError: If no batch is available or stock is insufficient
+    """
     if not batches:
         raise ValueError(
             f"Aucun lot disponible pour {medicine.name}. "
             f"Vérifiez le stock et les dates d'expiration."
         )
     
+    held = held or {}
     remaining = quantity
     allocations = []
     
@@ -358,7 +422,9 @@ def allocate_fefo(
         if remaining <= 0:
             break
         
-        take = min(int(batch.quantity), remaining)
+        take = min(int(batch.quantity) - held.get(batch.id, 0), remaining)
+        if take <= 0:
+            continue
         allocations.append(BatchAllocation(
             batch_id=batch.id,
             batch_number=batch.batch_number,
@@ -368,19 +434,27 @@ def allocate_fefo(
         remaining -= take
     
     if remaining > 0:
-        total_available = sum(int(b.quantity) for b in batches)
-        raise ValueError(
+        total_held = sum(min(held.get(b.id, 0), int(b.quantity)) for b in batches)
+        total_available = sum(int(b.quantity) for b in batches) - total_held
+        message = (
             f"Stock insuffisant pour {medicine.name}. "
             f"Demandé: {quantity}, Disponible: {total_available}"
         )
+        if total_held:
+            message += f" ({total_held} réservé(s) dans d'autres paniers)"
+        raise ValueError(message)
     
-    return medicine, allocations
+    return allocations
 
 
-def cart_add(db: Session, request: CartAddRequest) -> CartAddResponse:
+def cart_add(db: Session, request: CartAddRequest, owner: Optional[str] = None) -> CartAddResponse:
     """
     Calculate FEFO allocation for adding a product to the cart.
     Converts level-based quantity to base units for stock allocation.
+    
+    With an `owner` (see cart_owner), the allocation is held for the cart
+    line until checkout or expiry, so other tills cannot be allocated the
+    same units.
     """
     medicine = db.query(Medicine).filter(Medicine.id == request.medicine_id).first()
     if not medicine:
@@ -390,7 +464,9 @@ def cart_add(db: Session, request: CartAddRequest) -> CartAddResponse:
     base_units = _convert_to_base_units(request.quantity, request.level, medicine)
     
     # FEFO allocation in base units
-    _, allocations = allocate_fefo(db, request.medicine_id, base_units)
+    _, allocations = allocate_fefo(
+        db, request.medicine_id, base_units, owner=owner, level=request.level
+    )
     
     # Price at the chosen level
     unit_price = _get_price_at_level(medicine, request.level)
@@ -410,38 +486,152 @@ def cart_add(db: Session, request: CartAddRequest) -> CartAddResponse:
 
 
 # ============================================================================
-# INVOICE CODE GENERATION
+# BARCODE SCAN (EXACT LOOKUP)
 # ============================================================================
 
-def generate_pos_invoice_code(db: Session) -> str:
+def _scan_by_sql(db: Session, code: str) -> Optional[Medicine]:
+    return db.query(Medicine).filter(
+        Medicine.is_active == True,
+        or_(Medicine.code_barres == code, Medicine.code == code)
+    ).order_by(Medicine.id).first()
+
+
+def scan_product(db: Session, code: str, owner: Optional[str] = None) -> ScanResult:
     """
-    Generate unique POS invoice code in format: POS-YYYY-NNNN.
-    Compatible SQLite (local) et PostgreSQL (Render).
+    Resolve a scanned barcode / product code and pre-allocate 1 unit (FEFO).
+
+    Uses the O(1) code map of the product index; exact SQL match on
+    `code_barres` / `code` while the index is not built, or when the
+    indexed medicine no longer carries the code (stale entry). Batches and
+    pricing are loaded once and shared by the product and the allocation.
+
+    With an `owner` (see cart_owner), the unit is held for the
+    (owner, medicine, 'unite') cart line like cart_add does, replacing the
+    line's previous hold; a later /cart/add for a larger quantity replaces
+    it again.
+
+    Raises:
+        ValueError: If no active medicine has this code
     """
-    from sqlalchemy import extract
-    current_year = datetime.now().year
+    code = (code or "").strip()
+    medicine = None
 
-    # extract('year', ...) est compatible SQLite ≥ 3.38 et PostgreSQL
-    last_sale = db.query(POSSale).filter(
-        extract('year', POSSale.date) == current_year
-    ).order_by(POSSale.id.desc()).first()
+    medicine_id = product_index.lookup_code(code) if code else None
+    if medicine_id is not None:
+        medicine = db.query(Medicine).filter(Medicine.id == medicine_id).first()
+        if medicine is None or not medicine.is_active or fold(code) not in (
+            fold(medicine.code), fold(medicine.code_barres)
+        ):
+            # Stale index entry (medicine deleted, id reused): never sell another product
+            logger.warning(f"Stale search index entry for code '{code}' (medicine #{medicine_id})")
+            medicine = _scan_by_sql(db, code)
+    elif code and not product_index.ready:
+        medicine = _scan_by_sql(db, code)
 
-    if last_sale and last_sale.code:
-        try:
-            last_number = int(last_sale.code.split('-')[-1])
-            next_number = last_number + 1
-        except (ValueError, IndexError):
-            next_number = 1
-    else:
-        next_number = 1
+    if not medicine:
+        raise ValueError(f"Aucun produit actif pour le code '{code}'")
+
+    batches = _load_fefo_batches(db, [medicine.id], date.today())[medicine.id]
+    pricing = _load_latest_pricing(db, [medicine.id]).get(medicine.id)
+    product = _to_search_result(medicine, batches, pricing)
+
+    try:
+        batch_ids = [b.id for b in batches]
+        if owner is None:
+            held = stock_holds.held_quantities(batch_ids)
+            allocations = _allocate_from_batches(medicine, batches, 1, held)
+        else:
+            allocations = stock_holds.reserve(
+                hold_key(owner, medicine.id, "unite"), owner, medicine.id, batch_ids,
+                lambda held: _allocate_from_batches(medicine, batches, 1, held),
+            )
+    except ValueError as e:
+        return ScanResult(product=product, allocation=None, allocation_error=str(e))
+
+    unit_price = _get_price_at_level(medicine, "unite")
+    return ScanResult(
+        product=product,
+        allocation=CartAddResponse(
+            medicine_id=medicine.id,
+            medicine_name=medicine.name,
+            medicine_code=medicine.code,
+            quantity=1,
+            level="unite",
+            base_units=1,
+            unit_price=unit_price,
+            total_price=unit_price,
+            allocations=allocations
+        )
+    )
+
+
+# ============================================================================
+# INVOICE CODE GENERATION
+# ============================================================================
 
-    return f"POS-{current_year}-{next_number:04d}"
+def generate_pos_invoice_code(db: Session) -> str:
+    """
+    Allocate the next POS invoice code (format POS-YYYY-NNNN) from the
+    per-year counter, inside the checkout transaction: concurrent tills
+    never get the same code and a rolled-back sale leaves no gap.
+    """
+    return invoice_sequence_service.next_invoice_code(db, "POS", POSSale.code)
 
 
 # ============================================================================
 # CHECKOUT (SALE CREATION)
 # ============================================================================
 
+# Guarded per-lot deduction, executed once with the list of all lots
+# (executemany): `quantity >= :b_qty` refuses a lot drained by a concurrent
+# sale since validation. The statement is built once so its compiled form
+# is cached whatever the cart size.
+_batches = Batch.__table__
+_remaining_batch_qty = _batches.c.quantity - bindparam("b_qty")
+_DEDUCT_BATCH = (
+    update(_batches)
+    .where(_batches.c.id == bindparam("b_id"), _batches.c.quantity >= bindparam("b_qty"))
+    .values(
+        quantity=case((_remaining_batch_qty <= 0, 0), else_=_remaining_batch_qty),
+        is_active=case((_remaining_batch_qty <= 0, False), else_=_batches.c.is_active),
+    )
+)
+
+# Total stock (Medicine.quantity), floored at 0 like the legacy safety net
+_medicines = Medicine.__table__
+_remaining_medicine_qty = _medicines.c.quantity - bindparam("m_qty")
+_DEDUCT_MEDICINE = (
+    update(_medicines)
+    .where(_medicines.c.id == bindparam("m_id"))
+    .values(quantity=case((_remaining_medicine_qty < 0, 0), else_=_remaining_medicine_qty))
+)
+
+
+def _apply_batch_deductions(db: Session, deductions: Dict[int, int]) -> None:
+    """
+    Deduct stock from every lot of the sale with the guarded UPDATE.
+    Raises ValueError if any lot no longer holds the requested quantity.
+    """
+    params = [{"b_id": batch_id, "b_qty": qty} for batch_id, qty in deductions.items()]
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        updated = db.execute(_DEDUCT_BATCH, params).rowcount
+    else:
+        updated = sum(db.execute(_DEDUCT_BATCH, p).rowcount for p in params)
+
+    if updated != len(params):
+        raise ValueError(
+            "Stock modifié pendant la validation (vente concurrente). "
+            "Veuillez relancer l'allocation des lots."
+        )
+
+
+def _apply_medicine_deductions(db: Session, deductions: Dict[int, int]) -> None:
+    db.execute(
+        _DEDUCT_MEDICINE,
+        [{"m_id": medicine_id, "m_qty": qty} for medicine_id, qty in deductions.items()],
+    )
+
+
 def checkout(
     db: Session, 
     user_id: int, 
@@ -451,12 +641,17 @@ def checkout(
     Process POS checkout — create sale and deduct stock per batch.
     
     This is the critical transactional operation that:
-    1. Validates all batch allocations have sufficient stock
-    2. Creates POSSale header with UUID
-    3. Creates POSSaleItem for each batch allocation
-    4. Deducts Batch.quantity for each allocation
+    1. Loads every referenced medicine and batch (one IN query each)
+    2. Validates all batch allocations in memory
+    3. Creates POSSale header with UUID
+       (quantities held by another cart owner are not available)
+    4. Deducts Batch.quantity with a guarded UPDATE (quantity >= requested)
     5. Updates Medicine.quantity (total stock sync)
-    6. Commits atomically (all or nothing)
+    6. Bulk-inserts POSSaleItem rows and StockMovement audit rows,
+       and adds the sale to the dashboard sales facts
+    7. Commits atomically (all or nothing), then releases the cart holds
+    
+    The number of statements does not depend on the number of cart lines.
     
     Args:
         db: Database session
@@ -470,14 +665,29 @@ def checkout(
         ValueError: If validation fails (stock, invalid batch, etc.)
     """
     try:
-        # Phase 1: Validate all allocations
+        # Phase 1: Load everything the cart references
+        medicine_ids = {item.medicine_id for item in checkout_data.items}
+        batch_ids = {
+            alloc.batch_id for item in checkout_data.items for alloc in item.allocations
+        }
+        medicines = {
+            m.id: m for m in db.query(Medicine).filter(Medicine.id.in_(medicine_ids))
+        } if medicine_ids else {}
+        batches = {
+            b.id: b for b in db.query(Batch).filter(Batch.id.in_(batch_ids))
+        } if batch_ids else {}
+        owner = cart_owner(user_id, checkout_data.cart_id)
+        held_by_others = stock_holds.held_quantities(batch_ids, exclude_owner=owner)
+        
+        # Phase 2: Validate all allocations in memory
         validated_items = []
         total_amount = 0.0
+        batch_deductions: Dict[int, int] = {}
+        medicine_deductions: Dict[int, int] = {}
+        today = date.today()
         
         for item in checkout_data.items:
-            medicine = db.query(Medicine).filter(
-                Medicine.id == item.medicine_id
-            ).first()
+            medicine = medicines.get(item.medicine_id)
             
             if not medicine:
                 raise ValueError(f"Médicament avec ID {item.medicine_id} introuvable")
@@ -490,12 +700,9 @@ def checkout(
             )
             item_total_qty = 0
             for alloc in item.allocations:
-                batch = db.query(Batch).filter(
-                    Batch.id == alloc.batch_id,
-                    Batch.medicine_id == item.medicine_id
-                ).first()
+                batch = batches.get(alloc.batch_id)
                 
-                if not batch:
+                if not batch or batch.medicine_id != item.medicine_id:
                     raise ValueError(
                         f"Lot #{alloc.batch_id} introuvable pour {medicine.name}"
                     )
@@ -505,19 +712,26 @@ def checkout(
                         f"Lot {batch.batch_number} pour {medicine.name} est désactivé"
                     )
                 
-                if batch.quantity < alloc.quantity:
-                    raise ValueError(
+                # Same lot on several cart lines: check the cumulated quantity
+                requested = batch_deductions.get(batch.id, 0) + alloc.quantity
+                held = held_by_others.get(batch.id, 0)
+                if batch.quantity - held < requested:
+                    message = (
                         f"Stock insuffisant dans le lot {batch.batch_number} "
                         f"pour {medicine.name}. "
-                        f"Demandé: {alloc.quantity}, Disponible: {int(batch.quantity)}"
+                        f"Demandé: {requested}, Disponible: {max(int(batch.quantity) - held, 0)}"
                     )
+                    if held:
+                        message += f" ({held} réservé(s) dans d'autres paniers)"
+                    raise ValueError(message)
                 
-                if batch.expiration_date < date.today():
+                if batch.expiration_date < today:
                     raise ValueError(
                         f"Le lot {batch.batch_number} pour {medicine.name} "
                         f"est expiré ({batch.expiration_date}). Vente interdite."
                     )
                 
+                batch_deductions[batch.id] = requested
                 item_total_qty += alloc.quantity
             
             # Verify total base units match the FEFO allocation.
@@ -529,6 +743,9 @@ def checkout(
             
             line_total = item.unit_price * item.quantity
             total_amount += line_total
+            medicine_deductions[medicine.id] = (
+                medicine_deductions.get(medicine.id, 0) + expected_base_units
+            )
             validated_items.append({
                 "medicine": medicine,
                 "item": item,
@@ -536,7 +753,7 @@ def checkout(
                 "base_units": expected_base_units,
             })
         
-        # Phase 2: Create POSSale
+        # Phase 3: Create POSSale
         invoice_code = generate_pos_invoice_code(db)
         
         sale = POSSale(
@@ -555,7 +772,15 @@ def checkout(
         db.add(sale)
         db.flush()  # Get sale.id
         
-        # Phase 3: Create sale items + deduct stock
+        # Phase 4: Deduct stock (guarded, set-based)
+        if batch_deductions:
+            _apply_batch_deductions(db, batch_deductions)
+        if medicine_deductions:
+            _apply_medicine_deductions(db, medicine_deductions)
+        
+        # Phase 5: Bulk-insert sale items + stock movements (audit trail)
+        sale_items = []
+        movements = []
         for validated in validated_items:
             medicine = validated["medicine"]
             item = validated["item"]
@@ -564,49 +789,48 @@ def checkout(
             price_per_base_unit = line_total / base_units if base_units else 0.0
             
             for alloc in item.allocations:
-                # Create sale item per batch allocation
-                sale_item = POSSaleItem(
-                    sale_id=sale.id,
-                    medicine_id=medicine.id,
-                    batch_id=alloc.batch_id,
-                    quantity=alloc.quantity,
-                    unit_price=price_per_base_unit,
-                    total_price=price_per_base_unit * alloc.quantity
-                )
-                db.add(sale_item)
-                
-                # Deduct batch stock
-                batch = db.query(Batch).filter(Batch.id == alloc.batch_id).first()
-                batch.quantity -= alloc.quantity
-                
-                # Deactivate batch if empty
-                if batch.quantity <= 0:
-                    batch.quantity = 0
-                    batch.is_active = False
-                
-                # Create stock movement for audit trail
-                movement = StockMovement(
-                    medicine_id=medicine.id,
-                    batch_id=alloc.batch_id,
-                    type='sortie_vente',
-                    quantite=-alloc.quantity,
-                    motif=f"Vente POS",
-                    reference=sale.code
-                )
-                db.add(movement)
-            
-            # Update medicine total stock
-            medicine.quantity -= base_units
-            if medicine.quantity < 0:
-                medicine.quantity = 0  # Safety net
+                sale_items.append({
+                    "sale_id": sale.id,
+                    "medicine_id": medicine.id,
+                    "batch_id": alloc.batch_id,
+                    "quantity": alloc.quantity,
+                    "unit_price": price_per_base_unit,
+                    "total_price": price_per_base_unit * alloc.quantity,
+                })
+                movements.append({
+                    "medicine_id": medicine.id,
+                    "batch_id": alloc.batch_id,
+                    "type": "sortie_vente",
+                    "quantite": -alloc.quantity,
+                    "motif": "Vente POS",
+                    "reference": sale.code,
+                })
+        
+        if sale_items:
+            db.execute(insert(POSSaleItem.__table__), sale_items)
+            movement_ids = db.execute(
+                insert(StockMovement.__table__).returning(StockMovement.__table__.c.id), movements
+            ).scalars().all()
+            # Core inserts / updates bypass the flush hook of the outbox
+            outbox.record(db, [
+                *(("stock_movements", movement_id, SyncAction.CREATE) for movement_id in movement_ids),
+                *(("batches", batch_id, SyncAction.UPDATE)
+                  for batch_id in {m["batch_id"] for m in movements if m["batch_id"]}),
+            ])
         
-        # Phase 4: Commit
+        sales_facts_service.record_sale(db, sales_facts_service.SOURCE_POS, sale)
+        
+        # Phase 6: Commit
         db.commit()
+        stock_holds.release_owner(owner, medicine_ids)
+        sync_worker.notify()
+        metrics.inc("pharma_checkouts_total")
+        metrics.inc("pharma_checkout_lines_total", len(sale_items))
         db.refresh(sale)
         
         logger.info(
             f"POS Sale {sale.code} (UUID: {sale.sale_uuid}) created. "
-            f"Total: {sale.total_amount} FBu, Items: {len(sale.items)}"
+            f"Total: {sale.total_amount} FBu, Items: {len(sale_items)}"
         )
         
         return sale
@@ -675,12 +899,14 @@ def cancel_pos_sale(db: Session, sale_id: int, user_id: int) -> POSSale:
             )
             db.add(movement)
 
+        sales_facts_service.record_cancellation(db, sales_facts_service.SOURCE_POS, sale)
         sale.status = "cancelled"
         sale.cancelled_at = datetime.utcnow()
         sale.cancelled_by = user_id
 
         db.commit()
         db.refresh(sale)
+        metrics.inc("pharma_checkout_cancellations_total")
         logger.info(f"POS Sale {sale.code} cancelled by user #{user_id}")
         return sale
     except Exception as e:
@@ -749,9 +975,15 @@ def get_pos_sales_history(
     page_size: int = 50,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-) -> Tuple[List[POSSale], int]:
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+) -> Tuple[List[POSSale], Optional[int], Optional[str]]:
     """
     Get POS sales history with pagination.
+
+    `cursor` (the previous page's next cursor) switches to keyset pagination;
+    the total is only counted when `include_total`.
+    Returns (sales, total or None, next cursor or None).
     """
     query = db.query(POSSale)
     
@@ -770,11 +1002,14 @@ def get_pos_sales_history(
         except ValueError:
             pass
     
-    total = query.count()
-    offset = (page - 1) * page_size
-    sales = query.order_by(POSSale.date.desc()).offset(offset).limit(page_size).all()
-    
-    return sales, total
+    return sales_history.paginate(
+        query, POSSale,
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        options=sales_history.pos_sale_loader_options(),
+    )
 
 
 # ============================================================================
@@ -0,0 +1,208 @@
+"""
+Report bundle — Several reports of one period in a single ZIP.
+
+Month-end closing used to download stock Excel, sales Excel, financial PDF
+and sales Word one after the other, each request re-reading the same
+sales and stock. A bundle:
+
+- reads everything inside one read snapshot (a single SQLite read
+  transaction under WAL, REPEATABLE READ on PostgreSQL), so all the files
+  describe the same state of the data;
+- reads each table watermark and loads each dataset once (the sales of
+  the period are shared by the sales PDF / Excel / Word), and skips the
+  reports already in the report_jobs artifact store;
+- renders the missing reports in parallel in the report_jobs process pool
+  from those datasets (workers never touch the database);
+- streams the ZIP entry by entry from the artifact files, without
+  building the archive in memory or on disk.
+"""
+
+from concurrent.futures import wait
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import IO, Any, Dict, Iterator, List, Sequence, Tuple
+import io
+import json
+import os
+import zipfile
+
+from sqlalchemy.orm import Session
+
+from app.services import excel_export, report_jobs, report_service
+from app.services.report_jobs import ReportJobQueue, report_queue
+
+ZIP_MEDIA_TYPE = "application/zip"
+# PDF streams and .xlsx files are already compressed: stored as is
+STORED_EXTENSIONS = ("pdf", "xlsx")
+
+
+@contextmanager
+def read_snapshot(engine=None) -> Iterator[Session]:
+    """Session whose reads all see the same committed state, rolled back on exit."""
+    if engine is None:
+        from app.database import engine_local as engine
+
+    with engine.connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # Deferred: the snapshot is taken at the first read and kept
+            # until the rollback (WAL readers do not block the checkout)
+            conn.exec_driver_sql("BEGIN")
+        elif conn.dialect.name == "postgresql":
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        try:
+            with Session(bind=conn) as db:
+                yield db
+        finally:
+            conn.rollback()
+
+
+def parse_formats(formats: Sequence[str]) -> List[str]:
+    """Validate report type names, keeping the first occurrence of each."""
+    names = list(dict.fromkeys(name.strip() for name in formats if name and name.strip()))
+    if not names:
+        raise ValueError("Aucun rapport demandé")
+    for name in names:
+        report_jobs.get_report_type(name)
+    return names
+
+
+def bundle_filename(start_date: date, end_date: date) -> str:
+    return f"rapports_{start_date}_{end_date}.zip"
+
+
+class BundleEntry:
+    """One report of a bundle and its artifact."""
+
+    def __init__(self, report_name: str, params: Dict[str, Any], key: str):
+        self.report_name = report_name
+        self.params = params
+        self.key = key
+        self.cached = False
+
+    @property
+    def report(self) -> report_jobs.ReportType:
+        return report_jobs.REPORT_TYPES[self.report_name]
+
+    @property
+    def path(self) -> str:
+        return report_jobs.artifact_path(self.key, self.report)
+
+    @property
+    def filename(self) -> str:
+        return self.report.filename(self.params)
+
+
+def build_bundle(
+    start_date: date,
+    end_date: date,
+    formats: Sequence[str],
+    queue: ReportJobQueue = report_queue,
+    engine=None,
+) -> List[Tuple[BundleEntry, IO[bytes]]]:
+    """
+    Build (or reuse) every report of the bundle.
+
+    Args:
+        start_date / end_date: Period of the sales and financial reports
+        formats: Report type names (see report_jobs.REPORT_TYPES)
+        queue: Queue whose process pool renders the reports
+        engine: Database to read (default: local database)
+
+    Returns:
+        List of (entry, open artifact file), in the requested order
+    """
+    if end_date < start_date:
+        raise ValueError("La date de fin doit être postérieure à la date de début")
+    names = parse_formats(formats)
+    period = {"start_date": start_date, "end_date": end_date}
+
+    entries: List[BundleEntry] = []
+    datasets: Dict[str, Any] = {}
+    watermarks: Dict[str, list] = {}
+    futures = []
+
+    with read_snapshot(engine) as db:
+        for name in names:
+            report = report_jobs.get_report_type(name)
+            params = report.parse({k: v for k, v in period.items() if k in report.params})
+            entry = BundleEntry(name, params, report_jobs.cache_key(db, name, params, watermarks))
+            entries.append(entry)
+
+            if os.path.exists(entry.path):
+                os.utime(entry.path)
+                entry.cached = True
+                continue
+
+            # Same loader and parameters = same dataset (sales PDF / Excel / Word)
+            dataset_key = json.dumps([report.dataset, {k: str(v) for k, v in params.items()}])
+            if dataset_key not in datasets:
+                datasets[dataset_key] = report_service.materialize(report_jobs.load_dataset(db, report, params))
+            # Rendering starts while the next datasets are read
+            futures.append(queue.render(name, datasets[dataset_key], entry.path))
+    del datasets
+
+    wait(futures)
+    for future in futures:
+        error = future.exception()
+        if error is not None:
+            raise RuntimeError(f"Échec de génération du lot de rapports: {error}")
+    if futures:
+        report_jobs.evict()
+
+    # Open every artifact before streaming: a later eviction cannot break the ZIP
+    opened = []
+    try:
+        for entry in entries:
+            opened.append((entry, open(entry.path, "rb")))
+    except FileNotFoundError:
+        for _, artifact in opened:
+            artifact.close()
+        raise RuntimeError("Rapport expiré pendant la génération du lot, veuillez réessayer")
+    return opened
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Unseekable sink collecting what ZipFile writes, drained between chunks."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(artifacts: List[Tuple[BundleEntry, IO[bytes]]],
+             chunk_size: int = excel_export.CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream a ZIP of the artifacts (closed once written)."""
+    buffer = _ChunkBuffer()
+    try:
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for entry, artifact in artifacts:
+                info = zipfile.ZipInfo(entry.filename, datetime.now().timetuple()[:6])
+                info.compress_type = (
+                    zipfile.ZIP_STORED if entry.report.extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                )
+                with artifact, archive.open(info, "w", force_zip64=True) as member:
+                    while True:
+                        chunk = artifact.read(chunk_size)
+                        if not chunk:
+                            break
+                        member.write(chunk)
+                        data = buffer.drain()
+                        if data:
+                            yield data
+        # Member trailers and central directory
+        yield buffer.drain()
+    finally:
+        for _, artifact in artifacts:
+            artifact.close()
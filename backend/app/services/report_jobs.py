@@ -0,0 +1,456 @@
+"""
+Report jobs — Background report generation with a cached artifact store.
+
+Reports (PDF / Excel / Word) used to be built synchronously in the request
+handler and rebuilt from scratch on every download. Now:
+
+- A report is identified by its spec: report type + parameters.
+- The cache key is a hash of the spec and of a data-version watermark of
+  the tables the report reads (row count, highest id, latest updated_at,
+  sums of stock quantities / prices and cancelled sales).
+  An identical request is served from the artifact store until those
+  tables actually change.
+- `ReportJobQueue.submit` returns a job at once; missing artifacts are
+  built in a bounded process pool (REPORT_WORKERS), identical pending
+  specs share one job. Clients poll (or long-poll) the job, then
+  download the artifact.
+- `render` is the synchronous path of the legacy /reports/* endpoints:
+  same cache, built in-process on a miss.
+
+Artifacts live in REPORT_CACHE_DIR; the oldest are evicted beyond
+REPORT_CACHE_MAX_FILES.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from typing import IO, Any, Callable, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.models.medicine import Medicine, MedicineFamily
+from app.models.batch import Batch
+from app.models.pos_sale import POSSale
+from app.models.sales import Sale
+from app.services import excel_export
+
+logger = logging.getLogger("report_jobs")
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pharmagestion_reports")
+)
+REPORT_CACHE_MAX_FILES = int(os.getenv("REPORT_CACHE_MAX_FILES", "100"))
+# Finished jobs are forgotten after this delay (their artifact stays cached)
+JOB_RETENTION = timedelta(hours=1)
+
+PDF_MEDIA_TYPE = "application/pdf"
+WORD_MEDIA_TYPE = "application/msword"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+# ============================================================================
+# REPORT TYPES
+# ============================================================================
+
+def _parse_date(value) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Date invalide: {value} (format attendu AAAA-MM-JJ)")
+
+
+class ReportType:
+    """
+    A report the queue can build.
+
+    Attributes:
+        dataset   : report_service loader, called as load(db, **params)
+        renderer  : report_service renderer, called as render(dataset)
+        extension : Artifact file extension
+        media_type: Download media type
+        params    : Parameter name -> (parser, required)
+        tables    : Models whose changes invalidate the artifact
+        filename  : Download file name, from the parsed params
+    """
+
+    def __init__(self, dataset: str, renderer: str, extension: str, media_type: str,
+                 params: Dict[str, Tuple[Callable, bool]], tables: Tuple,
+                 filename: Callable[[Dict[str, Any]], str]):
+        self.dataset = dataset
+        self.renderer = renderer
+        self.extension = extension
+        self.media_type = media_type
+        self.params = params
+        self.tables = tables
+        self.filename = filename
+
+    def parse(self, raw: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        raw = raw or {}
+        unknown = set(raw) - set(self.params)
+        if unknown:
+            raise ValueError(f"Paramètre(s) inconnu(s): {', '.join(sorted(unknown))}")
+        parsed = {}
+        for name, (parser, required) in self.params.items():
+            value = parser(raw.get(name))
+            if required and value is None:
+                raise ValueError(f"Paramètre requis: {name}")
+            parsed[name] = value
+        return parsed
+
+
+_PERIOD = {"start_date": (_parse_date, True), "end_date": (_parse_date, True)}
+_STOCK_TABLES = (Medicine, Batch)
+_SALES_TABLES = (Sale, POSSale, Medicine)
+_FINANCIAL = {
+    "start_date": (_parse_date, False),
+    "end_date": (_parse_date, False),
+    "period_label": (lambda v: str(v) if v else "Aperçu", False),
+}
+_FINANCIAL_TABLES = _SALES_TABLES + (MedicineFamily,)
+
+
+def _stock_filename(ext):
+    return lambda p: f"stock_report_{date.today()}.{ext}"
+
+
+def _sales_filename(ext):
+    return lambda p: f"sales_report_{p['start_date']}_{p['end_date']}.{ext}"
+
+
+REPORT_TYPES: Dict[str, ReportType] = {
+    "stock_pdf": ReportType(
+        "load_stock", "render_stock_pdf", "pdf", PDF_MEDIA_TYPE, {}, _STOCK_TABLES, _stock_filename("pdf")),
+    "stock_excel": ReportType(
+        "load_stock", "render_stock_excel", "xlsx", excel_export.XLSX_MEDIA_TYPE, {}, _STOCK_TABLES,
+        _stock_filename("xlsx")),
+    "stock_word": ReportType(
+        "load_stock", "render_stock_word", "doc", WORD_MEDIA_TYPE, {}, _STOCK_TABLES, _stock_filename("doc")),
+    "sales_pdf": ReportType(
+        "load_sales", "render_sales_pdf", "pdf", PDF_MEDIA_TYPE, _PERIOD, _SALES_TABLES, _sales_filename("pdf")),
+    "sales_excel": ReportType(
+        "load_sales", "render_sales_excel", "xlsx", excel_export.XLSX_MEDIA_TYPE, _PERIOD, _SALES_TABLES,
+        _sales_filename("xlsx")),
+    "sales_word": ReportType(
+        "load_sales", "render_sales_word", "doc", WORD_MEDIA_TYPE, _PERIOD, _SALES_TABLES, _sales_filename("doc")),
+    "financial_pdf": ReportType(
+        "load_financial", "render_financial_pdf", "pdf", PDF_MEDIA_TYPE, _FINANCIAL, _FINANCIAL_TABLES,
+        lambda p: f"financial_report_{date.today()}.pdf"),
+    "financial_excel": ReportType(
+        "load_financial", "render_financial_excel", "xlsx", excel_export.XLSX_MEDIA_TYPE, _FINANCIAL,
+        _FINANCIAL_TABLES, lambda p: f"financial_report_{date.today()}.xlsx"),
+}
+
+
+def get_report_type(name: str) -> ReportType:
+    try:
+        return REPORT_TYPES[name]
+    except KeyError:
+        raise ValueError(f"Type de rapport inconnu: {name}")
+
+
+# ============================================================================
+# CACHE KEY
+# ============================================================================
+
+def _fingerprints(model) -> Tuple:
+    """
+    Extra sums for the columns that change most. updated_at only has
+    second resolution on SQLite, so a checkout in the same second as the
+    last update would otherwise keep the same watermark.
+    """
+    if model in (Medicine, Batch):
+        columns = [model.quantity]
+        if model is Medicine:
+            columns += [Medicine.price_buy, Medicine.price_sell]
+        return tuple(func.sum(column) for column in columns)
+    if model in (Sale, POSSale):
+        return (func.sum(case((model.status == "cancelled", 1), else_=0)),)
+    return ()
+
+
+def data_watermark(db: Session, tables, known: Optional[Dict[str, list]] = None) -> Dict[str, list]:
+    """
+    Row count, highest id, latest update and sums of each table (one query per table).
+    Tables already in `known` are not read again (several reports of one snapshot).
+    """
+    watermark = {}
+    for model in tables:
+        name = model.__tablename__
+        if known is not None and name in known:
+            watermark[name] = known[name]
+            continue
+        row = db.query(
+            func.count(model.id), func.max(model.id), func.max(model.updated_at), *_fingerprints(model)
+        ).one()
+        watermark[name] = [str(value) for value in row]
+        if known is not None:
+            known[name] = watermark[name]
+    return watermark
+
+
+def cache_key(db: Session, report_name: str, params: Dict[str, Any],
+              known: Optional[Dict[str, list]] = None) -> str:
+    report = get_report_type(report_name)
+    spec = {
+        "type": report_name,
+        "params": {name: str(value) for name, value in params.items()},
+        "data": data_watermark(db, report.tables, known),
+        # Headers print today's date
+        "day": str(date.today()),
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def artifact_path(key: str, report: ReportType) -> str:
+    return os.path.join(REPORT_CACHE_DIR, f"{key}.{report.extension}")
+
+
+def evict() -> None:
+    """Remove the least recently used artifacts beyond REPORT_CACHE_MAX_FILES."""
+    try:
+        entries = [e for e in os.scandir(REPORT_CACHE_DIR) if e.is_file() and not e.name.endswith(".part")]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[REPORT_CACHE_MAX_FILES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            # Being downloaded (Windows) - retried at the next eviction
+            pass
+
+
+def _write_artifact(output: IO[bytes], path: str) -> int:
+    """Copy a generator output into the store (atomic rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = f"{path}.{uuid.uuid4().hex}.part"
+    try:
+        output.seek(0)
+        with open(part, "wb") as f:
+            shutil.copyfileobj(output, f, excel_export.CHUNK_SIZE)
+        os.replace(part, path)
+    finally:
+        output.close()
+        if os.path.exists(part):
+            os.remove(part)
+    return os.path.getsize(path)
+
+
+def load_dataset(db: Session, report: ReportType, params: Dict[str, Any]):
+    from app.services import report_service
+    return getattr(report_service, report.dataset)(db, **params)
+
+
+def render_dataset(report: ReportType, dataset) -> IO[bytes]:
+    from app.services import report_service
+    return getattr(report_service, report.renderer)(dataset)
+
+
+def _generate(db: Session, report: ReportType, params: Dict[str, Any]) -> IO[bytes]:
+    return render_dataset(report, load_dataset(db, report, params))
+
+
+def _render_artifact(report_name: str, dataset, path: str) -> int:
+    """Process pool entry point: render one artifact from a materialized dataset (no session)."""
+    return _write_artifact(render_dataset(get_report_type(report_name), dataset), path)
+
+
+def _build_artifact(report_name: str, raw_params: Dict[str, Any], path: str) -> int:
+    """Process pool entry point: build one artifact with a fresh session."""
+    from app.database import SessionLocal
+
+    report = get_report_type(report_name)
+    with SessionLocal() as db:
+        output = _generate(db, report, report.parse(raw_params))
+    return _write_artifact(output, path)
+
+
+def render(db: Session, report_name: str, raw_params: Optional[Dict[str, Any]] = None) -> Tuple[IO[bytes], bool]:
+    """
+    Synchronous path: open the cached artifact or build it in-process.
+
+    Returns:
+        Tuple of (open artifact file, served from cache)
+    """
+    report = get_report_type(report_name)
+    params = report.parse(raw_params)
+    path = artifact_path(cache_key(db, report_name, params), report)
+    cached = True
+    if not os.path.exists(path):
+        cached = False
+        _write_artifact(_generate(db, report, params), path)
+        evict()
+    else:
+        os.utime(path)
+    return open(path, "rb"), cached
+
+
+# ============================================================================
+# JOB QUEUE
+# ============================================================================
+
+class ReportJob:
+    """One report request and its progress."""
+
+    def __init__(self, report_name: str, params: Dict[str, Any], key: str):
+        self.id = uuid.uuid4().hex
+        self.report_name = report_name
+        self.params = params
+        self.key = key
+        self.status = STATUS_QUEUED
+        self.cached = False
+        self.error: Optional[str] = None
+        self.size: Optional[int] = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.done = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def report(self) -> ReportType:
+        return REPORT_TYPES[self.report_name]
+
+    @property
+    def path(self) -> str:
+        return artifact_path(self.key, self.report)
+
+    @property
+    def filename(self) -> str:
+        return self.report.filename(self.params)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.utcnow()
+        if status == STATUS_DONE and os.path.exists(self.path):
+            self.size = os.path.getsize(self.path)
+        self.done.set()
+
+    def current_status(self) -> str:
+        if self.status == STATUS_QUEUED and self.future is not None and self.future.running():
+            return STATUS_RUNNING
+        return self.status
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "report_type": self.report_name,
+            "params": {name: str(value) if value is not None else None for name, value in self.params.items()},
+            "status": self.current_status(),
+            "cached": self.cached,
+            "error": self.error,
+            "size": self.size,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ReportJobQueue:
+    """Bounded process pool building report artifacts, with job tracking."""
+
+    def __init__(self, workers: int = REPORT_WORKERS):
+        self.workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReportJob] = {}
+        self._pending: Dict[str, ReportJob] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: no forked copies of open SQLite connections / threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def submit(self, db: Session, report_name: str, raw_params: Optional[Dict[str, Any]] = None) -> ReportJob:
+        """Queue a report (or return the cached / identical pending job)."""
+        report = get_report_type(report_name)
+        params = report.parse(raw_params)
+        key = cache_key(db, report_name, params)
+        job = ReportJob(report_name, params, key)
+
+        with self._lock:
+            self._prune()
+            pending = self._pending.get(key)
+            if pending is not None:
+                return pending
+            self._jobs[job.id] = job
+
+            if os.path.exists(job.path):
+                os.utime(job.path)
+                job.cached = True
+                job.finish(STATUS_DONE)
+                return job
+
+            self._pending[key] = job
+            serialized = {name: str(value) if value is not None else None for name, value in params.items()}
+            job.future = self._executor().submit(_build_artifact, report_name, serialized, job.path)
+        job.future.add_done_callback(lambda f: self._on_done(job, f))
+        return job
+
+    def render(self, report_name: str, dataset, path: str) -> Future:
+        """Render an artifact from an already loaded dataset in the pool (export bundles)."""
+        with self._lock:
+            future = self._executor().submit(_render_artifact, report_name, dataset, path)
+        future.add_done_callback(self._check_pool)
+        return future
+
+    def _check_pool(self, future: Future) -> None:
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # A worker died: start a new pool for the next jobs
+            with self._lock:
+                self._pool = None
+
+    def _on_done(self, job: ReportJob, future: Future) -> None:
+        error = RuntimeError("Génération annulée") if future.cancelled() else future.exception()
+        self._check_pool(future)
+        with self._lock:
+            self._pending.pop(job.key, None)
+        if error is not None:
+            logger.error(f"Report job {job.id} ({job.report_name}) failed: {error}")
+            job.finish(STATUS_FAILED, str(error))
+            return
+        job.finish(STATUS_DONE)
+        evict()
+
+    def _prune(self) -> None:
+        limit = datetime.utcnow() - JOB_RETENTION
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < limit
+        ]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+report_queue = ReportJobQueue()
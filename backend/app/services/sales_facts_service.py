@@ -0,0 +1,213 @@
+"""
+Sales facts service — Incremental sales rollups for the dashboard.
+
+The dashboard used to re-aggregate every Sale and POSSale row on each
+load. Sales are now also counted in two small fact tables:
+
+- sales_daily_facts : day x source x payment method x seller
+- sales_hourly_facts: day x hour x source
+
+`record_sale` / `record_cancellation` are called inside the sale
+transaction (POS checkout and cancel, legacy create_sale and cancel), so
+the facts commit or roll back with the sale. `rebuild` recomputes them
+from the raw sales (backfill, repair).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional, Tuple
+import logging
+
+from sqlalchemy import delete, extract, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.pos_sale import POSSale
+from app.models.sales import Sale
+from app.models.sales_fact import SalesDailyFact, SalesHourlyFact
+
+logger = logging.getLogger("sales_facts")
+
+SOURCE_POS = "pos"
+SOURCE_LEGACY = "legacy"
+
+MEASURES = ("revenue", "sales_count", "cancelled_count", "cancelled_amount")
+_DAILY_KEY = ("day", "source", "payment_method", "user_id")
+_HOURLY_KEY = ("day", "hour", "source")
+
+
+def _payment_method(value) -> str:
+    return str(getattr(value, "value", value) or "")
+
+
+def _add(db: Session, model, key: Dict, deltas: Dict) -> None:
+    """Add `deltas` to the fact row identified by `key` (created if missing)."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(model).values(**key, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: getattr(model, name) + stmt.excluded[name] for name in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    updated = db.execute(
+        update(model)
+        .where(*(getattr(model, name) == value for name, value in key.items()))
+        .values({name: getattr(model, name) + value for name, value in deltas.items()})
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not updated:
+        db.execute(insert(model).values(**key, **deltas))
+
+
+def _apply(db: Session, source: str, sale, deltas: Dict) -> None:
+    sale_date = sale.date or datetime.utcnow()
+    day = sale_date.date()
+    _add(db, SalesDailyFact, {
+        "day": day,
+        "source": source,
+        "payment_method": _payment_method(sale.payment_method),
+        "user_id": sale.user_id or 0,
+    }, deltas)
+    _add(db, SalesHourlyFact, {"day": day, "hour": sale_date.hour, "source": source}, deltas)
+
+
+def record_sale(db: Session, source: str, sale) -> None:
+    """Count a completed sale (call before the sale transaction commits)."""
+    amount = float(sale.total_amount or 0)
+    _apply(db, source, sale, {"revenue": amount, "sales_count": 1})
+
+
+def record_cancellation(db: Session, source: str, sale) -> None:
+    """Move a completed sale to the cancelled measures of its original bucket."""
+    amount = float(sale.total_amount or 0)
+    _apply(db, source, sale, {
+        "revenue": -amount, "sales_count": -1,
+        "cancelled_count": 1, "cancelled_amount": amount,
+    })
+
+
+def clear_source(db: Session, source: str) -> None:
+    """Drop every fact of `source` (call in the transaction deleting its sales)."""
+    for model in (SalesDailyFact, SalesHourlyFact):
+        db.execute(delete(model).where(model.source == source))
+
+
+# ============================================================================
+# BACKFILL
+# ============================================================================
+
+def _as_date(value) -> date:
+    # SQLite returns date() as a string, PostgreSQL as a date
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """
+    Recompute the facts from the raw sales, for [start, end] or everything.
+    Commits. Returns the number of sales aggregated.
+    """
+    daily: Dict[Tuple, Dict[str, float]] = {}
+    hourly: Dict[Tuple, Dict[str, float]] = {}
+    total_sales = 0
+
+    for model, source in ((POSSale, SOURCE_POS), (Sale, SOURCE_LEGACY)):
+        day_col = func.date(model.date)
+        hour_col = extract("hour", model.date)
+        query = db.query(
+            day_col, hour_col, model.payment_method, model.user_id, model.status,
+            func.count(model.id), func.sum(model.total_amount),
+        )
+        if start:
+            query = query.filter(model.date >= datetime.combine(start, datetime.min.time()))
+        if end:
+            query = query.filter(model.date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+
+        for day, hour, method, user_id, status, count, amount in query.group_by(
+            day_col, hour_col, model.payment_method, model.user_id, model.status
+        ):
+            status = str(getattr(status, "value", status))
+            if status == "cancelled":
+                deltas = {"cancelled_count": count, "cancelled_amount": float(amount or 0)}
+            else:
+                deltas = {"revenue": float(amount or 0), "sales_count": count}
+            day = _as_date(day)
+            total_sales += count
+
+            for buckets, key in (
+                (daily, (day, source, _payment_method(method), user_id or 0)),
+                (hourly, (day, int(hour), source)),
+            ):
+                measures = buckets.setdefault(key, dict.fromkeys(MEASURES, 0))
+                for name, value in deltas.items():
+                    measures[name] += value
+
+    try:
+        for model in (SalesDailyFact, SalesHourlyFact):
+            stmt = delete(model)
+            if start:
+                stmt = stmt.where(model.day >= start)
+            if end:
+                stmt = stmt.where(model.day <= end)
+            db.execute(stmt)
+
+        for model, key_names, buckets in (
+            (SalesDailyFact, _DAILY_KEY, daily),
+            (SalesHourlyFact, _HOURLY_KEY, hourly),
+        ):
+            rows = [{**dict(zip(key_names, key)), **measures} for key, measures in buckets.items()]
+            if rows:
+                db.execute(insert(model), rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    logger.info(f"Sales facts rebuilt: {total_sales} sales, {len(daily)} daily / {len(hourly)} hourly rows")
+    return total_sales
+
+
+def ensure_backfilled(db: Session) -> int:
+    """Backfill once when the fact tables are empty but sales exist."""
+    if db.query(SalesDailyFact.id).first() is not None:
+        return 0
+    if db.query(POSSale.id).first() is None and db.query(Sale.id).first() is None:
+        return 0
+    return rebuild(db)
+
+
+# ============================================================================
+# READERS
+# ============================================================================
+
+def totals(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, float]:
+    """Revenue, completed and cancelled counts over [start, end] (inclusive)."""
+    query = db.query(*(func.coalesce(func.sum(getattr(SalesDailyFact, name)), 0) for name in MEASURES))
+    if start:
+        query = query.filter(SalesDailyFact.day >= start)
+    if end:
+        query = query.filter(SalesDailyFact.day <= end)
+    return dict(zip(MEASURES, query.one()))
+
+
+def daily_revenue(db: Session, start: date, end: date) -> Dict[date, float]:
+    """Completed revenue per day over [start, end]."""
+    rows = db.query(
+        SalesDailyFact.day, func.sum(SalesDailyFact.revenue)
+    ).filter(
+        SalesDailyFact.day >= start,
+        SalesDailyFact.day <= end
+    ).group_by(SalesDailyFact.day).all()
+    return {_as_date(day): float(total or 0) for day, total in rows}
+
+
+def hourly_revenue(db: Session, start: date, end: Optional[date] = None) -> Dict[int, float]:
+    """Completed revenue per hour of day over [start, end]."""
+    query = db.query(
+        SalesHourlyFact.hour, func.sum(SalesHourlyFact.revenue)
+    ).filter(SalesHourlyFact.day >= start)
+    if end:
+        query = query.filter(SalesHourlyFact.day <= end)
+    return {int(hour): float(total or 0) for hour, total in query.group_by(SalesHourlyFact.hour)}
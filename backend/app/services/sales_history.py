@@ -0,0 +1,105 @@
+"""
+Sales history — Eager-loaded, keyset-paginated history queries.
+
+Shared by /sales/history (legacy Sale) and /pos/history (POSSale):
+
+- Relations serialized by the history responses (items and their
+  medicine/batch, seller, canceller, customer) are loaded up front with
+  joinedload/selectinload: a page costs a constant number of queries
+  instead of one lazy load per sale and per item.
+- Pages are ordered by (date DESC, id DESC). With a `cursor` (returned as
+  `next_cursor` by the previous page) the page starts after that key, so
+  a deep page of a multi-year history costs the same as page 1. The
+  `page` number (OFFSET) is still accepted for existing clients.
+- The exact total (a COUNT over the filtered history) is optional.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, joinedload, selectinload
+
+from app.models.pos_sale import POSSale, POSSaleItem
+from app.models.sales import Sale, SaleItem
+
+
+def encode_cursor(sale) -> str:
+    """Opaque cursor pointing after `sale` in (date DESC, id DESC) order."""
+    raw = f"{sale.date.isoformat()}|{sale.id}"
+    return urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_date, raw_id = urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(raw_date), int(raw_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Curseur de pagination invalide")
+
+
+def sale_loader_options():
+    """Eager loads for enrich_sale_response (legacy sales)."""
+    return (
+        selectinload(Sale.items).joinedload(SaleItem.medicine),
+        joinedload(Sale.user),
+        joinedload(Sale.cancelled_by_user),
+        joinedload(Sale.customer),
+    )
+
+
+def pos_sale_loader_options():
+    """Eager loads for enrich_pos_sale_response (POS sales)."""
+    return (
+        selectinload(POSSale.items).joinedload(POSSaleItem.medicine),
+        selectinload(POSSale.items).joinedload(POSSaleItem.batch),
+        joinedload(POSSale.user),
+        joinedload(POSSale.cancelled_by_user),
+    )
+
+
+def paginate(
+    query: Query,
+    model,
+    page: int = 1,
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    options=(),
+) -> Tuple[List, Optional[int], Optional[str]]:
+    """
+    Fetch one page of a filtered sales query, newest first.
+
+    Args:
+        query: Filtered query on `model` (no ordering / eager loads)
+        model: Sale or POSSale
+        page: Page number, used only without `cursor`
+        page_size: Items per page
+        cursor: `next_cursor` of the previous page (keyset pagination)
+        include_total: Also count the whole filtered history
+        options: Loader options applied to the page query
+
+    Returns:
+        Tuple of (sales, total or None, next_cursor or None)
+    """
+    total = query.order_by(None).count() if include_total else None
+
+    page_query = query.options(*options).order_by(model.date.desc(), model.id.desc())
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        page_query = page_query.filter(or_(
+            model.date < after_date,
+            and_(model.date == after_date, model.id < after_id),
+        ))
+    elif page > 1:
+        page_query = page_query.offset((page - 1) * page_size)
+
+    # One extra row tells whether a next page exists
+    sales = page_query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(sales) > page_size:
+        sales = sales[:page_size]
+        next_cursor = encode_cursor(sales[-1])
+    return sales, total, next_cursor
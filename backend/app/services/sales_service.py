@@ -11,7 +11,7 @@ from app.models.sales import Sale, SaleItem, PaymentMethod, SaleType
 from app.models.medicine import Medicine
 from app.models.user import User
 from app.schemas.sales import SaleCreate, SaleItemCreate
-from app.services import customer_service
+from app.services import customer_service, invoice_sequence_service, sales_facts_service, sales_history
 
 
 # Constants
@@ -114,31 +114,16 @@ def generate_invoice_code(db: Session) -> str:
     """
     Generate unique invoice code in format: INV-YYYY-NNNN
     
+    The number comes from the per-year counter, incremented atomically in
+    the sale transaction (see invoice_sequence_service).
+    
     Args:
         db: Database session
         
     Returns:
         Invoice code (e.g., INV-2025-0001)
     """
-    current_year = datetime.now().year
-    
-    # Get the last invoice of the current year
-    last_sale = db.query(Sale).filter(
-        func.strftime('%Y', Sale.date) == str(current_year)
-    ).order_by(Sale.id.desc()).first()
-    
-    if last_sale and last_sale.code:
-        # Extract number from last code (INV-2025-0001 -> 0001)
-        try:
-            last_number = int(last_sale.code.split('-')[-1])
-            next_number = last_number + 1
-        except (ValueError, IndexError):
-            next_number = 1
-    else:
-        next_number = 1
-    
-    # Format: INV-YYYY-NNNN
-    return f"INV-{current_year}-{next_number:04d}"
+    return invoice_sequence_service.next_invoice_code(db, "INV", Sale.code)
 
 
 # ============================================================================
@@ -330,6 +315,7 @@ def create_sale(db: Session, user_id: int, sale_data: SaleCreate) -> Sale:
              
     # Update Sale Total
     sale.total_amount = total_amount
+    sales_facts_service.record_sale(db, sales_facts_service.SOURCE_LEGACY, sale)
     db.commit()
     db.refresh(sale)
     
@@ -415,19 +401,23 @@ def get_sales_history(
     db: Session,
     page: int = 1,
     page_size: int = 50,
-    filters: Optional[dict] = None
-) -> Tuple[List[Sale], int]:
+    filters: Optional[dict] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True
+) -> Tuple[List[Sale], Optional[int], Optional[str]]:
     """
     Get sales history with pagination and filters.
     
     Args:
         db: Database session
-        page: Page number
+        page: Page number (ignored when `cursor` is given)
         page_size: Items per page
         filters: Dictionary with filter values (start_date, end_date, user_id, min/max amount)
+        cursor: Keyset cursor returned by the previous page
+        include_total: Count the whole filtered history
     
     Returns:
-        Tuple of (sales list, total count)
+        Tuple of (sales list, total count or None, next page cursor or None)
     """
     query = db.query(Sale)
     
@@ -454,14 +444,15 @@ def get_sales_history(
         if filters.get("status"):
             query = query.filter(Sale.status == filters["status"])
     
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination and sorting (newest first)
-    offset = (page - 1) * page_size
-    sales = query.order_by(Sale.date.desc()).offset(offset).limit(page_size).all()
-    
-    return sales, total
+    # Newest first, items / medicines / users / customer eager-loaded
+    return sales_history.paginate(
+        query, Sale,
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        options=sales_history.sale_loader_options()
+    )
 
 
 def get_user_stats(
@@ -0,0 +1,298 @@
+"""
+Product search index — In-process lookup structure for POS/stock search.
+
+Replaces `ilike('%q%')` full table scans on every keystroke:
+- Trigram postings over accent-folded name, code and barcode
+- Sorted prefix arrays (bisect) for name, code and barcode
+- Hash map code / barcode -> medicine id for exact scanner lookups
+- Secondary trigram postings over DCI and supplier (stock list search)
+
+The index holds active medicines only. It is rebuilt at startup and kept
+up to date by the medicine / pricing services after each commit.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import logging
+import threading
+import unicodedata
+
+from sqlalchemy.orm import Session
+
+from app.models.medicine import Medicine
+
+logger = logging.getLogger("search_index")
+
+# Above this many matches, callers should let SQL do the filtering
+# (large IN lists are slower than a scan and hit SQLite variable limits).
+MAX_ID_FILTER = 500
+
+
+def fold(text: Optional[str]) -> str:
+    """Lowercase and strip accents: 'Paracétamol' -> 'paracetamol'."""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Entry:
+    __slots__ = ("id", "name", "code", "barcode", "dci", "supplier")
+
+    def __init__(self, medicine_id: int, name: str, code: str, barcode: str, dci: str, supplier: str):
+        self.id = medicine_id
+        self.name = name
+        self.code = code
+        self.barcode = barcode
+        self.dci = dci
+        self.supplier = supplier
+
+    @property
+    def primary(self) -> Tuple[str, str, str]:
+        return (self.name, self.code, self.barcode)
+
+    @property
+    def secondary(self) -> Tuple[str, str]:
+        return (self.dci, self.supplier)
+
+
+class ProductSearchIndex:
+    """
+    Thread-safe in-memory search index over active medicines.
+
+    Ranking (best first):
+        0 — exact code / barcode
+        1 — code / barcode prefix (code order)
+        2 — name prefix (alphabetical)
+        3 — word prefix inside name (word order)
+        4 — substring anywhere in name, code or barcode (alphabetical)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ready = False
+        self._clear()
+
+    def _clear(self):
+        self._entries: Dict[int, _Entry] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        self._grams_ext: Dict[str, Set[int]] = {}
+        self._names: List[Tuple[str, int]] = []
+        self._words: List[Tuple[str, int]] = []
+        self._codes: List[Tuple[str, int]] = []
+        self._exact: Dict[str, Set[int]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Build / maintenance
+    # ------------------------------------------------------------------
+
+    def rebuild(self, db: Session) -> int:
+        """Load every active medicine. Returns the number of indexed rows."""
+        rows = db.query(
+            Medicine.id, Medicine.name, Medicine.code, Medicine.code_barres,
+            Medicine.dci, Medicine.fournisseur
+        ).filter(Medicine.is_active == True).all()
+
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(_Entry(
+                    row.id, fold(row.name), fold(row.code), fold(row.code_barres),
+                    fold(row.dci), fold(row.fournisseur)
+                ), sort=False)
+            self._names.sort()
+            self._words.sort()
+            self._codes.sort()
+            self._ready = True
+
+        logger.info(f"Search index rebuilt: {len(rows)} medicines")
+        return len(rows)
+
+    def upsert(self, medicine: Medicine) -> None:
+        """Index (or re-index) one medicine; inactive medicines are removed."""
+        with self._lock:
+            self._remove(medicine.id)
+            if medicine.is_active:
+                self._add(_Entry(
+                    medicine.id, fold(medicine.name), fold(medicine.code),
+                    fold(medicine.code_barres), fold(medicine.dci), fold(medicine.fournisseur)
+                ), sort=True)
+
+    def remove(self, medicine_id: int) -> None:
+        with self._lock:
+            self._remove(medicine_id)
+
+    def clear(self) -> None:
+        """Forget every entry; lookups defer to SQL until the next rebuild."""
+        with self._lock:
+            self._clear()
+            self._ready = False
+
+    def _add(self, entry: _Entry, sort: bool) -> None:
+        self._entries[entry.id] = entry
+        for field in entry.primary:
+            for gram in _trigrams(field):
+                self._grams.setdefault(gram, set()).add(entry.id)
+        for field in entry.secondary:
+            for gram in _trigrams(field):
+                self._grams_ext.setdefault(gram, set()).add(entry.id)
+
+        for code in (entry.code, entry.barcode):
+            if code:
+                self._exact.setdefault(code, set()).add(entry.id)
+
+        keys = [(self._names, (entry.name, entry.id))]
+        keys += [(self._words, (word, entry.id)) for word in set(entry.name.split()[1:])]
+        keys += [(self._codes, (code, entry.id)) for code in (entry.code, entry.barcode) if code]
+        for target, key in keys:
+            if sort:
+                insort(target, key)
+            else:
+                target.append(key)
+
+    def _remove(self, medicine_id: int) -> None:
+        entry = self._entries.pop(medicine_id, None)
+        if entry is None:
+            return
+        for postings, fields in ((self._grams, entry.primary), (self._grams_ext, entry.secondary)):
+            for field in fields:
+                for gram in _trigrams(field):
+                    ids = postings.get(gram)
+                    if ids is not None:
+                        ids.discard(medicine_id)
+                        if not ids:
+                            del postings[gram]
+
+        for code in (entry.code, entry.barcode):
+            ids = self._exact.get(code)
+            if ids is not None:
+                ids.discard(medicine_id)
+                if not ids:
+                    del self._exact[code]
+
+        keys = [(self._names, (entry.name, medicine_id))]
+        keys += [(self._words, (word, medicine_id)) for word in set(entry.name.split()[1:])]
+        keys += [(self._codes, (code, medicine_id)) for code in (entry.code, entry.barcode) if code]
+        for target, key in keys:
+            pos = bisect_left(target, key)
+            if pos < len(target) and target[pos] == key:
+                del target[pos]
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _prefix_ids(sorted_keys: List[Tuple[str, int]], prefix: str) -> Iterable[int]:
+        pos = bisect_left(sorted_keys, (prefix, -1))
+        while pos < len(sorted_keys) and sorted_keys[pos][0].startswith(prefix):
+            yield sorted_keys[pos][1]
+            pos += 1
+
+    def _candidates(self, q: str, postings: Dict[str, Set[int]]) -> Set[int]:
+        grams = sorted((postings.get(g, set()) for g in _trigrams(q)), key=len)
+        if not grams or not grams[0]:
+            return set()
+        result = set(grams[0])
+        for ids in grams[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def lookup_code(self, code: str) -> Optional[int]:
+        """
+        O(1) exact lookup of a scanned barcode or product code.
+        Returns None when unknown (or when the index is not built yet).
+        """
+        if not self._ready:
+            return None
+        with self._lock:
+            ids = self._exact.get(fold(code))
+            return min(ids) if ids else None
+
+    def match_ids(self, query: str, include_secondary: bool = False) -> Optional[Set[int]]:
+        """
+        All active medicine ids whose name / code / barcode contains `query`
+        (and DCI / supplier when `include_secondary`), like `ilike('%q%')`.
+
+        Returns None when the index cannot answer (not built yet, or query
+        shorter than a trigram): the caller must fall back to SQL.
+        """
+        q = fold(query)
+        if not self._ready or len(q) < 3:
+            return None
+
+        with self._lock:
+            ids = self._candidates(q, self._grams)
+            if include_secondary:
+                ids |= self._candidates(q, self._grams_ext)
+
+            matched = set()
+            for mid in ids:
+                entry = self._entries[mid]
+                values = entry.primary + entry.secondary if include_secondary else entry.primary
+                if any(q in value for value in values):
+                    matched.add(mid)
+            return matched
+
+    def search(self, query: str, limit: int = 20) -> Optional[List[int]]:
+        """
+        Ranked medicine ids for a counter search query (best first).
+        Returns None while the index is not built (caller falls back to SQL).
+
+        Tiers are consumed in rank order and the scan stops as soon as
+        `limit` ids are collected, so broad queries ("par") cost the same
+        as narrow ones. Substring matches (tier 4) need >= 3 characters.
+        """
+        if not self._ready:
+            return None
+        q = fold(query)
+        if not q or limit <= 0:
+            return []
+
+        results: List[int] = []
+        seen: Set[int] = set()
+
+        def take(ids: Iterable[int]) -> bool:
+            for mid in ids:
+                if mid not in seen:
+                    seen.add(mid)
+                    results.append(mid)
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        with self._lock:
+            # Tiers 0–3 come out of the sorted arrays already ordered
+            if (take(self._prefix_ids(self._codes, q))
+                    or take(self._prefix_ids(self._names, q))
+                    or take(self._prefix_ids(self._words, q))):
+                return results
+
+            if len(q) >= 3:
+                entries = self._entries
+                substring = [
+                    mid for mid in self._candidates(q, self._grams)
+                    if mid not in seen and any(q in value for value in entries[mid].primary)
+                ]
+                take(heapq.nsmallest(
+                    limit - len(results), substring,
+                    key=lambda mid: (entries[mid].name, mid)
+                ))
+            return results
+
+
+product_index = ProductSearchIndex()
@@ -0,0 +1,239 @@
+"""
+Stock holds — Short-lived POS reservations against batches.
+
+`cart_add` used to compute a FEFO allocation without reserving anything,
+so two tills could be handed the same last units and the second checkout
+failed at payment time. Each cart line now holds its allocation:
+
+- A hold belongs to a cart line (key '<owner>:<medicine_id>:<level>');
+  adding the same line again replaces it.
+- FEFO allocation subtracts the live holds of every other line, and
+  checkout refuses quantities held by another owner.
+- Checkout releases the owner's holds once the sale is committed.
+- Holds expire after HOLD_TTL_SECONDS; a background sweeper drops them.
+
+Holds are kept in memory (no database write per keystroke). The sweeper
+also saves a snapshot to `stock_holds` when they changed, and the snapshot
+is restored at startup.
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+import logging
+import os
+import threading
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.models.stock_hold import StockHold
+
+logger = logging.getLogger("stock_holds")
+
+HOLD_TTL_SECONDS = int(os.getenv("POS_HOLD_TTL_SECONDS", "600"))
+SWEEP_INTERVAL_SECONDS = int(os.getenv("POS_HOLD_SWEEP_SECONDS", "30"))
+
+
+def hold_key(owner: str, medicine_id: int, level: str) -> str:
+    return f"{owner}:{medicine_id}:{level}"
+
+
+class _Hold:
+    __slots__ = ("key", "owner", "medicine_id", "batches", "expires_at")
+
+    def __init__(self, key: str, owner: str, medicine_id: int,
+                 batches: Dict[int, int], expires_at: datetime):
+        self.key = key
+        self.owner = owner
+        self.medicine_id = medicine_id
+        self.batches = batches
+        self.expires_at = expires_at
+
+
+class StockHoldRegistry:
+    """Thread-safe in-memory registry of cart holds."""
+
+    def __init__(self, ttl_seconds: int = HOLD_TTL_SECONDS):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._lock = threading.RLock()
+        self._holds: Dict[str, _Hold] = {}
+        self._dirty = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    # ------------------------------------------------------------------
+    # Reservations
+    # ------------------------------------------------------------------
+
+    def held_quantities(
+        self,
+        batch_ids: Iterable[int],
+        exclude_key: Optional[str] = None,
+        exclude_owner: Optional[str] = None,
+    ) -> Dict[int, int]:
+        """Live held quantity per batch, ignoring one line and/or one owner."""
+        wanted = set(batch_ids)
+        now = datetime.utcnow()
+        held: Dict[int, int] = {}
+        with self._lock:
+            for hold in self._holds.values():
+                if (hold.expires_at <= now or hold.key == exclude_key
+                        or hold.owner == exclude_owner):
+                    continue
+                for batch_id, qty in hold.batches.items():
+                    if batch_id in wanted:
+                        held[batch_id] = held.get(batch_id, 0) + qty
+        return held
+
+    def reserve(
+        self,
+        key: str,
+        owner: str,
+        medicine_id: int,
+        batch_ids: Iterable[int],
+        allocate: Callable[[Dict[int, int]], List],
+    ) -> List:
+        """
+        Run `allocate(held_by_others)` and hold its result for `key`,
+        atomically with respect to other reservations.
+
+        `allocate` returns BatchAllocation-like objects (batch_id, quantity);
+        if it raises, the previous hold of the line is kept unchanged.
+        """
+        with self._lock:
+            allocations = allocate(self.held_quantities(batch_ids, exclude_key=key))
+            batches: Dict[int, int] = {}
+            for alloc in allocations:
+                batches[alloc.batch_id] = batches.get(alloc.batch_id, 0) + alloc.quantity
+            self._holds[key] = _Hold(
+                key, owner, medicine_id, batches, datetime.utcnow() + self.ttl
+            )
+            self._dirty = True
+            return allocations
+
+    def release(self, key: str) -> int:
+        """Release one cart line. Returns 1 if it held stock, else 0."""
+        with self._lock:
+            if self._holds.pop(key, None) is None:
+                return 0
+            self._dirty = True
+            return 1
+
+    def release_owner(self, owner: str, medicine_ids: Optional[Iterable[int]] = None) -> int:
+        """Release the holds of `owner` (only for `medicine_ids` if given)."""
+        medicines = set(medicine_ids) if medicine_ids is not None else None
+        with self._lock:
+            keys = [
+                key for key, hold in self._holds.items()
+                if hold.owner == owner and (medicines is None or hold.medicine_id in medicines)
+            ]
+            for key in keys:
+                del self._holds[key]
+            if keys:
+                self._dirty = True
+            return len(keys)
+
+    def sweep(self) -> int:
+        """Drop expired holds. Returns the number removed."""
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [key for key, hold in self._holds.items() if hold.expires_at <= now]
+            for key in expired:
+                del self._holds[key]
+            if expired:
+                self._dirty = True
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._holds.clear()
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Persisted snapshot
+    # ------------------------------------------------------------------
+
+    def _rows(self) -> List[dict]:
+        return [
+            {
+                "hold_key": hold.key, "owner": hold.owner, "medicine_id": hold.medicine_id,
+                "batch_id": batch_id, "quantity": qty, "expires_at": hold.expires_at,
+            }
+            for hold in self._holds.values()
+            for batch_id, qty in hold.batches.items()
+        ]
+
+    def persist(self, db: Session) -> int:
+        """Replace the stored snapshot with the live holds (if they changed)."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            rows = self._rows()
+            self._dirty = False
+        try:
+            db.execute(delete(StockHold))
+            if rows:
+                db.execute(insert(StockHold), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            self._dirty = True
+            raise
+        return len(rows)
+
+    def restore(self, db: Session) -> int:
+        """Load the non-expired holds of the stored snapshot. Returns holds loaded."""
+        rows = db.query(StockHold).filter(StockHold.expires_at > datetime.utcnow()).all()
+        holds: Dict[str, _Hold] = {}
+        for row in rows:
+            hold = holds.get(row.hold_key)
+            if hold is None:
+                hold = holds[row.hold_key] = _Hold(
+                    row.hold_key, row.owner, row.medicine_id, {}, row.expires_at
+                )
+            hold.batches[row.batch_id] = hold.batches.get(row.batch_id, 0) + row.quantity
+        with self._lock:
+            self._holds = holds
+            self._dirty = False
+        return len(holds)
+
+    # ------------------------------------------------------------------
+    # Background sweeper
+    # ------------------------------------------------------------------
+
+    def start_sweeper(self, session_factory, interval: int = SWEEP_INTERVAL_SECONDS) -> None:
+        """Sweep expired holds and save the snapshot every `interval` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(interval):
+                self._tick(session_factory)
+
+        self._thread = threading.Thread(target=run, name="stock-hold-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop_sweeper(self, session_factory=None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if session_factory is not None:
+            self._tick(session_factory)
+
+    def _tick(self, session_factory) -> None:
+        try:
+            expired = self.sweep()
+            if expired:
+                logger.debug(f"{expired} expired stock hold(s) released")
+            with session_factory() as db:
+                self.persist(db)
+        except Exception as e:
+            logger.warning(f"Stock hold sweep failed: {e}")
+
+
+stock_holds = StockHoldRegistry()
@@ -0,0 +1,385 @@
+"""
+Outbox — Capture des modifications locales à envoyer vers Supabase.
+
+sync_up ne pousse que les ventes POS : clients, mouvements de stock,
+réceptions de lots et annulations restaient en local. Le outbox les
+capture dans la table sync_queue :
+
+- un hook after_flush de la session locale écrit, dans la même
+  transaction que la modification, un enregistrement compact
+  (table, clé de la ligne, action) — pas de copie de la ligne ;
+- une seule entrée vivante par ligne : idempotency_key = '<table>:<clé>'.
+  Une nouvelle modification de la même ligne met l'entrée à jour
+  (coalescing) et incrémente sa version ;
+- drain() envoie les entrées par lots : l'état courant des lignes est lu
+  en local et écrit dans Supabase par upsert sur la clé (rejouer un lot
+  dont l'acquittement s'est perdu ne crée pas de doublon), les
+  suppressions en un DELETE ;
+- une entrée acquittée est supprimée (si sa version n'a pas changé pendant
+  l'envoi) : la table ne contient que les modifications non envoyées ;
+- un lot rejeté par Supabase (hors perte de connexion) est renvoyé entrée
+  par entrée : seules les lignes fautives comptent un échec.
+
+Les écritures Core en masse (checkout) ne passent pas par le flush :
+elles appellent record() elles-mêmes.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import os
+import time
+
+from sqlalchemy import bindparam, delete, event, func, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.sync_queue import SyncAction, SyncQueue, SyncStatus
+from app.utils.network import connectivity
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.getenv("SYNC_OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_MAX_RETRIES = int(os.getenv("SYNC_OUTBOX_MAX_RETRIES", "5"))
+
+
+class OutboxTable:
+    """
+    Table suivie par le outbox.
+
+    key        : colonne qui identifie la ligne dans Supabase
+    columns    : colonnes suivies (None = toutes) ; les autres
+                 modifications sont ignorées
+    update_only: seules les modifications sont envoyées (la création
+                 passe par un autre chemin, ex. sync_up pour les ventes)
+    """
+
+    def __init__(self, model, key: str = "id", columns: Optional[Tuple[str, ...]] = None,
+                 update_only: bool = False):
+        self.model = model
+        self.key = key
+        self.columns = columns
+        self.update_only = update_only
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+
+def _tables() -> "OrderedDict[str, OutboxTable]":
+    """Tables suivies, parents avant enfants (ordre d'envoi)."""
+    from app.models.batch import Batch
+    from app.models.customer import Customer
+    from app.models.pos_sale import POSSale
+    from app.models.stock_movement import StockMovement
+
+    tables = [
+        OutboxTable(Customer),
+        OutboxTable(Batch),
+        OutboxTable(StockMovement),
+        # Annulations : la vente elle-même part par sync_up (id distant différent)
+        OutboxTable(POSSale, key="sale_uuid",
+                    columns=("status", "cancelled_at", "cancelled_by", "notes"), update_only=True),
+    ]
+    return OrderedDict((table.name, table) for table in tables)
+
+
+_TABLES: Optional["OrderedDict[str, OutboxTable]"] = None
+
+
+def tables() -> "OrderedDict[str, OutboxTable]":
+    global _TABLES
+    if _TABLES is None:
+        _TABLES = _tables()
+    return _TABLES
+
+
+# ──────────────────────────────────────────────────────────────────────
+# Capture
+# ──────────────────────────────────────────────────────────────────────
+
+def enabled(db: Session) -> bool:
+    return bool(db.info.get("outbox"))
+
+
+def record(db: Session, changes: Iterable[Tuple[str, Any, SyncAction]]) -> int:
+    """
+    Enregistre des modifications (table, clé, action) dans la transaction
+    de `db`, en une requête. Sans effet si le outbox n'est pas activé.
+    """
+    if not enabled(db):
+        return 0
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    for table_name, key, action in changes:
+        row_key = str(key)
+        idempotency_key = f"{table_name}:{row_key}"
+        rows[idempotency_key] = {
+            "action": action, "table_name": table_name, "row_key": row_key,
+            "idempotency_key": idempotency_key, "data": {tables()[table_name].key: key},
+            "status": SyncStatus.PENDING, "retry_count": 0, "version": 1,
+        }
+    if not rows:
+        return 0
+
+    from app.sync.sync_manager import dialect_insert
+
+    stmt = dialect_insert(db)(SyncQueue)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["idempotency_key"],
+        set_={
+            # La dernière action l'emporte : l'envoi relit l'état courant
+            "action": stmt.excluded.action,
+            "status": SyncStatus.PENDING,
+            "retry_count": 0,
+            "error_message": None,
+            "version": SyncQueue.version + 1,
+            "updated_at": func.now(),
+        },
+    )
+    db.connection().execute(stmt, list(rows.values()))
+    db.info["outbox_written"] = True
+    return len(rows)
+
+
+def _changed(obj, table: OutboxTable) -> bool:
+    from sqlalchemy import inspect
+
+    state = inspect(obj)
+    names = table.columns or [attr.key for attr in state.mapper.column_attrs]
+    return any(state.attrs[name].history.has_changes() for name in names)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    tracked = tables()
+    changes = []
+    for obj in session.new:
+        table = tracked.get(getattr(obj, "__tablename__", None))
+        if table is not None and not table.update_only:
+            changes.append((table.name, getattr(obj, table.key), SyncAction.CREATE))
+    for obj in session.dirty:
+        table = tracked.get(getattr(obj, "__tablename__", None))
+        if table is not None and _changed(obj, table):
+            changes.append((table.name, getattr(obj, table.key), SyncAction.UPDATE))
+    for obj in session.deleted:
+        table = tracked.get(getattr(obj, "__tablename__", None))
+        if table is not None and not table.update_only:
+            changes.append((table.name, getattr(obj, table.key), SyncAction.DELETE))
+    if changes:
+        record(session, changes)
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop("outbox_written", False):
+        from app.sync.sync_worker import sync_worker
+        sync_worker.notify()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop("outbox_written", None)
+
+
+def install(session_factory) -> None:
+    """Active la capture pour les sessions créées par `session_factory`."""
+    session_factory.configure(info={"outbox": True})
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit),
+                     ("after_rollback", _after_rollback)):
+        if not event.contains(session_factory, name, fn):
+            event.listen(session_factory, name, fn)
+
+
+def uninstall(session_factory) -> None:
+    session_factory.configure(info={})
+    for name, fn in (("after_flush", _after_flush), ("after_commit", _after_commit),
+                     ("after_rollback", _after_rollback)):
+        if event.contains(session_factory, name, fn):
+            event.remove(session_factory, name, fn)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# Envoi
+# ──────────────────────────────────────────────────────────────────────
+
+def _apply(local_db: Session, remote_db: Session, table: OutboxTable, entries: List[Dict[str, Any]]) -> None:
+    """Écrit dans Supabase l'état courant des lignes d'un lot (sans commit)."""
+    from app.sync.sync_manager import dialect_insert
+
+    model_table = table.model.__table__
+    key_column = model_table.c[table.key]
+    key_type = key_column.type.python_type
+    upserts = {key_type(entry["row_key"]) for entry in entries if entry["action"] != SyncAction.DELETE}
+    deletes = {key_type(entry["row_key"]) for entry in entries if entry["action"] == SyncAction.DELETE}
+
+    if table.update_only:
+        columns = [table.key, *table.columns]
+        rows = local_db.execute(
+            select(*(model_table.c[name] for name in columns)).where(key_column.in_(upserts))
+        ).mappings().all() if upserts else []
+        if rows:
+            remote_db.connection().execute(
+                update(model_table)
+                .where(key_column == bindparam("_key"))
+                .values({name: bindparam(name) for name in table.columns}),
+                [{**{name: row[name] for name in table.columns}, "_key": row[table.key]} for row in rows],
+            )
+        return
+
+    rows = local_db.execute(select(model_table).where(key_column.in_(upserts))).mappings().all() if upserts else []
+    # Modifiée puis supprimée avant l'envoi : supprimée dans Supabase aussi
+    deletes |= upserts - {row[table.key] for row in rows}
+
+    if rows:
+        values = [dict(row) for row in rows]
+        upsert = dialect_insert(remote_db)
+        if upsert is not None:
+            stmt = upsert(model_table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.key],
+                set_={column.name: stmt.excluded[column.name] for column in model_table.c
+                      if column.name != table.key},
+            )
+            remote_db.execute(stmt, values)
+        else:
+            remote_db.execute(delete(model_table).where(key_column.in_([row[table.key] for row in values])))
+            remote_db.execute(model_table.insert(), values)
+    if deletes:
+        remote_db.execute(delete(model_table).where(key_column.in_(deletes)))
+
+
+def _send(local_db: Session, remote_db: Session, table: OutboxTable, entries: List[Dict[str, Any]]) -> None:
+    """Écrit un lot dans Supabase et le valide ; annule les deux sessions en cas d'échec."""
+    try:
+        _apply(local_db, remote_db, table, entries)
+        remote_db.commit()
+    except Exception:
+        remote_db.rollback()
+        local_db.rollback()
+        raise
+
+
+def _acknowledge(local_db: Session, entries: List[Dict[str, Any]]) -> None:
+    """Supprime les entrées envoyées, sauf celles modifiées depuis leur lecture."""
+    queue = SyncQueue.__table__
+    local_db.connection().execute(
+        delete(queue).where(queue.c.id == bindparam("_id"), queue.c.version == bindparam("_version")),
+        [{"_id": entry["id"], "_version": entry["version"]} for entry in entries],
+    )
+    local_db.commit()
+
+
+def _fail(local_db: Session, entries: List[Dict[str, Any]], error: Exception) -> None:
+    """Compte un échec ; après OUTBOX_MAX_RETRIES l'entrée passe en ERROR."""
+    message = f"{type(error).__name__}: {error}"[:255]
+    ids = [entry["id"] for entry in entries]
+    local_db.execute(
+        update(SyncQueue)
+        .where(SyncQueue.id.in_(ids))
+        .values(retry_count=SyncQueue.retry_count + 1, error_message=message)
+        .execution_options(synchronize_session=False)
+    )
+    local_db.execute(
+        update(SyncQueue)
+        .where(SyncQueue.id.in_(ids), SyncQueue.retry_count >= OUTBOX_MAX_RETRIES)
+        .values(status=SyncStatus.ERROR)
+        .execution_options(synchronize_session=False)
+    )
+    local_db.commit()
+
+
+def drain(local_db: Session, batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Envoie les entrées en attente, par lots de `batch_size`
+    (OUTBOX_BATCH_SIZE par défaut), une transaction distante par lot et
+    par table. Retourne { sent, errors, batches, duration_s }.
+    """
+    report = {"sent": 0, "errors": 0, "batches": 0, "duration_s": 0.0}
+    batch_size = max(1, batch_size or OUTBOX_BATCH_SIZE)
+    tracked = tables()
+    started = time.perf_counter()
+
+    from app.sync import sync_manager
+
+    remote_db = sync_manager.SessionRemote()
+    try:
+        last_id = 0
+        while True:
+            entries = local_db.execute(
+                select(SyncQueue.id, SyncQueue.table_name, SyncQueue.row_key,
+                       SyncQueue.action, SyncQueue.version)
+                .where(SyncQueue.status == SyncStatus.PENDING, SyncQueue.id > last_id)
+                .order_by(SyncQueue.id)
+                .limit(batch_size)
+            ).mappings().all()
+            local_db.rollback()
+            if not entries:
+                break
+            last_id = entries[-1]["id"]
+            report["batches"] += 1
+
+            by_table: Dict[str, List[Dict[str, Any]]] = {}
+            for entry in entries:
+                by_table.setdefault(entry["table_name"], []).append(dict(entry))
+
+            for name in sorted(by_table, key=lambda n: list(tracked).index(n) if n in tracked else len(tracked)):
+                group = by_table[name]
+                table = tracked.get(name)
+                if table is None:
+                    e = ValueError(f"Table non suivie par le outbox: {name}")
+                    logger.error(f"[Outbox] {e} ({len(group)} entrée(s))")
+                    _fail(local_db, group, e)
+                    report["errors"] += len(group)
+                    continue
+                try:
+                    _send(local_db, remote_db, table, group)
+                except OperationalError:
+                    raise
+                except Exception as e:
+                    if len(group) == 1:
+                        logger.error(f"[Outbox] Échec {name} {group[0]['row_key']}: {e}")
+                        _fail(local_db, group, e)
+                        report["errors"] += 1
+                        continue
+                    # Une ligne rejetée (ex. téléphone déjà pris) : isoler la
+                    # coupable en renvoyant le lot entrée par entrée
+                    logger.warning(f"[Outbox] Lot {name} rejeté ({e}) — envoi entrée par entrée")
+                    for entry in group:
+                        try:
+                            _send(local_db, remote_db, table, [entry])
+                        except OperationalError:
+                            raise
+                        except Exception as e:
+                            logger.error(f"[Outbox] Échec {name} {entry['row_key']}: {e}")
+                            _fail(local_db, [entry], e)
+                            report["errors"] += 1
+                            continue
+                        _acknowledge(local_db, [entry])
+                        report["sent"] += 1
+                    continue
+                _acknowledge(local_db, group)
+                report["sent"] += len(group)
+
+            if len(entries) < batch_size:
+                break
+    except OperationalError as e:
+        connectivity.mark_offline(str(e))
+        logger.error(f"[Outbox] Supabase injoignable: {e}")
+        report["errors"] += 1
+    finally:
+        remote_db.close()
+
+    report["duration_s"] = round(time.perf_counter() - started, 3)
+    if report["sent"] or report["errors"]:
+        logger.info(f"[Outbox] Résultat: {report}")
+    return report
+
+
+def pending_counts(local_db: Session) -> Dict[str, int]:
+    """Entrées en attente / en erreur (une requête)."""
+    rows = local_db.execute(
+        select(SyncQueue.status, func.count()).group_by(SyncQueue.status)
+    ).all()
+    counts = {status: count for status, count in rows}
+    return {
+        "pending": counts.get(SyncStatus.PENDING, 0),
+        "error": counts.get(SyncStatus.ERROR, 0),
+    }
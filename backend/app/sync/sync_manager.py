@@ -3,28 +3,146 @@ Sync Manager - Synchronisation offline-first SQLite ↔ Supabase PostgreSQL.
 
 Logique :
   - sync_up()   : pousse les pos_sales locales non-synchronisées vers Supabase
-  - sync_down() : récupère les médicaments/paramètres depuis Supabase
+                  (par lots, une transaction distante par lot)
+  - sync_down() : récupère les paramètres et le catalogue modifiés depuis
+                  Supabase (high-water mark par table dans sync_logs)
+  - push_changes(): envoie les autres modifications locales (outbox)
   - Utilise les UUID des POSSale pour éviter les doublons
   - Résolution de conflits : Local wins (offline-first)
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 import json
 import logging
-from typing import Dict, Any, List
-from datetime import datetime
+import os
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 
 from app.database import SessionRemote
-from app.utils.network import is_online
+from app.utils.network import connectivity
 
 logger = logging.getLogger(__name__)
 
+# Ventes envoyées par transaction distante
+SYNC_CHUNK_SIZE = int(os.getenv("SYNC_CHUNK_SIZE", "500"))
+# Lignes lues par page lors d'un sync_down
+SYNC_DOWN_PAGE_SIZE = int(os.getenv("SYNC_DOWN_PAGE_SIZE", "1000"))
+# Relecture avant le high-water mark : une transaction distante longue peut
+# committer une ligne datée (now() = début de transaction) avant le mark
+SYNC_DOWN_OVERLAP_SECONDS = float(os.getenv("SYNC_DOWN_OVERLAP_SECONDS", "60"))
+
+# Colonnes copiées telles quelles vers Supabase (hors id / sync)
+_SALE_COLUMNS = (
+    "sale_uuid", "code", "total_amount", "payment_method", "status", "date",
+    "user_id", "customer_id", "customer_name", "customer_phone",
+    "insurance_provider", "insurance_card_id", "coverage_percent", "notes",
+    "cancelled_at", "cancelled_by",
+)
+_ITEM_COLUMNS = (
+    "medicine_id", "batch_id", "quantity", "unit_price", "total_price",
+    "sale_type", "discount_percent",
+)
+
+
+class PullTable:
+    """
+    Table copiée par sync_down.
+
+    key          : colonne d'unicité de l'upsert (id partagé, ou clé métier)
+    local_columns: colonnes propres au poste, écrites à l'insertion puis
+                   jamais écrasées (stock : les ventes locales le décrémentent)
+    """
+
+    def __init__(self, model, key: str = "id", local_columns: Tuple[str, ...] = ()):
+        self.model = model
+        self.key = key
+        self.local_columns = local_columns
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+
+def pull_tables() -> List[PullTable]:
+    """Tables de sync_down, parents avant enfants."""
+    from app.models.batch import Batch
+    from app.models.medicine import Medicine, MedicineFamily, MedicineType
+    from app.models.medicine_pricing import MedicinePricing
+    from app.models.settings import Settings
+
+    return [
+        PullTable(Settings, key="key"),
+        PullTable(MedicineFamily),
+        PullTable(MedicineType),
+        PullTable(Medicine, local_columns=("quantity",)),
+        PullTable(Batch, local_columns=("quantity", "is_active")),
+        PullTable(MedicinePricing),
+    ]
+
+
+class _IndexRow:
+    """Ligne medicines vue comme un Medicine par product_index.upsert."""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.__dict__.update(row)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def dialect_insert(db: Session):
+    """insert() du dialecte de `db` (ON CONFLICT), None s'il n'en a pas."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        return None
+    return upsert
+
+
+def _insert_ignoring_duplicates(remote_db: Session, model, rows: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """
+    INSERT ... ON CONFLICT (sale_uuid) DO NOTHING RETURNING id, sale_uuid.
+    Retourne (id distant, sale_uuid) des lignes réellement insérées.
+    """
+    upsert = dialect_insert(remote_db)
+    if upsert is not None:
+        stmt = (
+            upsert(model)
+            .on_conflict_do_nothing(index_elements=["sale_uuid"])
+            .returning(model.id, model.sale_uuid)
+        )
+        return [tuple(row) for row in remote_db.execute(stmt, rows)]
+
+    # Autres moteurs : filtrer les UUID déjà présents
+    existing = set(remote_db.execute(
+        select(model.sale_uuid).where(model.sale_uuid.in_([row["sale_uuid"] for row in rows]))
+    ).scalars())
+    inserted = []
+    for row in rows:
+        if row["sale_uuid"] not in existing:
+            remote_id = remote_db.execute(insert(model).returning(model.id), row).scalar_one()
+            inserted.append((remote_id, row["sale_uuid"]))
+    return inserted
+
 
 def _remote_available() -> bool:
-    """Vérifie si Supabase est accessible."""
+    """
+    Vérifie si Supabase est accessible.
+
+    Lit l'état tenu par le moniteur de connexion (app/utils/network.py) :
+    pas de test de connexion bloquant pendant une requête.
+    """
     try:
-        return is_online(check_remote_db=True)
+        return connectivity.is_online()
     except Exception:
         return False
 
@@ -39,159 +157,332 @@ class SyncManager:
     # ──────────────────────────────────────────────────────────────────
 
     @staticmethod
-    def sync_up(local_db: Session) -> Dict[str, Any]:
+    def sync_up(local_db: Session, chunk_size: Optional[int] = None) -> Dict[str, Any]:
         """
-        Pousse les ventes POS locales non-synchronisées vers Supabase.
-        Retourne un rapport avec le nombre de ventes synchronisées.
+        Pousse les ventes POS locales non-synchronisées vers Supabase, par
+        lots de `chunk_size` (SYNC_CHUNK_SIZE par défaut), jusqu'à vider la
+        file d'attente.
+
+        Par lot : une lecture locale des en-têtes, une des articles, puis
+        une seule transaction distante (INSERT ... ON CONFLICT (sale_uuid)
+        DO NOTHING RETURNING pour les en-têtes, INSERT multi-lignes pour les
+        articles) et un UPDATE groupé du sync_status local.
+
+        Retourne un rapport : ventes synchronisées, déjà présentes
+        (skipped), en erreur, nombre de lots et débit (ventes/s).
         """
-        report = {"synced": 0, "errors": 0, "skipped": 0, "online": False}
+        report = {
+            "synced": 0, "errors": 0, "skipped": 0, "online": False,
+            "chunks": 0, "duration_s": 0.0, "sales_per_second": 0.0,
+        }
 
         if not _remote_available():
             logger.warning("[SyncUp] Supabase non joignable — skip.")
             return report
 
         report["online"] = True
+        chunk_size = max(1, chunk_size or SYNC_CHUNK_SIZE)
+        started = time.perf_counter()
 
+        remote_db = SessionRemote()
         try:
-            from app.models.pos_sale import POSSale, POSSaleItem
-            from app.models.medicine import Medicine
-            from app.models.user import User
-
-            # Ventes locales non encore envoyées vers le cloud
-            pending_sales = local_db.query(POSSale).filter(
-                POSSale.sync_status.in_(["pending", "local_only"])
-            ).order_by(POSSale.date.asc()).limit(100).all()
-
-            if not pending_sales:
-                logger.info("[SyncUp] Rien à synchroniser.")
-                return report
-
-            logger.info(f"[SyncUp] {len(pending_sales)} vente(s) à envoyer...")
-
-            remote_db = SessionRemote()
-            try:
-                for sale in pending_sales:
-                    try:
-                        SyncManager._push_pos_sale(sale, remote_db)
-                        # Marquer comme synchronisée
-                        sale.sync_status = "synced"
-                        sale.synced_at = datetime.utcnow()
-                        local_db.commit()
-                        report["synced"] += 1
-                    except Exception as e:
-                        logger.error(f"[SyncUp] Erreur vente {sale.sale_uuid}: {e}")
-                        sale.sync_status = "error"
-                        local_db.commit()
-                        report["errors"] += 1
-            finally:
-                remote_db.close()
-
+            last_id = 0
+            while True:
+                sales = SyncManager._pending_chunk(local_db, last_id, chunk_size)
+                if not sales:
+                    break
+                last_id = sales[-1]["id"]
+                report["chunks"] += 1
+
+                try:
+                    already = SyncManager._push_chunk(local_db, remote_db, sales)
+                    report["synced"] += len(sales) - already
+                    report["skipped"] += already
+                except OperationalError as e:
+                    # Liaison perdue : le reste attendra la prochaine sync
+                    remote_db.rollback()
+                    connectivity.mark_offline(str(e))
+                    logger.error(f"[SyncUp] Supabase injoignable pendant le lot: {e}")
+                    report["errors"] += 1
+                    break
+                except Exception as e:
+                    # Une vente rejetée (ex. code en double) : isoler le
+                    # coupable en renvoyant le lot vente par vente
+                    remote_db.rollback()
+                    logger.warning(f"[SyncUp] Lot rejeté ({e}) — envoi vente par vente")
+                    for sale in sales:
+                        try:
+                            already = SyncManager._push_chunk(local_db, remote_db, [sale])
+                            report["synced"] += 1 - already
+                            report["skipped"] += already
+                        except Exception as e:
+                            remote_db.rollback()
+                            logger.error(f"[SyncUp] Erreur vente {sale['sale_uuid']}: {e}")
+                            SyncManager._mark(local_db, [sale["id"]], "error")
+                            report["errors"] += 1
+
+                if len(sales) < chunk_size:
+                    break
         except Exception as e:
             logger.error(f"[SyncUp] Erreur fatale: {e}")
             report["errors"] += 1
+        finally:
+            remote_db.close()
 
-        logger.info(f"[SyncUp] Résultat: {report}")
+        elapsed = time.perf_counter() - started
+        pushed = report["synced"] + report["skipped"]
+        report["duration_s"] = round(elapsed, 3)
+        report["sales_per_second"] = round(pushed / elapsed, 1) if elapsed > 0 else 0.0
+        if pushed or report["errors"]:
+            logger.info(f"[SyncUp] Résultat: {report}")
+        else:
+            logger.info("[SyncUp] Rien à synchroniser.")
         return report
 
     @staticmethod
-    def _push_pos_sale(sale, remote_db: Session):
-        """
-        Insère ou met à jour une POSSale dans Supabase (upsert par UUID).
+    def _pending_chunk(local_db: Session, after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """En-têtes locaux en attente d'envoi (id > after_id), en lignes simples."""
+        from app.models.pos_sale import POSSale
+
+        columns = [POSSale.id] + [getattr(POSSale, name) for name in _SALE_COLUMNS]
+        rows = local_db.execute(
+            select(*columns)
+            .where(POSSale.sync_status.in_(["pending", "local_only"]), POSSale.id > after_id)
+            .order_by(POSSale.id)
+            .limit(limit)
+        ).mappings().all()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _push_chunk(local_db: Session, remote_db: Session, sales: List[Dict[str, Any]]) -> int:
         """
-        from app.models.pos_sale import POSSale as RemotePOSSale, POSSaleItem as RemotePOSSaleItem
-
-        # Vérifier si déjà présente (par UUID)
-        existing = remote_db.query(RemotePOSSale).filter(
-            RemotePOSSale.sale_uuid == sale.sale_uuid
-        ).first()
-
-        if existing:
-            logger.debug(f"[SyncUp] Vente {sale.sale_uuid} déjà dans Supabase — skip.")
-            return
-
-        # Copier la vente vers Supabase
-        remote_sale = RemotePOSSale(
-            sale_uuid=sale.sale_uuid,
-            code=sale.code,
-            total_amount=sale.total_amount,
-            payment_method=sale.payment_method,
-            status=sale.status,
-            date=sale.date,
-            user_id=sale.user_id,
-            customer_id=sale.customer_id,
-            customer_name=getattr(sale, "customer_name", None),
-            customer_phone=getattr(sale, "customer_phone", None),
-            insurance_provider=getattr(sale, "insurance_provider", None),
-            insurance_card_id=getattr(sale, "insurance_card_id", None),
-            coverage_percent=getattr(sale, "coverage_percent", 0.0),
-            notes=getattr(sale, "notes", None),
-            sync_status="synced",
-            synced_at=datetime.utcnow(),
-        )
-        remote_db.add(remote_sale)
-        remote_db.flush()  # Pour obtenir remote_sale.id
-
-        # Copier les articles
-        for item in sale.items:
-            remote_item = RemotePOSSaleItem(
-                pos_sale_id=remote_sale.id,
-                medicine_id=item.medicine_id,
-                batch_id=item.batch_id,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                total_price=item.total_price,
-                sale_type=getattr(item, "sale_type", "packaging"),
-                discount_percent=getattr(item, "discount_percent", 0.0),
-            )
-            remote_db.add(remote_item)
+        Envoie un lot de ventes et leurs articles dans une transaction
+        distante, puis les marque 'synced' localement.
 
+        Retourne le nombre de ventes déjà présentes dans Supabase.
+        """
+        from app.models.pos_sale import POSSale, POSSaleItem
+
+        local_ids = {sale["sale_uuid"]: sale["id"] for sale in sales}
+        now = datetime.utcnow()
+        headers = [
+            {**{name: sale[name] for name in _SALE_COLUMNS}, "sync_status": "synced", "synced_at": now}
+            for sale in sales
+        ]
+
+        # En-têtes : seules les ventes réellement insérées reviennent
+        inserted = _insert_ignoring_duplicates(remote_db, POSSale, headers)
+        remote_ids = {local_ids[sale_uuid]: remote_id for remote_id, sale_uuid in inserted}
+
+        if remote_ids:
+            item_columns = [getattr(POSSaleItem, name) for name in _ITEM_COLUMNS]
+            items = local_db.execute(
+                select(POSSaleItem.sale_id, *item_columns)
+                .where(POSSaleItem.sale_id.in_(list(remote_ids)))
+                .order_by(POSSaleItem.id)
+            ).mappings().all()
+            if items:
+                # executemany : regroupé en INSERT multi-lignes par SQLAlchemy
+                remote_db.execute(insert(POSSaleItem), [
+                    {**{name: item[name] for name in _ITEM_COLUMNS}, "sale_id": remote_ids[item["sale_id"]]}
+                    for item in items
+                ])
         remote_db.commit()
-        logger.info(f"[SyncUp] ✅ Vente {sale.sale_uuid} ({sale.code}) → Supabase")
+
+        SyncManager._mark(local_db, list(local_ids.values()), "synced", now)
+        return len(sales) - len(remote_ids)
+
+    @staticmethod
+    def _mark(local_db: Session, sale_ids: List[int], status: str, synced_at: Optional[datetime] = None):
+        """Met à jour le sync_status d'un lot de ventes locales (un seul UPDATE)."""
+        from app.models.pos_sale import POSSale
+
+        values = {"sync_status": status}
+        if synced_at is not None:
+            values["synced_at"] = synced_at
+        local_db.execute(
+            update(POSSale)
+            .where(POSSale.id.in_(sale_ids))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        local_db.commit()
 
     # ──────────────────────────────────────────────────────────────────
     # SYNC DOWN : Supabase → Local
     # ──────────────────────────────────────────────────────────────────
 
     @staticmethod
-    def sync_down(local_db: Session) -> Dict[str, Any]:
+    def sync_down(local_db: Session, page_size: Optional[int] = None, full: bool = False) -> Dict[str, Any]:
         """
-        Récupère les médicaments et paramètres depuis Supabase vers le local.
-        Utile pour une installation fraîche ou une mise à jour partagée.
+        Récupère depuis Supabase les paramètres et le catalogue (familles,
+        types, médicaments, lots, prix) modifiés depuis le dernier pull.
+
+        Pour chaque table : lecture des lignes dont updated_at dépasse le
+        high-water mark enregistré dans sync_logs (moins
+        SYNC_DOWN_OVERLAP_SECONDS), par pages de `page_size` en keyset sur
+        l'id, upsert groupé en local (une requête par page), puis nouveau
+        mark. `full=True` ignore les marks (installation neuve).
+
+        Le stock (quantity) reste celui du poste : il n'est écrit qu'à la
+        création de la ligne.
         """
-        report = {"medicines_updated": 0, "settings_updated": 0, "errors": 0, "online": False}
+        report = {
+            "medicines_updated": 0, "settings_updated": 0, "tables": {},
+            "pages": 0, "errors": 0, "online": False, "duration_s": 0.0,
+        }
 
         if not _remote_available():
             logger.warning("[SyncDown] Supabase non joignable — skip.")
             return report
 
+        from app.models.sync_log import SyncLogStatus
+
         report["online"] = True
+        page_size = max(1, page_size or SYNC_DOWN_PAGE_SIZE)
+        marks = {} if full else SyncManager.high_water_marks(local_db)
+        started = time.perf_counter()
 
         remote_db = SessionRemote()
         try:
-            # Synchroniser les paramètres depuis Supabase
-            from app.models.settings import Settings
-            try:
-                remote_settings = remote_db.query(Settings).all()
-                for rs in remote_settings:
-                    local_s = local_db.query(Settings).filter(Settings.key == rs.key).first()
-                    if local_s:
-                        local_s.value = rs.value
-                    else:
-                        local_db.add(Settings(key=rs.key, value=rs.value))
-                local_db.commit()
-                report["settings_updated"] = len(remote_settings)
-            except Exception as e:
-                logger.warning(f"[SyncDown] Settings sync skipped: {e}")
-
+            for table in pull_tables():
+                try:
+                    count, pages = SyncManager._pull_table(
+                        local_db, remote_db, table, marks.get(table.name), page_size
+                    )
+                    report["tables"][table.name] = count
+                    report["pages"] += pages
+                except OperationalError as e:
+                    local_db.rollback()
+                    remote_db.rollback()
+                    connectivity.mark_offline(str(e))
+                    logger.error(f"[SyncDown] Supabase injoignable pendant {table.name}: {e}")
+                    report["errors"] += 1
+                    break
+                except Exception as e:
+                    local_db.rollback()
+                    remote_db.rollback()
+                    logger.error(f"[SyncDown] Erreur table {table.name}: {e}")
+                    SyncManager._log(local_db, SyncLogStatus.FAILURE, f"{type(e).__name__}: {e}", table.name)
+                    report["errors"] += 1
         except Exception as e:
             logger.error(f"[SyncDown] Erreur fatale: {e}")
             report["errors"] += 1
         finally:
             remote_db.close()
 
+        report["medicines_updated"] = report["tables"].get("medicines", 0)
+        report["settings_updated"] = report["tables"].get("settings", 0)
+        if report["settings_updated"]:
+            # La licence peut venir du cloud
+            from app.core.license import license_service
+            license_service.invalidate()
+        report["duration_s"] = round(time.perf_counter() - started, 3)
         logger.info(f"[SyncDown] Résultat: {report}")
         return report
 
+    @staticmethod
+    def high_water_marks(local_db: Session) -> Dict[str, datetime]:
+        """Dernier updated_at distant copié, par table (une requête)."""
+        from app.models.sync_log import SyncLog, SyncLogStatus
+
+        rows = local_db.execute(
+            select(SyncLog.table_name, func.max(SyncLog.high_water_mark))
+            .where(SyncLog.status == SyncLogStatus.SUCCESS, SyncLog.table_name.isnot(None))
+            .group_by(SyncLog.table_name)
+        ).all()
+        return {name: mark for name, mark in rows if mark is not None}
+
+    @staticmethod
+    def _pull_table(local_db: Session, remote_db: Session, table: PullTable,
+                    mark: Optional[datetime], page_size: int) -> Tuple[int, int]:
+        """Copie les lignes modifiées d'une table. Retourne (lignes, pages)."""
+        from app.models.sync_log import SyncLogStatus
+
+        model = table.model
+        query = select(model.__table__).order_by(model.id).limit(page_size)
+        if mark is not None:
+            query = query.where(model.updated_at > mark - timedelta(seconds=SYNC_DOWN_OVERLAP_SECONDS))
+
+        count = pages = 0
+        newest = mark
+        last_id = 0
+        while True:
+            rows = remote_db.execute(query.where(model.id > last_id)).mappings().all()
+            if not rows:
+                break
+            pages += 1
+            last_id = rows[-1]["id"]
+            for row in rows:
+                updated_at = _naive_utc(row["updated_at"])
+                if updated_at is not None and (newest is None or updated_at > newest):
+                    newest = updated_at
+
+            count += SyncManager._upsert_rows(local_db, table, rows)
+            if len(rows) < page_size:
+                break
+        # Fin de la lecture distante (pas de transaction laissée ouverte)
+        remote_db.rollback()
+
+        if count:
+            SyncManager._log(local_db, SyncLogStatus.SUCCESS, f"{count} ligne(s) reçue(s)", table.name, newest)
+        return count, pages
+
+    @staticmethod
+    def _upsert_rows(local_db: Session, table: PullTable, rows) -> int:
+        """
+        INSERT ... ON CONFLICT (key) DO UPDATE d'une page, en une requête.
+        Une ligne en conflit sur une autre contrainte (ex. code déjà pris
+        par un autre médicament local) est ignorée et journalisée.
+        """
+        columns = table.model.__table__.c
+        values = [dict(row) for row in rows]
+        if table.key != "id":
+            # Clé métier : les id distants et locaux ne correspondent pas
+            for row in values:
+                row.pop("id", None)
+
+        stmt = dialect_insert(local_db)(table.model.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.key],
+            set_={
+                column.name: stmt.excluded[column.name] for column in columns
+                if column.name not in ("id", table.key, *table.local_columns)
+            },
+        )
+
+        try:
+            local_db.execute(stmt, values)
+            local_db.commit()
+            written = values
+        except IntegrityError:
+            local_db.rollback()
+            written = []
+            for row in values:
+                try:
+                    local_db.execute(stmt, [row])
+                    local_db.commit()
+                    written.append(row)
+                except IntegrityError as e:
+                    local_db.rollback()
+                    logger.warning(f"[SyncDown] {table.name} {row.get(table.key)} ignoré: {e.orig}")
+
+        if table.name == "medicines":
+            from app.services.search_index import product_index
+            for row in written:
+                product_index.upsert(_IndexRow(row))
+        return len(written)
+
+    @staticmethod
+    def _log(local_db: Session, status, message: str, table_name: Optional[str] = None,
+             high_water_mark: Optional[datetime] = None) -> None:
+        from app.models.sync_log import SyncLog
+
+        local_db.add(SyncLog(
+            status=status, message=message, table_name=table_name, high_water_mark=high_water_mark,
+        ))
+        local_db.commit()
+
     # ──────────────────────────────────────────────────────────────────
     # STATUT
     # ──────────────────────────────────────────────────────────────────
@@ -200,34 +491,67 @@ class SyncManager:
     def get_status(local_db: Session) -> Dict[str, Any]:
         """
         Retourne l'état de la synchronisation.
+
+        Ne teste pas la connexion : `online` est le dernier état connu
+        (moniteur de connexion), la file d'attente est lue en une requête
+        locale.
         """
         try:
             from app.models.pos_sale import POSSale
-            pending = local_db.query(POSSale).filter(
-                POSSale.sync_status.in_(["pending", "local_only"])
-            ).count()
-            errored = local_db.query(POSSale).filter(
-                POSSale.sync_status == "error"
-            ).count()
-            synced = local_db.query(POSSale).filter(
-                POSSale.sync_status == "synced"
-            ).count()
-            online = _remote_available()
+            counts, oldest_pending = {}, None
+            for sync_status, count, oldest in local_db.execute(
+                select(POSSale.sync_status, func.count(), func.min(POSSale.date))
+                .group_by(POSSale.sync_status)
+            ):
+                counts[sync_status] = count
+                if sync_status in ("pending", "local_only") and oldest is not None:
+                    oldest_pending = oldest if oldest_pending is None else min(oldest, oldest_pending)
+
+            from app.sync import outbox
+            changes = outbox.pending_counts(local_db)
+
+            now = datetime.utcnow()
+            pending = counts.get("pending", 0) + counts.get("local_only", 0)
+            link = connectivity.state()
             return {
-                "online": online,
+                "online": link["online"],
+                "connectivity_checked_at": link["checked_at"],
                 "pending_count": pending,
-                "error_count": errored,
-                "synced_count": synced,
-                "last_check": datetime.utcnow().isoformat(),
+                "queue_depth": pending,
+                "error_count": counts.get("error", 0),
+                "synced_count": counts.get("synced", 0),
+                "outbox_pending": changes["pending"],
+                "outbox_errors": changes["error"],
+                "oldest_pending_at": oldest_pending.isoformat() if oldest_pending else None,
+                # Retard du cloud : âge de la plus ancienne vente non envoyée
+                "lag_seconds": round((now - oldest_pending).total_seconds(), 1) if oldest_pending else 0.0,
+                "last_check": now.isoformat(),
+                "connectivity": link,
             }
         except Exception as e:
             return {"online": False, "error": str(e)}
 
     # ──────────────────────────────────────────────────────────────────
-    # QUEUE LEGACY (compatibilité avec l'ancien code)
+    # OUTBOX : clients, lots, mouvements de stock, annulations
     # ──────────────────────────────────────────────────────────────────
 
+    @staticmethod
+    def push_changes(local_db: Session, batch_size: Optional[int] = None) -> Dict[str, Any]:
+        """Envoie les modifications capturées par le outbox (voir app/sync/outbox.py)."""
+        from app.sync import outbox
+
+        if not _remote_available():
+            logger.warning("[Outbox] Supabase non joignable — skip.")
+            return {"sent": 0, "errors": 0, "batches": 0, "duration_s": 0.0}
+        return outbox.drain(local_db, batch_size)
+
     @staticmethod
     def add_to_queue(db: Session, action, table_name: str, data: Dict[str, Any]):
-        """Compatibilité legacy — utiliser sync_up() à la place."""
-        logger.info(f"[SyncQueue] Action {action} sur {table_name} → sera traitée par sync_up()")
+        """Enregistre une modification dans le outbox (data contient la clé de la ligne)."""
+        from app.models.sync_queue import SyncAction
+        from app.sync import outbox
+
+        table = outbox.tables().get(table_name)
+        if table is None or table.key not in data:
+            raise ValueError(f"Table non synchronisée ou clé manquante: {table_name}")
+        outbox.record(db, [(table_name, data[table.key], SyncAction(action))])
@@ -0,0 +1,230 @@
+"""
+Sync worker — Synchronisation Local → Supabase en tâche de fond.
+
+Sans lui, les ventes ne partent que lorsqu'un client appelle /sync/push.
+Chaque passe envoie les ventes (sync_up) puis les modifications du outbox.
+Le worker tourne dans un thread démarré par le lifespan de l'application :
+
+- chaque checkout (et chaque commit qui alimente le outbox) le réveille
+  (notify) ; les réveils sont regroupés
+  (debounce) : il attend SYNC_DEBOUNCE_SECONDS sans nouvelle vente, au
+  plus SYNC_MAX_DELAY_SECONDS après la première ;
+- sans réveil, il repasse toutes les SYNC_INTERVAL_SECONDS (checkouts
+  d'un autre processus, entrées du outbox en échec à retenter) ; les
+  ventes refusées par Supabase restent en 'error' et ne sont pas renvoyées
+  automatiquement ;
+- hors ligne, les tentatives s'espacent (backoff exponentiel jusqu'à
+  SYNC_BACKOFF_MAX_SECONDS) et les checkouts ne relancent pas de test de
+  connexion avant la fin du délai ;
+- son état (dernier succès, échecs, prochaine tentative) est lu par
+  /sync/status sans bloquer la requête.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+import os
+import threading
+import time
+
+from app.core.metrics import metrics
+from app.sync.sync_manager import SyncManager
+from app.utils.network import connectivity
+
+logger = logging.getLogger(__name__)
+
+SYNC_WORKER_ENABLED = os.getenv("SYNC_WORKER", "on").lower() not in ("off", "false", "0")
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "60"))
+SYNC_DEBOUNCE_SECONDS = float(os.getenv("SYNC_DEBOUNCE_SECONDS", "2"))
+SYNC_MAX_DELAY_SECONDS = float(os.getenv("SYNC_MAX_DELAY_SECONDS", "10"))
+SYNC_BACKOFF_BASE_SECONDS = float(os.getenv("SYNC_BACKOFF_BASE_SECONDS", "5"))
+SYNC_BACKOFF_MAX_SECONDS = float(os.getenv("SYNC_BACKOFF_MAX_SECONDS", "300"))
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class SyncWorker:
+    """Thread de synchronisation réveillé par les checkouts."""
+
+    def __init__(
+        self,
+        interval: float = SYNC_INTERVAL_SECONDS,
+        debounce: float = SYNC_DEBOUNCE_SECONDS,
+        max_delay: float = SYNC_MAX_DELAY_SECONDS,
+        backoff_base: float = SYNC_BACKOFF_BASE_SECONDS,
+        backoff_max: float = SYNC_BACKOFF_MAX_SECONDS,
+    ):
+        self.interval = interval
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory = None
+
+        self._first_notify: Optional[float] = None   # time.monotonic()
+        self._last_notify: Optional[float] = None
+        self._notified = 0
+        self._retry_at: Optional[float] = None       # fin du backoff en cours
+        self._failures = 0
+        self._running = False
+        self._last_attempt: Optional[datetime] = None
+        self._last_success: Optional[datetime] = None
+        self._last_error: Optional[str] = None
+        self._last_report: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------
+    # Déclencheurs
+    # ------------------------------------------------------------------
+
+    def notify(self) -> None:
+        """Signale une nouvelle vente à envoyer (appelé après le commit du checkout)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._first_notify is None:
+                self._first_notify = now
+            self._last_notify = now
+            self._notified += 1
+        self._wake.set()
+
+    def _debounce(self) -> None:
+        """Attend une pause des checkouts, au plus max_delay après le premier."""
+        while not self._stop.is_set():
+            with self._lock:
+                if self._first_notify is None:
+                    return
+                now = time.monotonic()
+                remaining = min(
+                    self.debounce - (now - self._last_notify),
+                    self.max_delay - (now - self._first_notify),
+                )
+            if remaining <= 0:
+                return
+            self._stop.wait(remaining)
+
+    # ------------------------------------------------------------------
+    # Synchronisation
+    # ------------------------------------------------------------------
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """Une passe de sync_up ; met à jour l'état et le backoff."""
+        with self._lock:
+            # Les ventes déjà signalées partent avec cette passe
+            self._wake.clear()
+            self._first_notify = self._last_notify = None
+            self._notified = 0
+            self._running = True
+            self._last_attempt = datetime.utcnow()
+
+        report, error = None, None
+        try:
+            with self._session_factory() as db:
+                report = SyncManager.sync_up(db)
+                if report["online"]:
+                    # Après les ventes : les annulations visent des ventes déjà envoyées
+                    report["outbox"] = SyncManager.push_changes(db)
+            if not report["online"] or not connectivity.state()["online"]:
+                error = "Supabase non joignable"
+        except Exception as e:
+            logger.error(f"[SyncWorker] Échec de la synchronisation: {e}")
+            error = str(e)
+
+        metrics.inc("pharma_sync_runs_total", result="ok" if error is None else "error")
+        if report:
+            metrics.inc("pharma_sync_sales_pushed_total", report["synced"])
+
+        with self._lock:
+            self._running = False
+            self._last_report = report
+            self._last_error = error
+            if error is None:
+                self._failures = 0
+                self._retry_at = None
+                self._last_success = datetime.utcnow()
+            else:
+                self._failures += 1
+                delay = min(self.backoff_base * 2 ** (self._failures - 1), self.backoff_max)
+                self._retry_at = time.monotonic() + delay
+                logger.info(f"[SyncWorker] Nouvelle tentative dans {delay:.0f}s ({error})")
+        return report
+
+    def _next_timeout(self) -> float:
+        with self._lock:
+            if self._retry_at is not None:
+                return max(0.0, self._retry_at - time.monotonic())
+            return self.interval
+
+    def _in_backoff(self) -> bool:
+        with self._lock:
+            return self._retry_at is not None and time.monotonic() < self._retry_at
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            woken = self._wake.wait(self._next_timeout())
+            if self._stop.is_set():
+                break
+            if woken:
+                self._wake.clear()
+                # Hors ligne : la vente attendra la fin du backoff
+                if self._in_backoff():
+                    continue
+                self._debounce()
+                if self._stop.is_set():
+                    break
+            self.run_once()
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def start(self, session_factory) -> None:
+        """Démarre le thread (sans effet s'il tourne déjà)."""
+        if self.is_alive:
+            return
+        self._session_factory = session_factory
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sync-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self._wake.clear()
+
+    def status(self) -> Dict[str, Any]:
+        """État du worker, lu en mémoire."""
+        with self._lock:
+            retry_in = None
+            if self._retry_at is not None:
+                retry_in = round(max(0.0, self._retry_at - time.monotonic()), 1)
+            since_success = None
+            if self._last_success is not None:
+                since_success = round((datetime.utcnow() - self._last_success).total_seconds(), 1)
+            return {
+                "enabled": self.is_alive,
+                "running": self._running,
+                "notified": self._notified,
+                "last_attempt_at": _iso(self._last_attempt),
+                "last_success_at": _iso(self._last_success),
+                "seconds_since_success": since_success,
+                "consecutive_failures": self._failures,
+                "retry_in_s": retry_in,
+                "last_error": self._last_error,
+                "last_report": self._last_report,
+            }
+
+
+sync_worker = SyncWorker()
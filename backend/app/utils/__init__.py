@@ -7,7 +7,7 @@ from .security import (
     verify_token,
     decode_token
 )
-from .network import is_online
+from .network import is_online, connectivity
 
 __all__ = [
     "hash_password",
@@ -16,5 +16,6 @@ __all__ = [
     "verify_token",
     "verify_token",
     "decode_token",
-    "is_online"
+    "is_online",
+    "connectivity"
 ]
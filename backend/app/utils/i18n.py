@@ -3,9 +3,12 @@ I18n Utility - Handles loading and retrieving translation strings.
 """
 
 import json
+import logging
 import os
 from typing import Dict
 
+logger = logging.getLogger(__name__)
+
 # Global cache for loaded messages
 _MESSAGES: Dict[str, Dict[str, str]] = {}
 DEFAULT_LOCALE = "fr"
@@ -21,7 +24,7 @@ def load_messages():
         with open(os.path.join(i18n_path, "messages_fr.json"), "r", encoding="utf-8") as f:
             _MESSAGES["fr"] = json.load(f)
     except FileNotFoundError:
-        print("Warning: messages_fr.json not found")
+        logger.warning("messages_fr.json not found")
         _MESSAGES["fr"] = {}
 
     # Load EN
@@ -29,7 +32,7 @@ def load_messages():
         with open(os.path.join(i18n_path, "messages_en.json"), "r", encoding="utf-8") as f:
             _MESSAGES["en"] = json.load(f)
     except FileNotFoundError:
-        print("Warning: messages_en.json not found")
+        logger.warning("messages_en.json not found")
         _MESSAGES["en"] = {}
 
 
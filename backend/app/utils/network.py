@@ -1,26 +1,256 @@
 """
 Network Utility.
 Helper to check internet/database connection status.
+
+The remote database state comes from a ConnectivityMonitor instead of a
+fresh connection + SELECT 1 per call (up to the 10 s connect_timeout
+when the link is down):
+
+- a background thread probes the remote database on a schedule
+  (NETWORK_PROBE_INTERVAL_SECONDS, NETWORK_OFFLINE_PROBE_INTERVAL_SECONDS
+  while offline) and keeps the last state with its timestamps and a
+  latency histogram;
+- is_online() answers from that state. Without the thread (scripts,
+  tests) a stale state is refreshed by one probe, shared by concurrent
+  callers;
+- once the link is known to be down, a probe first opens a plain TCP
+  connection to the database host with NETWORK_FAST_FAIL_TIMEOUT_SECONDS
+  and only runs the full probe if it succeeds.
 """
 
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import logging
+import os
 import socket
-from app.database import check_database_connection
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.core.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL_SECONDS = float(os.getenv("NETWORK_PROBE_INTERVAL_SECONDS", "30"))
+OFFLINE_PROBE_INTERVAL_SECONDS = float(os.getenv("NETWORK_OFFLINE_PROBE_INTERVAL_SECONDS", "10"))
+FAST_FAIL_TIMEOUT_SECONDS = float(os.getenv("NETWORK_FAST_FAIL_TIMEOUT_SECONDS", "1"))
+# Age after which a state is refreshed when the monitor thread is not running
+STATE_TTL_SECONDS = float(os.getenv("NETWORK_STATE_TTL_SECONDS", "15"))
+
+DEFAULT_PORTS = {"postgresql": 5432, "mysql": 3306}
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class ConnectivityMonitor:
+    """Cached reachability of the remote database, refreshed in the background."""
+
+    def __init__(
+        self,
+        engine=None,
+        interval: float = PROBE_INTERVAL_SECONDS,
+        offline_interval: float = OFFLINE_PROBE_INTERVAL_SECONDS,
+        fast_fail_timeout: float = FAST_FAIL_TIMEOUT_SECONDS,
+        ttl: float = STATE_TTL_SECONDS,
+    ):
+        self._engine = engine
+        self.interval = interval
+        self.offline_interval = offline_interval
+        self.fast_fail_timeout = fast_fail_timeout
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._probe_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._online: Optional[bool] = None
+        self._checked_at: Optional[float] = None     # time.monotonic()
+        self._checked_at_utc: Optional[datetime] = None
+        self._changed_at: Optional[datetime] = None
+        self._last_online_at: Optional[datetime] = None
+        self._last_error: Optional[str] = None
+        self._failures = 0
+        self._probes = 0
+        self._fast_failures = 0
+        self.latency = LatencyHistogram()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from app.database import engine_remote
+            self._engine = engine_remote
+        return self._engine
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def address(self) -> Optional[Tuple[str, int]]:
+        """(host, port) of the remote database, None for file databases."""
+        url = self.engine.url
+        if not url.host:
+            return None
+        port = url.port or DEFAULT_PORTS.get(url.get_backend_name())
+        return (url.host, port) if port else None
+
+    # ------------------------------------------------------------------
+    # Probes
+    # ------------------------------------------------------------------
+
+    def _reachable(self, address: Tuple[str, int]) -> bool:
+        try:
+            socket.create_connection(address, timeout=self.fast_fail_timeout).close()
+            return True
+        except OSError:
+            return False
+
+    def _probe_database(self) -> None:
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    def probe(self) -> bool:
+        """Check the remote database now and record the result."""
+        with self._probe_lock:
+            address = self.address()
+            if self._online is False and address is not None and not self._reachable(address):
+                # Known down and host unreachable: no 10 s connect_timeout
+                self._fast_failures += 1
+                self._record(False, f"{address[0]}:{address[1]} unreachable")
+                return False
+
+            started = time.perf_counter()
+            try:
+                self._probe_database()
+            except Exception as e:
+                self._record(False, f"{type(e).__name__}: {e}")
+                return False
+            self._record(True, latency_ms=(time.perf_counter() - started) * 1000)
+            return True
+
+    def _record(self, online: bool, error: Optional[str] = None, latency_ms: Optional[float] = None) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            if online != self._online:
+                if self._online is not None:
+                    logger.info(f"Remote database {'reachable' if online else 'unreachable'}"
+                                + (f": {error}" if error else ""))
+                self._changed_at = now
+            self._online = online
+            self._checked_at = time.monotonic()
+            self._checked_at_utc = now
+            self._probes += 1
+            if online:
+                self._failures = 0
+                self._last_error = None
+                self._last_online_at = now
+                self.latency.observe(latency_ms)
+            else:
+                self._failures += 1
+                self._last_error = error
+
+    def mark_offline(self, error: str) -> None:
+        """Record a failure seen by a caller (lost connection) and re-probe soon."""
+        self._record(False, error)
+        self._wake.set()
+
+    def is_online(self, max_age: Optional[float] = None) -> bool:
+        """
+        Last known state. Probes only when the monitor thread is not
+        running and the state is older than `max_age` (default: ttl).
+        """
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            if self._checked_at is not None and (
+                self.is_running or time.monotonic() - self._checked_at < max_age
+            ):
+                return self._online
+            checked_at = self._checked_at
+        with self._probe_lock:
+            # Another caller probed while we waited
+            if self._checked_at != checked_at and time.monotonic() - self._checked_at < max_age:
+                return self._online
+        return self.probe()
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                logger.warning(f"Connectivity probe failed: {e}")
+            self._wake.clear()
+            self._wake.wait(self.interval if self._online else self.offline_interval)
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, name="connectivity-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def reset(self) -> None:
+        """Forget the recorded state (tests, engine change)."""
+        with self._lock:
+            self._online = None
+            self._checked_at = self._checked_at_utc = self._changed_at = None
+            self._last_online_at = self._last_error = None
+            self._failures = self._probes = self._fast_failures = 0
+            self.latency = LatencyHistogram()
+
+    def state(self) -> Dict[str, Any]:
+        """Recorded state, without probing."""
+        with self._lock:
+            age = round(time.monotonic() - self._checked_at, 1) if self._checked_at is not None else None
+            return {
+                "online": bool(self._online),
+                "checked_at": _iso(self._checked_at_utc),
+                "age_s": age,
+                "since": _iso(self._changed_at),
+                "last_online_at": _iso(self._last_online_at),
+                "consecutive_failures": self._failures,
+                "fast_fail": self._online is False,
+                "last_error": self._last_error,
+                "probes": self._probes,
+                "fast_failures": self._fast_failures,
+                "monitor_running": self.is_running,
+                "latency": self.latency.snapshot(),
+            }
+
+
+connectivity = ConnectivityMonitor()
+
 
 def is_online(check_remote_db: bool = True) -> bool:
     """
     Check if the system is online.
-    
+
     Args:
-        check_remote_db: If True, specifically checks connection to the configured Remote MySQL DB.
+        check_remote_db: If True, returns the state of the configured remote database
+                         (see ConnectivityMonitor, answered from cache).
                          If False, just checks basic internet connectivity (e.g. Google DNS).
-    
+
     Returns:
         bool: True if online/connected, False otherwise.
     """
     if check_remote_db:
-        # Check actual DB connection using the core database util
-        return check_database_connection(use_remote=True)
-    
+        return bool(connectivity.is_online())
+
     # Fallback: Simple DNS check
     try:
         # Check google DNS (8.8.8.8) on port 53
@@ -28,5 +258,5 @@ def is_online(check_remote_db: bool = True) -> bool:
         return True
     except OSError:
         pass
-        
+
     return False
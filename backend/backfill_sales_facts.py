@@ -0,0 +1,26 @@
+"""
+Rebuild the dashboard sales facts (sales_daily_facts / sales_hourly_facts)
+from the raw legacy and POS sales.
+
+Usage (from backend/):
+    python backfill_sales_facts.py                          # everything
+    python backfill_sales_facts.py --start 2026-01-01 --end 2026-03-31
+"""
+
+import argparse
+import sys
+from datetime import date
+
+sys.path.insert(0, '.')
+from app.database import SessionLocal, init_local_db
+from app.services import sales_facts_service
+
+parser = argparse.ArgumentParser(description="Rebuild the dashboard sales facts")
+parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+args = parser.parse_args()
+
+init_local_db()
+with SessionLocal() as db:
+    count = sales_facts_service.rebuild(db, start=args.start, end=args.end)
+print(f"OK: {count} vente(s) agrégée(s) dans les tables de faits")
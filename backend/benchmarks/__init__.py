@@ -0,0 +1,6 @@
+"""
+Benchmarks package.
+
+Standalone performance scripts run against a throw-away SQLite database:
+    python -m benchmarks.bench_pos_search
+"""
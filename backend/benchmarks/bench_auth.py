@@ -0,0 +1,69 @@
+"""
+Benchmark: per-request cost of the auth dependency chain.
+
+Runs get_current_user + get_current_active_user for a pharmacist (license
+checked) with both caches cold (invalidated before every request: User
+lookup + one Settings query), with only the license cached, and with the
+user principal cached too, and reports queries per request and latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth [--iterations 2000]
+"""
+
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from benchmarks.common import count_queries, measure, print_table, reset_database, seed_user
+from app.auth.dependencies import get_current_active_user, get_current_user
+from app.auth.user_cache import user_cache
+from app.core.license import license_service
+from app.database import SessionLocal
+from app.models import Settings
+from app.utils.security import create_access_token
+
+
+def seed():
+    reset_database()
+    seed_user("caisse")
+    with SessionLocal() as db:
+        db.add_all([
+            Settings(key="license_expiry_date", value=(date.today() + timedelta(days=200)).isoformat()),
+            Settings(key="license_warning_bdays", value="30"),
+            Settings(key="license_warning_message", value="Licence bientôt expirée"),
+        ])
+        db.commit()
+
+
+def run(iterations):
+    seed()
+    token = create_access_token({"sub": "caisse"})
+
+    async def chain(db):
+        user = await get_current_user(token, db)
+        return await get_current_active_user(user, db)
+
+    rows = []
+    for label, caches in (("cold", (license_service, user_cache)),
+                          ("license cached", (user_cache,)),
+                          ("all cached", ())):
+        with SessionLocal() as db:
+            def request():
+                for cache in caches:
+                    cache.invalidate()
+                asyncio.run(chain(db))
+
+            request()
+            with count_queries() as queries:
+                request()
+            timings = measure(request, iterations)
+        rows.append((label, queries["count"], f"{timings['p50']:.3f}", f"{timings['p95']:.3f}"))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print_table(["caches", "queries/request", "p50 ms", "p95 ms"], run(args.iterations))
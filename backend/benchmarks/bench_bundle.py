@@ -0,0 +1,70 @@
+"""
+Benchmark: month-end export bundle vs separate downloads.
+
+Seeds a catalog and a year of sales, then compares building the closing
+reports one after the other (report_service.generate_*, each reading its
+own data) with report_bundle.build_bundle (one read snapshot, shared
+datasets, rendered in the report_jobs process pool). The artifact cache
+is emptied before each bundle run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bundle [--sales 20000] [--medicines 5000] [--workers 2]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import seed_catalog, seed_user, seed_sales, count_queries, print_table
+from app.database import SessionLocal, engine_local
+from app.services import report_bundle, report_jobs, report_service
+from app.services.report_jobs import ReportJobQueue
+
+FORMATS = ["stock_excel", "sales_excel", "financial_pdf", "sales_word", "sales_pdf"]
+
+
+def run(n_sales, n_medicines, workers):
+    seed_catalog(n_medicines)
+    user_id = seed_user()
+    seed_sales(n_sales, days=365, user_id=user_id)
+
+    end = date.today()
+    start = end - timedelta(days=365)
+    rows = []
+
+    with SessionLocal() as db, count_queries() as counter:
+        started = time.perf_counter()
+        for name in FORMATS:
+            report = report_jobs.get_report_type(name)
+            params = report.parse({"start_date": start, "end_date": end} if report.params else {})
+            report_jobs._generate(db, report, params).close()
+        rows.append(("separate", counter["count"], f"{time.perf_counter() - started:.2f}"))
+
+    queue = ReportJobQueue(workers=workers)
+    try:
+        for label in ("bundle (cold pool)", "bundle (warm pool)"):
+            report_jobs.REPORT_CACHE_DIR = tempfile.mkdtemp(prefix="bench_bundle_")
+            with count_queries() as counter:
+                started = time.perf_counter()
+                archive = b"".join(report_bundle.iter_zip(
+                    report_bundle.build_bundle(start, end, FORMATS, queue, engine=engine_local)
+                ))
+                elapsed = time.perf_counter() - started
+            rows.append((label, counter["count"], f"{elapsed:.2f}", f"{len(archive) / 1024:.0f}"))
+            shutil.rmtree(report_jobs.REPORT_CACHE_DIR, ignore_errors=True)
+    finally:
+        queue.shutdown()
+    rows[0] += ("-",)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", type=int, default=20000)
+    parser.add_argument("--medicines", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    print_table(["mode", "statements", "seconds", "zip KB"], run(args.sales, args.medicines, args.workers))
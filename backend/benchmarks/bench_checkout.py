@@ -0,0 +1,79 @@
+"""
+Benchmark: POS checkout with large carts.
+
+Builds carts of 1, 10, 50 and 100 lines (FEFO allocations from cart_add,
+several lots per line), then reports SQL statements and p50/p95 latency
+of pos_service.checkout, commit included.
+
+Usage (from backend/):
+    python -m benchmarks.bench_checkout [--lines 1,10,50,100]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import seed_catalog, seed_user, count_queries, print_table
+from app.database import SessionLocal
+from app.schemas.pos import CartAddRequest, POSCheckoutRequest, CheckoutItem
+from app.services import pos_service
+
+ITERATIONS = 20
+
+
+def _build_cart(db, medicine_ids):
+    items = []
+    for medicine_id in medicine_ids:
+        # 150 units usually spans two or three lots
+        line = pos_service.cart_add(db, CartAddRequest(medicine_id=medicine_id, quantity=150))
+        items.append(CheckoutItem(
+            medicine_id=medicine_id, allocations=line.allocations,
+            quantity=150, unit_price=max(line.unit_price, 1.0),
+        ))
+    return POSCheckoutRequest(items=items)
+
+
+def _in_stock_ids(db, count):
+    ids = []
+    for medicine_id in range(1, 100000):
+        if len(ids) == count:
+            break
+        try:
+            pos_service.allocate_fefo(db, medicine_id, 150)
+            ids.append(medicine_id)
+        except ValueError:
+            continue
+    return ids
+
+
+def run(lines, user_id):
+    db = SessionLocal()
+    try:
+        timings, statements, allocations = [], 0, 0
+        candidates = _in_stock_ids(db, lines * ITERATIONS)
+        for i in range(ITERATIONS):
+            cart = _build_cart(db, candidates[i * lines:(i + 1) * lines])
+            allocations = sum(len(item.allocations) for item in cart.items)
+            with count_queries() as counter:
+                start = time.perf_counter()
+                pos_service.checkout(db, user_id, cart)
+                timings.append((time.perf_counter() - start) * 1000)
+            statements = counter["count"]
+        timings.sort()
+        return (
+            lines, allocations, statements,
+            f"{timings[len(timings) // 2]:.2f}", f"{timings[int(len(timings) * 0.95) - 1]:.2f}",
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", default="1,10,50,100")
+    parser.add_argument("--medicines", type=int, default=20000)
+    args = parser.parse_args()
+
+    seed_catalog(args.medicines, batches_per_medicine=4)
+    user_id = seed_user()
+    rows = [run(int(n), user_id) for n in args.lines.split(",")]
+    print_table(["cart lines", "lot allocations", "statements", "p50 ms", "p95 ms"], rows)
@@ -0,0 +1,61 @@
+"""
+Benchmark: dashboard analytics vs sales history size.
+
+For histories of 1, 3 and 5 years of sales, backfills the sales facts and
+reports SQL statements and p50/p95 latency of the dashboard endpoints'
+service calls (get_stats, revenue chart, day-of-week, hour-of-day).
+Latency should stay flat as the history grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_dashboard [--sales-per-day 150] [--years 1,3,5]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import seed_catalog, seed_user, seed_sales, count_queries, measure, print_table
+from app.database import SessionLocal
+from app.services import dashboard_service, sales_facts_service
+
+
+def _calls(db):
+    return [
+        ("get_stats", lambda: dashboard_service.get_stats(db)),
+        ("revenue chart (30 d)", lambda: dashboard_service.get_revenue_chart_data(db, days=30)),
+        ("by day of week (30 d)", lambda: dashboard_service.get_sales_by_day_of_week(db, days=30)),
+        ("by hour (30 d)", lambda: dashboard_service.get_sales_by_hour(db, days=30)),
+    ]
+
+
+def run(years, sales_per_day):
+    seed_catalog(1000)
+    user_id = seed_user()
+    n_sales = years * 365 * sales_per_day
+    seed_sales(n_sales, days=years * 365, user_id=user_id)
+
+    rows = []
+    with SessionLocal() as db:
+        start = time.perf_counter()
+        sales_facts_service.rebuild(db)
+        backfill_s = time.perf_counter() - start
+        for label, fn in _calls(db):
+            with count_queries() as counter:
+                fn()
+            timings = measure(fn, iterations=20)
+            rows.append((
+                f"{years} y", n_sales, f"{backfill_s:.1f}", label, counter["count"],
+                f"{timings['p50']:.2f}", f"{timings['p95']:.2f}",
+            ))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales-per-day", type=int, default=150)
+    parser.add_argument("--years", default="1,3,5")
+    args = parser.parse_args()
+
+    rows = []
+    for years in args.years.split(","):
+        rows += run(int(years), args.sales_per_day)
+    print_table(["history", "sales", "backfill s", "call", "statements", "p50 ms", "p95 ms"], rows)
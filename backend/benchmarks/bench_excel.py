@@ -0,0 +1,66 @@
+"""
+Benchmark: streaming Excel exports vs history size.
+
+Seeds histories of increasing size and reports duration, peak Python
+memory (tracemalloc) and file size of report_service.generate_sales_excel
+and generate_stock_excel. Peak memory should stay roughly flat as the
+number of rows grows.
+
+Usage (from backend/):
+    python -m benchmarks.bench_excel [--sales 20000,100000] [--medicines 5000]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks.common import seed_catalog, seed_user, seed_sales, print_table
+from app.database import SessionLocal
+from app.services import report_service
+
+
+def _profile(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    output = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    output.seek(0, os.SEEK_END)
+    size = output.tell()
+    output.close()
+    return elapsed, peak, size
+
+
+def run(n_sales, n_medicines):
+    seed_catalog(n_medicines)
+    user_id = seed_user()
+    seed_sales(n_sales, days=365, user_id=user_id)
+
+    today = date.today()
+    rows = []
+    with SessionLocal() as db:
+        for label, rows_out, fn in (
+            ("sales (1 year)", n_sales // 2,
+             lambda: report_service.generate_sales_excel(db, today - timedelta(days=365), today)),
+            ("stock", n_medicines, lambda: report_service.generate_stock_excel(db)),
+        ):
+            elapsed, peak, size = _profile(fn)
+            rows.append((
+                label, rows_out, f"{elapsed:.2f}", f"{peak / 1024 / 1024:.1f}", f"{size / 1024:.0f}",
+            ))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", default="20000,100000")
+    parser.add_argument("--medicines", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = []
+    for n_sales in args.sales.split(","):
+        rows += run(int(n_sales), args.medicines)
+    print_table(["report", "rows", "seconds", "peak MB", "file KB"], rows)
@@ -0,0 +1,82 @@
+"""
+Benchmark: financial statement on large sales histories.
+
+Seeds a catalog split into families and sales with N line items (half
+legacy SaleItem, half POSSaleItem) over one year, then reports SQL
+statements and p50/p95 latency of financial_statement.build_statement
+(sales mode over the year, and stock mode) and of the PDF / Excel
+renderers.
+
+Usage (from backend/):
+    python -m benchmarks.bench_financial [--lines 10000,100000] [--medicines 2000]
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select, update
+
+from benchmarks.common import NAMES, seed_catalog, seed_user, seed_sales, count_queries, measure, print_table
+from app.database import SessionLocal, engine_local
+from app.models import Medicine, MedicineFamily, POSSale, POSSaleItem, Sale, SaleItem
+from app.services import financial_statement, report_service
+
+
+def seed_lines(n_lines: int, n_medicines: int, seed: int = 42) -> None:
+    """Families for the catalog, then ~3 lines per sale until n_lines."""
+    rng = random.Random(seed)
+    with engine_local.begin() as conn:
+        conn.execute(insert(MedicineFamily), [{"id": i, "name": name} for i, name in enumerate(NAMES, 1)])
+        # 5% of the catalog stays without family
+        conn.execute(
+            update(Medicine).where(Medicine.id % 20 != 0).values(family_id=Medicine.id % len(NAMES) + 1)
+        )
+        for sale_model, item_model in ((Sale, SaleItem), (POSSale, POSSaleItem)):
+            sale_ids = conn.execute(select(sale_model.id)).scalars().all()
+            rows = []
+            for n in range(n_lines // 2):
+                qty = rng.randint(1, 5)
+                rows.append({
+                    "sale_id": sale_ids[n // 3 % len(sale_ids)],
+                    "medicine_id": rng.randint(1, n_medicines),
+                    "quantity": qty, "unit_price": 150.0, "total_price": qty * 150.0,
+                })
+            conn.execute(insert(item_model), rows)
+
+
+def run(n_lines, n_medicines):
+    seed_catalog(n_medicines)
+    user_id = seed_user()
+    seed_sales(n_lines // 3 + 1, days=365, user_id=user_id)
+    seed_lines(n_lines, n_medicines)
+
+    today = date.today()
+    year_ago = today - timedelta(days=365)
+    rows = []
+    with SessionLocal() as db:
+        for label, fn, iterations in (
+            ("statement (sales, 1 y)", lambda: financial_statement.build_statement(db, year_ago, today), 10),
+            ("statement (stock)", lambda: financial_statement.build_statement(db), 10),
+            ("PDF (sales, 1 y)", lambda: report_service.generate_financial_pdf(db, year_ago, today), 3),
+            ("Excel (sales, 1 y)", lambda: report_service.generate_financial_excel(db, year_ago, today).close(), 3),
+        ):
+            with count_queries() as counter:
+                fn()
+            timings = measure(fn, iterations=iterations)
+            rows.append((
+                n_lines, label, counter["count"], f"{timings['p50']:.1f}", f"{timings['p95']:.1f}",
+            ))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--lines", default="10000,100000")
+    parser.add_argument("--medicines", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for n_lines in args.lines.split(","):
+        rows += run(int(n_lines), args.medicines)
+    print_table(["lines", "call", "statements", "p50 ms", "p95 ms"], rows)
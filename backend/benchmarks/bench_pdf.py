@@ -0,0 +1,89 @@
+"""
+Benchmark: PDF rendering (invoices and reports).
+
+Reports p50/p95 latency of pdf_service.generate_invoice_pdf for a typical
+POS basket in A4 and 80 mm receipt format (printing must not stall the
+checkout), then duration, page count and file size of the stock and
+sales PDF reports, which paginate through pdf_render.RowTable.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pdf [--items 5,40] [--sales 20000] [--medicines 5000]
+"""
+
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.common import seed_catalog, seed_user, seed_sales, measure, print_table
+from app.database import SessionLocal
+from app.services import pdf_service, report_service
+
+
+def _invoice(n_items):
+    return {
+        "invoice_code": "FAC-2026-000001",
+        "date": datetime.now(),
+        "seller": "bench",
+        "customer": {"name": "Client Bench", "phone": "+257 00 00 00 00", "points_earned": 12},
+        "payment_method": "cash",
+        "items": [
+            {"medicine_name": f"Amoxicilline 500mg gélules {i}", "quantity": 2,
+             "unit_price": 1500.0, "total_price": 3000.0}
+            for i in range(n_items)
+        ],
+        "total_amount": 3000.0 * n_items,
+    }
+
+
+def _pages(output):
+    data = output.read()
+    output.close()
+    return data.count(b"/Type /Page\n"), len(data)
+
+
+def run_invoices(item_counts):
+    rows = []
+    for n_items in item_counts:
+        invoice = _invoice(n_items)
+        for fmt in pdf_service.INVOICE_FORMATS:
+            timings = measure(lambda: pdf_service.generate_invoice_pdf(invoice, fmt).close(), iterations=100)
+            pages, size = _pages(pdf_service.generate_invoice_pdf(invoice, fmt))
+            rows.append((
+                f"invoice {fmt} ({n_items} items)", pages,
+                f"{timings['p50']:.1f}", f"{timings['p95']:.1f}", f"{size / 1024:.0f}",
+            ))
+    return rows
+
+
+def run_reports(n_sales, n_medicines):
+    seed_catalog(n_medicines)
+    user_id = seed_user()
+    seed_sales(n_sales, days=365, user_id=user_id)
+
+    today = date.today()
+    rows = []
+    with SessionLocal() as db:
+        for label, fn in (
+            (f"stock ({n_medicines} medicines)", lambda: report_service.generate_stock_pdf(db)),
+            (f"sales 1 year ({n_sales // 2})",
+             lambda: report_service.generate_sales_pdf(db, today - timedelta(days=365), today)),
+        ):
+            start = time.perf_counter()
+            output = fn()
+            elapsed = (time.perf_counter() - start) * 1000
+            pages, size = _pages(output)
+            rows.append((label, pages, f"{elapsed:.0f}", "-", f"{size / 1024:.0f}"))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", default="5,40")
+    parser.add_argument("--sales", type=int, default=20000)
+    parser.add_argument("--medicines", type=int, default=5000)
+    args = parser.parse_args()
+
+    rows = run_invoices([int(n) for n in args.items.split(",")])
+    rows += run_reports(args.sales, args.medicines)
+    print_table(["document", "pages", "p50 ms", "p95 ms", "file KB"], rows)
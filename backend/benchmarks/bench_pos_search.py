@@ -0,0 +1,68 @@
+"""
+Benchmark: POS product search and top products.
+
+Reports the number of SQL statements and p50/p95 latency of
+pos_service.search_products / get_top_products for catalogs of
+1k, 10k and 50k medicines, first on the SQL `ilike` path (index not built),
+then through the in-memory product index.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pos_search [--sizes 1000,10000,50000]
+"""
+
+import argparse
+
+from benchmarks.common import seed_catalog, count_queries, measure, print_table
+from app.database import SessionLocal
+from app.services import pos_service
+from app.services.search_index import product_index
+
+QUERIES = ["para", "cipro 500", "MED-00012", "6000000000042"]
+
+
+def _bench_rows(db, size, mode):
+    rows = []
+    for label, fn in [
+        ("search 'para' (20)", lambda: pos_service.search_products(db, "para", 20)),
+        ("search '' (20)", lambda: pos_service.search_products(db, "", 20)),
+        ("search mixed x4", lambda: [pos_service.search_products(db, q, 20) for q in QUERIES]),
+        ("top products (10)", lambda: pos_service.get_top_products(db, 10)),
+    ]:
+        with count_queries() as counter:
+            fn()
+        timings = measure(fn, iterations=30)
+        rows.append((
+            size, mode, label, counter["count"],
+            f"{timings['p50']:.2f}", f"{timings['p95']:.2f}",
+        ))
+    return rows
+
+
+def run(sizes):
+    rows = []
+    for size in sizes:
+        seed_catalog(size)
+        db = SessionLocal()
+        try:
+            product_index.__init__()  # not built -> SQL fallback
+            rows += _bench_rows(db, size, "sql")
+
+            product_index.rebuild(db)
+            rows += _bench_rows(db, size, "index")
+
+            lookup = measure(lambda: [product_index.search(q, 20) for q in QUERIES], iterations=200)
+            rows.append((
+                size, "index", "index.search x4 only", 0,
+                f"{lookup['p50']:.3f}", f"{lookup['p95']:.3f}",
+            ))
+        finally:
+            db.close()
+
+    print_table(["catalog", "path", "operation", "queries", "p50 ms", "p95 ms"], rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,50000")
+    args = parser.parse_args()
+    run([int(s) for s in args.sizes.split(",")])
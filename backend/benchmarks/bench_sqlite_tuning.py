@@ -0,0 +1,111 @@
+"""
+Benchmark: SQLite tuning profile (WAL, synchronous=NORMAL, mmap, cache).
+
+For each profile ("default" SQLite pragmas vs the tuned profile of
+app.database.core), runs concurrent POS checkouts from several threads
+while the main thread polls the dashboard, and reports checkout
+throughput, failed checkouts (locks) and dashboard read latency.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sqlite_tuning [--threads 4] [--checkouts 50]
+"""
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import TMP_DIR, seed_catalog, seed_user, measure, print_table
+from app.database import configure_sqlite_engine, get_sqlite_pragmas
+from app.schemas.pos import CartAddRequest, POSCheckoutRequest, CheckoutItem
+from app.services import pos_service, dashboard_service
+
+
+def _make_engine(profile: str):
+    path = os.path.join(TMP_DIR, f"tuning_{profile}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if profile == "tuned":
+        configure_sqlite_engine(engine)
+    return engine
+
+
+def _checkout_worker(Session, user_id, n_medicines, n_checkouts, stats, seed):
+    rng = random.Random(seed)
+    db = Session()
+    try:
+        for _ in range(n_checkouts):
+            items = []
+            try:
+                for medicine_id in rng.sample(range(1, n_medicines + 1), 3):
+                    line = pos_service.cart_add(db, CartAddRequest(medicine_id=medicine_id, quantity=1))
+                    items.append(CheckoutItem(
+                        medicine_id=medicine_id, allocations=line.allocations,
+                        quantity=1, unit_price=max(line.unit_price, 1.0),
+                    ))
+                pos_service.checkout(db, user_id, POSCheckoutRequest(items=items))
+                stats["ok"] += 1
+            except ValueError:
+                db.rollback()
+                stats["failed"] += 1
+    finally:
+        db.close()
+
+
+def run_profile(profile, n_medicines, n_threads, n_checkouts):
+    engine = _make_engine(profile)
+    seed_catalog(n_medicines, engine=engine)
+    user_id = seed_user(engine=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    stats = {"ok": 0, "failed": 0}
+    threads = [
+        threading.Thread(target=_checkout_worker, args=(Session, user_id, n_medicines, n_checkouts, stats, i))
+        for i in range(n_threads)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    reader = Session()
+    try:
+        dashboard = measure(lambda: dashboard_service.get_stats(reader), iterations=20)
+    finally:
+        reader.close()
+
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    pragmas = get_sqlite_pragmas(engine)
+    engine.dispose()
+
+    return (
+        profile, f"{pragmas['journal_mode']}/{pragmas['synchronous']}",
+        stats["ok"], stats["failed"], f"{stats['ok'] / elapsed:.1f}",
+        f"{dashboard['p50']:.1f}", f"{dashboard['p95']:.1f}",
+    )
+
+
+if __name__ == "__main__":
+    logging.getLogger("pos_service").setLevel(logging.CRITICAL)  # failed checkouts are counted
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--medicines", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--checkouts", type=int, default=50, help="Checkouts per thread")
+    args = parser.parse_args()
+
+    rows = [
+        run_profile(profile, args.medicines, args.threads, args.checkouts)
+        for profile in ("default", "tuned")
+    ]
+    print_table(
+        ["profile", "journal/sync", "checkouts", "failed", "checkouts/s", "dash p50 ms", "dash p95 ms"],
+        rows,
+    )
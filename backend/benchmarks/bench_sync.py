@@ -0,0 +1,70 @@
+"""
+Benchmark: sync up throughput (local POS sales → cloud).
+
+Pushes a backlog of POS sales (2 items each) to a second SQLite file
+standing in for Supabase, for several chunk sizes, and reports sales/s
+and remote statements. chunk_size=1 is the old sale-by-sale behaviour.
+
+Usage (from backend/):
+    python -m benchmarks.bench_sync [--sales 20000] [--chunks 1,100,500,2000]
+"""
+
+import argparse
+import os
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import TMP_DIR, seed_catalog, seed_user, seed_sales, count_queries, print_table
+from app.database import SessionLocal, configure_sqlite_engine, engine_local
+from app.models import POSSale, POSSaleItem
+from app.sync import sync_manager
+from app.sync.sync_manager import SyncManager
+
+
+def seed_backlog(n_sales):
+    seed_catalog(100)
+    user_id = seed_user()
+    # seed_sales inserts half POS sales, half legacy sales
+    seed_sales(n_sales * 2, days=30, user_id=user_id)
+    with engine_local.begin() as conn:
+        sale_ids = conn.execute(select(POSSale.id)).scalars().all()
+        conn.execute(insert(POSSaleItem), [
+            {"sale_id": sale_id, "medicine_id": medicine_id, "quantity": 1,
+             "unit_price": 150.0, "total_price": 150.0}
+            for sale_id in sale_ids for medicine_id in (1, 2)
+        ])
+
+
+def run(n_sales, chunk_sizes):
+    seed_backlog(n_sales)
+    remote = create_engine(f"sqlite:///{os.path.join(TMP_DIR, 'remote.db')}")
+    configure_sqlite_engine(remote)
+    sync_manager.SessionRemote = sessionmaker(autocommit=False, autoflush=False, bind=remote)
+    sync_manager._remote_available = lambda: True
+
+    rows = []
+    for chunk_size in chunk_sizes:
+        # Fresh cloud and a full local backlog for every run
+        seed_catalog(100, engine=remote)
+        seed_user(engine=remote)
+        with engine_local.begin() as conn:
+            conn.execute(update(POSSale).values(sync_status="pending", synced_at=None))
+
+        with SessionLocal() as db, count_queries(remote) as remote_queries:
+            report = SyncManager.sync_up(db, chunk_size=chunk_size)
+        rows.append((
+            chunk_size, report["synced"], report["chunks"], remote_queries["count"],
+            f"{report['duration_s']:.2f}", f"{report['sales_per_second']:.0f}",
+        ))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", type=int, default=20000)
+    parser.add_argument("--chunks", default="1,100,500,2000")
+    args = parser.parse_args()
+
+    rows = run(args.sales, [int(n) for n in args.chunks.split(",")])
+    print_table(["chunk", "synced", "chunks", "remote stmts", "seconds", "sales/s"], rows)
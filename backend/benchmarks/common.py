@@ -0,0 +1,156 @@
+"""
+Shared helpers for benchmarks: throw-away database, synthetic catalog,
+query counting and latency percentiles.
+
+Importing this module points DB_URL_LOCAL to a temporary SQLite file, so it
+must be imported BEFORE any `app.*` module.
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+TMP_DIR = tempfile.mkdtemp(prefix="pharma_bench_")
+os.environ["DB_URL_LOCAL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+os.environ["DB_URL_REMOTE"] = ""
+
+from sqlalchemy import event, insert  # noqa: E402
+
+from app.database import Base, engine_local  # noqa: E402
+from app.models import Medicine, Batch, MedicinePricing, POSSale, Sale, User, UserRole  # noqa: E402
+
+NAMES = [
+    "Paracétamol", "Amoxicilline", "Ibuprofène", "Métronidazole", "Artéméther",
+    "Quinine", "Doliprane", "Cotrimoxazole", "Oméprazole", "Ciprofloxacine",
+]
+
+
+def reset_database(engine=engine_local):
+    """Drop and recreate every table of the benchmark database."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def seed_catalog(n_medicines: int, batches_per_medicine: int = 3, seed: int = 42, engine=engine_local) -> None:
+    """
+    Insert a synthetic catalog: medicines, FEFO batches and pricing rows.
+    Uses executemany inserts so 50k medicines seed in a few seconds.
+    """
+    rng = random.Random(seed)
+    reset_database(engine)
+    today = date.today()
+
+    medicines, batches, pricings = [], [], []
+    batch_id = 0
+    for i in range(1, n_medicines + 1):
+        name = f"{NAMES[i % len(NAMES)]} {rng.choice([100, 250, 500, 1000])}mg #{i}"
+        medicines.append({
+            "id": i, "code": f"MED-{i:06d}", "name": name,
+            "code_barres": f"{6000000000000 + i}",
+            "quantity": 0.0, "price_buy": 100.0, "price_sell": 150.0,
+            "min_stock_alert": 10, "expiry_alert_threshold": 30, "is_active": True,
+            "boxes_per_carton": 10, "blisters_per_box": 3, "units_per_blister": 10,
+            "units_per_packaging": 30,
+        })
+        total = 0.0
+        for b in range(batches_per_medicine):
+            batch_id += 1
+            qty = float(rng.randint(0, 200))
+            total += qty
+            batches.append({
+                "id": batch_id, "medicine_id": i, "batch_number": f"LOT-{i}-{b}",
+                "expiration_date": today + timedelta(days=rng.randint(-30, 720)),
+                "quantity": qty, "purchase_price": 3.0, "is_active": True,
+            })
+        medicines[-1]["quantity"] = total
+        for p in range(2):
+            pricings.append({
+                "medicine_id": i, "nom": name, "lot": f"LOT-{i}-{p}",
+                "vente_comprime": 5.0 + p, "vente_plaquette": 50.0, "vente_boite": 150.0,
+                "vente_carton": 1500.0, "achat_comprime": 3.0, "achat_plaquette": 30.0,
+                "achat_boite": 100.0, "achat_carton": 1000.0,
+            })
+
+    with engine.begin() as conn:
+        conn.execute(insert(Medicine), medicines)
+        conn.execute(insert(Batch), batches)
+        conn.execute(insert(MedicinePricing), pricings)
+
+
+def seed_user(username: str = "bench", engine=engine_local) -> int:
+    """Create a cashier user and return its id."""
+    with engine.begin() as conn:
+        result = conn.execute(insert(User).values(
+            username=username, password_hash="x", role=UserRole.PHARMACIST, is_active=True
+        ))
+        return result.inserted_primary_key[0]
+
+
+def seed_sales(n_sales: int, days: int, user_id: int, seed: int = 42, engine=engine_local) -> None:
+    """
+    Insert `n_sales` raw sales (half POS, half legacy) spread over the last
+    `days` days, ~5% cancelled. Sale items are not created.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    pos_sales, legacy_sales = [], []
+    for i in range(n_sales):
+        row = {
+            "code": f"BENCH-{i:08d}",
+            "total_amount": float(rng.randint(1, 200) * 100),
+            "payment_method": rng.choice(["cash", "cash", "insurance"]),
+            "date": now - timedelta(days=rng.randint(0, days - 1), minutes=rng.randint(0, 1439)),
+            "user_id": user_id,
+            "status": "cancelled" if rng.random() < 0.05 else "completed",
+        }
+        if i % 2:
+            pos_sales.append({**row, "sale_uuid": f"bench-{i:08d}"})
+        else:
+            legacy_sales.append(row)
+
+    with engine.begin() as conn:
+        conn.execute(insert(POSSale), pos_sales)
+        conn.execute(insert(Sale), legacy_sales)
+
+
+@contextmanager
+def count_queries(engine=engine_local):
+    """Count SQL statements executed on `engine` inside the block."""
+    counter = {"count": 0}
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter["count"] += 1
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+
+
+def measure(fn, iterations: int = 50) -> dict:
+    """Run `fn` several times and return latency percentiles in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "max": timings[-1],
+    }
+
+
+def print_table(headers, rows):
+    """Print a fixed-width results table."""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(str(c).ljust(w) for c, w in zip(row, widths)))
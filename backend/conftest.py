@@ -0,0 +1,62 @@
+"""
+Shared test setup.
+
+Points the app at a throw-away SQLite database before any test module
+imports it (app.database binds its engines at import time) and provides
+the fixtures that start a test from empty tables and empty in-memory
+caches:
+
+- fresh_db: per test, yields a session;
+- fresh_module_db: the same, shared by the tests of a module that only
+  read the data its fixture seeds.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+TMP_DIR = tempfile.mkdtemp(prefix="pharma_tests_")
+os.environ["DB_URL_LOCAL"] = f"sqlite:///{os.path.join(TMP_DIR, 'local.db')}"
+os.environ["DB_URL_REMOTE"] = ""
+
+import pytest
+
+from app.auth.user_cache import user_cache
+from app.core.license import license_service
+from app.database import Base, SessionLocal, engine_local
+from app.services.search_index import product_index
+from app.services.stock_holds import stock_holds
+
+
+def _reset_caches():
+    product_index.clear()
+    stock_holds.clear()
+    user_cache.invalidate()
+    license_service.invalidate()
+
+
+@contextmanager
+def _fresh_session():
+    Base.metadata.drop_all(bind=engine_local)
+    Base.metadata.create_all(bind=engine_local)
+    _reset_caches()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        _reset_caches()
+
+
+@pytest.fixture()
+def fresh_db():
+    with _fresh_session() as session:
+        yield session
+
+
+@pytest.fixture(scope="module")
+def fresh_module_db():
+    with _fresh_session() as session:
+        yield session
@@ -3,13 +3,6 @@ FastAPI application entry point.
 Main application configuration and startup.
 """
 
-from fastapi import FastAPI, Request, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
-from sqlalchemy.orm import Session
-from app.database import init_local_db, get_local_db
-from app.core.license import license_service
 import uvicorn
 import os
 import sys
@@ -17,11 +10,24 @@ import threading
 import socket
 import time
 import ctypes
+import logging
 from contextlib import asynccontextmanager
 import subprocess
+import multiprocessing
+
+# Les rapports sont générés dans des processus enfants (report_jobs, spawn).
+# Dans l'exécutable, un enfant relance ce module : freeze_support() exécute
+# le travail de l'enfant et termine le processus ici, avant la redirection
+# de console.log, setup_logging() et la construction de l'application.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+# Enfant hors exécutable (module importé sous le nom __mp_main__) : pas
+# d'effets de bord (console, second handler sur backend.log)
+IS_WORKER_PROCESS = multiprocessing.parent_process() is not None
 
 # FORCE HIDE CONSOLE ON STARTUP (ONLY IN FROZEN MODE)
-if getattr(sys, "frozen", False) and sys.platform == "win32":
+if getattr(sys, "frozen", False) and sys.platform == "win32" and not IS_WORKER_PROCESS:
     try:
         # 1. Cacher la fenêtre existante (si elle existe)
         ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
@@ -31,18 +37,35 @@ if getattr(sys, "frozen", False) and sys.platform == "win32":
     except Exception:
         pass
 
-# REDIRECT LOGS TO FILE (ONLY IN FROZEN MODE)
-if getattr(sys, "frozen", False):
+# REDIRECT STRAY OUTPUT TO FILE (ONLY IN FROZEN MODE)
+# Diagnostics go through logging (APPDATA/PharmaGestion/logs/backend.log);
+# this file only catches what third-party code writes to stdout/stderr.
+if getattr(sys, "frozen", False) and not IS_WORKER_PROCESS:
     try:
         log_dir = os.path.join(os.environ.get('APPDATA', '.'), 'PharmaGestion')
         if not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
-        log_file = open(os.path.join(log_dir, 'backend.log'), 'w')
+        log_file = open(os.path.join(log_dir, 'console.log'), 'w')
         sys.stdout = log_file
         sys.stderr = log_file
     except Exception:
         pass
 
+# Before the app imports: they may log
+from app.core.logging_config import setup_logging
+if not IS_WORKER_PROCESS:
+    setup_logging()
+logger = logging.getLogger(__name__)
+
+from fastapi import FastAPI, Request, Depends
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm import Session
+from app.database import init_local_db, get_local_db
+from app.core.license import license_service
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware, install_db_hooks
+
 # =========================
 # LIFESPAN EVENT HANDLER
 # =========================
@@ -50,17 +73,60 @@ if getattr(sys, "frozen", False):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("[*] Starting Pharmacy Management System...")
-    print("[*] Initializing local database...")
+    logger.info("Starting Pharmacy Management System...")
+    logger.info("Initializing local database...")
     try:
         init_local_db()
-        print("[OK] Local database initialized successfully!")
-        print("[OK] Application started successfully!")
+        logger.info("Local database initialized successfully!")
+        from app.database import SessionLocal
+        from app.services.search_index import product_index
+        with SessionLocal() as db:
+            product_index.rebuild(db)
+        logger.info(f"Product search index built ({len(product_index)} medicines)")
+        from app.services import sales_facts_service
+        with SessionLocal() as db:
+            backfilled = sales_facts_service.ensure_backfilled(db)
+        if backfilled:
+            logger.info(f"Dashboard sales facts backfilled ({backfilled} sales)")
+        from app.services.stock_holds import stock_holds
+        with SessionLocal() as db:
+            restored = stock_holds.restore(db)
+        stock_holds.start_sweeper(SessionLocal)
+        logger.info(f"POS stock holds restored ({restored} active)")
+        from app.services import invoice_sequence_service
+        if invoice_sequence_service.INVOICE_BLOCK_SIZE > 0:
+            from app.models.pos_sale import POSSale
+            invoice_sequence_service.enable_block_reservation("POS", POSSale.code)
+            logger.info(f"POS invoice numbers reserved in blocks of {invoice_sequence_service.INVOICE_BLOCK_SIZE}")
+        from app.database import engine_local, engine_remote
+        from app.sync.sync_worker import sync_worker, SYNC_WORKER_ENABLED
+        if engine_remote is not engine_local:
+            from app.sync import outbox
+            from app.utils.network import connectivity
+            connectivity.start()
+            logger.info("Connectivity monitor started")
+            outbox.install(SessionLocal)
+            if SYNC_WORKER_ENABLED:
+                sync_worker.start(SessionLocal)
+                logger.info("Background sync worker started")
+        logger.info("Application started successfully!")
     except Exception as e:
-        print(f"[ERROR] Error during startup: {e}")
+        logger.error(f"Error during startup: {e}")
     yield
-    # Shutdown (if needed)
-    print("[*] Shutting down...")
+    # Shutdown
+    logger.info("Shutting down...")
+    try:
+        from app.database import SessionLocal
+        from app.services.stock_holds import stock_holds
+        stock_holds.stop_sweeper(SessionLocal)
+    except Exception as e:
+        logger.error(f"Error saving stock holds: {e}")
+    from app.sync.sync_worker import sync_worker
+    sync_worker.stop()
+    from app.utils.network import connectivity
+    connectivity.stop()
+    from app.services.report_jobs import report_queue
+    report_queue.shutdown()
 
 # =========================
 # CREATE FASTAPI APP
@@ -95,6 +161,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# =========================
+# METRICS (METRICS=off to disable)
+# =========================
+
+if METRICS_ENABLED:
+    # Outermost: the latency includes the other middlewares
+    app.add_middleware(MetricsMiddleware)
+    install_db_hooks()
+
 
 # =========================
 # HEALTH CHECK
@@ -166,10 +241,10 @@ if getattr(sys, "frozen", False):
         parent_dir = os.path.dirname(exe_dir)
         parent_name = os.path.basename(parent_dir)
         
-        print(f"[DEBUG] sys.executable: {sys.executable}")
-        print(f"[DEBUG] exe_dir: {exe_dir}")
-        print(f"[DEBUG] parent_dir: {parent_dir}")
-        print(f"[DEBUG] parent_name: {parent_name}")
+        logger.debug(f"sys.executable: {sys.executable}")
+        logger.debug(f"exe_dir: {exe_dir}")
+        logger.debug(f"parent_dir: {parent_dir}")
+        logger.debug(f"parent_name: {parent_name}")
         
         if parent_name == "resources":
             # MODE PRODUCTION ELECTRON
@@ -177,8 +252,8 @@ if getattr(sys, "frozen", False):
             # Frontend dans : resources/frontend/
             resources_dir = parent_dir
             frontend_dist = os.path.join(resources_dir, "frontend")
-            print(f"[*] Mode: PRODUCTION ELECTRON")
-            print(f"[DEBUG] frontend_dist (resources/frontend): {frontend_dist}")
+            logger.info("Mode: PRODUCTION ELECTRON")
+            logger.debug(f"frontend_dist (resources/frontend): {frontend_dist}")
         else:
             # MODE DÉVELOPPEMENT (backend frozen mais lancé depuis le projet)
             # Structure : C:/projet/backend/dist/PharmaBackend.exe
@@ -187,37 +262,37 @@ if getattr(sys, "frozen", False):
             # On doit remonter encore pour atteindre C:/projet/
             project_root = os.path.dirname(parent_dir)  # Remonter de "backend" vers le projet
             frontend_dist = os.path.join(project_root, "frontend", "dist")
-            print(f"[*] Mode: DÉVELOPPEMENT (backend frozen)")
-            print(f"[DEBUG] project_root: {project_root}")
-            print(f"[DEBUG] frontend_dist (projet/frontend/dist): {frontend_dist}")
+            logger.info("Mode: DÉVELOPPEMENT (backend frozen)")
+            logger.debug(f"project_root: {project_root}")
+            logger.debug(f"frontend_dist (projet/frontend/dist): {frontend_dist}")
     else:
         # Mode standalone PyInstaller
         frontend_dist = os.path.join(sys._MEIPASS, "frontend_dist")
-        print(f"[DEBUG] Mode standalone - frontend_dist: {frontend_dist}")
+        logger.debug(f"Mode standalone - frontend_dist: {frontend_dist}")
 else:
     # Mode développement (Python script direct)
     frontend_dist = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend", "dist")
-    print(f"[DEBUG] Mode développement (script) - frontend_dist: {frontend_dist}")
+    logger.debug(f"Mode développement (script) - frontend_dist: {frontend_dist}")
 
-print(f"[*] Frontend path résolu: {frontend_dist}")
-print(f"[*] Frontend path existe: {os.path.exists(frontend_dist)}")
+logger.info(f"Frontend path résolu: {frontend_dist}")
+logger.info(f"Frontend path existe: {os.path.exists(frontend_dist)}")
 
 index_html_path = os.path.join(frontend_dist, "index.html")
-print(f"[*] index.html path: {index_html_path}")
-print(f"[*] index.html existe: {os.path.exists(index_html_path)}")
+logger.info(f"index.html path: {index_html_path}")
+logger.info(f"index.html existe: {os.path.exists(index_html_path)}")
 
 if os.path.exists(frontend_dist) and not os.path.exists(index_html_path):
-    print(f"[WARNING] Le dossier frontend existe mais index.html est manquant")
+    logger.warning("Le dossier frontend existe mais index.html est manquant")
     try:
-        print(f"[WARNING] Contenu du dossier: {os.listdir(frontend_dist)}")
+        logger.warning(f"Contenu du dossier: {os.listdir(frontend_dist)}")
     except Exception as e:
-        print(f"[ERROR] Impossible de lister le contenu: {e}")
+        logger.error(f"Impossible de lister le contenu: {e}")
 
 if (
     os.path.exists(frontend_dist)
     and os.path.exists(index_html_path)
 ):
-    print("[OK] Frontend trouvé et prêt à être servi!")
+    logger.info("Frontend trouvé et prêt à être servi!")
 
     assets_path = os.path.join(frontend_dist, "assets")
     if os.path.exists(assets_path):
@@ -226,7 +301,7 @@ if (
             StaticFiles(directory=assets_path),
             name="assets"
         )
-        print(f"[OK] Assets montés depuis: {assets_path}")
+        logger.info(f"Assets montés depuis: {assets_path}")
 
     # Custom 404 handler for SPA
     # If a route is not found (and not an API/asset path), serve index.html
@@ -244,14 +319,14 @@ if (
         return FileResponse(os.path.join(frontend_dist, "index.html"))
 
 else:
-    print("[WARNING] Frontend dist folder not found. Running API only.")
-    print(f"[WARNING] Chemin recherché: {frontend_dist}")
+    logger.warning("Frontend dist folder not found. Running API only.")
+    logger.warning(f"Chemin recherché: {frontend_dist}")
     if os.path.exists(frontend_dist):
-        print(f"[WARNING] Le dossier existe mais index.html est manquant")
+        logger.warning("Le dossier existe mais index.html est manquant")
         try:
-            print(f"[WARNING] Contenu du dossier: {os.listdir(frontend_dist)}")
+            logger.warning(f"Contenu du dossier: {os.listdir(frontend_dist)}")
         except Exception as e:
-            print(f"[ERROR] Impossible de lister le contenu: {e}")
+            logger.error(f"Impossible de lister le contenu: {e}")
 
 # =========================
 # DESKTOP LAUNCHER
@@ -281,7 +356,7 @@ def kill_process_on_port(port):
         time.sleep(2)
         return True
     except Exception as e:
-        print(f"[WARNING] Could not kill process on port {port}: {e}")
+        logger.warning(f"Could not kill process on port {port}: {e}")
     return False
 
 def run_api(port):
@@ -304,46 +379,48 @@ if __name__ == "__main__":
     # Par défaut, on force le port 8000 pour la production
     PORT = 8000
     
-    print(f"[*] ===== DEMARRAGE DE PHARMAGESTION BACKEND =====")
-    print(f"[*] Frozen mode: {IS_FROZEN}")
-    print(f"[*] Target Port: {PORT}")
+    logger.info("===== DEMARRAGE DE PHARMAGESTION BACKEND =====")
+    logger.info(f"Frozen mode: {IS_FROZEN}")
+    logger.info(f"Target Port: {PORT}")
 
     if IS_FROZEN:
-        print(f"[*] Demarrage en mode PRODUCTION (Frozen)")
+        logger.info("Demarrage en mode PRODUCTION (Frozen)")
         
         # Kill any existing process on port 8000
         if is_port_in_use(PORT):
-            print(f"[WARNING] Port {PORT} already in use, attempting to free it...")
+            logger.warning(f"Port {PORT} already in use, attempting to free it...")
             kill_process_on_port(PORT)
             time.sleep(1)
             if is_port_in_use(PORT):
-                print(f"[ERROR] Could not free port {PORT}")
+                logger.error(f"Could not free port {PORT}")
         
-        print(f"[*] Le serveur ecoute sur http://127.0.0.1:{PORT}")
+        logger.info(f"Le serveur ecoute sur http://127.0.0.1:{PORT}")
         try:
             uvicorn.run(
                 app,
                 host="127.0.0.1",
                 port=PORT,
-                reload=False
+                reload=False,
+                log_config=None
             )
         except Exception as e:
-            print(f"[ERROR] CRITICAL: Failed to start server on port {PORT}")
-            print(f"[ERROR] Detail: {e}")
+            logger.critical(f"Failed to start server on port {PORT}")
+            logger.error(f"Detail: {e}")
             raise
             
     else:
         # Mode développement (python main.py)
         try:
             PORT = 8000
-            print(f"[*] Demarrage en mode DEV sur port {PORT}")
+            logger.info(f"Demarrage en mode DEV sur port {PORT}")
             uvicorn.run(
                 "main:app",
                 host="127.0.0.1",
                 port=PORT,
-                reload=True
+                reload=True,
+                log_config=None
             )
         except OSError:
             PORT = find_free_port()
-            print(f"[*] Port 8000 occupe, bascule sur {PORT}")
+            logger.info(f"Port 8000 occupe, bascule sur {PORT}")
             run_api(PORT)
@@ -6,6 +6,7 @@ Il démarre uniquement l'API FastAPI sans le code Desktop Windows.
 Start Command Render : uvicorn render_main:app --host 0.0.0.0 --port $PORT
 """
 
+import logging
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -15,6 +16,11 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
+# Avant les imports de l'application : ils peuvent journaliser
+from app.core.logging_config import setup_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Rate limiter global — partagé avec les routes
 limiter = Limiter(key_func=get_remote_address)
 
@@ -55,14 +61,14 @@ from app.database import init_local_db
 @asynccontextmanager
 async def lifespan(application: FastAPI):
     """Initialise la base de données au démarrage."""
-    print("[Render] Démarrage PharmaGestion API...")
+    logger.info("Démarrage PharmaGestion API...")
     try:
         # Toujours init la DB locale (SQLite — même si éphémère, nécessaire pour les sessions)
         from app.database import init_local_db
         init_local_db()
-        print("[Render] DB locale (SQLite) initialisée.")
+        logger.info("DB locale (SQLite) initialisée.")
     except Exception as e:
-        print(f"[Render][WARNING] SQLite init warning: {e}")
+        logger.warning(f"SQLite init warning: {e}")
 
     try:
         # Init la DB remote (PostgreSQL Render) si configurée
@@ -71,9 +77,9 @@ async def lifespan(application: FastAPI):
         db_remote = os.getenv("DB_URL_REMOTE", "")
         if db_remote and "postgresql" in db_remote:
             init_remote_db()
-            print("[Render] DB remote (PostgreSQL) initialisée.")
+            logger.info("DB remote (PostgreSQL) initialisée.")
     except Exception as e:
-        print(f"[Render][WARNING] Remote DB init warning: {e}")
+        logger.warning(f"Remote DB init warning: {e}")
 
     try:
         # Sync legacy stock au démarrage (une seule fois, pas à chaque recherche)
@@ -82,13 +88,63 @@ async def lifespan(application: FastAPI):
         with SessionLocal() as _db:
             created = sync_legacy_stock(_db)
             if created:
-                print(f"[Render] {created} lot(s) auto-créé(s) via sync_legacy_stock.")
+                logger.info(f"{created} lot(s) auto-créé(s) via sync_legacy_stock.")
+    except Exception as e:
+        logger.warning(f"sync_legacy_stock at startup: {e}")
+
+    try:
+        # Index de recherche produits en mémoire (POS / stock)
+        from app.database import SessionLocal
+        from app.services.search_index import product_index
+        with SessionLocal() as _db:
+            product_index.rebuild(_db)
+        logger.info(f"Index de recherche construit ({len(product_index)} produits).")
+    except Exception as e:
+        logger.warning(f"Search index build: {e}")
+
+    try:
+        # Tables de faits du tableau de bord (remplies une fois si vides)
+        from app.database import SessionLocal
+        from app.services import sales_facts_service
+        with SessionLocal() as _db:
+            backfilled = sales_facts_service.ensure_backfilled(_db)
+        if backfilled:
+            logger.info(f"Faits de ventes reconstruits ({backfilled} ventes).")
     except Exception as e:
-        print(f"[Render][WARNING] sync_legacy_stock at startup: {e}")
+        logger.warning(f"Sales facts backfill: {e}")
 
-    print("[Render] API prête ✅")
+    try:
+        # Réservations de stock des paniers POS (mémoire + snapshot en base)
+        from app.database import SessionLocal
+        from app.services.stock_holds import stock_holds
+        with SessionLocal() as _db:
+            restored = stock_holds.restore(_db)
+        stock_holds.start_sweeper(SessionLocal)
+        logger.info(f"Réservations de stock restaurées ({restored} actives).")
+    except Exception as e:
+        logger.warning(f"Stock holds: {e}")
+
+    try:
+        # Numérotation POS par blocs réservés (INVOICE_BLOCK_SIZE > 0)
+        from app.services import invoice_sequence_service
+        if invoice_sequence_service.INVOICE_BLOCK_SIZE > 0:
+            from app.models.pos_sale import POSSale
+            invoice_sequence_service.enable_block_reservation("POS", POSSale.code)
+            logger.info(f"Numéros de facture POS réservés par blocs de {invoice_sequence_service.INVOICE_BLOCK_SIZE}.")
+    except Exception as e:
+        logger.warning(f"Invoice blocks: {e}")
+
+    logger.info("API prête ✅")
     yield
-    print("[Render] Arrêt du serveur.")
+    try:
+        from app.database import SessionLocal
+        from app.services.stock_holds import stock_holds
+        stock_holds.stop_sweeper(SessionLocal)
+    except Exception as e:
+        logger.warning(f"Sauvegarde des réservations: {e}")
+    from app.services.report_jobs import report_queue
+    report_queue.shutdown()
+    logger.info("Arrêt du serveur.")
 
 
 
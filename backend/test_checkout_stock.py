@@ -0,0 +1,120 @@
+"""
+Checkout stock deduction test.
+
+Runs pos_service.checkout against a throw-away SQLite database and checks
+the guarantees of the guarded lot deduction: a lot drained by a
+concurrent sale after validation makes the whole checkout roll back (no
+sale, items, movements, facts or invoice number left behind), the same
+lot on several cart lines is checked on the cumulated quantity, and the
+medicine total is floored at 0.
+
+Run: python -m pytest -q test_checkout_stock.py
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func, update
+
+from app.models import Batch, Medicine, User, UserRole
+from app.models.pos_sale import POSSale, POSSaleItem
+from app.models.sales_fact import SalesDailyFact
+from app.models.stock_movement import StockMovement
+from app.schemas.pos import BatchAllocation, CheckoutItem, POSCheckoutRequest
+from app.services import pos_service
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    session.add(User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True))
+    session.add(Medicine(code="MED-1", name="Amoxicilline", quantity=15, price_buy=1, price_sell=2))
+    session.flush()
+    expiry = date.today() + timedelta(days=365)
+    session.add_all([
+        Batch(medicine_id=1, batch_number="L1", quantity=5, expiration_date=expiry, is_active=True),
+        Batch(medicine_id=1, batch_number="L2", quantity=10, expiration_date=expiry, is_active=True),
+    ])
+    session.commit()
+    return session
+
+
+def _item(*allocations, unit_price=2):
+    quantity = sum(q for _, q in allocations)
+    return CheckoutItem(
+        medicine_id=1, quantity=quantity, unit_price=unit_price,
+        allocations=[BatchAllocation(batch_id=b, quantity=q) for b, q in allocations],
+    )
+
+
+def _checkout(db, *items):
+    return pos_service.checkout(db, 1, POSCheckoutRequest(items=list(items)))
+
+
+def _stock(db):
+    db.expire_all()
+    batches = {b.batch_number: (b.quantity, b.is_active) for b in db.query(Batch)}
+    return db.query(Medicine.quantity).scalar(), batches
+
+
+def _count(db, model):
+    return db.query(func.count(model.id)).scalar()
+
+
+def _drain_before_deduction(monkeypatch, batch_id, left):
+    """Simulate a concurrent sale committed between validation and the guarded UPDATE."""
+    original = pos_service._apply_batch_deductions
+
+    def racing(db, deductions):
+        db.execute(update(Batch).where(Batch.id == batch_id).values(quantity=left))
+        return original(db, deductions)
+
+    monkeypatch.setattr(pos_service, "_apply_batch_deductions", racing)
+
+
+def test_lost_race_rolls_back_everything(db, monkeypatch):
+    _drain_before_deduction(monkeypatch, batch_id=2, left=1)
+
+    with pytest.raises(ValueError, match="vente concurrente"):
+        # L1 still holds its 5, L2 no longer holds 4: nothing is kept
+        _checkout(db, _item((1, 5), (2, 4)))
+
+    assert _stock(db) == (15, {"L1": (5, True), "L2": (10, True)})
+    for model in (POSSale, POSSaleItem, StockMovement, SalesDailyFact):
+        assert _count(db, model) == 0
+
+    # The rolled-back sale used no invoice number
+    monkeypatch.undo()
+    assert _checkout(db, _item((1, 1))).code.endswith("-0001")
+
+
+def test_guard_refuses_a_drained_single_lot(db, monkeypatch):
+    _drain_before_deduction(monkeypatch, batch_id=1, left=0)
+
+    with pytest.raises(ValueError, match="vente concurrente"):
+        _checkout(db, _item((1, 5)))
+    assert _stock(db)[1]["L1"] == (5, True)
+    assert _count(db, POSSale) == 0
+
+
+def test_same_lot_on_several_lines_is_checked_cumulated(db):
+    with pytest.raises(ValueError, match="Demandé: 6"):
+        _checkout(db, _item((1, 3)), _item((1, 3)))
+    assert _count(db, POSSale) == 0
+
+    sale = _checkout(db, _item((1, 3)), _item((1, 2), (2, 1)))
+    assert _stock(db) == (9, {"L1": (0, False), "L2": (9, True)})
+    assert _count(db, POSSaleItem) == 3
+    movements = db.query(StockMovement.batch_id, func.sum(StockMovement.quantite)).filter(
+        StockMovement.reference == sale.code
+    ).group_by(StockMovement.batch_id).all()
+    assert sorted(movements) == [(1, -5), (2, -1)]
+
+
+def test_medicine_total_is_floored_at_zero(db):
+    # Total out of step with the lots (legacy data): never negative
+    db.query(Medicine).update({"quantity": 2})
+    db.commit()
+
+    _checkout(db, _item((2, 4)))
+    assert _stock(db) == (0, {"L1": (5, True), "L2": (6, True)})
@@ -0,0 +1,117 @@
+"""
+Financial statement test.
+
+Seeds families, legacy and POS sales (one cancelled, one outside the
+period) in a throw-away SQLite database and checks the per-family
+quantities, rates and values of build_statement, in one SQL query, and
+that the PDF / Excel renderers build from the same statement.
+
+Run: python -m pytest -q test_financial_statement.py
+"""
+
+from datetime import date, datetime, timedelta
+
+import openpyxl
+import pytest
+from sqlalchemy import event
+
+from app.database import engine_local
+from app.models import Medicine, MedicineFamily, POSSale, POSSaleItem, Sale, SaleItem, User, UserRole
+from app.services import financial_statement, report_service
+
+TODAY = date.today()
+
+
+@pytest.fixture(scope="module")
+def db(fresh_module_db):
+    session = fresh_module_db
+
+    user = User(username="bilan", password_hash="x", role=UserRole.ADMIN, is_active=True)
+    antibio = MedicineFamily(name="Antibiotiques")
+    antalg = MedicineFamily(name="Antalgiques")
+    session.add_all([user, antibio, antalg])
+    session.flush()
+    amox = Medicine(code="AMOX", name="Amoxicilline", quantity=40, price_buy=50, price_sell=100, family_id=antibio.id)
+    para = Medicine(code="PARA", name="Paracétamol", quantity=10, price_buy=5, price_sell=20, family_id=antalg.id)
+    misc = Medicine(code="MISC", name="Compresses", quantity=5, price_buy=1, price_sell=3)
+    session.add_all([amox, para, misc])
+    session.flush()
+
+    now = datetime.utcnow()
+
+    def legacy(status, when, lines):
+        sale = Sale(code=f"INV-{status}-{when:%j%H%M%S%f}", total_amount=0, user_id=user.id,
+                    status=status, date=when)
+        session.add(sale)
+        session.flush()
+        for med, qty, total in lines:
+            session.add(SaleItem(sale_id=sale.id, medicine_id=med.id, quantity=qty,
+                                 unit_price=total / qty, total_price=total))
+
+    def pos(status, when, lines):
+        sale = POSSale(code=f"POS-{status}-{when:%j%H%M%S%f}", total_amount=0, user_id=user.id,
+                       status=status, date=when)
+        session.add(sale)
+        session.flush()
+        for med, qty, total in lines:
+            session.add(POSSaleItem(sale_id=sale.id, medicine_id=med.id, quantity=qty,
+                                    unit_price=total / qty, total_price=total))
+
+    legacy("completed", now, [(amox, 2, 200), (para, 5, 100)])
+    pos("completed", now - timedelta(minutes=1), [(amox, 3, 270), (misc, 4, 12)])
+    legacy("cancelled", now - timedelta(minutes=2), [(amox, 50, 5000)])
+    pos("cancelled", now - timedelta(minutes=3), [(para, 50, 1000)])
+    pos("completed", now - timedelta(days=40), [(amox, 7, 700)])
+    session.commit()
+
+    return session
+
+
+def _by_name(statement):
+    return {
+        family.name: {line.name: (line.quantity, round(line.rate, 2), line.value) for line in family.lines}
+        for family in statement.families
+    }
+
+
+def test_sales_statement_merges_legacy_and_pos_in_one_query(db):
+    queries = []
+
+    def _count(*args):
+        queries.append(args[2])
+
+    event.listen(engine_local, "before_cursor_execute", _count)
+    try:
+        statement = financial_statement.build_statement(db, TODAY - timedelta(days=7), TODAY)
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _count)
+
+    assert len(queries) == 1
+    assert _by_name(statement) == {
+        "Antalgiques": {"Paracétamol": (5, 20.0, 100)},
+        "Antibiotiques": {"Amoxicilline": (5, 94.0, 470)},
+        financial_statement.NO_FAMILY: {"Compresses": (4, 3.0, 12)},
+    }
+    assert statement.mode == "sales"
+    assert statement.grand_total == 582
+    assert [f.value for f in statement.families] == [100, 470, 12]
+
+
+def test_stock_statement_values_active_stock(db):
+    statement = financial_statement.build_statement(db)
+    assert statement.mode == "stock"
+    assert _by_name(statement)["Antibiotiques"] == {"Amoxicilline": (40, 100.0, 4000)}
+    assert statement.grand_total == 40 * 100 + 10 * 20 + 5 * 3
+
+
+def test_excel_renders_the_statement(db):
+    output = report_service.generate_financial_excel(db, TODAY - timedelta(days=7), TODAY)
+    ws = openpyxl.load_workbook(output).active
+    rows = [tuple(cell.value for cell in row) for row in ws.iter_rows(min_row=2)]
+    assert rows[-1] == ("Grand Total", None, None, None, 582)
+    assert ("Antibiotiques", "Amoxicilline", 5, 94, 470) in rows
+
+
+def test_pdf_renders_the_statement(db):
+    output = report_service.generate_financial_pdf(db, TODAY - timedelta(days=7), TODAY)
+    assert output.read(5) == b"%PDF-"
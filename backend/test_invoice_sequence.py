@@ -0,0 +1,179 @@
+"""
+Invoice numbering concurrency test.
+
+Hammers pos_service.checkout from many threads against a throw-away SQLite
+database and checks that the POS codes handed out are duplicate-free and
+gap-free (POS-YYYY-0001 .. POS-YYYY-N), including when some sales are
+rolled back after taking their number, that reserved blocks never
+overlap and that checkout mints from the block when it is enabled.
+
+Run: python -m pytest -q test_invoice_sequence.py
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Medicine, Batch, POSSale, User, UserRole
+from app.schemas.pos import CartAddRequest, POSCheckoutRequest, CheckoutItem
+from app.services import pos_service, invoice_sequence_service
+
+THREADS = 8
+CHECKOUTS_PER_THREAD = 25
+YEAR = datetime.now().year
+
+
+@pytest.fixture()
+def user_id(fresh_db):
+    session = fresh_db
+    user = User(username="seq", password_hash="x", role=UserRole.PHARMACIST, is_active=True)
+    session.add(user)
+    for i in range(1, 11):
+        med = Medicine(code=f"MED-{i:04d}", name=f"Amoxicilline {i}", quantity=10000,
+                       price_buy=1, price_sell=2)
+        session.add(med)
+        session.flush()
+        session.add(Batch(medicine_id=med.id, batch_number=f"L{i}", quantity=10000,
+                          expiration_date=date.today() + timedelta(days=365), is_active=True))
+    session.commit()
+    return user.id
+
+
+def _sell_one(db, user_id, medicine_id, unit_price=2):
+    line = pos_service.cart_add(db, CartAddRequest(medicine_id=medicine_id, quantity=1))
+    return pos_service.checkout(db, user_id, POSCheckoutRequest(items=[CheckoutItem(
+        medicine_id=medicine_id, allocations=line.allocations, quantity=1, unit_price=unit_price,
+    )]))
+
+
+def _pos_codes():
+    session = SessionLocal()
+    try:
+        return [code for (code,) in session.query(POSSale.code)]
+    finally:
+        session.close()
+
+
+def _expected(n):
+    return [invoice_sequence_service.format_invoice_code("POS", YEAR, i) for i in range(1, n + 1)]
+
+
+def _hammer(worker):
+    errors = []
+
+    def run(index):
+        try:
+            worker(index)
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(repr(e))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_concurrent_checkouts_get_gap_free_unique_codes(user_id):
+    def worker(index):
+        db = SessionLocal()
+        try:
+            for n in range(CHECKOUTS_PER_THREAD):
+                _sell_one(db, user_id, (index + n) % 10 + 1)
+        finally:
+            db.close()
+
+    _hammer(worker)
+    assert sorted(_pos_codes()) == _expected(THREADS * CHECKOUTS_PER_THREAD)
+
+
+def test_rolled_back_checkout_releases_its_number(user_id, monkeypatch):
+    allocated = []
+    original_code = pos_service.generate_pos_invoice_code
+    original_record = pos_service.sales_facts_service.record_sale
+
+    def generate(db):
+        code = original_code(db)
+        allocated.append(code)
+        return code
+
+    def record_sale(db, source, sale):
+        # Fails after the number, the stock and the items are written
+        if sale.total_amount == 3:
+            raise RuntimeError("disque plein")
+        return original_record(db, source, sale)
+
+    monkeypatch.setattr(pos_service, "generate_pos_invoice_code", generate)
+    monkeypatch.setattr(pos_service.sales_facts_service, "record_sale", record_sale)
+
+    def worker(index):
+        db = SessionLocal()
+        try:
+            for n in range(CHECKOUTS_PER_THREAD):
+                medicine_id = (index + n) % 10 + 1
+                if n % 5 == 0:
+                    with pytest.raises(ValueError, match="disque plein"):
+                        _sell_one(db, user_id, medicine_id, unit_price=3)
+                else:
+                    _sell_one(db, user_id, medicine_id)
+        finally:
+            db.close()
+
+    _hammer(worker)
+    sold = THREADS * (CHECKOUTS_PER_THREAD - CHECKOUTS_PER_THREAD // 5)
+    # Every failed checkout had taken a number, and gave it back
+    assert len(allocated) == THREADS * CHECKOUTS_PER_THREAD
+    assert sorted(_pos_codes()) == _expected(sold)
+
+
+def test_counter_starts_after_existing_codes(user_id):
+    db = SessionLocal()
+    try:
+        db.add(POSSale(code=f"POS-{YEAR}-0041", total_amount=1, user_id=user_id))
+        db.commit()
+        assert _sell_one(db, user_id, 1).code == f"POS-{YEAR}-0042"
+        assert _sell_one(db, user_id, 1).code == f"POS-{YEAR}-0043"
+    finally:
+        db.close()
+
+
+def test_reserved_blocks_do_not_overlap(user_id):
+    tills = [
+        invoice_sequence_service.InvoiceBlockAllocator("POS", POSSale.code, 7, SessionLocal)
+        for _ in range(THREADS)
+    ]
+    minted = [[] for _ in tills]
+
+    def worker(index):
+        for _ in range(CHECKOUTS_PER_THREAD):
+            minted[index].append(tills[index].next_code())
+
+    _hammer(worker)
+    codes = [code for till in minted for code in till]
+    assert len(set(codes)) == len(codes)
+
+    # Later in-transaction codes continue after every reserved block
+    db = SessionLocal()
+    try:
+        reserved = len(codes) + sum(till.remaining for till in tills)
+        assert pos_service.generate_pos_invoice_code(db) == f"POS-{YEAR}-{reserved + 1:04d}"
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_checkout_mints_from_the_reserved_block(user_id):
+    invoice_sequence_service.enable_block_reservation("POS", POSSale.code, 5)
+    db = SessionLocal()
+    try:
+        codes = [_sell_one(db, user_id, 1).code for _ in range(3)]
+        assert codes == _expected(3)
+        # The whole block is taken from the counter, the rest stays in memory
+        invoice_sequence_service.disable_block_reservation("POS")
+        assert _sell_one(db, user_id, 1).code == f"POS-{YEAR}-0006"
+    finally:
+        invoice_sequence_service.disable_block_reservation("POS")
+        db.close()
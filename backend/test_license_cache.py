@@ -0,0 +1,105 @@
+"""
+License cache test.
+
+Runs the auth dependency chain against a throw-away SQLite database: once
+warm, the license check costs no query, writes through /admin/license,
+/settings and /license/update are seen by the next request, and
+days_remaining follows the calendar without any write.
+
+Run: python -m pytest -q test_license_cache.py
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.auth.dependencies import get_current_active_user
+from app.core import license as license_module
+from app.core.license import license_service
+from app.database import engine_local
+from app.models import Settings, User, UserRole
+from app.routes import admin, license as license_routes, settings as settings_routes
+from app.schemas.settings import SettingsUpdate
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    session.add_all([
+        User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True),
+        User(username="root", password_hash="x", role=UserRole.SUPER_ADMIN, is_active=True),
+        Settings(key="license_expiry_date", value=(date.today() + timedelta(days=200)).isoformat()),
+        Settings(key="license_warning_bdays", value="30"),
+    ])
+    session.commit()
+    return session
+
+
+def _user(db, username):
+    return db.query(User).filter(User.username == username).one()
+
+
+def _check(db, user):
+    return asyncio.run(get_current_active_user(user, db))
+
+
+def test_warm_license_check_costs_no_query(db):
+    user = _user(db, "caisse")
+    statements = []
+
+    def _count(*args):
+        statements.append(args[2])
+
+    event.listen(engine_local, "before_cursor_execute", _count)
+    try:
+        _check(db, user)
+        cold = len(statements)
+        for _ in range(10):
+            _check(db, user)
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _count)
+
+    assert cold == 1
+    assert len(statements) == 1
+
+
+def test_admin_license_write_is_seen_by_next_request(db):
+    user = _user(db, "caisse")
+    _check(db, user)
+
+    asyncio.run(admin.update_license(admin.LicenseUpdate(expiry_date=date.today() - timedelta(days=1)),
+                                     _user(db, "root"), db))
+    with pytest.raises(HTTPException) as exc:
+        _check(db, user)
+    assert exc.value.status_code == 403
+
+
+def test_settings_and_license_update_invalidate(db):
+    assert license_service.get_license_status(db)["status"] == "valid"
+
+    asyncio.run(settings_routes.update_settings(
+        SettingsUpdate(license_warning_bdays=365, license_warning_message="Renouvelez"), _user(db, "root"), db,
+    ))
+    status = license_service.get_license_status(db)
+    assert (status["status"], status["message"]) == ("warning", "Renouvelez")
+
+    expiry = (date.today() + timedelta(days=10)).isoformat()
+    asyncio.run(license_routes.update_license(expiry, 5, None, _user(db, "root"), db))
+    status = license_service.get_license_status(db)
+    assert (status["status"], status["days_remaining"]) == ("valid", 10)
+
+
+def test_days_remaining_follows_the_calendar(db, monkeypatch):
+    assert license_service.get_license_status(db)["days_remaining"] == 200
+
+    class _Later(date):
+        @classmethod
+        def today(cls):
+            return date.fromordinal(date.today().toordinal() + 171)
+
+    monkeypatch.setattr(license_module, "date", _Later)
+    status = license_service.get_license_status(db)
+    assert (status["status"], status["days_remaining"]) == ("warning", 29)
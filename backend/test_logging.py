@@ -0,0 +1,108 @@
+"""
+Logging setup test.
+
+Routes records through the queue to a size-rotated file in a temporary
+directory: per-module levels apply, records are written by the listener
+thread, files rotate, JSON lines carry `extra=` fields and the auth
+dependency chain no longer prints.
+
+Run: python -m pytest -q test_logging.py
+"""
+
+import asyncio
+import json
+from datetime import date, timedelta
+import logging
+import os
+import threading
+
+import pytest
+
+from app.core import logging_config
+from app.core.logging_config import JsonFormatter, parse_levels, setup_logging, shutdown_logging
+
+
+@pytest.fixture()
+def log_dir(tmp_path):
+    yield str(tmp_path)
+    shutdown_logging()
+    for name in ("app", "app.sync", "app.auth"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def _lines(log_dir):
+    with open(os.path.join(log_dir, logging_config.LOG_FILE_NAME), encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_records_go_through_the_queue_with_module_levels(log_dir):
+    listener = setup_logging(level="INFO", levels={"app.sync": "DEBUG", "app.auth": "WARNING"},
+                             log_dir=log_dir, console=False)
+    writers = []
+    handler = listener.handlers[0]
+    emit = handler.emit
+    handler.emit = lambda record: (writers.append(threading.current_thread().name), emit(record))[1]
+
+    logging.getLogger("app.sync.sync_worker").debug("passe %s", 1)
+    logging.getLogger("app.auth.dependencies").info("ignoré")
+    logging.getLogger("app.services.pos_service").info("checkout %s", "POS-1")
+    shutdown_logging()
+
+    lines = _lines(log_dir)
+    assert len(lines) == 2
+    assert lines[0].endswith("app.sync.sync_worker: passe 1")
+    assert "INFO" in lines[1] and lines[1].endswith("checkout POS-1")
+    # Written by the listener thread, not the caller
+    assert threading.current_thread().name not in writers
+
+
+def test_disabled_level_is_a_level_check(log_dir):
+    setup_logging(level="INFO", log_dir=log_dir, console=False)
+    logger = logging.getLogger("app.auth.dependencies")
+
+    class _Expensive:
+        def __str__(self):
+            raise AssertionError("message built for a disabled level")
+
+    assert not logger.isEnabledFor(logging.DEBUG)
+    logger.debug("user %s", _Expensive())
+
+
+def test_files_rotate(log_dir, monkeypatch):
+    monkeypatch.setattr(logging_config, "LOG_FILE_MAX_BYTES", 2000)
+    monkeypatch.setattr(logging_config, "LOG_FILE_BACKUPS", 2)
+    setup_logging(level="INFO", log_dir=log_dir, console=False)
+    for i in range(200):
+        logging.getLogger("app.test").info("ligne %04d %s", i, "x" * 40)
+    shutdown_logging()
+
+    files = sorted(os.listdir(log_dir))
+    assert files == ["backend.log", "backend.log.1", "backend.log.2"]
+    assert all(os.path.getsize(os.path.join(log_dir, f)) <= 2000 for f in files)
+
+
+def test_json_lines_carry_extra_fields():
+    record = logging.LogRecord("app.sync", logging.INFO, __file__, 1, "lot %s envoyé", (3,), None)
+    record.sales = 500
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert (entry["level"], entry["logger"], entry["message"], entry["sales"]) == ("INFO", "app.sync", "lot 3 envoyé", 500)
+
+
+def test_parse_levels():
+    assert parse_levels("app.sync=debug, sqlalchemy.engine=INFO,,bad") == {
+        "app.sync": "DEBUG", "sqlalchemy.engine": "INFO",
+    }
+
+
+def test_auth_chain_does_not_print(fresh_db, capsys):
+    from app.auth.dependencies import get_current_active_user
+    from app.auth.user_cache import UserPrincipal
+    from app.models import Settings
+
+    fresh_db.add(Settings(key="license_expiry_date", value=(date.today() + timedelta(days=365)).isoformat()))
+    fresh_db.commit()
+    user = UserPrincipal(id=1, username="caisse", role="pharmacist", is_active=True,
+                         must_change_password=False, token_version=0)
+    asyncio.run(get_current_active_user(user, fresh_db))
+    assert capsys.readouterr().out == ""
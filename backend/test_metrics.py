@@ -0,0 +1,138 @@
+"""
+Metrics test.
+
+Drives MetricsMiddleware through a small FastAPI app on a throw-away
+SQLite database: requests are labelled by route template and status,
+their SQL statements are counted, the in-flight gauge goes back to zero,
+a checkout bumps its counters, the sync backlog and cache collectors
+show up in both exports and failed statements leave no timing state on
+pooled connections.
+
+Run: python -m pytest -q test_metrics.py
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core.metrics import MetricsMiddleware, MetricsRegistry, install_db_hooks, metrics, uninstall_db_hooks
+from app.database import SessionLocal, engine_local
+from app.models import Batch, Medicine, User, UserRole
+from app.routes import metrics as metrics_routes
+from app.schemas.pos import CartAddRequest, CheckoutItem, POSCheckoutRequest
+from app.services import pos_service
+
+
+@pytest.fixture()
+def db(fresh_db):
+    install_db_hooks()
+    metrics.reset()
+    session = fresh_db
+    session.add(User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True))
+    session.commit()
+    yield session
+    uninstall_db_hooks()
+
+
+def _series(snapshot, name, **labels):
+    wanted = {k: str(v) for k, v in labels.items()}
+    return [s for s in snapshot[name]["series"] if s["labels"] == wanted]
+
+
+def test_prometheus_rendering():
+    registry = MetricsRegistry()
+    registry.describe("demo_total", "counter", "Demo counter.")
+    registry.describe("demo_ms", "histogram", "Demo latency.", buckets=(10, 100))
+    registry.inc("demo_total", route='/a"b', status=200)
+    registry.inc("demo_total", 2, route='/a"b', status=200)
+    for value in (5, 50, 500):
+        registry.observe("demo_ms", value, route="/x")
+    registry.register_collector(lambda: [("demo_backlog", "gauge", "Demo gauge.", {}, 7)])
+
+    lines = registry.render_prometheus().splitlines()
+    assert "# TYPE demo_total counter" in lines
+    assert 'demo_total{route="/a\\"b",status="200"} 3' in lines
+    assert 'demo_ms_bucket{route="/x",le="10"} 1' in lines
+    assert 'demo_ms_bucket{route="/x",le="100"} 2' in lines
+    assert 'demo_ms_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'demo_ms_count{route="/x"} 3' in lines
+    assert "demo_backlog 7" in lines
+    assert registry.snapshot()["demo_ms"]["series"][0]["p50_ms"] == 100
+
+
+def test_middleware_records_route_status_and_queries(db):
+    registry = MetricsRegistry()
+    registry.describe("pharma_http_request_db_queries", "histogram", "", buckets=(0, 1, 2, 5))
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    seen_in_flight = []
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        seen_in_flight.append(registry.snapshot()["pharma_http_requests_in_flight"]["series"][0]["value"])
+        with SessionLocal() as session:
+            session.execute(text("SELECT 1"))
+            session.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/items/x").status_code == 422
+    assert client.get("/nowhere").status_code == 404
+
+    snapshot = registry.snapshot()
+    route = "/items/{item_id}"
+    assert _series(snapshot, "pharma_http_requests_total", route=route, method="GET", status=200)[0]["value"] == 2
+    assert _series(snapshot, "pharma_http_requests_total", route=route, method="GET", status=422)[0]["value"] == 1
+    assert _series(snapshot, "pharma_http_requests_total", route="unmatched", method="GET", status=404)
+    assert _series(snapshot, "pharma_http_request_duration_ms", route=route, method="GET")[0]["count"] == 3
+    queries = _series(snapshot, "pharma_http_request_db_queries", route=route, method="GET")[0]
+    assert queries["sum_ms"] == 4   # two statements per successful request
+    assert seen_in_flight == [1, 1]
+    assert snapshot["pharma_http_requests_in_flight"]["series"][0]["value"] == 0
+
+
+def test_checkout_counters_and_collectors(db):
+    medicine = Medicine(code="MED-1", name="Amoxicilline", quantity=100, price_buy=1, price_sell=2)
+    db.add(medicine)
+    db.flush()
+    db.add(Batch(medicine_id=medicine.id, batch_number="L1", quantity=100,
+                 expiration_date=date.today() + timedelta(days=365), is_active=True))
+    db.commit()
+
+    line = pos_service.cart_add(db, CartAddRequest(medicine_id=medicine.id, quantity=3))
+    pos_service.checkout(db, 1, POSCheckoutRequest(items=[CheckoutItem(
+        medicine_id=medicine.id, allocations=line.allocations, quantity=3, unit_price=2,
+    )]))
+
+    snapshot = metrics.snapshot()
+    assert snapshot["pharma_checkouts_total"]["series"][0]["value"] == 1
+    assert snapshot["pharma_checkout_lines_total"]["series"][0]["value"] == 1
+    assert snapshot["pharma_db_queries_total"]["series"][0]["value"] > 0
+    assert _series(snapshot, "pharma_sync_backlog", queue="sales")[0]["value"] == 1
+    assert _series(snapshot, "pharma_cache_hits_total", cache="license")
+
+    response = metrics_routes.get_metrics(current_user=None)
+    assert response.media_type.startswith("text/plain; version=0.0.4")
+    body = response.body.decode()
+    assert "pharma_checkouts_total 1" in body
+    assert 'pharma_sync_backlog{queue="sales"} 1' in body
+
+
+def test_failed_statements_leave_no_timing_state(db):
+    metrics.reset()
+    with engine_local.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(Exception):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.rollback()
+        conn.execute(text("SELECT 1"))
+        assert not any("metrics" in str(key) for key in conn.info)
+
+    snapshot = metrics.snapshot()
+    # Only the statement that completed is counted
+    assert snapshot["pharma_db_queries_total"]["series"][0]["value"] == 1
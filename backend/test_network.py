@@ -0,0 +1,130 @@
+"""
+Connectivity monitor test.
+
+Probes a throw-away SQLite database standing in for Supabase: the state
+is cached between probes, a link known to be down is checked with a
+short TCP connect before the full probe, is_online answers from memory
+while the background probe is stuck, and a failure reported by a sync
+pass takes effect at once.
+
+Run: python -m pytest -q test_network.py
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from app.utils.network import ConnectivityMonitor, LatencyHistogram
+
+# Stand-in for Supabase
+engine_remote = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pharma_remote_'), 'remote.db')}")
+
+
+@pytest.fixture()
+def monitor():
+    monitor = ConnectivityMonitor(engine=engine_remote, interval=60, offline_interval=60,
+                                  fast_fail_timeout=0.5, ttl=60)
+    yield monitor
+    monitor.stop()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_state_is_cached_between_probes(monitor):
+    assert monitor.is_online() is True
+    assert monitor.is_online() is True
+    assert monitor.state()["probes"] == 1
+    assert monitor.is_online(max_age=0) is True
+
+    state = monitor.state()
+    assert state["probes"] == 2
+    assert state["latency"]["count"] == 2
+    assert state["last_online_at"] is not None
+    assert state["fast_fail"] is False
+
+
+def test_known_down_link_fails_fast(monitor, monkeypatch):
+    port = _free_port()
+    calls = []
+
+    def _probe_database():
+        calls.append(time.monotonic())
+        raise OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+    monkeypatch.setattr(monitor, "address", lambda: ("127.0.0.1", port))
+    monkeypatch.setattr(monitor, "_probe_database", _probe_database)
+
+    # State unknown: full probe
+    assert monitor.probe() is False
+    assert len(calls) == 1
+    # Known down and nothing listening: the database is not tried
+    assert monitor.probe() is False
+    assert len(calls) == 1
+    assert monitor.state()["fast_failures"] == 1
+    assert monitor.state()["consecutive_failures"] == 2
+
+    # Host answers again: back to the full probe
+    monkeypatch.setattr(monitor, "_probe_database", lambda: calls.append(time.monotonic()))
+    with socket.socket() as server:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("127.0.0.1", port))
+        server.listen()
+        assert monitor.probe() is True
+    assert len(calls) == 2
+    assert monitor.state()["consecutive_failures"] == 0
+
+
+def test_is_online_does_not_wait_for_background_probe(monitor, monkeypatch):
+    monitor.start()
+    assert _wait_for(lambda: monitor.state()["probes"] == 1)
+
+    release = threading.Event()
+    monkeypatch.setattr(monitor, "_probe_database", release.wait)
+    monitor.mark_offline("connexion perdue")
+    started = time.perf_counter()
+    assert monitor.is_online() is False
+    assert time.perf_counter() - started < 0.1
+
+    release.set()
+    assert _wait_for(lambda: monitor.is_online())
+
+
+def test_mark_offline_takes_effect_at_once(monitor):
+    assert monitor.is_online() is True
+    monitor.mark_offline("OperationalError: server closed the connection")
+
+    assert monitor.is_online() is False
+    state = monitor.state()
+    assert state["fast_fail"] is True
+    assert state["last_error"].startswith("OperationalError")
+    assert state["since"] is not None
+
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram(buckets=(10, 100))
+    for value in (1, 5, 50, 500):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == [[10, 2], [100, 3], ["+Inf", 4]]
+    assert snapshot["count"] == 4
+    assert snapshot["p50_ms"] == 10
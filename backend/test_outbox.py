@@ -0,0 +1,243 @@
+"""
+Outbox test.
+
+Captures local changes into sync_queue through the session hooks and
+drains them to a second throw-away SQLite database standing in for
+Supabase: changes are written in the same transaction (a rollback leaves
+nothing), repeated updates of a row coalesce into one entry, the drainer
+sends the current row state in batches, replays are idempotent, a change
+made while its entry is in flight is not lost, checkout records its bulk
+writes, acknowledged entries are pruned and a row rejected by the
+remote only fails itself, not the rest of its group.
+
+Run: python -m pytest -q test_outbox.py
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, SessionLocal, engine_local
+from app.models import Batch, Customer, Medicine, StockMovement, SyncQueue, User, UserRole
+from app.models.pos_sale import POSSale
+from app.schemas.pos import CartAddRequest, CheckoutItem, POSCheckoutRequest
+from app.services import pos_service
+from app.sync import outbox, sync_manager
+from app.sync.sync_manager import SyncManager
+
+# Stand-in for Supabase
+engine_remote = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pharma_remote_'), 'remote.db')}")
+
+
+@pytest.fixture()
+def db(fresh_db, monkeypatch):
+    Base.metadata.drop_all(bind=engine_remote)
+    Base.metadata.create_all(bind=engine_remote)
+    for engine in (engine_local, engine_remote):
+        with engine.begin() as conn:
+            conn.execute(insert(User), [{"username": "caisse", "password_hash": "x",
+                                         "role": UserRole.PHARMACIST, "is_active": True}])
+    monkeypatch.setattr(sync_manager, "SessionRemote", sessionmaker(bind=engine_remote))
+    monkeypatch.setattr(sync_manager, "_remote_available", lambda: True)
+    # The capture hooks only reach sessions opened after install()
+    outbox.install(SessionLocal)
+    session = SessionLocal()
+    yield session
+    session.close()
+    outbox.uninstall(SessionLocal)
+
+
+def _entries(db):
+    return db.execute(select(SyncQueue.table_name, SyncQueue.row_key, SyncQueue.action, SyncQueue.version)).all()
+
+
+def _remote(model, *where):
+    with engine_remote.connect() as conn:
+        return conn.execute(select(model.__table__).where(*where)).mappings().all()
+
+
+def _customer(db, i):
+    customer = Customer(first_name=f"Client {i}", last_name="Test", phone=f"7900{i:04d}")
+    db.add(customer)
+    return customer
+
+
+def test_changes_are_captured_in_the_same_transaction(db):
+    _customer(db, 1)
+    db.commit()
+    _customer(db, 2)
+    db.flush()
+    db.rollback()
+
+    assert [(t, a.value) for t, _, a, _ in _entries(db)] == [("customers", "CREATE")]
+
+
+def test_repeated_updates_coalesce_into_one_entry(db):
+    customer = _customer(db, 1)
+    db.commit()
+    for points in (10, 20, 30):
+        customer.total_points = points
+        db.commit()
+
+    (entry,) = _entries(db)
+    assert entry.version == 4
+    assert entry.action.value == "UPDATE"
+
+    report = SyncManager.push_changes(db)
+    assert report["sent"] == 1
+    (remote,) = _remote(Customer)
+    assert remote["total_points"] == 30
+    # Acknowledged entries are pruned
+    assert _entries(db) == []
+
+
+def test_drain_batches_remote_writes(db):
+    for i in range(300):
+        _customer(db, i)
+    db.commit()
+
+    statements = []
+
+    def _count(*args):
+        statements.append(args[2])
+
+    event.listen(engine_remote, "before_cursor_execute", _count)
+    try:
+        report = outbox.drain(db, batch_size=100)
+    finally:
+        event.remove(engine_remote, "before_cursor_execute", _count)
+
+    assert report == {**report, "sent": 300, "errors": 0, "batches": 3}
+    assert len(_remote(Customer)) == 300
+    assert len(statements) <= 3 * 2
+
+
+def test_delete_and_replay_are_idempotent(db):
+    customers = [_customer(db, i) for i in range(3)]
+    db.commit()
+    outbox.drain(db)
+
+    db.delete(customers[0])
+    customers[1].last_name = "Nouveau"
+    db.commit()
+    # Acknowledgement lost: the same entries are sent twice
+    pending = [dict(row) for row in db.execute(
+        select(SyncQueue.id, SyncQueue.table_name, SyncQueue.row_key, SyncQueue.action, SyncQueue.version)
+    ).mappings()]
+    remote_db = sync_manager.SessionRemote()
+    for _ in range(2):
+        outbox._apply(db, remote_db, outbox.tables()["customers"], pending)
+        remote_db.commit()
+    remote_db.close()
+
+    rows = _remote(Customer)
+    assert len(rows) == 2
+    assert {row["last_name"] for row in rows} == {"Test", "Nouveau"}
+
+
+def test_change_during_drain_is_not_lost(db, monkeypatch):
+    customer = _customer(db, 1)
+    db.commit()
+    apply = outbox._apply
+
+    def _apply_then_edit(local_db, remote_db, table, entries):
+        apply(local_db, remote_db, table, entries)
+        with SessionLocal() as other:
+            other.get(Customer, customer.id).total_points = 99
+            other.commit()
+
+    monkeypatch.setattr(outbox, "_apply", _apply_then_edit)
+    outbox.drain(db)
+    monkeypatch.setattr(outbox, "_apply", apply)
+
+    # The in-flight entry was bumped: it stays and carries the new state
+    (entry,) = _entries(db)
+    assert entry.version == 2
+    outbox.drain(db)
+    assert _remote(Customer)[0]["total_points"] == 99
+    assert _entries(db) == []
+
+
+def test_cancellation_is_sent_by_sale_uuid(db):
+    sale = POSSale(sale_uuid="uuid-1", code="POS-0001", total_amount=100, user_id=1, sync_status="synced")
+    db.add(sale)
+    db.commit()
+    # Creation is left to sync_up: nothing queued
+    assert _entries(db) == []
+    with engine_remote.begin() as conn:
+        conn.execute(insert(POSSale), [{"id": 77, "sale_uuid": "uuid-1", "code": "POS-0001",
+                                        "total_amount": 100, "user_id": 1}])
+
+    sale.status = "cancelled"
+    sale.cancelled_at = datetime.utcnow()
+    sale.cancelled_by = 1
+    db.commit()
+    SyncManager.push_changes(db)
+
+    (remote,) = _remote(POSSale)
+    assert (remote["id"], remote["status"], remote["cancelled_by"]) == (77, "cancelled", 1)
+
+
+def test_checkout_records_its_bulk_writes(db):
+    medicine = Medicine(code="MED-1", name="Amoxicilline", quantity=100, price_buy=1, price_sell=2)
+    db.add(medicine)
+    db.flush()
+    db.add(Batch(medicine_id=medicine.id, batch_number="L1", quantity=100,
+                 expiration_date=date.today() + timedelta(days=365), is_active=True))
+    db.commit()
+    db.query(SyncQueue).delete()
+    db.commit()
+
+    line = pos_service.cart_add(db, CartAddRequest(medicine_id=medicine.id, quantity=3))
+    pos_service.checkout(db, 1, POSCheckoutRequest(items=[CheckoutItem(
+        medicine_id=medicine.id, allocations=line.allocations, quantity=3, unit_price=2,
+    )]))
+
+    assert sorted((t, a.value) for t, _, a, _ in _entries(db)) == [
+        ("batches", "UPDATE"), ("stock_movements", "CREATE"),
+    ]
+    with engine_remote.begin() as conn:
+        conn.execute(insert(Medicine), [{"id": medicine.id, "code": "MED-1", "name": "Amoxicilline",
+                                         "quantity": 0, "price_buy": 1, "price_sell": 2}])
+    assert outbox.drain(db)["sent"] == 2
+    assert _remote(Batch)[0]["quantity"] == 97
+    assert _remote(StockMovement)[0]["quantite"] == -3
+
+
+def test_failing_entries_are_retried_then_parked(db, monkeypatch):
+    _customer(db, 1)
+    db.commit()
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_RETRIES", 2)
+    monkeypatch.setattr(outbox, "_apply", lambda *args: (_ for _ in ()).throw(ValueError("rejeté")))
+
+    for _ in range(2):
+        assert outbox.drain(db)["errors"] == 1
+    assert outbox.pending_counts(db) == {"pending": 0, "error": 1}
+    assert db.execute(select(func.count()).select_from(SyncQueue)).scalar() == 1
+
+
+def test_one_rejected_row_does_not_block_its_group(db, monkeypatch):
+    for i in range(5):
+        _customer(db, i)
+    db.commit()
+    # Téléphone du client 3 déjà pris côté Supabase par un autre client
+    with engine_remote.begin() as conn:
+        conn.execute(insert(Customer), [{"id": 100, "first_name": "Autre", "last_name": "Client",
+                                         "phone": "79000002"}])
+    monkeypatch.setattr(outbox, "OUTBOX_MAX_RETRIES", 2)
+
+    report = outbox.drain(db)
+    assert (report["sent"], report["errors"]) == (4, 1)
+    assert sorted(r["phone"] for r in _remote(Customer, Customer.id != 100)) == [
+        "79000000", "79000001", "79000003", "79000004",
+    ]
+    rejected = db.execute(select(SyncQueue.row_key, SyncQueue.retry_count)).all()
+    assert rejected == [("3", 1)]
+
+    # Seule la ligne fautive finit en erreur
+    assert outbox.drain(db)["errors"] == 1
+    assert outbox.pending_counts(db) == {"pending": 0, "error": 1}
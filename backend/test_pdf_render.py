@@ -0,0 +1,128 @@
+"""
+PDF rendering test.
+
+Renders invoices and reports through pdf_render against a throw-away
+SQLite database: long tables continue on new pages, thermal receipts are
+one 80 mm page sized to their content, documents can be written to a
+caller-provided file and the sales report reads its rows in one query.
+
+Run: python -m pytest -q test_pdf_render.py
+"""
+
+import base64
+import re
+import zlib
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine_local
+from app.models import Medicine, Sale, SaleItem, User, UserRole
+from app.services import pdf_render, pdf_service, report_service
+
+
+def _invoice(n_items):
+    return {
+        "invoice_code": "FAC-0001",
+        "date": datetime(2026, 10, 17, 9, 30),
+        "seller": "caisse",
+        "customer": {"name": "Jean Ndayisaba", "phone": "79000000", "points_earned": 3},
+        "payment_method": "cash",
+        "items": [
+            {"medicine_name": f"Paracétamol 500mg comprimés boîte de 20 - lot {i}", "quantity": 1,
+             "unit_price": 500.0, "total_price": 500.0}
+            for i in range(n_items)
+        ],
+        "total_amount": 500.0 * n_items,
+    }
+
+
+def _pages(data):
+    return data.count(b"/Type /Page\n")
+
+
+def _text(data):
+    """Decoded page content streams (ReportLab writes them ASCII85 + Flate)."""
+    streams = re.findall(rb"/Filter \[ /ASCII85Decode /FlateDecode \] /Length \d+\s*>>\s*stream\r?\n(.*?)endstream", data, re.S)
+    return b"".join(zlib.decompress(base64.a85decode(s.strip(), adobe=True)) for s in streams)
+
+
+def _media_boxes(data):
+    return {tuple(float(v) for v in box.split()) for box in re.findall(rb"/MediaBox \[ ([^\]]*) \]", data)}
+
+
+@pytest.fixture(scope="module")
+def db(fresh_module_db):
+    session = fresh_module_db
+    user = User(username="pdf", password_hash="x", role=UserRole.ADMIN, is_active=True)
+    session.add(user)
+    for i in range(1, 201):
+        session.add(Medicine(code=f"MED-{i:04d}", name=f"Quinine {i}", quantity=i % 7,
+                             min_stock_alert=3, price_buy=10, price_sell=15))
+    session.flush()
+    for i in range(30):
+        sale = Sale(code=f"INV-{i:04d}", total_amount=30, user_id=user.id)
+        session.add(sale)
+        session.flush()
+        session.add(SaleItem(sale_id=sale.id, medicine_id=1, quantity=2, unit_price=15, total_price=30))
+    session.commit()
+    return session
+
+
+def test_a4_invoice_continues_on_new_pages():
+    assert _pages(pdf_service.generate_invoice_pdf(_invoice(3)).read()) == 1
+    data = pdf_service.generate_invoice_pdf(_invoice(120)).read()
+    assert data.startswith(b"%PDF-")
+    assert _pages(data) > 2
+    # Every row and the total are rendered
+    content = _text(data)
+    assert content.count(b"(500 FBu)") == 2 * 120  # Unit price and line total
+    assert b"(60,000 FBu)" in content
+
+
+def test_receipt_is_one_page_sized_to_its_content():
+    short = pdf_service.generate_invoice_pdf(_invoice(3), format="receipt").read()
+    long = pdf_service.generate_invoice_pdf(_invoice(120), format="receipt").read()
+    assert _pages(short) == _pages(long) == 1
+
+    (short_box,), (long_box,) = _media_boxes(short), _media_boxes(long)
+    assert round(short_box[2], 1) == round(pdf_render.RECEIPT_WIDTH, 1)
+    assert long_box[3] > short_box[3]
+
+
+def test_unknown_invoice_format_is_rejected():
+    with pytest.raises(ValueError):
+        pdf_service.generate_invoice_pdf(_invoice(1), format="a3")
+
+
+def test_render_writes_to_the_given_file(tmp_path):
+    path = tmp_path / "facture.pdf"
+    with open(path, "wb") as output:
+        pdf_service.generate_invoice_pdf(_invoice(2), output=output)
+    assert path.read_bytes().startswith(b"%PDF-")
+
+
+def test_stock_report_paginates_with_letterhead(db):
+    data = report_service.generate_stock_pdf(db).read()
+    content = _text(data)
+    assert _pages(data) > 1
+    assert content.count(b"(PHARMA-SOURCE)") == 2  # First page only
+    assert content.count(b"(Code)") > 1  # Header repeated on the next pages
+    assert b"Total M\\351dicaments: 200" in content
+
+
+def test_sales_report_reads_rows_in_one_query(db):
+    queries = []
+
+    def _count(*args):
+        queries.append(args[2])
+
+    event.listen(engine_local, "before_cursor_execute", _count)
+    try:
+        data = report_service.generate_sales_pdf(db, date.today() - timedelta(days=1), date.today()).read()
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _count)
+
+    assert len(queries) == 1
+    assert b"Nombre de ventes: 30" in _text(data)
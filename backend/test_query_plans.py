@@ -0,0 +1,156 @@
+"""
+EXPLAIN QUERY PLAN regression test.
+
+Runs the FEFO allocation, POS search, dashboard, history and financial
+statement code paths against a throw-away SQLite database, captures every
+SQL statement they issue and fails if SQLite plans a full table scan on
+one of the hot tables (i.e. a missing or unusable index).
+
+Run: python -m pytest -q test_query_plans.py
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine_local
+from app.models import (
+    Medicine, Batch, MedicinePricing, POSSale, POSSaleItem, Sale, SaleItem, StockMovement, User, UserRole
+)
+from app.services import pos_service, dashboard_service, financial_statement
+from app.services.search_index import ProductSearchIndex, product_index
+
+# Tables that must always be reached through an index
+HOT_TABLES = {
+    "batches", "pos_sales", "pos_sale_items", "sales", "sale_items", "stock_movements", "medicine_pricing",
+}
+
+
+@pytest.fixture(scope="module")
+def db(fresh_module_db):
+    session = fresh_module_db
+    today = date.today()
+
+    user = User(username="eqp", password_hash="x", role=UserRole.PHARMACIST, is_active=True)
+    session.add(user)
+    for i in range(1, 201):
+        med = Medicine(
+            code=f"MED-{i:04d}", name=f"Paracétamol {i}", code_barres=f"600{i:010d}",
+            quantity=100, price_buy=1, price_sell=2,
+        )
+        session.add(med)
+        session.flush()
+        for b in range(3):
+            session.add(Batch(
+                medicine_id=med.id, batch_number=f"L{i}-{b}", quantity=30 + b,
+                expiration_date=today + timedelta(days=30 * (b + 1)), is_active=True,
+            ))
+        session.add(MedicinePricing(medicine_id=med.id, nom=med.name, lot=f"L{i}-0"))
+        session.add(StockMovement(medicine_id=med.id, type="entree", quantite=100))
+    session.flush()
+    for n in range(50):
+        sale = POSSale(
+            code=f"POS-{today.year}-{n:04d}", total_amount=10, user_id=user.id,
+            date=datetime.utcnow() - timedelta(days=n % 10),
+            status="cancelled" if n % 7 == 0 else "completed",
+        )
+        session.add(sale)
+        session.flush()
+        session.add(POSSaleItem(
+            sale_id=sale.id, medicine_id=(n % 200) + 1, batch_id=1,
+            quantity=1, unit_price=10, total_price=10,
+        ))
+        legacy = Sale(
+            code=f"INV-{today.year}-{n:04d}", total_amount=10, user_id=user.id,
+            date=datetime.utcnow() - timedelta(days=n % 10),
+        )
+        session.add(legacy)
+        session.flush()
+        session.add(SaleItem(
+            sale_id=legacy.id, medicine_id=(n % 200) + 1, quantity=1, unit_price=10, total_price=10,
+        ))
+    session.commit()
+    with engine_local.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    return session
+
+
+def _capture(fn):
+    """Run fn() and return the (statement, parameters) it executed."""
+    statements = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine_local, "before_cursor_execute", _before)
+    try:
+        fn()
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _before)
+    assert statements, "no SQL captured"
+    return statements
+
+
+def _table_scans(statements):
+    """Return plan lines showing a full scan of a hot table."""
+    offenders = []
+    raw = engine_local.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, parameters in statements:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                words = detail.split()
+                # "SCAN batches" is a full scan; "SCAN batches USING INDEX ..." is not
+                if (words[:1] == ["SCAN"] and len(words) >= 2
+                        and words[1] in HOT_TABLES and "USING" not in words):
+                    offenders.append(f"{detail}  <=  {statement.split(chr(10))[0][:120]}")
+    finally:
+        raw.close()
+    return offenders
+
+
+def test_fefo_allocation_uses_index(db):
+    statements = _capture(lambda: pos_service.allocate_fefo(db, 5, 40))
+    assert _table_scans(statements) == []
+
+
+def test_product_search_sql_path_uses_index(db, monkeypatch):
+    # Index not built yet -> search_products falls back to SQL
+    monkeypatch.setattr(pos_service, "product_index", ProductSearchIndex())
+    statements = _capture(lambda: pos_service.search_products(db, "para", 20))
+    assert _table_scans(statements) == []
+
+
+def test_product_search_index_path_uses_index(db):
+    product_index.rebuild(db)
+    statements = _capture(lambda: (
+        pos_service.search_products(db, "paracetamol 1", 20),
+        pos_service.scan_product(db, "MED-0007"),
+    ))
+    assert _table_scans(statements) == []
+
+
+def test_dashboard_stats_use_index(db):
+    statements = _capture(lambda: dashboard_service.get_stats(db))
+    assert _table_scans(statements) == []
+
+
+def test_pos_history_cursor_page_uses_index(db):
+    _, _, cursor = pos_service.get_pos_sales_history(db, page_size=10, include_total=False)
+    statements = _capture(lambda: pos_service.get_pos_sales_history(
+        db, page_size=10, cursor=cursor, include_total=False
+    ))
+    assert _table_scans(statements) == []
+
+
+def test_financial_statement_uses_index(db):
+    today = date.today()
+    statements = _capture(lambda: financial_statement.build_statement(
+        db, today - timedelta(days=3), today
+    ))
+    assert _table_scans(statements) == []
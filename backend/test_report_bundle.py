@@ -0,0 +1,108 @@
+"""
+Report bundle test.
+
+Builds export bundles through report_bundle against a throw-away SQLite
+database and cache directory: the ZIP holds one valid file per requested
+report, reports sharing a dataset read it once, a second bundle is
+served from the artifact store and the read snapshot ignores writes
+committed while it is open.
+
+Run: python -m pytest -q test_report_bundle.py
+"""
+
+import io
+import zipfile
+from datetime import date, timedelta
+
+import openpyxl
+import pytest
+
+from app.database import engine_local
+from app.models import Medicine, Sale, SaleItem, User, UserRole
+from app.services import report_bundle, report_jobs, report_service
+from app.services.report_jobs import ReportJobQueue
+
+START = date.today() - timedelta(days=30)
+END = date.today()
+FORMATS = ["stock_excel", "sales_excel", "sales_pdf", "financial_pdf", "sales_word"]
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    user = User(username="cloture", password_hash="x", role=UserRole.ADMIN, is_active=True)
+    session.add(user)
+    for i in range(1, 21):
+        session.add(Medicine(code=f"MED-{i:04d}", name=f"Quinine {i}", quantity=10, price_buy=1, price_sell=2))
+    session.flush()
+    for i in range(5):
+        sale = Sale(code=f"INV-{i:04d}", total_amount=4, user_id=user.id)
+        session.add(sale)
+        session.flush()
+        session.add(SaleItem(sale_id=sale.id, medicine_id=1, quantity=2, unit_price=2, total_price=4))
+    session.commit()
+    return session
+
+
+@pytest.fixture()
+def queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_jobs, "REPORT_CACHE_DIR", str(tmp_path))
+    queue = ReportJobQueue(workers=2)
+    yield queue
+    queue.shutdown()
+
+
+def _zip(artifacts):
+    return zipfile.ZipFile(io.BytesIO(b"".join(report_bundle.iter_zip(artifacts))))
+
+
+def test_bundle_zips_every_report(db, queue):
+    archive = _zip(report_bundle.build_bundle(START, END, FORMATS, queue))
+    names = archive.namelist()
+    assert len(names) == len(FORMATS)
+    assert f"sales_report_{START}_{END}.xlsx" in names
+
+    sales = openpyxl.load_workbook(io.BytesIO(archive.read(f"sales_report_{START}_{END}.xlsx"))).active
+    assert sales.max_row == 1 + 5
+    assert archive.read(f"sales_report_{START}_{END}.pdf").startswith(b"%PDF-")
+    assert b"INV-0004" in archive.read(f"sales_report_{START}_{END}.doc")
+
+
+def test_shared_dataset_is_loaded_once(db, queue, monkeypatch):
+    calls = []
+    load_sales = report_service.load_sales
+
+    def _load_sales(*args, **kwargs):
+        calls.append(kwargs)
+        return load_sales(*args, **kwargs)
+
+    monkeypatch.setattr(report_service, "load_sales", _load_sales)
+    for _, artifact in report_bundle.build_bundle(START, END, ["sales_excel", "sales_pdf", "sales_word"], queue):
+        artifact.close()
+    assert calls == [{"start_date": START, "end_date": END}]
+
+
+def test_second_bundle_is_served_from_the_store(db, queue):
+    for _, artifact in report_bundle.build_bundle(START, END, FORMATS, queue):
+        artifact.close()
+    artifacts = report_bundle.build_bundle(START, END, FORMATS, queue)
+    assert all(entry.cached for entry, _ in artifacts)
+    assert len(_zip(artifacts).namelist()) == len(FORMATS)
+
+
+def test_invalid_bundle_is_rejected(db, queue):
+    with pytest.raises(ValueError):
+        report_bundle.build_bundle(START, END, ["inventaire_pdf"], queue)
+    with pytest.raises(ValueError):
+        report_bundle.build_bundle(START, END, [], queue)
+    with pytest.raises(ValueError):
+        report_bundle.build_bundle(END, START, ["stock_excel"], queue)
+
+
+def test_snapshot_ignores_concurrent_commits(db):
+    with report_bundle.read_snapshot(engine_local) as snapshot:
+        before = snapshot.query(Medicine).count()
+        db.add(Medicine(code="MED-NEW", name="Artemether", quantity=1, price_buy=1, price_sell=2))
+        db.commit()
+        assert snapshot.query(Medicine).count() == before
+    assert db.query(Medicine).count() == before + 1
@@ -0,0 +1,114 @@
+"""
+Report job queue test.
+
+Builds reports through report_jobs against a throw-away SQLite database
+and cache directory: a job built in the process pool is served from the
+artifact cache when submitted again, a data change produces a new
+artifact, and identical pending jobs are shared.
+
+Run: python -m pytest -q test_report_jobs.py
+"""
+
+import os
+from datetime import date, timedelta
+
+import pytest
+
+from app.models import Medicine, Sale, User, UserRole
+from app.services import report_jobs
+from app.services.report_jobs import ReportJobQueue
+
+PERIOD = {"start_date": str(date.today() - timedelta(days=30)), "end_date": str(date.today())}
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    user = User(username="reports", password_hash="x", role=UserRole.ADMIN, is_active=True)
+    session.add(user)
+    for i in range(1, 21):
+        session.add(Medicine(code=f"MED-{i:04d}", name=f"Quinine {i}", quantity=10, price_buy=1, price_sell=2))
+    session.flush()
+    session.add(Sale(code="INV-0001", total_amount=20, user_id=user.id))
+    session.commit()
+    return session
+
+
+@pytest.fixture()
+def queue(monkeypatch, tmp_path):
+    monkeypatch.setattr(report_jobs, "REPORT_CACHE_DIR", str(tmp_path))
+    queue = ReportJobQueue(workers=1)
+    yield queue
+    queue.shutdown()
+
+
+def _wait(job):
+    assert job.done.wait(60), "report job did not finish"
+    assert job.status == report_jobs.STATUS_DONE, job.error
+    return job
+
+
+def test_job_is_built_then_served_from_cache(db, queue):
+    job = _wait(queue.submit(db, "sales_excel", PERIOD))
+    assert not job.cached
+    assert os.path.getsize(job.path) == job.size > 0
+
+    again = queue.submit(db, "sales_excel", PERIOD)
+    assert again.cached and again.status == report_jobs.STATUS_DONE
+    assert again.path == job.path
+
+
+def test_data_change_invalidates_artifact(db, queue):
+    first = _wait(queue.submit(db, "stock_pdf"))
+
+    # Same second as the seeding: updated_at alone would not move
+    db.query(Medicine).filter(Medicine.code == "MED-0001").update({"quantity": 99})
+    db.commit()
+    second = queue.submit(db, "stock_pdf")
+    assert second.key != first.key
+    assert not _wait(second).cached
+
+    db.query(Sale).update({"status": "cancelled"})
+    db.commit()
+    sales_key = report_jobs.cache_key(db, "sales_pdf", report_jobs.get_report_type("sales_pdf").parse(PERIOD))
+    db.query(Sale).update({"status": "completed"})
+    db.commit()
+    assert report_jobs.cache_key(db, "sales_pdf", report_jobs.get_report_type("sales_pdf").parse(PERIOD)) != sales_key
+
+
+def test_identical_pending_jobs_are_shared(db, queue):
+    first = queue.submit(db, "stock_word")
+    second = queue.submit(db, "stock_word")
+    assert second.id == first.id
+    _wait(first)
+
+
+def test_render_uses_the_same_cache(db, queue):
+    artifact, cached = report_jobs.render(db, "stock_excel")
+    artifact.close()
+    assert not cached
+
+    job = queue.submit(db, "stock_excel")
+    assert job.cached
+
+
+def test_invalid_spec_is_rejected(db, queue):
+    with pytest.raises(ValueError):
+        queue.submit(db, "inventaire_pdf")
+    with pytest.raises(ValueError):
+        queue.submit(db, "sales_pdf", {"start_date": "2026-01-01"})
+    with pytest.raises(ValueError):
+        queue.submit(db, "sales_pdf", {**PERIOD, "format": "a3"})
+
+
+def test_report_builds_stay_off_the_event_loop():
+    import inspect
+    from app.routes import reports
+
+    # A cache miss builds the report inline and submitting a job reads the
+    # data watermarks: those handlers must run in the threadpool. Only the
+    # job polling/download handlers (no database session) stay async.
+    for route in reports.router.routes:
+        if route.path.startswith("/jobs/"):
+            continue
+        assert not inspect.iscoroutinefunction(route.endpoint), route.path
@@ -0,0 +1,131 @@
+"""
+Sales facts test.
+
+Runs the sales rollups against a throw-away SQLite database: after a
+checkout, a cancellation and a backfill the daily and hourly facts match
+a re-aggregation of the raw sales, and the admin data reset drops the
+revenue of the sales it deletes.
+
+Run: python -m pytest -q test_sales_facts.py
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+
+from app.database import engine_local
+from app.models import Batch, Medicine, User, UserRole
+from app.models.pos_sale import POSSale
+from app.models.sales import Sale
+from app.models.sales_fact import SalesDailyFact, SalesHourlyFact
+from app.routes import admin as admin_routes
+from app.schemas.pos import CartAddRequest, CheckoutItem, POSCheckoutRequest
+from app.services import pos_service, sales_facts_service
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    session.add(User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True))
+    medicine = Medicine(code="MED-1", name="Amoxicilline", quantity=1000, price_buy=1, price_sell=2)
+    session.add(medicine)
+    session.flush()
+    session.add(Batch(medicine_id=medicine.id, batch_number="L1", quantity=1000,
+                      expiration_date=date.today() + timedelta(days=365), is_active=True))
+    session.commit()
+    return session
+
+
+def _checkout(db, quantity):
+    line = pos_service.cart_add(db, CartAddRequest(medicine_id=1, quantity=quantity))
+    return pos_service.checkout(db, 1, POSCheckoutRequest(items=[CheckoutItem(
+        medicine_id=1, allocations=line.allocations, quantity=quantity, unit_price=2,
+    )]))
+
+
+def _add_legacy_sales(rows):
+    with engine_local.begin() as conn:
+        conn.execute(insert(Sale), [
+            {"code": f"VTE-{i}", "total_amount": amount, "payment_method": "cash", "user_id": 1,
+             "date": when, "status": status}
+            for i, (amount, when, status) in enumerate(rows)
+        ])
+
+
+def _raw(db):
+    """(day, hour, source) -> measures, re-aggregated from the sales tables."""
+    expected = {}
+    for model, source in ((POSSale, sales_facts_service.SOURCE_POS), (Sale, sales_facts_service.SOURCE_LEGACY)):
+        for when, status, amount in db.query(model.date, model.status, model.total_amount):
+            measures = expected.setdefault((when.date(), when.hour, source), dict.fromkeys(sales_facts_service.MEASURES, 0))
+            if status == "cancelled":
+                measures["cancelled_count"] += 1
+                measures["cancelled_amount"] += amount
+            else:
+                measures["sales_count"] += 1
+                measures["revenue"] += amount
+    return expected
+
+
+def _facts(db, model, key):
+    facts = {}
+    for row in db.query(model):
+        measures = facts.setdefault(key(row), dict.fromkeys(sales_facts_service.MEASURES, 0))
+        for name in sales_facts_service.MEASURES:
+            measures[name] += getattr(row, name)
+    # Rows a cancellation brought back to zero carry nothing
+    return {k: v for k, v in facts.items() if any(v.values())}
+
+
+def _assert_facts_match_raw(db):
+    raw = _raw(db)
+    assert _facts(db, SalesHourlyFact, lambda r: (r.day, r.hour, r.source)) == raw
+    by_day = {}
+    for (day, _, source), measures in raw.items():
+        total = by_day.setdefault((day, source), dict.fromkeys(sales_facts_service.MEASURES, 0))
+        for name, value in measures.items():
+            total[name] += value
+    assert _facts(db, SalesDailyFact, lambda r: (r.day, r.source)) == by_day
+
+
+def test_checkout_and_cancel_keep_facts_in_step(db):
+    first = _checkout(db, 3)
+    _checkout(db, 5)
+    _assert_facts_match_raw(db)
+    assert sales_facts_service.totals(db)["revenue"] == 16
+
+    pos_service.cancel_pos_sale(db, first.id, 1)
+    _assert_facts_match_raw(db)
+    totals = sales_facts_service.totals(db)
+    assert (totals["revenue"], totals["sales_count"], totals["cancelled_count"]) == (10, 1, 1)
+
+
+def test_backfill_matches_raw_sales(db):
+    _checkout(db, 2)
+    yesterday = datetime.utcnow().replace(hour=9, minute=30) - timedelta(days=1)
+    _add_legacy_sales([(100, yesterday, "completed"), (40, yesterday.replace(hour=17), "completed"),
+                       (25, yesterday, "cancelled")])
+    db.query(SalesDailyFact).delete()
+    db.query(SalesHourlyFact).delete()
+    db.commit()
+
+    assert sales_facts_service.ensure_backfilled(db) == 4
+    _assert_facts_match_raw(db)
+    assert sales_facts_service.ensure_backfilled(db) == 0
+    assert sales_facts_service.daily_revenue(db, yesterday.date(), yesterday.date()) == {yesterday.date(): 140}
+    assert sales_facts_service.hourly_revenue(db, yesterday.date(), yesterday.date()) == {9: 100, 17: 40}
+
+
+def test_reset_drops_the_deleted_sales_revenue(db):
+    _checkout(db, 4)
+    _add_legacy_sales([(100, datetime.utcnow(), "completed")])
+    sales_facts_service.rebuild(db)
+    assert sales_facts_service.totals(db)["revenue"] == 108
+
+    asyncio.run(admin_routes.reset_data(admin_routes.ResetDataRequest(sales=True), None, db))
+
+    assert db.query(func.count(Sale.id)).scalar() == 0
+    assert sales_facts_service.totals(db)["revenue"] == 8
+    _assert_facts_match_raw(db)
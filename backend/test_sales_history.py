@@ -0,0 +1,132 @@
+"""
+Sales history pagination test.
+
+Seeds legacy and POS sales (with items, customers and sales sharing the
+same timestamp) in a throw-away SQLite database and checks that walking
+the history with keyset cursors returns exactly the OFFSET pages, and that
+a page costs the same number of queries whatever its depth and size.
+
+Run: python -m pytest -q test_sales_history.py
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine_local
+from app.models import Medicine, Batch, Customer, POSSale, POSSaleItem, Sale, SaleItem, User, UserRole
+from app.routes.sales import enrich_sale_response
+from app.services import pos_service, sales_service, sales_history
+
+SALES = 95
+PAGE_SIZE = 10
+
+
+@pytest.fixture(scope="module")
+def db(fresh_module_db):
+    session = fresh_module_db
+
+    user = User(username="history", password_hash="x", role=UserRole.PHARMACIST, is_active=True)
+    customer = Customer(first_name="Aline", last_name="K", phone="79000000")
+    session.add_all([user, customer])
+    meds = []
+    for i in range(1, 6):
+        med = Medicine(code=f"MED-{i:04d}", name=f"Ibuprofène {i}", quantity=100, price_buy=1, price_sell=2)
+        session.add(med)
+        session.flush()
+        session.add(Batch(medicine_id=med.id, batch_number=f"L{i}", quantity=100,
+                          expiration_date=date.today() + timedelta(days=365), is_active=True))
+        meds.append(med)
+    session.flush()
+
+    start = datetime(2026, 1, 1, 8, 0)
+    for n in range(SALES):
+        # Groups of three sales share a timestamp: the cursor must break ties on id
+        when = start + timedelta(hours=n // 3)
+        sale = Sale(code=f"INV-2026-{n:04d}", total_amount=4, user_id=user.id,
+                    customer_id=customer.id if n % 2 else None, date=when)
+        pos_sale = POSSale(code=f"POS-2026-{n:04d}", total_amount=4, user_id=user.id, date=when)
+        session.add_all([sale, pos_sale])
+        session.flush()
+        for med in meds[: 1 + n % 3]:
+            session.add(SaleItem(sale_id=sale.id, medicine_id=med.id, quantity=1, unit_price=2, total_price=2))
+            session.add(POSSaleItem(sale_id=pos_sale.id, medicine_id=med.id, batch_id=med.id,
+                                    quantity=1, unit_price=2, total_price=2))
+    session.commit()
+
+    return session
+
+
+def _count_queries(fn):
+    count = [0]
+
+    def _before(*args):
+        count[0] += 1
+
+    event.listen(engine_local, "before_cursor_execute", _before)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _before)
+    return result, count[0]
+
+
+def _walk(fetch):
+    """Follow next_cursor to the end, returning the ids of each page."""
+    pages, cursor = [], None
+    while True:
+        sales, _, cursor = fetch(cursor)
+        pages.append([s.id for s in sales])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("fetch", [
+    lambda db, page, cursor: sales_service.get_sales_history(
+        db, page=page, page_size=PAGE_SIZE, cursor=cursor, include_total=False),
+    lambda db, page, cursor: pos_service.get_pos_sales_history(
+        db, page=page, page_size=PAGE_SIZE, cursor=cursor, include_total=False),
+], ids=["legacy", "pos"])
+def test_cursor_pages_match_offset_pages(db, fetch):
+    by_cursor = _walk(lambda cursor: fetch(db, 1, cursor))
+    pages = (SALES + PAGE_SIZE - 1) // PAGE_SIZE
+    by_offset = [[s.id for s in fetch(db, page, None)[0]] for page in range(1, pages + 1)]
+
+    assert by_cursor == by_offset
+    assert sum(len(page) for page in by_cursor) == SALES
+
+
+def test_total_is_optional(db):
+    _, total, _ = sales_service.get_sales_history(db, page_size=PAGE_SIZE)
+    assert total == SALES
+    _, total, _ = pos_service.get_pos_sales_history(db, page_size=PAGE_SIZE, include_total=False)
+    assert total is None
+
+
+def test_invalid_cursor_is_rejected(db):
+    with pytest.raises(ValueError):
+        pos_service.get_pos_sales_history(db, cursor="pas-un-curseur")
+
+
+def test_page_query_count_is_constant(db):
+    def legacy_page(cursor, size):
+        db.expire_all()
+        sales, _, next_cursor = sales_service.get_sales_history(
+            db, page_size=size, cursor=cursor, include_total=False)
+        [enrich_sale_response(sale, db) for sale in sales]
+        return next_cursor
+
+    def pos_page(cursor, size):
+        db.expire_all()
+        sales, _, next_cursor = pos_service.get_pos_sales_history(
+            db, page_size=size, cursor=cursor, include_total=False)
+        [pos_service.enrich_pos_sale_response(sale) for sale in sales]
+        return next_cursor
+
+    for page in (legacy_page, pos_page):
+        deep_cursor = page(None, SALES - PAGE_SIZE)
+        _, first = _count_queries(lambda: page(None, PAGE_SIZE))
+        _, deep = _count_queries(lambda: page(deep_cursor, PAGE_SIZE))
+        _, large = _count_queries(lambda: page(None, 50))
+        assert first == deep == large
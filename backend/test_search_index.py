@@ -0,0 +1,187 @@
+"""
+Product search index test.
+
+Builds product_index over a throw-away SQLite database and checks its
+behaviour, not only that it is used: accent-insensitive matching, the
+ranking tiers, the MAX_ID_FILTER fallback to SQL and the incremental
+updates made by the medicine service on create, update and delete,
+the rebuild after an admin product reset and scans that never trust a
+stale index entry.
+
+Run: python -m pytest -q test_search_index.py
+"""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.database import engine_local
+from app.models import Batch, Medicine
+from app.routes import admin as admin_routes
+from app.schemas.medicine import MedicineCreate, MedicineUpdate
+from app.services import medicine_service, pos_service
+from app.services.search_index import ProductSearchIndex, _Entry, fold, product_index
+
+MEDICINES = [
+    # (code, barcode, name, dci)
+    ("AMO-500", "5410000000017", "Zinc sulfate", None),
+    ("PAR-001", None, "Amoxicilline 500 mg", "amoxicilline"),
+    ("PAR-002", None, "Acide amoxicillinique", None),
+    ("CLA-100", None, "Clamoxyl", "amoxicilline"),
+    ("EFF-001", None, "Éfferalgan Paracétamol", "paracétamol"),
+]
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    for code, barcode, name, dci in MEDICINES:
+        session.add(Medicine(code=code, code_barres=barcode, name=name, dci=dci,
+                             quantity=0, price_buy=1, price_sell=2))
+    session.commit()
+    product_index.rebuild(session)
+    return session
+
+
+def _codes(db, ids):
+    by_id = {m.id: m.code for m in db.query(Medicine)}
+    return [by_id[i] for i in ids]
+
+
+def test_fold_strips_accents_and_case():
+    assert fold("  Éfferalgan PARACÉTAMOL ") == "efferalgan paracetamol"
+    assert fold(None) == ""
+
+
+def test_accented_names_match_unaccented_queries(db):
+    assert _codes(db, product_index.search("efferalgan")) == ["EFF-001"]
+    assert _codes(db, product_index.search("PARACETAMOL")) == ["EFF-001"]
+    assert _codes(db, product_index.match_ids("cétam")) == ["EFF-001"]
+
+
+def test_code_prefixes_rank_before_name_matches(db):
+    ranked = _codes(db, product_index.search("amo"))
+    # code prefix, name prefix, word prefix inside a name, then substrings by name
+    # ("clamoxyl" before "efferalgan paracetamol")
+    assert ranked == ["AMO-500", "PAR-001", "PAR-002", "CLA-100", "EFF-001"]
+    assert _codes(db, product_index.search("amo", limit=2)) == ["AMO-500", "PAR-001"]
+    assert _codes(db, [product_index.lookup_code("5410000000017")]) == ["AMO-500"]
+
+
+def test_secondary_fields_only_match_when_asked(db):
+    assert _codes(db, sorted(product_index.match_ids("amoxicilline"))) == ["PAR-001"]
+    assert _codes(db, sorted(product_index.match_ids("amoxicilline", include_secondary=True))) == [
+        "PAR-001", "CLA-100",
+    ]
+
+
+def test_short_queries_and_unbuilt_index_defer_to_sql(db):
+    assert product_index.match_ids("am") is None
+    assert ProductSearchIndex().search("amo") is None
+    assert ProductSearchIndex().lookup_code("AMO-500") is None
+
+
+def _search_statements(db, search):
+    statements = []
+
+    def _capture(*args):
+        statements.append(args[2].upper())
+
+    event.listen(engine_local, "before_cursor_execute", _capture)
+    try:
+        medicines, total = medicine_service.get_medicines(db, search=search)
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _capture)
+    return sorted(m.code for m in medicines), total, statements
+
+
+def test_broad_matches_fall_back_to_sql(db, monkeypatch):
+    indexed, total, statements = _search_statements(db, "amoxicilline")
+    assert (indexed, total) == (["CLA-100", "PAR-001"], 2)
+    assert not any("LIKE" in s for s in statements)
+
+    # More matches than MAX_ID_FILTER: same answer from the SQL scan
+    monkeypatch.setattr(medicine_service, "MAX_ID_FILTER", 1)
+    scanned, total, statements = _search_statements(db, "amoxicilline")
+    assert (scanned, total) == (["CLA-100", "PAR-001"], 2)
+    assert any("LIKE" in s for s in statements)
+
+
+def test_service_keeps_the_index_current(db):
+    created = medicine_service.create_medicine(db, MedicineCreate(
+        code="DOL-1", name="Doliprane 1000", price_buy=1, price_sell=2,
+    ))
+    assert product_index.lookup_code("DOL-1") == created.id
+    assert _codes(db, product_index.search("dolip")) == ["DOL-1"]
+
+    medicine_service.update_medicine(db, created.id, MedicineUpdate(code="DOL-2", name="Dafalgan"))
+    assert product_index.lookup_code("DOL-1") is None
+    assert product_index.lookup_code("DOL-2") == created.id
+    assert product_index.search("dolip") == []
+    assert _codes(db, product_index.search("dafal")) == ["DOL-2"]
+
+    # No history: hard delete
+    assert medicine_service.delete_medicine(db, created.id)
+    assert product_index.lookup_code("DOL-2") is None
+    assert product_index.search("dafal") == []
+
+
+def test_deactivated_medicine_disappears(db):
+    medicine = db.query(Medicine).filter(Medicine.code == "CLA-100").one()
+    db.add(Batch(medicine_id=medicine.id, batch_number="L1", quantity=0,
+                 expiration_date=date.today() + timedelta(days=30), is_active=True))
+    db.commit()
+
+    # Referenced by a batch: soft delete (is_active = False)
+    assert medicine_service.delete_medicine(db, medicine.id)
+    db.refresh(medicine)
+    assert medicine.is_active is False
+    assert product_index.lookup_code("CLA-100") is None
+    assert "CLA-100" not in _codes(db, product_index.search("amo"))
+    assert medicine.id not in product_index.match_ids("amoxicilline", include_secondary=True)
+
+    # A rebuild agrees with the incremental state
+    incremental = product_index.search("amo")
+    product_index.rebuild(db)
+    assert product_index.search("amo") == incremental
+
+
+def test_product_reset_empties_the_index(db):
+    asyncio.run(admin_routes.reset_data(admin_routes.ResetDataRequest(products=True), None, db))
+
+    assert len(product_index) == 0
+    assert product_index.lookup_code("AMO-500") is None
+    assert product_index.search("amo") == []
+
+    # Ids are reused by SQLite: the new medicine is the only match
+    created = medicine_service.create_medicine(db, MedicineCreate(
+        code="NEW-1", name="Amoxicilline Biogaran", price_buy=1, price_sell=2,
+    ))
+    assert product_index.search("amo") == [created.id]
+    assert product_index.lookup_code("5410000000017") is None
+
+
+def test_scan_never_resolves_a_stale_index_entry(db, monkeypatch):
+    asyncio.run(admin_routes.reset_data(admin_routes.ResetDataRequest(products=True), None, db))
+    created = medicine_service.create_medicine(db, MedicineCreate(
+        code="NEW-1", name="Doliprane", price_buy=1, price_sell=2,
+    ))
+    db.add(Batch(medicine_id=created.id, batch_number="L1", quantity=5,
+                 expiration_date=date.today() + timedelta(days=30), is_active=True))
+    db.commit()
+    assert pos_service.scan_product(db, "NEW-1").product.id == created.id
+    with pytest.raises(ValueError):
+        pos_service.scan_product(db, "AMO-500")
+
+    # An index still pointing the old codes at the reused id: checked against the row
+    stale = ProductSearchIndex()
+    stale.rebuild(db)
+    stale._add(_Entry(created.id, "zinc sulfate", "amo-500", "5410000000017", "", ""), sort=True)
+    monkeypatch.setattr(pos_service, "product_index", stale)
+    assert stale.lookup_code("5410000000017") == created.id
+    for code in ("AMO-500", "5410000000017"):
+        with pytest.raises(ValueError):
+            pos_service.scan_product(db, code)
+    assert pos_service.scan_product(db, "NEW-1").product.id == created.id
@@ -0,0 +1,137 @@
+"""
+Stock holds test.
+
+Checks StockHoldRegistry on its own (reserve/replace, per-owner
+exclusion, expiry, persisted snapshot) and the POS flow on a throw-away
+SQLite database: a scanned unit is held for its till, /cart/remove
+releases it and checkout releases the owner's holds.
+
+Run: python -m pytest -q test_stock_holds.py
+"""
+
+import asyncio
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.models import Batch, Medicine, User, UserRole
+from app.routes import pos as pos_routes
+from app.schemas.pos import CartAddRequest, CheckoutItem, POSCheckoutRequest
+from app.services import pos_service
+from app.services.stock_holds import StockHoldRegistry, hold_key, stock_holds
+
+
+def _alloc(*pairs):
+    return lambda held: [SimpleNamespace(batch_id=b, quantity=q) for b, q in pairs]
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    session.add(User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True))
+    medicine = Medicine(code="MED-1", code_barres="5410000000017", name="Amoxicilline",
+                        quantity=1, price_buy=1, price_sell=2)
+    session.add(medicine)
+    session.flush()
+    session.add(Batch(medicine_id=medicine.id, batch_number="L1", quantity=1,
+                      expiration_date=date.today() + timedelta(days=365), is_active=True))
+    session.commit()
+    return session
+
+
+def test_reserve_replaces_the_line_hold():
+    registry = StockHoldRegistry()
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 3)))
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 5)))
+    registry.reserve("b:1:unite", "b", 1, [10, 11], _alloc((10, 1), (11, 2)))
+
+    assert registry.held_quantities([10, 11]) == {10: 6, 11: 2}
+    assert registry.held_quantities([10, 11], exclude_owner="a") == {10: 1, 11: 2}
+    assert registry.held_quantities([10], exclude_key="b:1:unite") == {10: 5}
+
+
+def test_failed_allocation_keeps_the_previous_hold():
+    registry = StockHoldRegistry()
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 3)))
+
+    def refuse(held):
+        raise ValueError("Stock insuffisant")
+
+    with pytest.raises(ValueError):
+        registry.reserve("a:1:unite", "a", 1, [10], refuse)
+    assert registry.held_quantities([10]) == {10: 3}
+
+
+def test_allocation_sees_the_other_lines_holds():
+    registry = StockHoldRegistry()
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 3)))
+    seen = []
+    registry.reserve("a:1:unite", "a", 1, [10], lambda held: seen.append(held) or [])
+    registry.reserve("b:1:unite", "b", 1, [10], lambda held: seen.append(held) or [])
+    # Its own previous hold is not counted against the line
+    assert seen == [{}, {}]
+
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 3)))
+    registry.reserve("b:1:unite", "b", 1, [10], lambda held: seen.append(held) or [])
+    assert seen[-1] == {10: 3}
+
+
+def test_expired_holds_are_ignored_and_swept():
+    registry = StockHoldRegistry(ttl_seconds=0)
+    registry.reserve("a:1:unite", "a", 1, [10], _alloc((10, 3)))
+
+    assert registry.held_quantities([10]) == {}
+    assert registry.sweep() == 1
+    assert len(registry) == 0
+
+
+def test_snapshot_round_trip(db):
+    registry = StockHoldRegistry()
+    registry.reserve("a:1:unite", "a", 1, [10, 11], _alloc((10, 2), (11, 1)))
+    registry.reserve("b:2:boite", "b", 2, [12], _alloc((12, 20)))
+    assert registry.persist(db) == 3
+    assert registry.persist(db) == 0   # unchanged: nothing written
+
+    restored = StockHoldRegistry()
+    assert restored.restore(db) == 2
+    assert restored.held_quantities([10, 11, 12]) == {10: 2, 11: 1, 12: 20}
+    assert restored.release_owner("a") == 1
+    assert restored.held_quantities([10, 11, 12]) == {12: 20}
+
+
+def test_scan_holds_the_unit_for_its_till(db):
+    till_a, till_b = pos_service.cart_owner(1, "A"), pos_service.cart_owner(1, "B")
+
+    first = pos_service.scan_product(db, "5410000000017", owner=till_a)
+    assert first.allocation is not None and first.allocation.allocations[0].quantity == 1
+    second = pos_service.scan_product(db, "5410000000017", owner=till_b)
+    assert second.allocation is None and second.allocation_error
+
+    # Scanning again on the same till replaces its line, it does not hold twice
+    assert pos_service.scan_product(db, "5410000000017", owner=till_a).allocation is not None
+
+    user = SimpleNamespace(id=1)
+    released = asyncio.run(pos_routes.cart_remove(1, "unite", "A", user))
+    assert released["released"] == 1
+    assert asyncio.run(pos_routes.cart_remove(1, "unite", "A", user))["released"] == 0
+    assert pos_service.scan_product(db, "5410000000017", owner=till_b).allocation is not None
+
+
+def test_checkout_releases_the_owner_holds(db):
+    line = pos_service.cart_add(db, CartAddRequest(medicine_id=1, quantity=1, cart_id="A"),
+                                owner=pos_service.cart_owner(1, "A"))
+    assert len(stock_holds) == 1
+
+    # Another till cannot sell the held unit
+    with pytest.raises(ValueError):
+        pos_service.checkout(db, 1, POSCheckoutRequest(cart_id="B", items=[CheckoutItem(
+            medicine_id=1, allocations=line.allocations, quantity=1, unit_price=2,
+        )]))
+    assert len(stock_holds) == 1
+
+    pos_service.checkout(db, 1, POSCheckoutRequest(cart_id="A", items=[CheckoutItem(
+        medicine_id=1, allocations=line.allocations, quantity=1, unit_price=2,
+    )]))
+    assert len(stock_holds) == 0
+    assert stock_holds.held_quantities([1]) == {}
@@ -0,0 +1,157 @@
+"""
+Sync down test.
+
+Pulls the catalog from a second throw-away SQLite database standing in
+for Supabase: the first pull copies every table in pages, the next one
+only reads rows changed since the high-water mark kept in sync_logs,
+local stock survives catalog updates, settings are matched on their key
+and the POS search index follows the synced medicines.
+
+Run: python -m pytest -q test_sync_down.py
+"""
+
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, engine_local
+from app.models import Batch, Medicine, Settings, SyncLog
+from app.models.medicine_pricing import MedicinePricing
+from app.services.search_index import product_index
+from app.sync import sync_manager
+from app.sync.sync_manager import SyncManager
+
+# Stand-in for Supabase
+engine_remote = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pharma_remote_'), 'remote.db')}")
+
+YESTERDAY = datetime.utcnow() - timedelta(days=1)
+
+
+def _seed_remote(n_medicines):
+    with engine_remote.begin() as conn:
+        conn.execute(insert(Medicine), [
+            {"id": i, "code": f"MED-{i:05d}", "name": f"Quinine {i}", "quantity": 50,
+             "price_buy": 100, "price_sell": 150, "updated_at": YESTERDAY}
+            for i in range(1, n_medicines + 1)
+        ])
+        conn.execute(insert(Batch), [
+            {"id": i, "medicine_id": i, "batch_number": f"LOT-{i}", "quantity": 50,
+             "expiration_date": date.today() + timedelta(days=365), "updated_at": YESTERDAY}
+            for i in range(1, n_medicines + 1)
+        ])
+        conn.execute(insert(MedicinePricing), [
+            {"id": i, "medicine_id": i, "nom": f"Quinine {i}", "lot": f"LOT-{i}",
+             "vente_boite": 150, "updated_at": YESTERDAY}
+            for i in range(1, n_medicines + 1)
+        ])
+        conn.execute(insert(Settings), [
+            {"id": 10, "key": "pharmacy_name", "value": "Pharmacie Centrale", "updated_at": YESTERDAY},
+        ])
+
+
+def _count(engine, model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+@pytest.fixture()
+def db(fresh_db, monkeypatch):
+    Base.metadata.drop_all(bind=engine_remote)
+    Base.metadata.create_all(bind=engine_remote)
+    monkeypatch.setattr(sync_manager, "SessionRemote", sessionmaker(bind=engine_remote))
+    monkeypatch.setattr(sync_manager, "_remote_available", lambda: True)
+    monkeypatch.setattr(sync_manager, "SYNC_DOWN_OVERLAP_SECONDS", 0)
+    product_index.rebuild(fresh_db)
+    return fresh_db
+
+
+def test_first_pull_copies_the_catalog_in_pages(db):
+    _seed_remote(2500)
+    report = SyncManager.sync_down(db, page_size=1000)
+
+    assert report["errors"] == 0
+    assert report["medicines_updated"] == 2500
+    assert report["tables"]["batches"] == report["tables"]["medicine_pricing"] == 2500
+    assert report["settings_updated"] == 1
+    assert _count(engine_local, Medicine) == 2500
+    assert _count(engine_local, Batch) == 2500
+
+    marks = SyncManager.high_water_marks(db)
+    assert set(marks) == {"settings", "medicines", "batches", "medicine_pricing"}
+    assert product_index.lookup_code("MED-02042") == 2042
+
+
+def test_next_pull_reads_only_changed_rows(db):
+    _seed_remote(2500)
+    SyncManager.sync_down(db, page_size=1000)
+
+    with engine_remote.begin() as conn:
+        conn.execute(update(Medicine).where(Medicine.id.in_([5, 6, 7]))
+                     .values(name="Artemether", updated_at=datetime.utcnow()))
+
+    statements = []
+
+    def _count_statements(*args):
+        statements.append(args[2])
+
+    event.listen(engine_remote, "before_cursor_execute", _count_statements)
+    try:
+        report = SyncManager.sync_down(db, page_size=1000)
+    finally:
+        event.remove(engine_remote, "before_cursor_execute", _count_statements)
+
+    assert {name: count for name, count in report["tables"].items() if count} == {"medicines": 3}
+    assert report["pages"] == 1
+    # One page query per table, nothing proportional to the catalog size
+    assert len(statements) == 6
+    assert db.execute(select(func.count()).where(Medicine.name == "Artemether")).scalar() == 3
+    assert set(product_index.search("artemether")) == {5, 6, 7}
+
+
+def test_local_stock_survives_catalog_updates(db):
+    _seed_remote(10)
+    SyncManager.sync_down(db)
+    db.execute(update(Medicine).where(Medicine.id == 3).values(quantity=7))
+    db.execute(update(Batch).where(Batch.id == 3).values(quantity=7))
+    db.commit()
+
+    with engine_remote.begin() as conn:
+        conn.execute(update(Medicine).where(Medicine.id == 3)
+                     .values(name="Quinine forte", quantity=999, updated_at=datetime.utcnow()))
+        conn.execute(update(Batch).where(Batch.id == 3)
+                     .values(batch_number="LOT-3B", quantity=999, updated_at=datetime.utcnow()))
+    SyncManager.sync_down(db)
+
+    medicine = db.get(Medicine, 3)
+    db.refresh(medicine)
+    assert (medicine.name, medicine.quantity) == ("Quinine forte", 7)
+    batch = db.get(Batch, 3)
+    db.refresh(batch)
+    assert (batch.batch_number, batch.quantity) == ("LOT-3B", 7)
+
+
+def test_settings_are_matched_on_their_key(db):
+    db.add(Settings(key="pharmacy_name", value="Ancien nom"))
+    db.commit()
+    _seed_remote(1)
+    SyncManager.sync_down(db)
+
+    assert db.execute(select(Settings.value).where(Settings.key == "pharmacy_name")).scalar_one() == "Pharmacie Centrale"
+    assert _count(engine_local, Settings) == 1
+
+
+def test_conflicting_row_is_skipped(db):
+    # Local medicine already owns a code the cloud gives to another id
+    db.add(Medicine(id=900, code="MED-00004", name="Locale", quantity=1, price_buy=1, price_sell=2))
+    db.commit()
+    _seed_remote(10)
+    report = SyncManager.sync_down(db)
+
+    assert report["errors"] == 0
+    assert report["medicines_updated"] == 9
+    assert db.get(Medicine, 900).name == "Locale"
+    assert db.execute(select(func.count()).select_from(SyncLog)).scalar() == 4
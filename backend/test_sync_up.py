@@ -0,0 +1,135 @@
+"""
+Sync up test.
+
+Pushes local POS sales to a second throw-away SQLite database standing in
+for Supabase: the queue is drained chunk by chunk, sales already in the
+cloud are skipped, the remote statements are counted per chunk (not per
+sale) and a sale rejected by the cloud is isolated without failing the
+rest of its chunk.
+
+Run: python -m pytest -q test_sync_up.py
+"""
+
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, engine_local
+from app.models import Medicine, User, UserRole
+from app.models.pos_sale import POSSale, POSSaleItem
+from app.sync import sync_manager
+from app.sync.sync_manager import SyncManager
+
+# Stand-in for Supabase
+engine_remote = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pharma_remote_'), 'remote.db')}")
+
+
+def _seed(engine, n_sales, prefix="POS"):
+    with engine.begin() as conn:
+        sale_ids = conn.execute(insert(POSSale).returning(POSSale.id), [
+            {"sale_uuid": f"uuid-{i:06d}", "code": f"{prefix}-{i:06d}", "total_amount": 300.0,
+             "user_id": 1, "sync_status": "pending"}
+            for i in range(n_sales)
+        ]).scalars().all()
+        conn.execute(insert(POSSaleItem), [
+            {"sale_id": sale_id, "medicine_id": medicine_id, "quantity": 1,
+             "unit_price": 150.0, "total_price": 150.0}
+            for sale_id in sale_ids for medicine_id in (1, 2)
+        ])
+
+
+@pytest.fixture()
+def db(fresh_db, monkeypatch):
+    Base.metadata.drop_all(bind=engine_remote)
+    Base.metadata.create_all(bind=engine_remote)
+    for engine in (engine_local, engine_remote):
+        with engine.begin() as conn:
+            conn.execute(insert(User), [{"username": "caisse", "password_hash": "x",
+                                         "role": UserRole.PHARMACIST, "is_active": True}])
+            conn.execute(insert(Medicine), [
+                {"code": f"MED-{i}", "name": f"Quinine {i}", "quantity": 10, "price_buy": 100, "price_sell": 150}
+                for i in (1, 2)
+            ])
+    monkeypatch.setattr(sync_manager, "SessionRemote", sessionmaker(bind=engine_remote))
+    monkeypatch.setattr(sync_manager, "_remote_available", lambda: True)
+    return fresh_db
+
+
+def _remote_count(model):
+    with engine_remote.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar()
+
+
+def _local_status(db):
+    return dict(db.execute(select(POSSale.sync_status, func.count()).group_by(POSSale.sync_status)).all())
+
+
+def test_queue_is_drained_in_chunks(db):
+    _seed(engine_local, 1200)
+    report = SyncManager.sync_up(db, chunk_size=250)
+
+    assert report["synced"] == 1200
+    assert report["chunks"] == 5
+    assert report["errors"] == 0
+    assert report["sales_per_second"] > 0
+    assert _remote_count(POSSale) == 1200
+    assert _remote_count(POSSaleItem) == 2400
+    assert _local_status(db) == {"synced": 1200}
+
+    # Items point at the cloud ids of their sale
+    with engine_remote.connect() as conn:
+        orphans = conn.execute(
+            select(func.count()).select_from(POSSaleItem)
+            .outerjoin(POSSale, POSSale.id == POSSaleItem.sale_id)
+            .where(POSSale.id.is_(None))
+        ).scalar()
+    assert orphans == 0
+
+
+def test_sales_already_in_the_cloud_are_skipped(db):
+    _seed(engine_remote, 40)
+    _seed(engine_local, 100)
+    report = SyncManager.sync_up(db, chunk_size=30)
+
+    assert report["synced"] == 60
+    assert report["skipped"] == 40
+    assert _remote_count(POSSale) == 100
+    # Items of the skipped sales are not duplicated
+    assert _remote_count(POSSaleItem) == 200
+    assert _local_status(db) == {"synced": 100}
+
+
+def test_remote_statements_are_per_chunk(db):
+    _seed(engine_local, 600)
+    statements = []
+
+    def _count(*args):
+        statements.append(args[2])
+
+    event.listen(engine_remote, "before_cursor_execute", _count)
+    try:
+        report = SyncManager.sync_up(db, chunk_size=200)
+    finally:
+        event.remove(engine_remote, "before_cursor_execute", _count)
+
+    assert report["synced"] == 600
+    # Multi-row INSERT batches, not one round trip per sale
+    assert len(statements) < 600 // 10
+
+
+def test_rejected_sale_is_isolated(db):
+    _seed(engine_local, 50)
+    # Same code, different UUID: the cloud rejects this one sale
+    with engine_remote.begin() as conn:
+        conn.execute(insert(POSSale), [{"sale_uuid": "other", "code": "POS-000007",
+                                        "total_amount": 1.0, "user_id": 1}])
+
+    report = SyncManager.sync_up(db, chunk_size=20)
+
+    assert report["synced"] == 49
+    assert report["errors"] == 1
+    assert _local_status(db) == {"synced": 49, "error": 1}
+    assert db.execute(select(POSSale.code).where(POSSale.sync_status == "error")).scalar() == "POS-000007"
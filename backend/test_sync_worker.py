@@ -0,0 +1,152 @@
+"""
+Background sync worker test.
+
+Runs sync_worker against a throw-away local SQLite database and a second
+one standing in for Supabase: a burst of checkouts triggers one debounced
+sync, offline passes back off exponentially without re-probing on every
+checkout and /sync/status is answered from local and in-memory state
+only.
+
+Run: python -m pytest -q test_sync_worker.py
+"""
+
+import os
+import tempfile
+import time
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, SessionLocal, engine_local
+from app.models import Medicine, User, UserRole
+from app.models.pos_sale import POSSale
+from app.sync import sync_manager
+from app.sync.sync_manager import SyncManager
+from app.sync.sync_worker import SyncWorker
+from app.utils.network import connectivity
+
+# Stand-in for Supabase
+engine_remote = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='pharma_remote_'), 'remote.db')}")
+
+
+def _add_sales(n_sales, start=0):
+    with engine_local.begin() as conn:
+        conn.execute(insert(POSSale), [
+            {"sale_uuid": f"uuid-{i:06d}", "code": f"POS-{i:06d}", "total_amount": 300.0,
+             "user_id": 1, "sync_status": "pending"}
+            for i in range(start, start + n_sales)
+        ])
+
+
+def _remote_sales():
+    with engine_remote.connect() as conn:
+        return conn.execute(select(func.count()).select_from(POSSale)).scalar()
+
+
+@pytest.fixture()
+def online(fresh_db, monkeypatch):
+    Base.metadata.drop_all(bind=engine_remote)
+    Base.metadata.create_all(bind=engine_remote)
+    for engine in (engine_local, engine_remote):
+        with engine.begin() as conn:
+            conn.execute(insert(User), [{"username": "caisse", "password_hash": "x",
+                                         "role": UserRole.PHARMACIST, "is_active": True}])
+            conn.execute(insert(Medicine), [{"code": "MED-1", "name": "Quinine", "quantity": 10,
+                                             "price_buy": 100, "price_sell": 150}])
+    state = {"online": True, "probes": 0}
+
+    def _probe_database():
+        state["probes"] += 1
+        if not state["online"]:
+            raise OperationalError("SELECT 1", {}, Exception("réseau coupé"))
+
+    monkeypatch.setattr(sync_manager, "SessionRemote", sessionmaker(bind=engine_remote))
+    monkeypatch.setattr(connectivity, "_probe_database", _probe_database)
+    connectivity.reset()
+    yield state
+    connectivity.reset()
+
+
+@pytest.fixture()
+def worker():
+    worker = SyncWorker(interval=60, debounce=0.2, max_delay=1, backoff_base=0.5, backoff_max=2)
+    yield worker
+    worker.stop()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_checkout_burst_triggers_one_sync(online, worker, monkeypatch):
+    runs = []
+    sync_up = SyncManager.sync_up
+
+    def _sync_up(db, chunk_size=None):
+        runs.append(time.monotonic())
+        return sync_up(db, chunk_size)
+
+    monkeypatch.setattr(SyncManager, "sync_up", staticmethod(_sync_up))
+    worker.start(SessionLocal)
+    for i in range(5):
+        _add_sales(1, start=i)
+        worker.notify()
+        time.sleep(0.05)
+
+    assert _wait_for(lambda: _remote_sales() == 5)
+    time.sleep(0.3)
+    assert len(runs) == 1
+    status = worker.status()
+    assert status["last_success_at"] is not None
+    assert status["consecutive_failures"] == 0
+
+
+def test_offline_backs_off_exponentially(online, worker, monkeypatch):
+    online["online"] = False
+    worker._session_factory = SessionLocal
+    _add_sales(3)
+
+    worker.run_once()
+    first = worker.status()["retry_in_s"]
+    monkeypatch.setattr(connectivity, "ttl", 0)  # state expired
+    worker.run_once()
+    second = worker.status()["retry_in_s"]
+
+    assert worker.status()["consecutive_failures"] == 2
+    assert 0 < first <= 0.5 < second <= 1
+    assert _remote_sales() == 0
+
+
+def test_checkouts_during_backoff_do_not_probe(online, worker, monkeypatch):
+    online["online"] = False
+    worker.backoff_base = worker.backoff_max = 30
+    worker.start(SessionLocal)
+    _add_sales(1)
+    worker.notify()
+    assert _wait_for(lambda: worker.status()["consecutive_failures"] == 1)
+
+    probes = online["probes"]
+    monkeypatch.setattr(connectivity, "ttl", 0)
+    for _ in range(10):
+        worker.notify()
+    time.sleep(0.5)
+    assert online["probes"] == probes
+    assert worker.status()["consecutive_failures"] == 1
+
+
+def test_status_does_not_probe(online, worker):
+    _add_sales(4)
+    with SessionLocal() as db:
+        status = SyncManager.get_status(db)
+    assert online["probes"] == 0
+    assert status["queue_depth"] == 4
+    assert status["lag_seconds"] >= 0
+    assert status["connectivity"]["checked_at"] is None
+    assert worker.status()["last_success_at"] is None
@@ -0,0 +1,125 @@
+"""
+Authenticated-user cache test.
+
+Runs the auth dependencies against a throw-away SQLite database: a warm
+token resolves without any query, password changes revoke older tokens,
+deactivation and deletion are seen by the next request, and the cache
+stays bounded.
+
+Run: python -m pytest -q test_user_cache.py
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.auth.dependencies import get_current_active_user, get_current_user
+from app.auth.user_cache import UserCache, UserPrincipal
+from app.database import engine_local
+from app.models import User, UserRole
+from app.routes import auth as auth_routes, users as users_routes
+from app.schemas.auth import ChangeInitialPassword
+from app.utils.security import create_access_token
+
+
+@pytest.fixture()
+def db(fresh_db):
+    session = fresh_db
+    session.add_all([
+        User(username="caisse", password_hash="x", role=UserRole.PHARMACIST, is_active=True),
+        User(username="chef", password_hash="x", role=UserRole.ADMIN, is_active=True),
+    ])
+    session.commit()
+    return session
+
+
+def _token(username, version=0):
+    return create_access_token({"sub": username, "ver": version})
+
+
+def _request(db, token):
+    async def chain():
+        return await get_current_active_user(await get_current_user(token, db), db)
+    return asyncio.run(chain())
+
+
+def _admin(db):
+    return _request(db, _token("chef"))
+
+
+def test_warm_token_costs_no_query(db):
+    token = _token("caisse")
+    statements = []
+
+    def _count(*args):
+        statements.append(args[2])
+
+    _request(db, token)
+    event.listen(engine_local, "before_cursor_execute", _count)
+    try:
+        for _ in range(10):
+            user = _request(db, token)
+    finally:
+        event.remove(engine_local, "before_cursor_execute", _count)
+
+    assert statements == []
+    assert isinstance(user, UserPrincipal)
+    assert (user.username, user.role) == ("caisse", "pharmacist")
+
+
+def test_password_change_revokes_older_tokens(db):
+    old = _token("caisse")
+    user = _request(db, old)
+    asyncio.run(users_routes.update_user_password(user.id, users_routes.PasswordUpdate(password="nouveau"),
+                                                  _admin(db), db))
+
+    with pytest.raises(HTTPException) as exc:
+        _request(db, old)
+    assert exc.value.status_code == 401
+    assert _request(db, _token("caisse", version=1)).id == user.id
+
+
+def test_deactivation_and_deletion_are_seen_at_once(db):
+    token = _token("caisse")
+    user = _request(db, token)
+
+    asyncio.run(users_routes.toggle_user_status(user.id, _admin(db), db))
+    with pytest.raises(HTTPException) as exc:
+        _request(db, token)
+    assert exc.value.status_code == 400
+
+    asyncio.run(users_routes.delete_user(user.id, _admin(db), db))
+    with pytest.raises(HTTPException) as exc:
+        _request(db, token)
+    assert exc.value.status_code == 401
+
+
+def test_initial_password_change_issues_a_current_token(db):
+    db.query(User).filter(User.username == "caisse").update({"must_change_password": True})
+    db.commit()
+    old = _token("caisse")
+    user = _request(db, old)
+    assert user.must_change_password is True
+
+    response = asyncio.run(auth_routes.change_initial_password(
+        ChangeInitialPassword(new_password="motdepasse1", confirm_password="motdepasse1"), user, db,
+    ))
+    assert _request(db, response["access_token"]).must_change_password is False
+    with pytest.raises(HTTPException):
+        _request(db, old)
+
+
+def test_cache_is_bounded_and_expires():
+    cache = UserCache(ttl=60, max_size=2)
+    for i in range(3):
+        cache.put(UserPrincipal(id=i, username=f"u{i}", role="pharmacist", is_active=True,
+                                must_change_password=False, token_version=0))
+    assert cache.get("u0", 0) is None
+    assert cache.get("u2", 0).id == 2
+    assert cache.get("u2", 1) is None
+
+    cache.ttl = 0
+    assert cache.get("u2", 0) is None
+    assert cache.stats()["size"] == 1